@@ -41,5 +41,10 @@ export default defineNuxtConfig({
     dirs: ['stores']
   },
 
+  // Set by the Python runner so every server directory keeps its own Vite cache
+  vite: {
+    cacheDir: process.env.ANIMATION_VITE_CACHE_DIR || undefined,
+  },
+
   compatibilityDate: '2025-04-12'
 })
@@ -9,7 +9,8 @@ logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 
 with import_functions():
-    from linda_server.functions.llm_chat import Message, LlmChatInput, llm_chat
+    from linda_server.functions.llm_chat import Message, LlmChatInput, LlmChatOutput, llm_chat
+    from linda_server.functions import LOCAL_FUNCTIONS_TASK_QUEUE
     from linda_server.functions.animation_services import save_animation_code
     from linda_server.agents.prompts.animation_developer_prompt import SYSTEM_PROMPT as ANIMATION_DEVELOPER_SYSTEM_PROMPT
 
@@ -56,27 +57,43 @@ class AnimationDeveloperAgent:
                 )
             ]
             
-            # Call LLM to generate animation code
-            animation_code = await agent.step(
+            # Stream the animation code straight into the animation server, so each file
+            # is saved (and starts compiling) as soon as its code block is complete
+            step_result = await agent.step(
                 function=llm_chat,
-                function_input=LlmChatInput(messages=code_messages),
+                function_input=LlmChatInput(
+                    messages=code_messages,
+                    cache=True,
+                    stream=True,
+                    stream_target="animation_server",
+                ),
                 start_to_close_timeout=timedelta(seconds=240),
             )
+            if isinstance(step_result, LlmChatOutput):
+                animation_code = step_result.content
+                streamed_files = step_result.saved_files
+            else:
+                animation_code = step_result
+                streamed_files = []
             logger.info("Received animation code block")
-            
-            # Save the animation code
-            logger.info("Calling service function to save animation code")
-            save_result = await agent.step(
-                function=save_animation_code,
-                function_input=animation_code,
-                start_to_close_timeout=timedelta(seconds=60000),
-            )
-            
-            if not save_result.get("success", False):
-                logger.error(f"Failed to save animation code: {save_result.get('message')}")
-                raise ValueError(save_result.get("message", "Unknown error saving animation code"))
-                
-            logger.info(f"Animation code saved: {save_result.get('message')}")
+
+            if streamed_files:
+                logger.info(f"Animation code saved while streaming: {len(streamed_files)} files")
+            else:
+                # Nothing was saved during the stream; fall back to saving the full text
+                logger.info("Calling service function to save animation code")
+                save_result = await agent.step(
+                    function=save_animation_code,
+                    function_input=animation_code,
+                    task_queue=LOCAL_FUNCTIONS_TASK_QUEUE,
+                    start_to_close_timeout=timedelta(seconds=60000),
+                )
+
+                if not save_result.get("success", False):
+                    logger.error(f"Failed to save animation code: {save_result.get('message')}")
+                    raise ValueError(save_result.get("message", "Unknown error saving animation code"))
+
+                logger.info(f"Animation code saved: {save_result.get('message')}")
             
             self.animation_code = animation_code
             self.status = "complete"
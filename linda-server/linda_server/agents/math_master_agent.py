@@ -5,6 +5,7 @@ from typing import Dict, Any, List
 from datetime import timedelta
 from pydantic import BaseModel
 from restack_ai.agent import agent, import_functions, NonRetryableError
+from temporalio.exceptions import ActivityError, ApplicationError
 
 # Configure logger
 logger = logging.getLogger(__name__)
@@ -25,8 +26,9 @@ class GeometryProblemInput(BaseModel):
     image_path: str | None = None
 
 with import_functions():
-    from linda_server.functions.llm_chat import Message as LlmMessage, LlmChatInput, llm_chat
+    from linda_server.functions.llm_chat import Message as LlmMessage, LlmChatInput, LlmChatOutput, llm_chat
     from linda_server.agents.prompts.math_master_prompt import SYSTEM_PROMPT as MATH_MASTER_SYSTEM_PROMPT
+    from linda_server.utils.stream_relay import STREAM_ABANDONED_ERROR_TYPE
 
 @agent.defn()
 class MathMasterAgent:
@@ -34,6 +36,7 @@ class MathMasterAgent:
         logger.info("Initializing MathMasterAgent")
         self.status = "idle"
         self.end = False
+        self.last_stream_stats: Dict[str, Any] = {}
 
     @agent.event
     async def messages(self, messages_event: MessagesEvent):
@@ -59,15 +62,32 @@ class MathMasterAgent:
             ]
 
             logger.info("Calling llm_chat for solution (streaming)")
-            stream_response = await agent.step(
+            step_result = await agent.step(
                 function=llm_chat,
-                function_input=LlmChatInput(messages=messages, stream=True),
+                function_input=LlmChatInput(messages=messages, stream=True, cache=True, include_stats=True),
                 start_to_close_timeout=timedelta(seconds=36000),
+                # The relay heartbeats while streaming, so a short timeout lets cancellation reach it quickly
+                heartbeat_timeout=timedelta(seconds=30),
             )
+            if isinstance(step_result, LlmChatOutput):
+                stream_response = step_result.content
+                self.last_stream_stats = step_result.stream_stats
+                logger.info("Stream stats: %s", step_result.stream_stats)
+            else:
+                stream_response = step_result
 
             self.status = "complete"
             logger.info("messages event completed successfully")
             return stream_response
+        except ActivityError as e:
+            if isinstance(e.cause, ApplicationError) and e.cause.type == STREAM_ABANDONED_ERROR_TYPE:
+                # Nobody is listening any more; the upstream generation has already been stopped
+                logger.info("Solution stream abandoned by the client")
+                self.status = "cancelled"
+                return ""
+            logger.exception("Error in messages event")
+            self.status = "error"
+            raise NonRetryableError(f"Error in math master agent messages handler: {e}") from e
         except Exception as e:
             logger.exception("Error in messages event")
             self.status = "error"
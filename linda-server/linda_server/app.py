@@ -1,9 +1,13 @@
-from fastapi import FastAPI, Request, HTTPException
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Request, WebSocket
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import RedirectResponse
+from fastapi.staticfiles import StaticFiles
 from strawberry.fastapi import GraphQLRouter
 from strawberry.subscriptions import GRAPHQL_TRANSPORT_WS_PROTOCOL, GRAPHQL_WS_PROTOCOL
-import jwt  # PyJWT library
-from datetime import datetime, timedelta
+from typing import Optional
+import asyncio
+import hmac
 import os
 from dotenv import load_dotenv
 
@@ -12,8 +16,27 @@ load_dotenv()
 
 # Import your GraphQL schema
 from .graphql.schema import schema
+from .utils.metrics import metrics
+from .utils.auth_tokens import get_token_verifier
+from .utils.auth_middleware import UserAuthMiddleware
+from .utils.animation_workspaces import get_workspace_manager
+from .utils.animation_builds import STATIC_ANIMATIONS_PREFIX, get_publish_dir, get_session_build
+from .utils.animation_server_runner import PREVIEW_PATH_PREFIX
+from .utils.animation_preview_proxy import (
+    PREVIEW_COOKIE,
+    PreviewGrant,
+    close_preview_proxy,
+    get_preview_grants,
+    proxy_http,
+    proxy_websocket,
+)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    await close_preview_proxy()
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 # Get CORS settings from environment
 cors_origins = os.getenv("CORS_ORIGINS", "http://localhost:3000")
@@ -30,36 +53,130 @@ app.add_middleware(
 
 oauth2_scheme = None  # Not used anymore since we removed REST authentication
 
-def verify_token(token: str):
+# Auth settings are resolved once, after .env is loaded
+token_verifier = get_token_verifier()
+
+# Plain ASGI, so it also covers the /graphql websocket and never buffers responses
+app.add_middleware(UserAuthMiddleware, verifier=token_verifier)
+
+# Metrics reveal usage and load, so they are only served with this token
+metrics_token = os.getenv("METRICS_TOKEN", "")
+
+@app.get("/metrics")
+async def get_metrics(request: Request):
+    """
+    Expose in-process counters and gauges as JSON.
+
+    Disabled unless METRICS_TOKEN is set; scrapers send it as a bearer token.
+    """
+    if not metrics_token:
+        raise HTTPException(status_code=404, detail="Not Found")
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not hmac.compare_digest(token.encode(), metrics_token.encode()):
+        raise HTTPException(status_code=401, detail="Invalid metrics token", headers={"WWW-Authenticate": "Bearer"})
+    return metrics.snapshot()
+
+class ImmutableStaticFiles(StaticFiles):
+    """Static files whose URLs change with their content, so they can be cached for good."""
+    def file_response(self, *args, **kwargs):
+        response = super().file_response(*args, **kwargs)
+        response.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+        return response
+
+# Production animation bundles, addressed by the hash of their inputs
+app.mount(
+    STATIC_ANIMATIONS_PREFIX,
+    ImmutableStaticFiles(directory=os.path.join(get_publish_dir(), "builds"), html=True, check_dir=False),
+    name="static-animations",
+)
+
+@app.get("/animations/{session_id}")
+async def preview_animation(request: Request, session_id: str, ticket: Optional[str] = None):
+    """
+    Redirect a session to its latest production bundle, or to the proxied dev server
+    previewing its workspace while no bundle has been published yet.
+
+    Only the user who claimed the session may preview it, authenticated by a bearer token
+    or, for iframes, by a single-use preview ticket. The redirect to the dev server sets
+    the preview cookie the proxy checks. A session without a workspace is not found;
+    this never creates one.
+    """
+    grants = get_preview_grants()
+    user_id = None
+    if ticket:
+        grant = grants.redeem_ticket(ticket)
+        if grant is not None and grant.session_id == session_id:
+            user_id = grant.user_id
+    elif request.scope.get("user") is not None:
+        user_id = str(request.scope["user"]["user_id"])
+    if user_id is None:
+        raise HTTPException(status_code=401, detail="Authentication required")
     try:
-        # Get JWT settings directly from environment
-        secret_key = os.getenv("JWT_SECRET_KEY", "your_default_secret_key")
-        algorithm = os.getenv("JWT_ALGORITHM", "HS256")
-        
-        payload = jwt.decode(token, secret_key, algorithms=[algorithm])
-        user_id: int = payload.get("sub")
-        if user_id is None:
-            raise HTTPException(status_code=401, detail="Invalid authentication credentials")
-        return {"user_id": user_id, "is_authenticated": True}
-    except jwt.PyJWTError:
-        raise HTTPException(status_code=401, detail="Invalid authentication credentials")
-
-@app.middleware("http")
-async def add_user_to_request(request: Request, call_next):
-    token = request.headers.get("Authorization")
-    if token:
-        try:
-            scheme, _, param = token.partition(" ")
-            if scheme.lower() == "bearer":
-                user = verify_token(param)
-                request.state.user = user
-        except HTTPException:
-            request.state.user = None
-    else:
-        request.state.user = None
-    response = await call_next(request)
+        manager = get_workspace_manager()
+        owner = await asyncio.to_thread(manager.session_owner, session_id)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    if owner is None or owner != user_id:
+        # Sessions of other users are indistinguishable from missing ones
+        raise HTTPException(status_code=404, detail="Animation session not found")
+
+    # The ticket must not leak from the redirect, and the redirect must not be cached
+    headers = {"Cache-Control": "no-store", "Referrer-Policy": "no-referrer"}
+    build = get_session_build(session_id)
+    if build is not None:
+        return RedirectResponse(build.url, status_code=307, headers=headers)
+    try:
+        preview = await manager.get_preview_server(session_id, create=False)
+    except (ValueError, FileNotFoundError):
+        raise HTTPException(status_code=404, detail="Animation session not found")
+    if preview is None:
+        raise HTTPException(status_code=503, detail="Animation preview server is not available")
+    response = RedirectResponse(preview.base_path, status_code=307, headers=headers)
+    response.set_cookie(
+        PREVIEW_COOKIE,
+        grants.open_cookie(session_id, user_id),
+        max_age=int(grants.cookie_seconds),
+        path=preview.base_path,
+        httponly=True,
+        secure=request.url.scheme == "https",
+        samesite="lax",
+    )
     return response
 
+def _preview_grant(port: int, cookie: Optional[str]) -> Optional[PreviewGrant]:
+    # The cookie must belong to the session the server on this port is previewing right now
+    grant = get_preview_grants().check_cookie(cookie)
+    if grant is None:
+        return None
+    try:
+        previewing = get_workspace_manager().running_preview_port(grant.session_id)
+    except ValueError:
+        return None
+    return grant if previewing == port else None
+
+@app.api_route(
+    f"{PREVIEW_PATH_PREFIX}/{{port}}/{{path:path}}",
+    methods=["GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"],
+    include_in_schema=False,
+)
+async def proxy_animation_preview(request: Request, port: int, path: str):
+    """
+    Serve a session's dev server to the browser holding its preview cookie.
+    """
+    if _preview_grant(port, request.cookies.get(PREVIEW_COOKIE)) is None:
+        raise HTTPException(status_code=404, detail="Animation preview not found")
+    return await proxy_http(request, port, path)
+
+@app.websocket(f"{PREVIEW_PATH_PREFIX}/{{port}}/{{path:path}}")
+async def proxy_animation_preview_websocket(websocket: WebSocket, port: int, path: str):
+    """
+    Relay the Vite HMR websocket of a session's dev server.
+    """
+    if _preview_grant(port, websocket.cookies.get(PREVIEW_COOKIE)) is None:
+        await websocket.close(code=1008)
+        return
+    await proxy_websocket(websocket, port, path)
+
 # Set up GraphQL router
 graphql_router = GraphQLRouter(
     schema,
@@ -1,3 +1,4 @@
 from linda_server.db.models.user import User
+from linda_server.db.models.refresh_token import RefreshToken
 
-__all__ = ['User']
+__all__ = ['User', 'RefreshToken']
@@ -0,0 +1,53 @@
+from datetime import datetime
+from typing import Optional
+from linda_server.db.models.refresh_token import RefreshToken
+from repository_sqlalchemy import BaseRepository
+import logging
+
+logger = logging.getLogger(__name__)
+
+class RefreshTokenRepository(BaseRepository[RefreshToken]):
+    def create_refresh_token(
+        self,
+        user_id: int,
+        token_hash: str,
+        family_id: str,
+        created_at: datetime,
+        expires_at: datetime
+    ) -> RefreshToken:
+        return self.create(RefreshToken(
+            user_id=user_id,
+            token_hash=token_hash,
+            family_id=family_id,
+            created_at=created_at,
+            expires_at=expires_at
+        ))
+
+    def find_token_by_hash(self, token_hash: str) -> Optional[RefreshToken]:
+        return self.session.query(RefreshToken).filter(RefreshToken.token_hash == token_hash).first()
+
+    def update_revoke_token(self, token_id: int, revoked_at: datetime) -> bool:
+        """
+        Revoke a token unless it already was. Returns False if another request revoked it first.
+        """
+        revoked = (
+            self.session.query(RefreshToken)
+            .filter(RefreshToken.id == token_id, RefreshToken.revoked_at.is_(None))
+            .update({RefreshToken.revoked_at: revoked_at}, synchronize_session=False)
+        )
+        return revoked == 1
+
+    def update_revoke_family(self, family_id: str, revoked_at: datetime) -> int:
+        """
+        Revoke every live token rotated from the same login. Returns how many were revoked.
+        """
+        revoked = (
+            self.session.query(RefreshToken)
+            .filter(RefreshToken.family_id == family_id, RefreshToken.revoked_at.is_(None))
+            .update({RefreshToken.revoked_at: revoked_at}, synchronize_session=False)
+        )
+        if revoked:
+            logger.warning(f"Revoked {revoked} refresh tokens of family {family_id}")
+        return revoked
+
+refresh_token_repository = RefreshTokenRepository()
@@ -1 +1,5 @@
 # Functions module initialization
+
+# Task queue served by the separate worker pool for cheap local functions
+# (file writes, parsing) so they never wait behind slow LLM calls.
+LOCAL_FUNCTIONS_TASK_QUEUE = "local_functions"
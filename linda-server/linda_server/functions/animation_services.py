@@ -1,46 +1,40 @@
 """
 Functions for animation-related services that run outside the workflow context.
 """
-import os
 import logging
-import sys
-from typing import List, Dict, Any
-from restack_ai.function import function, log, NonRetryableError
+from typing import Dict, Any
+from restack_ai.function import function
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 
 # Import the parser and file utilities here (outside workflow context)
 from linda_server.utils.animation_parser import parse_animation_code, save_animation_files
+from linda_server.utils.animation_commit import commit_animation_files_async, get_commit_mode
+from linda_server.utils.blocking_io import OffloadStats, run_file_io
+from linda_server.utils.animation_workspaces import current_session_id, resolve_animation_dir
+from linda_server.utils.animation_builds import queue_animation_build
 
 @function.defn()
 async def save_animation_code(animation_code: str) -> Dict[str, Any]:
     """
-    Save animation code to the animation server directory.
+    Save animation code to the calling session's animation workspace.
     This function runs outside the workflow context and can access environment variables.
     
     Args:
         animation_code: The raw animation code to save
         
     Returns:
-        Dict with status and message
+        Dict with status, message, saved files (split into written and unchanged),
+        for atomic commits the commit timings, and the file I/O time kept off the event loop
     """
     logger.info("Service function: save_animation_code called")
     
-    # Check for mandatory ANIMATION_SERVER_PATH environment variable
-    if "ANIMATION_SERVER_PATH" not in os.environ:
-        error_msg = "ERROR: ANIMATION_SERVER_PATH environment variable is not set!"
-        logger.error(error_msg)
-        return {
-            "success": False,
-            "message": error_msg,
-            "saved_files": []
-        }
-    
-    animation_server_dir = os.environ["ANIMATION_SERVER_PATH"]
-    
-    if not os.path.exists(animation_server_dir):
-        error_msg = f"ERROR: Animation server directory not found: {animation_server_dir}"
+    # Write into the calling agent's workspace (or ANIMATION_SERVER_PATH itself in shared mode)
+    try:
+        animation_server_dir = await run_file_io("workspace", resolve_animation_dir)
+    except (ValueError, OSError) as e:
+        error_msg = f"ERROR: {str(e)}"
         logger.error(error_msg)
         return {
             "success": False,
@@ -52,12 +46,36 @@ async def save_animation_code(animation_code: str) -> Dict[str, Any]:
         # Parse and save the animation code
         logger.info(f"Saving animation code to {animation_server_dir}")
         parsed_files = parse_animation_code(animation_code)
-        saved_files = save_animation_files(animation_server_dir, parsed_files)
+        commit_timings = None
+        io_stats = OffloadStats()
+        if get_commit_mode() == "atomic":
+            # Swap all files in at once so the dev server rebuilds a complete project
+            commit = await commit_animation_files_async(animation_server_dir, parsed_files, stats=io_stats)
+            written_files = commit.saved_files
+            unchanged_files = commit.unchanged_files
+            commit_timings = commit.timings()
+        else:
+            unchanged_files = []
+            written_files = await run_file_io(
+                "save", save_animation_files, animation_server_dir, parsed_files, unchanged_files, stats=io_stats
+            )
+        saved_files = written_files + unchanged_files
+        logger.info(f"Kept {io_stats.seconds * 1000:.1f}ms of file I/O off the event loop in {io_stats.calls} calls")
+        if saved_files:
+            # Build the production bundle in the background; previews switch to it once published
+            queue_animation_build(animation_server_dir, current_session_id())
         
         return {
             "success": True,
-            "message": f"Successfully saved {len(saved_files)} animation files",
-            "saved_files": saved_files
+            "message": (
+                f"Successfully saved {len(saved_files)} animation files "
+                f"({len(written_files)} written, {len(unchanged_files)} unchanged)"
+            ),
+            "saved_files": saved_files,
+            "written_files": written_files,
+            "unchanged_files": unchanged_files,
+            "commit": commit_timings,
+            "io": {"calls": io_stats.calls, "offloaded_seconds": round(io_stats.seconds, 6)}
         }
     except Exception as e:
         error_msg = f"Error saving animation code: {str(e)}"
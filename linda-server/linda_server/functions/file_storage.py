@@ -5,6 +5,7 @@ from typing import Optional
 from datetime import datetime
 from pydantic import BaseModel
 from restack_ai.function import function, log, NonRetryableError
+from linda_server.utils.blocking_io import run_file_io
 
 class SaveFileInput(BaseModel):
     file_content: str  # Base64 encoded file content
@@ -15,25 +16,28 @@ class SaveFileOutput(BaseModel):
     file_path: str
     public_url: str
 
+def _write_upload(upload_dir: str, file_name: str, file_content: str) -> str:
+    # Blocking part of save_file: runs on the file I/O thread pool
+    os.makedirs(upload_dir, exist_ok=True)
+    file_path = os.path.join(upload_dir, file_name)
+    file_data = base64.b64decode(file_content)
+    with open(file_path, "wb") as f:
+        f.write(file_data)
+    return file_path
+
 @function.defn()
 async def save_file(function_input: SaveFileInput) -> SaveFileOutput:
     try:
-        # Create uploads directory if it doesn't exist
+        # Uploads are grouped in a directory per day
         upload_dir = os.path.join("uploads", datetime.now().strftime("%Y-%m-%d"))
-        os.makedirs(upload_dir, exist_ok=True)
         
         # Generate a unique filename if not provided
         if not function_input.file_name:
             extension = function_input.file_type.split("/")[-1]
             function_input.file_name = f"{uuid.uuid4()}.{extension}"
             
-        # Construct file path
-        file_path = os.path.join(upload_dir, function_input.file_name)
-        
-        # Decode base64 and save file
-        file_data = base64.b64decode(function_input.file_content)
-        with open(file_path, "wb") as f:
-            f.write(file_data)
+        # Create the directory, decode base64 and save the file off the event loop
+        file_path = await run_file_io("upload", _write_upload, upload_dir, function_input.file_name, function_input.file_content)
             
         # Generate public URL (depends on server configuration)
         public_url = f"/uploads/{datetime.now().strftime('%Y-%m-%d')}/{function_input.file_name}"
@@ -1,11 +1,41 @@
+import asyncio
 import os
 import logging
 import sys
-from typing import List, Literal, Optional
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Literal, Optional, Tuple, Union
 from dotenv import load_dotenv
-from openai import OpenAI
 from pydantic import BaseModel, Field
-from restack_ai.function import function, NonRetryableError, stream_to_websocket
+from restack_ai.function import function, heartbeat, NonRetryableError
+from temporalio.exceptions import ApplicationError
+from linda_server.utils.animation_parser import save_animation_stream
+from linda_server.utils.animation_builds import queue_animation_build
+from linda_server.utils.animation_workspaces import current_session_id, resolve_animation_dir
+from linda_server.utils.blocking_io import run_file_io
+from linda_server.utils.concurrency_limiter import AdaptiveLimiter, LimiterSlot, get_adaptive_limiter
+from linda_server.utils.llm_cache import get_llm_cache, llm_cache_enabled, make_cache_key
+from linda_server.utils.llm_cassette import get_llm_cassette
+from linda_server.utils.llm_client import get_llm_client, is_llm_overload_error, resolve_llm_endpoint
+from linda_server.utils.llm_retry import (
+    call_with_retries,
+    compute_deadline,
+    get_latency_tracker,
+    hedge_delay_for,
+    hedged_call,
+)
+from linda_server.utils.metrics import metrics
+from linda_server.utils.request_coalescing import SharedStreamGroup, SingleFlight
+from linda_server.utils.stream_relay import (
+    STREAM_ABANDONED_ERROR_TYPE,
+    StreamAbandonedError,
+    close_stream,
+    get_stream_api_address,
+    iter_text_chunks,
+    chunk_content,
+    relay_stream_to_websocket,
+)
+from linda_server.utils.stream_stats import StreamTimer, current_agent_name
+from linda_server.utils.token_budget import count_tokens, fit_messages_to_budget, record_usage
 
 load_dotenv()
 
@@ -21,21 +51,159 @@ class LlmChatInput(BaseModel):
     model: Optional[str] = None
     messages: List[Message] = Field(default_factory=list)
     stream: bool = False
+    cache: bool = False  # Opt in to the shared response cache (only used when LLM_CACHE_ENABLED)
+    include_stats: bool = False  # Return an LlmChatOutput with stream timings instead of plain text
+    # Where a streamed response goes: the agent's websocket, or parsed straight into
+    # the agent's animation workspace with each file saved as soon as it is complete
+    stream_target: Literal["websocket", "animation_server"] = "websocket"
+
+class LlmChatOutput(BaseModel):
+    content: str
+    stream_stats: Dict[str, Any] = Field(default_factory=dict)
+    saved_files: List[str] = Field(default_factory=list)
+    # Timings of the commit that swapped the saved files into the workspace
+    commit: Optional[Dict[str, Any]] = None
+
+# Identical concurrent requests share one upstream generation
+_completion_flights = SingleFlight("llm_chat")
+_stream_flights = SharedStreamGroup("llm_chat")
+
+def _coalescing_enabled() -> bool:
+    return os.getenv("LLM_COALESCE_REQUESTS", "true").lower() == "true"
+
+async def _limited_stream(
+    limiter: AdaptiveLimiter,
+    create_upstream: Callable[[float], Awaitable[Any]],
+    deadline: float,
+    model: str,
+    prompt_tokens: int,
+    timer: StreamTimer,
+):
+    """Open the upstream stream with retries and hold a limiter slot while it runs, timing the provider's chunks.
+
+    Every open attempt takes its own slot, so a 429 or timeout on any attempt shrinks the
+    limit, and backoff between attempts holds no slot.
+    """
+    async def open_attempt(timeout: float) -> Tuple[LimiterSlot, Any]:
+        held = await limiter.acquire()
+        try:
+            timer.started = time.monotonic()
+            return held, await create_upstream(timeout)
+        except BaseException as e:
+            await asyncio.shield(limiter.release(held, e))
+            raise
+
+    held: Optional[LimiterSlot] = None
+    stream = None
+    error: Optional[BaseException] = None
+    cancelled = False
+    try:
+        # Only opening the stream is retried; chunks already relayed cannot be taken back
+        held, stream = await call_with_retries(open_attempt, deadline)
+        async for chunk in stream:
+            held.responded()
+            timer.chunk(chunk_content(chunk))
+            yield chunk
+    except (asyncio.CancelledError, GeneratorExit) as e:
+        # Every consumer went away: closing the upstream below stops the generation
+        error = e
+        cancelled = True
+        raise
+    except BaseException as e:
+        error = e
+        raise
+    finally:
+        await close_stream(stream)
+        if held is not None:
+            await asyncio.shield(limiter.release(held, error))
+        completion_tokens = (await timer.finish()).tokens
+        if stream is not None:
+            record_usage(model, prompt_tokens, completion_tokens)
+        if cancelled:
+            metrics.inc("llm_stream_cancelled_total", labels={"model": model})
+            metrics.inc("llm_stream_cancelled_tokens_total", completion_tokens, labels={"model": model})
+            metrics.inc("llm_stream_slots_reclaimed_total", labels={"model": model})
+            logger.info("Cancelled upstream stream for model=%s after %d tokens", model, completion_tokens)
+
+async def _save_animation_stream(stream, timer: StreamTimer) -> Tuple[str, List[str], Optional[Dict[str, Any]]]:
+    """Parse a streamed response into the session's animation workspace, saving each file as it completes."""
+    try:
+        animation_server_dir = await run_file_io("workspace", resolve_animation_dir)
+    except (ValueError, OSError) as e:
+        raise NonRetryableError(f"Animation workspace not available: {str(e)}") from e
+
+    async def texts():
+        async for chunk in stream:
+            content = chunk_content(chunk)
+            timer.chunk(content)
+            heartbeat()
+            if content:
+                yield content
+
+    try:
+        content, saved_files, commit = await save_animation_stream(texts(), animation_server_dir)
+    finally:
+        await close_stream(stream)
+        await timer.finish()
+    if saved_files:
+        # Build the production bundle in the background; previews switch to it once published
+        queue_animation_build(animation_server_dir, current_session_id())
+    return content, saved_files, commit
+
+def _consumer_stage(function_input: LlmChatInput) -> str:
+    return "relay" if function_input.stream_target == "websocket" else "animation_writer"
+
+async def _consume_stream(function_input: LlmChatInput, stream, timer: StreamTimer) -> Tuple[str, List[str], Optional[Dict[str, Any]]]:
+    if function_input.stream_target == "animation_server":
+        return await _save_animation_stream(stream, timer)
+    content = await relay_stream_to_websocket(stream, api_address=get_stream_api_address(), timer=timer)
+    return content, [], None
+
+def _chat_result(function_input: LlmChatInput, content: str, *timers: StreamTimer, saved_files: Optional[List[str]] = None, commit: Optional[Dict[str, Any]] = None) -> Union[str, LlmChatOutput]:
+    # Callers streaming into the animation server always get the saved files back
+    if not function_input.include_stats and function_input.stream_target == "websocket":
+        return content
+    stream_stats = {}
+    for timer in timers:
+        summary = timer.summary()
+        if summary is not None:
+            stream_stats[timer.stage] = summary
+    return LlmChatOutput(content=content, stream_stats=stream_stats, saved_files=saved_files or [], commit=commit)
 
 @function.defn()
-async def llm_chat(function_input: LlmChatInput) -> str:
+async def llm_chat(function_input: LlmChatInput) -> Union[str, LlmChatOutput]:
     logger.info("llm_chat invocation started")
-    logger.info("LlmChatInput: %s", function_input.json())
+    logger.debug("LlmChatInput: %s", function_input.json())
     try:
-        api_key = os.environ.get("RESTACK_API_KEY") or os.environ.get("OPENAI_API_KEY")
-        if not api_key:
-            logger.error("API key not found")
-            raise NonRetryableError("LLM API key not found")
-        base_url = "https://ai.restack.io" if os.environ.get("RESTACK_API_KEY") else "https://api.openai.com/v1"
-        client = OpenAI(base_url=base_url, api_key=api_key)
+        # In replay mode responses come from the cassette and no API key is needed
+        cassette = get_llm_cassette()
+        client = None
+        if cassette is None or not cassette.replaying:
+            try:
+                base_url, api_key = resolve_llm_endpoint()
+            except ValueError:
+                logger.error("API key not found")
+                raise NonRetryableError("LLM API key not found")
+            client = get_llm_client(base_url, api_key)
 
         model = function_input.model or "gpt-4.1"
-        logger.info("Calling OpenAI model=%s stream=%s", model, function_input.stream)
+        agent_name = current_agent_name()
+
+        request_key = make_cache_key(model, function_input.system_content, function_input.messages)
+        # While recording, skip the response cache so every call reaches the cassette
+        recording = cassette is not None and not cassette.replaying
+        cache_key = request_key if function_input.cache and llm_cache_enabled() and not recording else None
+        if cache_key:
+            cached = await asyncio.to_thread(get_llm_cache().get, cache_key)
+            if cached is not None:
+                logger.info("LLM cache hit for model=%s stream=%s", model, function_input.stream)
+                if function_input.stream:
+                    relay_timer = StreamTimer(_consumer_stage(function_input), model, agent_name)
+                    content, saved_files, commit = await _consume_stream(
+                        function_input, iter_text_chunks(cached, model), relay_timer
+                    )
+                    return _chat_result(function_input, content, relay_timer, saved_files=saved_files, commit=commit)
+                return _chat_result(function_input, cached)
 
         # Build messages payload
         messages_payload = []
@@ -44,25 +212,91 @@ async def llm_chat(function_input: LlmChatInput) -> str:
         for m in function_input.messages:
             messages_payload.append(m.model_dump())
 
-        # Log the full outgoing payload for debugging
-        logger.info("Outgoing messages_payload: %s", messages_payload)
+        # The full payload is only logged at DEBUG; use a cassette to capture traffic for benchmarking
+        logger.debug("Outgoing messages_payload: %s", messages_payload)
 
-        response = client.chat.completions.create(
-            model=model,
-            messages=messages_payload,
-            stream=function_input.stream,
-            timeout=6000000,
+        # Keep the prompt inside the model's context budget so the API never rejects it
+        # Encoding a large prompt is CPU work that would stall every other stream on the loop
+        messages_payload, prompt_tokens = await asyncio.to_thread(fit_messages_to_budget, messages_payload, model)
+        logger.info(
+            "Calling LLM model=%s stream=%s messages=%d prompt_tokens=%d%s",
+            model, function_input.stream, len(messages_payload), prompt_tokens,
+            f" cassette={cassette.mode}" if cassette else "",
         )
 
+        # Every attempt is bounded by what is left of the step's own timeout
+        deadline = compute_deadline()
+        latency_tracker = get_latency_tracker(model)
+
+        async def create_completion(timeout: float):
+            if cassette is not None and cassette.replaying:
+                if function_input.stream:
+                    return cassette.replay_stream(request_key, model)
+                return await cassette.replay_completion(request_key, model)
+            started = time.monotonic()
+            response = await client.chat.completions.create(
+                model=model,
+                messages=messages_payload,
+                stream=function_input.stream,
+                timeout=timeout,
+            )
+            if cassette is not None:
+                if function_input.stream:
+                    return cassette.record_stream(request_key, model, response, started)
+                return await cassette.record_completion(request_key, model, response, started)
+            return response
+
+        limiter = get_adaptive_limiter("llm_chat", model, is_overload=is_llm_overload_error)
+
+        async def attempt(timeout: float) -> str:
+            async with limiter.slot():
+                started = time.monotonic()
+                response = await create_completion(timeout)
+            latency_tracker.record(time.monotonic() - started)
+            content = response.choices[0].message.content
+            if response.usage:
+                record_usage(model, response.usage.prompt_tokens, response.usage.completion_tokens)
+            else:
+                record_usage(model, prompt_tokens, await asyncio.to_thread(count_tokens, content or "", model))
+            return content
+
+        async def complete() -> str:
+            hedge_delay = hedge_delay_for(model)
+            return await call_with_retries(
+                lambda timeout: hedged_call(lambda: attempt(timeout), hedge_delay),
+                deadline,
+            )
+
+        async def open_stream():
+            return _limited_stream(limiter, create_completion, deadline, model, prompt_tokens, upstream_timer)
+
+        # Coalesced followers only see the relay side; the leader's stream carries the upstream timer
+        upstream_timer = StreamTimer("upstream", model, agent_name)
+        relay_timer = StreamTimer(_consumer_stage(function_input), model, agent_name)
+        saved_files: List[str] = []
+        commit = None
         if function_input.stream:
-            logger.info("Streaming response to websocket")
-            api_address = os.environ.get("RESTACK_API_ADDRESS") or os.environ.get("API_ADDRESS")
-            return await stream_to_websocket(api_address=api_address, data=response)
+            logger.info("Streaming response to %s", function_input.stream_target)
+            if _coalescing_enabled():
+                stream = _stream_flights.subscribe(request_key, open_stream)
+            else:
+                stream = await open_stream()
+            result, saved_files, commit = await _consume_stream(function_input, stream, relay_timer)
         else:
-            result = response.choices[0].message.content
-            logger.info("Received response: %s", result)
-            return result
+            if _coalescing_enabled():
+                result = await _completion_flights.do(request_key, complete)
+            else:
+                result = await complete()
+            logger.info("Received response: %d characters", len(result or ""))
+            logger.debug("Received response: %s", result)
+
+        if cache_key and result:
+            await asyncio.to_thread(get_llm_cache().set, cache_key, result)
+        return _chat_result(function_input, result, upstream_timer, relay_timer, saved_files=saved_files, commit=commit)
 
+    except StreamAbandonedError as e:
+        logger.info("llm_chat stream abandoned by its consumer: %s", e)
+        raise ApplicationError(str(e), type=STREAM_ABANDONED_ERROR_TYPE, non_retryable=True) from e
     except Exception as e:
         logger.exception("Error in llm_chat")
         raise NonRetryableError(f"Error in llm_chat function: {e}") from e
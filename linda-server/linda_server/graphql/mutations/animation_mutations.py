@@ -0,0 +1,43 @@
+import asyncio
+import strawberry
+from graphql import GraphQLError
+from linda_server.utils.animation_preview_proxy import get_preview_grants
+from linda_server.utils.animation_workspaces import get_workspace_manager
+
+def _current_user(info: strawberry.Info):
+    request = info.context.get("request")
+    user = request.scope.get("user") if request is not None else None
+    if user is None:
+        raise GraphQLError("Authentication required", extensions={"code": "UNAUTHENTICATED"})
+    return user
+
+@strawberry.type
+class AnimationMutation:
+    @strawberry.mutation
+    async def claim_animation_session(self, info: strawberry.Info, agent_id: str) -> bool:
+        """
+        Claims an AnimationDeveloperAgent session for the logged-in user, so that only they can preview it.
+        """
+        user = _current_user(info)
+        try:
+            claimed = await asyncio.to_thread(get_workspace_manager().claim_session, agent_id, user["user_id"])
+        except ValueError as e:
+            raise GraphQLError(str(e))
+        if not claimed:
+            raise GraphQLError("Animation session belongs to another user", extensions={"code": "FORBIDDEN"})
+        return True
+
+    @strawberry.mutation
+    async def create_animation_preview_ticket(self, info: strawberry.Info, agent_id: str) -> str:
+        """
+        Creates a short-lived, single-use ticket that opens the logged-in user's animation preview,
+        for /animations/{agent_id}?ticket=<ticket>.
+        """
+        user = _current_user(info)
+        try:
+            owner = await asyncio.to_thread(get_workspace_manager().session_owner, agent_id)
+        except ValueError as e:
+            raise GraphQLError(str(e))
+        if owner != str(user["user_id"]):
+            raise GraphQLError("Animation session not found", extensions={"code": "NOT_FOUND"})
+        return get_preview_grants().issue_ticket(agent_id, user["user_id"])
@@ -1,14 +1,16 @@
+import math
 import strawberry
 from graphql import GraphQLError
-from linda_server.graphql.types.user_types import User, CreateUserInput, UpdateUserInput, LoginInput, LoginPayload
+from linda_server.graphql.types.user_types import User, CreateUserInput, UpdateUserInput, LoginInput, LoginPayload, RefreshTokenInput
 from linda_server.services.user_service import user_service
+from linda_server.utils.login_guard import LoginThrottledError
 
 @strawberry.type
 class UserMutation:
     @strawberry.mutation
-    def create_user(self, input: CreateUserInput) -> User:
+    async def create_user(self, input: CreateUserInput) -> User:
         try:
-            return user_service.create_user(
+            return await user_service.create_user_async(
                 username=input.username,
                 email=input.email,
                 full_name=input.full_name,
@@ -18,9 +20,9 @@ class UserMutation:
             raise GraphQLError(str(e))
     
     @strawberry.mutation
-    def update_user(self, input: UpdateUserInput) -> User:
+    async def update_user(self, input: UpdateUserInput) -> User:
         try:
-            return user_service.update_user(
+            return await user_service.update_user_async(
                 user_id=input.id,
                 username=input.username,
                 email=input.email,
@@ -38,11 +40,27 @@ class UserMutation:
             raise GraphQLError(str(e))
     
     @strawberry.mutation
-    def login(self, input: LoginInput) -> LoginPayload:
+    async def login(self, info: strawberry.Info, input: LoginInput) -> LoginPayload:
         """
         Authenticates a user and returns a JWT token along with user information.
         """
-        token, user = user_service.login(input.username, input.password)
+        request = info.context.get("request")
+        client_ip = request.client.host if request is not None and request.client else None
+        try:
+            token, user = await user_service.login_async(input.username, input.password, client_ip)
+        except LoginThrottledError as e:
+            raise GraphQLError(str(e), extensions={"code": "RATE_LIMITED", "retryAfter": math.ceil(e.retry_after)})
         if not token or not user:
             raise GraphQLError("Invalid credentials")
-        return LoginPayload(token=token, user=user)
+        refresh_token = await user_service.create_refresh_token_async(user.id)
+        return LoginPayload(token=token, refresh_token=refresh_token, user=user)
+
+    @strawberry.mutation
+    async def refresh_token(self, input: RefreshTokenInput) -> LoginPayload:
+        """
+        Exchanges a refresh token for a new access token and a new refresh token, without a password check.
+        """
+        token, refresh_token, user = await user_service.refresh_access_token_async(input.refresh_token)
+        if not token or not user:
+            raise GraphQLError("Invalid refresh token")
+        return LoginPayload(token=token, refresh_token=refresh_token, user=user)
@@ -7,6 +7,7 @@ This module combines all GraphQL queries and mutations to form the main GraphQL
 import strawberry
 from linda_server.graphql.queries.user_queries import UserQuery
 from linda_server.graphql.mutations.user_mutations import UserMutation
+from linda_server.graphql.mutations.animation_mutations import AnimationMutation
 from linda_server.graphql.types.user_types import User
 from linda_server.graphql.types.geometry_types import GeometrySolution
 
@@ -15,9 +16,9 @@ class Query(UserQuery):
     pass
 
 @strawberry.type
-class Mutation(UserMutation):
+class Mutation(UserMutation, AnimationMutation):
     """
-    Main Mutation type for user authentication and geometry problem solving.
+    Main Mutation type for user authentication, animation sessions and geometry problem solving.
     """
     pass
 
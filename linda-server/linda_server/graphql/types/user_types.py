@@ -28,7 +28,12 @@ class LoginInput:
     username: str
     password: str
 
+@strawberry.input
+class RefreshTokenInput:
+    refresh_token: str
+
 @strawberry.type
 class LoginPayload:
     token: str
+    refresh_token: str
     user: User
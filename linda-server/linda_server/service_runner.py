@@ -12,10 +12,15 @@ from linda_server.app import app
 from linda_server.agents.coordinator_agent import CoordinatorAgent
 from linda_server.agents.math_master_agent import MathMasterAgent
 from linda_server.agents.animation_developer_agent import AnimationDeveloperAgent
+from linda_server.functions import LOCAL_FUNCTIONS_TASK_QUEUE
 from linda_server.functions.llm_chat import llm_chat
 from linda_server.functions.file_storage import save_file
 from linda_server.functions.animation_services import save_animation_code
 from linda_server.utils.animation_server_runner import start_animation_server, get_animation_server_url
+from linda_server.utils.animation_workspaces import get_workspace_manager
+from linda_server.utils.llm_client import close_llm_clients
+from linda_server.utils.password import get_password_hasher
+from linda_server.utils.token_budget import preload_encodings
 
 from restack_ai import Restack
 from restack_ai.restack import CloudConnectionOptions, ServiceOptions
@@ -61,17 +66,30 @@ restack_available = True
 async def start_restack_services():
     """Start Restack agents and workflows"""
     try:
-        await client.start_service(
+        # Loading a tokenizer can download its encoding; do it before llm_chat needs one
+        await asyncio.to_thread(preload_encodings)
+        # LLM calls are throttled per model by the adaptive limiter inside llm_chat,
+        # so the worker itself only caps the total number of running functions.
+        llm_service = client.start_service(
             agents=[CoordinatorAgent, MathMasterAgent, AnimationDeveloperAgent],
             # No workflows registered since workflows were removed
             workflows=[],
-            functions=[llm_chat, save_animation_code, save_file],  # Added save_animation_code function
+            functions=[llm_chat],
             options=ServiceOptions(
                 max_concurrent_workflow_runs=10,
-                max_concurrent_function_runs=5
+                max_concurrent_function_runs=int(os.getenv("RESTACK_LLM_FUNCTION_RUNS", "50"))
             )
         )
-        logger.info("Restack services started successfully")
+        # Cheap local functions get their own pool so they never queue behind LLM calls
+        local_service = client.start_service(
+            functions=[save_animation_code, save_file],
+            task_queue=LOCAL_FUNCTIONS_TASK_QUEUE,
+            options=ServiceOptions(
+                max_concurrent_function_runs=int(os.getenv("RESTACK_LOCAL_FUNCTION_RUNS", "10"))
+            )
+        )
+        logger.info("Starting Restack services")
+        await asyncio.gather(llm_service, local_service)
     except Exception as e:
         logger.error(f"Failed to start Restack services: {str(e)}")
 
@@ -80,6 +98,11 @@ async def main():
     try:
         # Start the animation server using the dedicated module
         animation_server = await start_animation_server()
+        # Sessions preview their own workspaces; stale ones are collected in the background
+        workspace_manager = get_workspace_manager()
+        workspace_gc = asyncio.create_task(workspace_manager.run_garbage_collector())
+        # Warm preview servers are leased to new sessions so they skip the dev server cold start
+        await workspace_manager.pool.start()
         
         await start_restack_services()
         
@@ -89,8 +112,12 @@ async def main():
         server = uvicorn.Server(config)
         await server.serve()
 
+        await close_llm_clients()
+        get_password_hasher().close()
+        workspace_gc.cancel()
+        await workspace_manager.close()
         if animation_server:
-            animation_server.terminate()
+            await animation_server.stop()
     except Exception as e:
         logger.error(f"Error in main service: {str(e)}")
 
@@ -1,21 +1,33 @@
 from typing import List, Optional, Tuple
 from linda_server.db.repositories.user_repository import user_repository, UserRepository
+from linda_server.db.repositories.refresh_token_repository import refresh_token_repository, RefreshTokenRepository
 from linda_server.db.models.user import User
-from linda_server.utils.password import hash_password, verify_password
+from linda_server.utils.auth_tokens import generate_refresh_token, get_auth_settings, hash_refresh_token
+from linda_server.utils.login_guard import get_login_guard
+from linda_server.utils.metrics import metrics
+from linda_server.utils.password import hash_password, hash_password_async, verify_password, verify_password_async
+import asyncio
 import jwt
+import uuid
 from datetime import datetime, timedelta
 import logging
-import os
 
 logger = logging.getLogger(__name__)
 
 class UserService:
-    def __init__(self, user_repository: UserRepository):
+    def __init__(
+        self,
+        user_repository: UserRepository,
+        refresh_token_repository: RefreshTokenRepository = refresh_token_repository
+    ):
         self.user_repository = user_repository
-        # Get JWT settings from environment variables
-        self.secret_key = os.getenv("JWT_SECRET_KEY", "your_default_secret_key")
-        self.algorithm = os.getenv("JWT_ALGORITHM", "HS256")
-        self.access_token_expire_minutes = int(os.getenv("JWT_ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
+        self.refresh_token_repository = refresh_token_repository
+        # JWT settings, shared with the request middleware's token verifier
+        self.settings = get_auth_settings()
+        self.secret_key = self.settings.secret_key
+        self.algorithm = self.settings.algorithm
+        self.access_token_expire_minutes = self.settings.access_token_expire_minutes
+        self.refresh_token_expire_days = self.settings.refresh_token_expire_days
 
     def create_user(self, username: str, email: str, full_name: str, password: str) -> User:
         """
@@ -36,6 +48,30 @@ class UserService:
             hashed_password=hashed_password
         )
 
+    async def create_user_async(self, username: str, email: str, full_name: str, password: str) -> User:
+        """
+        Create a new user, hashing the password on the password worker pool and
+        writing it on a worker thread.
+        Args:
+            username: User's username
+            email: User's email
+            full_name: User's full name
+            password: User's plain text password
+        Returns:
+            Created User object
+        """
+        hashed_password = await hash_password_async(password)
+        user = await asyncio.to_thread(
+            self.user_repository.create_user,
+            username=username,
+            email=email,
+            full_name=full_name,
+            hashed_password=hashed_password
+        )
+        # Attempts that failed before the user existed may have used this password
+        get_login_guard().forget(username)
+        return user
+
     def find_user_by_id(self, user_id: int) -> Optional[User]:
         return self.user_repository.find_user_by_id(user_id)
 
@@ -73,6 +109,42 @@ class UserService:
             
         return self.user_repository.update_user(user_id, **update_data)
 
+    async def update_user_async(
+        self,
+        user_id: int,
+        username: str = None,
+        email: str = None,
+        full_name: str = None,
+        password: str = None
+    ) -> Optional[User]:
+        """
+        Update user information, hashing a new password on the password worker pool and
+        writing it on a worker thread.
+        Args:
+            user_id: ID of user to update
+            username: Optional new username
+            email: Optional new email
+            full_name: Optional new full name
+            password: Optional new password
+        Returns:
+            Updated User object or None if user not found
+        """
+        update_data = {}
+        if username:
+            update_data['username'] = username
+        if email:
+            update_data['email'] = email
+        if full_name:
+            update_data['full_name'] = full_name
+        if password:
+            update_data['hashed_password'] = await hash_password_async(password)
+
+        user = await asyncio.to_thread(self.user_repository.update_user, user_id, **update_data)
+        if user and password:
+            # Failed attempts with the new password must not be answered from memory
+            get_login_guard().forget(user.username)
+        return user
+
     def delete_user(self, user_id: int) -> bool:
         return self.user_repository.delete_user(user_id)
     
@@ -100,6 +172,46 @@ class UserService:
             logger.error(f"Authentication error: {str(e)}")
             return None
 
+    async def authenticate_user_async(self, username: str, password: str, client_ip: Optional[str] = None) -> Optional[User]:
+        """
+        Authenticate a user, looking it up on a worker thread and verifying the password
+        on the password worker pool.
+
+        Attempts that just failed are rejected from memory, and attempts beyond the
+        client IP's rate limit, or the username's failed-attempt limit at that IP, are
+        refused, both before bcrypt runs.
+        Args:
+            username: Username to authenticate
+            password: Plain text password to verify
+            client_ip: Address the attempt came from, if known
+        Returns:
+            User object if authentication successful, None otherwise
+        Raises:
+            LoginThrottledError: If the username or client IP made too many attempts
+        """
+        guard = get_login_guard()
+        if guard.recently_failed(username, password):
+            logger.warning(f"Authentication failed: Repeated failed attempt for user {username}")
+            return None
+        guard.admit(username, client_ip)
+        try:
+            user = await asyncio.to_thread(self.user_repository.find_user_by_username, username)
+            if not user or not user.hashed_password:
+                logger.warning(f"Authentication failed: User {username} not found or no password set")
+                guard.record_failure(username, password, verified=False)
+                return None
+
+            if await verify_password_async(password, user.hashed_password):
+                guard.record_success(username, client_ip)
+                return user
+
+            logger.warning(f"Authentication failed: Invalid password for user {username}")
+            guard.record_failure(username, password)
+            return None
+        except Exception as e:
+            logger.error(f"Authentication error: {str(e)}")
+            return None
+
     def create_access_token(self, data: dict, expires_delta: timedelta = None) -> str:
         """
         Create a JWT access token.
@@ -114,6 +226,83 @@ class UserService:
         to_encode.update({"exp": expire})
         return jwt.encode(to_encode, self.secret_key, algorithm=self.algorithm)
 
+    def create_refresh_token(self, user_id: int, family_id: str = None) -> str:
+        """
+        Issue a refresh token; only its HMAC digest is stored.
+        Args:
+            user_id: ID of the user the token belongs to
+            family_id: Family of the token it replaces, or None to start a new one at login
+        Returns:
+            The refresh token for the client
+        """
+        token, token_hash = generate_refresh_token(self.settings)
+        now = datetime.utcnow()
+        self.refresh_token_repository.create_refresh_token(
+            user_id=user_id,
+            token_hash=token_hash,
+            family_id=family_id or uuid.uuid4().hex,
+            created_at=now,
+            expires_at=now + timedelta(days=self.refresh_token_expire_days)
+        )
+        return token
+
+    def refresh_access_token(self, refresh_token: str) -> Tuple[Optional[str], Optional[str], Optional[User]]:
+        """
+        Exchange a refresh token for a new access token and a new refresh token.
+
+        The presented token is revoked (rotation). Presenting a token that was already
+        rotated means it leaked, so every token of its family is revoked as well.
+        Args:
+            refresh_token: Refresh token issued at login or by the previous refresh
+        Returns:
+            Tuple of (access_token, refresh_token, user) if successful, (None, None, None) otherwise
+        """
+        stored = self.refresh_token_repository.find_token_by_hash(hash_refresh_token(refresh_token, self.settings))
+        if not stored:
+            metrics.inc("auth_refresh_total", labels={"result": "invalid"})
+            return None, None, None
+
+        now = datetime.utcnow()
+        if stored.revoked_at is not None or not self.refresh_token_repository.update_revoke_token(stored.id, now):
+            logger.warning(f"Refresh token reuse for user {stored.user_id}, revoking family {stored.family_id}")
+            self.refresh_token_repository.update_revoke_family(stored.family_id, now)
+            metrics.inc("auth_refresh_total", labels={"result": "reused"})
+            return None, None, None
+        if stored.expires_at <= now:
+            metrics.inc("auth_refresh_total", labels={"result": "expired"})
+            return None, None, None
+
+        user = self.user_repository.find_user_by_id(stored.user_id)
+        if not user:
+            metrics.inc("auth_refresh_total", labels={"result": "invalid"})
+            return None, None, None
+        access_token = self.create_access_token(data={"sub": str(user.id)})
+        new_refresh_token = self.create_refresh_token(user.id, stored.family_id)
+        metrics.inc("auth_refresh_total", labels={"result": "rotated"})
+        return access_token, new_refresh_token, user
+
+    async def create_refresh_token_async(self, user_id: int, family_id: str = None) -> str:
+        """
+        Issue a refresh token, storing its digest on a worker thread.
+        Args:
+            user_id: ID of the user the token belongs to
+            family_id: Family of the token it replaces, or None to start a new one at login
+        Returns:
+            The refresh token for the client
+        """
+        return await asyncio.to_thread(self.create_refresh_token, user_id, family_id)
+
+    async def refresh_access_token_async(self, refresh_token: str) -> Tuple[Optional[str], Optional[str], Optional[User]]:
+        """
+        Exchange a refresh token like refresh_access_token, without blocking the event
+        loop on the token lookups and writes.
+        Args:
+            refresh_token: Refresh token issued at login or by the previous refresh
+        Returns:
+            Tuple of (access_token, refresh_token, user) if successful, (None, None, None) otherwise
+        """
+        return await asyncio.to_thread(self.refresh_access_token, refresh_token)
+
     def login(self, username: str, password: str) -> Tuple[Optional[str], Optional[User]]:
         """
         Login a user and return access token if successful.
@@ -129,4 +318,22 @@ class UserService:
         access_token = self.create_access_token(data={"sub": str(user.id)})
         return access_token, user
 
+    async def login_async(self, username: str, password: str, client_ip: Optional[str] = None) -> Tuple[Optional[str], Optional[User]]:
+        """
+        Login a user without blocking the event loop on bcrypt.
+        Args:
+            username: Username to login
+            password: Plain text password to verify
+            client_ip: Address the attempt came from, if known
+        Returns:
+            Tuple of (access_token, user) if successful, (None, None) otherwise
+        Raises:
+            LoginThrottledError: If the username or client IP made too many attempts
+        """
+        user = await self.authenticate_user_async(username, password, client_ip)
+        if not user:
+            return None, None
+        access_token = self.create_access_token(data={"sub": str(user.id)})
+        return access_token, user
+
 user_service: UserService = UserService(user_repository)
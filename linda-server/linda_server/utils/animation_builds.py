@@ -0,0 +1,309 @@
+"""
+Utility module for building animations into static production bundles.
+
+Previews used to come from `yarn dev`: unminified, with HMR overhead. After an
+animation is saved, its workspace is queued for a production build (`nuxt generate`
+by default). The bundle is published under ANIMATION_PUBLISH_DIR, which the API
+serves with long-lived cache headers:
+
+    builds/<input hash>/      Immutable bundle, doubles as the build cache
+    sessions/<session>.json   The session's latest bundle with its build time and size
+
+The input hash covers every source file of the workspace (including yarn.lock), so
+a workspace that matches an earlier build, in any session, reuses that bundle.
+Builds run in a copy-on-write clone of the workspace under <publish dir>/.building,
+so they never touch the .nuxt/ and .output/ directories of a running dev server.
+Bundles are built with the app base URL /static-animations/<input hash>/, so every
+asset URL changes whenever the content does.
+
+Settings:
+    ANIMATION_BUILDS_ENABLED: Build after each save (default true)
+    ANIMATION_BUILD_COMMAND: Build command run in the workspace (default "yarn generate")
+    ANIMATION_BUILD_OUTPUT: Output directory, relative to the build clone (default .output/public)
+    ANIMATION_BUILD_WORKERS: Builds running at once (default 2)
+    ANIMATION_BUILD_TIMEOUT_SECONDS: Time limit per build (default 600)
+    ANIMATION_PUBLISH_DIR: Where bundles are published (default .animation_publish next to the template)
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import time
+from typing import Dict, Optional, Set
+
+from pydantic import BaseModel
+
+from linda_server.utils.animation_workspaces import NOT_CLONED, clone_template
+from linda_server.utils.blocking_io import run_file_io
+from linda_server.utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+STATIC_ANIMATIONS_PREFIX = "/static-animations"
+DEFAULT_BUILD_COMMAND = "yarn generate"
+DEFAULT_BUILD_OUTPUT = os.path.join(".output", "public")
+DEFAULT_BUILD_WORKERS = 2
+DEFAULT_BUILD_TIMEOUT_SECONDS = 600
+# How much of a failed build's output is kept for the error message
+_OUTPUT_TAIL_BYTES = 4000
+
+class AnimationBuild(BaseModel):
+    """A published production bundle of one animation."""
+    session_id: str
+    input_hash: str
+    url: str
+    cached: bool
+    build_seconds: float
+    bundle_bytes: int
+    bundle_files: int
+    published_at: float
+
+def builds_enabled() -> bool:
+    """
+    Check whether saved animations should be built into production bundles.
+    """
+    return os.getenv("ANIMATION_BUILDS_ENABLED", "true").lower() in ("1", "true", "yes")
+
+def get_publish_dir() -> str:
+    """
+    Get the directory production bundles are published to.
+    """
+    publish_dir = os.getenv("ANIMATION_PUBLISH_DIR")
+    if publish_dir:
+        return os.path.abspath(publish_dir)
+    template_dir = os.getenv("ANIMATION_SERVER_PATH")
+    if template_dir:
+        return os.path.join(os.path.dirname(os.path.abspath(template_dir)), ".animation_publish")
+    return os.path.abspath(".animation_publish")
+
+def hash_build_inputs(workspace_dir: str) -> str:
+    """
+    Hash every source file of a workspace, skipping dependencies and build output.
+
+    Args:
+        workspace_dir: The workspace to hash
+
+    Returns:
+        str: Hex SHA-256 over the sorted relative paths and file contents
+    """
+    digest = hashlib.sha256()
+    for root, dirs, files in os.walk(workspace_dir):
+        dirs[:] = sorted(d for d in dirs if d not in NOT_CLONED)
+        for name in sorted(files):
+            if name in NOT_CLONED:
+                continue
+            path = os.path.join(root, name)
+            digest.update(os.path.relpath(path, workspace_dir).encode("utf-8") + b"\0")
+            with open(path, "rb") as f:
+                digest.update(hashlib.sha256(f.read()).digest())
+    return digest.hexdigest()
+
+def _bundle_size(bundle_dir: str) -> Dict[str, int]:
+    size = files = 0
+    for root, _, names in os.walk(bundle_dir):
+        for name in names:
+            size += os.path.getsize(os.path.join(root, name))
+            files += 1
+    return {"bytes": size, "files": files}
+
+def _publish_bundle(output_dir: str, bundle_dir: str) -> None:
+    # Copy next to the final location and rename, so a bundle is complete or absent
+    parent = os.path.dirname(bundle_dir)
+    os.makedirs(parent, exist_ok=True)
+    staging = tempfile.mkdtemp(prefix=f".{os.path.basename(bundle_dir)}-", dir=parent)
+    try:
+        shutil.copytree(output_dir, staging, dirs_exist_ok=True)
+        try:
+            os.rename(staging, bundle_dir)
+        except OSError:
+            # Published meanwhile by an identical build
+            if not os.path.isdir(bundle_dir):
+                raise
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+
+def _clone_for_build(workspace_dir: str, input_hash: str) -> str:
+    # Source files are hard-linked; saves replace files rather than writing into them,
+    # so later saves to the workspace do not show up in the clone
+    building_dir = os.path.join(get_publish_dir(), ".building")
+    os.makedirs(building_dir, exist_ok=True)
+    build_root = tempfile.mkdtemp(prefix=f"{input_hash[:16]}-", dir=building_dir)
+    try:
+        clone_template(workspace_dir, os.path.join(build_root, "workspace"))
+    except BaseException:
+        shutil.rmtree(build_root, ignore_errors=True)
+        raise
+    return build_root
+
+def _write_session_record(publish_dir: str, build: AnimationBuild) -> None:
+    sessions_dir = os.path.join(publish_dir, "sessions")
+    os.makedirs(sessions_dir, exist_ok=True)
+    path = os.path.join(sessions_dir, f"{build.session_id}.json")
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, "w") as f:
+        f.write(build.model_dump_json())
+    os.replace(temp_path, path)
+
+def get_session_build(session_id: str) -> Optional[AnimationBuild]:
+    """
+    Get the latest published bundle of a session.
+
+    Args:
+        session_id: The session
+
+    Returns:
+        Optional[AnimationBuild]: The bundle, or None if nothing has been published yet
+    """
+    path = os.path.join(get_publish_dir(), "sessions", f"{os.path.basename(session_id)}.json")
+    try:
+        with open(path) as f:
+            return AnimationBuild(**json.load(f))
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        logger.warning(f"Ignoring unreadable build record {path}: {str(e)}")
+        return None
+
+class AnimationBuildQueue:
+    """Builds saved animations with a bounded number of parallel build workers."""
+
+    def __init__(self, workers: Optional[int] = None):
+        self.workers = workers or int(os.getenv("ANIMATION_BUILD_WORKERS", str(DEFAULT_BUILD_WORKERS)))
+        self._slots = asyncio.Semaphore(self.workers)
+        # One build per input hash at a time; later requests for it share the result
+        self._in_flight: Dict[str, asyncio.Task] = {}
+        # Builds of one workspace run one at a time, so a superseded one can be skipped
+        self._workspace_locks: Dict[str, asyncio.Lock] = {}
+        self._latest: Dict[str, int] = {}
+        self._tasks: Set[asyncio.Task] = set()
+
+    def submit(self, session_id: str, workspace_dir: str) -> "asyncio.Task[Optional[AnimationBuild]]":
+        """
+        Queue a build of a session's workspace and return immediately.
+
+        Args:
+            session_id: The session the animation belongs to
+            workspace_dir: The workspace holding the saved animation
+
+        Returns:
+            asyncio.Task: Resolves to the published build, or None if it failed or was superseded
+        """
+        generation = self._latest.get(session_id, 0) + 1
+        self._latest[session_id] = generation
+        task = asyncio.create_task(self._build(session_id, workspace_dir, generation))
+        # The event loop only keeps weak references to tasks
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    async def _build(self, session_id: str, workspace_dir: str, generation: int) -> Optional[AnimationBuild]:
+        lock = self._workspace_locks.setdefault(workspace_dir, asyncio.Lock())
+        try:
+            async with lock:
+                if self._latest.get(session_id) != generation:
+                    # A newer save of this session is queued behind us
+                    metrics.inc("animation_builds_total", labels={"result": "superseded"})
+                    return None
+                input_hash = await run_file_io("build_hash", hash_build_inputs, workspace_dir)
+                task = self._in_flight.get(input_hash)
+                if task is None:
+                    task = self._in_flight[input_hash] = asyncio.create_task(self._build_bundle(workspace_dir, input_hash))
+                    task.add_done_callback(lambda _: self._in_flight.pop(input_hash, None))
+                result = await asyncio.shield(task)
+        except Exception as e:
+            metrics.inc("animation_builds_total", labels={"result": "failed"})
+            logger.error(f"Animation build for session {session_id} failed: {str(e)}")
+            return None
+
+        cached, build_seconds, size = result
+        build = AnimationBuild(
+            session_id=session_id,
+            input_hash=input_hash,
+            url=f"{STATIC_ANIMATIONS_PREFIX}/{input_hash}/",
+            cached=cached,
+            build_seconds=build_seconds,
+            bundle_bytes=size["bytes"],
+            bundle_files=size["files"],
+            published_at=time.time(),
+        )
+        if self._latest.get(session_id) == generation:
+            await run_file_io("build_publish", _write_session_record, get_publish_dir(), build)
+        metrics.inc("animation_builds_total", labels={"result": "cached" if cached else "built"})
+        logger.info(
+            f"Animation build for session {session_id}: {build.url} "
+            f"({'cached' if cached else f'built in {build_seconds:.1f}s'}, {build.bundle_bytes} bytes in {build.bundle_files} files)"
+        )
+        return build
+
+    async def _build_bundle(self, workspace_dir: str, input_hash: str):
+        bundle_dir = os.path.join(get_publish_dir(), "builds", input_hash)
+        if await run_file_io("build_cache", os.path.isdir, bundle_dir):
+            return True, 0.0, await run_file_io("build_size", _bundle_size, bundle_dir)
+
+        async with self._slots:
+            build_root = await run_file_io("build_clone", _clone_for_build, workspace_dir, input_hash)
+            try:
+                return await self._run_build(os.path.join(build_root, "workspace"), input_hash, bundle_dir)
+            finally:
+                await run_file_io("build_clone", shutil.rmtree, build_root, True)
+
+    async def _run_build(self, build_dir: str, input_hash: str, bundle_dir: str):
+        started = time.perf_counter()
+        env = dict(os.environ, NUXT_APP_BASE_URL=f"{STATIC_ANIMATIONS_PREFIX}/{input_hash}/")
+        process = await asyncio.create_subprocess_shell(
+            os.getenv("ANIMATION_BUILD_COMMAND", DEFAULT_BUILD_COMMAND),
+            cwd=build_dir,
+            env=env,
+            stdout=asyncio.subprocess.PIPE,
+            # One pipe for both streams, drained by communicate so neither can fill up
+            stderr=asyncio.subprocess.STDOUT,
+            start_new_session=True,
+        )
+        try:
+            output, _ = await asyncio.wait_for(
+                process.communicate(),
+                float(os.getenv("ANIMATION_BUILD_TIMEOUT_SECONDS", str(DEFAULT_BUILD_TIMEOUT_SECONDS))),
+            )
+        except (asyncio.TimeoutError, asyncio.CancelledError):
+            process.kill()
+            await process.wait()
+            raise
+        build_seconds = time.perf_counter() - started
+        if process.returncode != 0:
+            tail = output[-_OUTPUT_TAIL_BYTES:].decode("utf-8", errors="replace")
+            raise RuntimeError(f"Build command exited with {process.returncode}: {tail}")
+
+        output_dir = os.path.join(build_dir, os.getenv("ANIMATION_BUILD_OUTPUT", DEFAULT_BUILD_OUTPUT))
+        if not await run_file_io("build_output", os.path.isdir, output_dir):
+            raise RuntimeError(f"Build did not produce {output_dir}")
+        await run_file_io("build_publish", _publish_bundle, output_dir, bundle_dir)
+        size = await run_file_io("build_size", _bundle_size, bundle_dir)
+        metrics.observe("animation_build_seconds", build_seconds, buckets=(1, 2.5, 5, 10, 20, 30, 60, 120, 300, 600))
+        metrics.observe("animation_bundle_bytes", size["bytes"], buckets=(1e4, 1e5, 2.5e5, 5e5, 1e6, 2.5e6, 5e6, 1e7, 5e7))
+        return False, build_seconds, size
+
+_queue: Optional[AnimationBuildQueue] = None
+
+def get_build_queue() -> AnimationBuildQueue:
+    """
+    Get the process-wide animation build queue.
+    """
+    global _queue
+    if _queue is None:
+        _queue = AnimationBuildQueue()
+    return _queue
+
+def queue_animation_build(workspace_dir: str, session_id: Optional[str]) -> None:
+    """
+    Queue a production build of a saved animation if builds are enabled.
+
+    Args:
+        workspace_dir: The directory the animation was saved to
+        session_id: The session it belongs to; the shared animation server uses "shared"
+    """
+    if builds_enabled():
+        get_build_queue().submit(session_id or "shared", workspace_dir)
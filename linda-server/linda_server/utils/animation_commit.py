@@ -0,0 +1,308 @@
+"""
+Utility module for committing generated animation files atomically.
+
+Writing files one at a time into the live animation server lets the Nuxt dev server
+see (and rebuild) a half-written project once per file. A commit instead writes every
+file into a scratch directory next to the animation server and then swaps them into
+place with os.replace, back to back, so the watcher sees one short burst of complete
+files. A streamed response is committed file by file as each one completes, so the
+dev server can start compiling before the response has finished.
+
+Settings:
+    ANIMATION_COMMIT_MODE: atomic (default) or in_place (write each file directly)
+"""
+import asyncio
+import errno
+import logging
+import os
+import shutil
+import tempfile
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from linda_server.utils.animation_parser import AnimationFileInfo
+from linda_server.utils.blocking_io import OffloadStats, run_file_io
+from linda_server.utils.file_manifest import count_elision, get_file_manifest
+from linda_server.utils.file_utils import is_system_file
+from linda_server.utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+COMMIT_MODES = ("atomic", "in_place")
+
+
+@dataclass
+class CommitResult:
+    """Outcome and timings of one commit."""
+    saved_files: List[str] = field(default_factory=list)
+    unchanged_files: List[str] = field(default_factory=list)
+    skipped_files: List[str] = field(default_factory=list)
+    failed_files: List[str] = field(default_factory=list)
+    stage_seconds: float = 0.0
+    swap_seconds: float = 0.0
+    total_seconds: float = 0.0
+
+    def timings(self) -> Dict[str, Any]:
+        """
+        Get the commit's timings and counts for reporting.
+        """
+        return {
+            "files": len(self.saved_files),
+            "unchanged": len(self.unchanged_files),
+            "skipped": len(self.skipped_files),
+            "failed": len(self.failed_files),
+            "stage_seconds": round(self.stage_seconds, 6),
+            "swap_seconds": round(self.swap_seconds, 6),
+            "total_seconds": round(self.total_seconds, 6),
+        }
+
+
+def get_commit_mode() -> str:
+    """
+    Get the configured commit mode for generated animation files.
+
+    Returns:
+        str: "atomic" or "in_place"
+    """
+    mode = os.getenv("ANIMATION_COMMIT_MODE", "atomic").lower()
+    if mode not in COMMIT_MODES:
+        raise ValueError(f"ANIMATION_COMMIT_MODE must be one of {COMMIT_MODES}, got {mode}")
+    return mode
+
+
+def _staging_parent(base_dir: str) -> str:
+    # Next to the target so the final renames stay on one filesystem, but outside the watched tree
+    return os.path.dirname(os.path.abspath(base_dir))
+
+
+def _replace(staged_path: str, target: str) -> None:
+    try:
+        os.replace(staged_path, target)
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+        # Different filesystem: copy next to the target first, then rename within its directory
+        temp_target = f"{target}.{os.getpid()}.tmp"
+        shutil.copyfile(staged_path, temp_target)
+        os.replace(temp_target, target)
+
+
+class _CommitBatch:
+    """One commit in progress: staging directory, manifest and result."""
+
+    def __init__(self, base_dir: str):
+        self.base_dir = base_dir
+        self.result = CommitResult()
+        self.manifest = get_file_manifest(base_dir)
+        self.started = time.perf_counter()
+        self.staging_dir = tempfile.mkdtemp(
+            prefix=f".{os.path.basename(os.path.abspath(base_dir))}-staging-",
+            dir=_staging_parent(base_dir),
+        )
+
+    def stage(self, index: int, file_info: AnimationFileInfo) -> Tuple[str, str, Optional[str]]:
+        """Write one file into the staging directory, returning (outcome, target, staged path)."""
+        target = os.path.join(self.base_dir, file_info.path)
+        if is_system_file(target):
+            logger.warning("Skipping system file: %s", target)
+            return "skipped", target, None
+        if self.manifest.is_unchanged(target, file_info.content):
+            return "unchanged", target, None
+        staged_path = os.path.join(self.staging_dir, str(index))
+        with open(staged_path, "w") as f:
+            f.write(file_info.content)
+        return "staged", target, staged_path
+
+    def swap(self, files: List[AnimationFileInfo], outcomes: List[Tuple[str, str, Optional[str]]]) -> None:
+        """Create the target directories, then move every staged file into place."""
+        staged: List[Tuple[str, str, str]] = []
+        for file_info, (outcome, target, staged_path) in zip(files, outcomes):
+            if outcome == "skipped":
+                self.result.skipped_files.append(target)
+            elif outcome == "unchanged":
+                self.result.unchanged_files.append(target)
+            else:
+                staged.append((staged_path, target, file_info.content))
+        try:
+            # Create target directories up front so the swap is only renames
+            for _, target, _ in staged:
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+        except Exception as e:
+            logger.exception("Error staging animation files")
+            raise IOError(f"Error staging animation files: {str(e)}") from e
+        swap_started = time.perf_counter()
+        self.result.stage_seconds = swap_started - self.started
+
+        for staged_path, target, content in staged:
+            try:
+                _replace(staged_path, target)
+                self.result.saved_files.append(target)
+                self.manifest.record(target, content)
+            except OSError as e:
+                logger.error(f"Failed to commit {target}: {str(e)}")
+                self.result.failed_files.append(target)
+                # Continue with other files even if one fails
+        self.result.swap_seconds += time.perf_counter() - swap_started
+        if self.result.saved_files:
+            self.manifest.save()
+
+    def cleanup(self) -> None:
+        shutil.rmtree(self.staging_dir, ignore_errors=True)
+
+    def finish(self) -> CommitResult:
+        result = self.result
+        result.total_seconds = time.perf_counter() - self.started
+        count_elision(len(result.saved_files), len(result.unchanged_files))
+        metrics.inc("animation_commits_total")
+        metrics.inc("animation_committed_files_total", len(result.saved_files))
+        metrics.observe("animation_commit_stage_seconds", result.stage_seconds)
+        metrics.observe("animation_commit_swap_seconds", result.swap_seconds)
+        logger.info(
+            f"Committed {len(result.saved_files)} animation files to {self.base_dir}, {len(result.unchanged_files)} unchanged "
+            f"(stage {result.stage_seconds * 1000:.1f}ms, swap {result.swap_seconds * 1000:.1f}ms)"
+        )
+        return result
+
+
+def _staging_error(e: Exception) -> IOError:
+    logger.error(f"Error staging animation files: {str(e)}")
+    return IOError(f"Error staging animation files: {str(e)}")
+
+
+def commit_animation_files(base_dir: str, files: List[AnimationFileInfo]) -> CommitResult:
+    """
+    Stage files in a scratch directory and swap them into base_dir in one batch.
+
+    Nothing in base_dir changes if staging fails. System files are skipped, as with save_file,
+    and files whose content matches the workspace manifest are left untouched.
+
+    Args:
+        base_dir: Base directory where files should be saved
+        files: Files to commit
+
+    Returns:
+        CommitResult: Saved, unchanged, skipped and failed paths plus stage/swap timings
+
+    Raises:
+        IOError: If the files could not be staged
+    """
+    batch = _CommitBatch(base_dir)
+    try:
+        try:
+            outcomes = [batch.stage(index, file_info) for index, file_info in enumerate(files)]
+        except Exception as e:
+            raise _staging_error(e) from e
+        batch.swap(files, outcomes)
+    finally:
+        batch.cleanup()
+    return batch.finish()
+
+
+async def commit_animation_files_async(
+    base_dir: str,
+    files: List[AnimationFileInfo],
+    stats: Optional[OffloadStats] = None,
+) -> CommitResult:
+    """
+    Async version of commit_animation_files that keeps all file I/O off the event loop.
+
+    Files are staged in parallel on the file I/O thread pool; the swap then runs as one
+    pool task so the renames still happen back to back.
+
+    Args:
+        base_dir: Base directory where files should be saved
+        files: Files to commit
+        stats: If given, accumulates the file I/O time kept off the event loop
+
+    Returns:
+        CommitResult: Saved, unchanged, skipped and failed paths plus stage/swap timings
+
+    Raises:
+        IOError: If the files could not be staged
+    """
+    batch = await run_file_io("commit", _CommitBatch, base_dir, stats=stats)
+    try:
+        outcomes = await asyncio.gather(
+            *(run_file_io("stage", batch.stage, index, file_info, stats=stats) for index, file_info in enumerate(files)),
+            return_exceptions=True,
+        )
+        for outcome in outcomes:
+            if isinstance(outcome, Exception):
+                raise _staging_error(outcome) from outcome
+        await run_file_io("swap", batch.swap, files, outcomes, stats=stats)
+    finally:
+        await run_file_io("commit", batch.cleanup, stats=stats)
+    return batch.finish()
+
+
+class StreamingCommit:
+    """
+    A commit filled while a response streams in.
+
+    Each file is staged and swapped into base_dir as soon as it is complete, so the dev
+    server can compile early files while later ones are still generating. Every file
+    still lands with a single rename, so the watcher never sees a half-written file.
+    Files of a stream that fails midway stay in place; only the file still being
+    generated is lost.
+    """
+
+    def __init__(self, base_dir: str, stats: Optional[OffloadStats] = None):
+        self.base_dir = base_dir
+        self.stats = stats
+        self._batch: Optional[_CommitBatch] = None
+        self._next_index = 0
+        self._stage_seconds = 0.0
+
+    async def add(self, files: List[AnimationFileInfo]) -> None:
+        """
+        Stage completed files and swap them into base_dir.
+
+        Args:
+            files: Files whose content is complete
+
+        Raises:
+            IOError: If a file could not be staged
+        """
+        if not files:
+            return
+        if self._batch is None:
+            self._batch = await run_file_io("commit", _CommitBatch, self.base_dir, stats=self.stats)
+        started = time.perf_counter()
+        first_index = self._next_index
+        self._next_index += len(files)
+        outcomes = await asyncio.gather(
+            *(run_file_io("stage", self._batch.stage, first_index + offset, file_info, stats=self.stats)
+              for offset, file_info in enumerate(files)),
+            return_exceptions=True,
+        )
+        self._stage_seconds += time.perf_counter() - started
+        for outcome in outcomes:
+            if isinstance(outcome, Exception):
+                raise _staging_error(outcome) from outcome
+        await run_file_io("swap", self._batch.swap, files, outcomes, stats=self.stats)
+
+    async def commit(self) -> Optional[CommitResult]:
+        """
+        Finish the commit once the stream has ended.
+
+        Returns:
+            Optional[CommitResult]: The commit, or None if no file was added
+        """
+        if self._batch is None:
+            return None
+        batch, self._batch = self._batch, None
+        await run_file_io("commit", batch.cleanup, stats=self.stats)
+        # Time spent waiting for the model is not part of the commit
+        batch.result.stage_seconds = self._stage_seconds
+        batch.started = time.perf_counter() - self._stage_seconds - batch.result.swap_seconds
+        return batch.finish()
+
+    async def abort(self) -> None:
+        """
+        Remove the staging directory of a stream that failed. Files already swapped in stay.
+        """
+        if self._batch is not None:
+            batch, self._batch = self._batch, None
+            await run_file_io("commit", batch.cleanup, stats=self.stats)
@@ -1,9 +1,11 @@
 """
 Utility module for parsing and extracting animation code files.
 """
+import asyncio
 import os
 import logging
-from typing import Dict, List, Tuple, Set
+import re
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple, Set
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
@@ -17,10 +19,73 @@ class AnimationFileInfo:
     def __repr__(self) -> str:
         return f"AnimationFileInfo(path={self.path})"
 
+_HEADER_CANDIDATE = re.compile(r"^[^\S\n]*file:", re.IGNORECASE | re.MULTILINE)
+_FENCE = "```"
+_HEADER_SEARCH_WINDOW = 256
+
+def _line_end(code: str, start: int) -> int:
+    end = code.find("\n", start)
+    return len(code) if end == -1 else end
+
+def _is_file_header(line: str) -> bool:
+    return line.strip().lower().startswith("file:")
+
+def _find_header_in_segment(segment: str) -> int:
+    """Offset of the first File: header line in a run of whole lines, or -1."""
+    folded = segment.lower()
+    if len(folded) != len(segment):
+        # A few characters lower to more than one, so offsets would not line up
+        for match in _HEADER_CANDIDATE.finditer(segment):
+            line_start = match.start()
+            if _is_file_header(segment[line_start:_line_end(segment, line_start)]):
+                return line_start
+        return -1
+
+    position = 0
+    while True:
+        hit = folded.find("file:", position)
+        if hit == -1:
+            return -1
+        line_start = segment.rfind("\n", 0, hit) + 1
+        line_end = _line_end(segment, hit)
+        if not segment[line_start:hit].strip() and _is_file_header(segment[line_start:line_end]):
+            return line_start
+        position = line_end + 1
+
+def _find_file_header(code: str, start: int) -> int:
+    """Offset of the next File: header line at or after a line start, or -1."""
+    # Search growing windows of whole lines, so a header right after a fence costs little
+    window = _HEADER_SEARCH_WINDOW
+    position = start
+    while position <= len(code):
+        segment_end = _line_end(code, min(len(code), position + window))
+        offset = _find_header_in_segment(code[position:segment_end])
+        if offset != -1:
+            return position + offset
+        position = segment_end + 1
+        window *= 2
+    return -1
+
+def _find_closing_fence(code: str, start: int) -> int:
+    """Offset of the next line consisting only of a fence, at or after a line start, or -1."""
+    position = start
+    while True:
+        hit = code.find(_FENCE, position)
+        if hit == -1:
+            return -1
+        line_start = code.rfind("\n", 0, hit) + 1
+        line_end = _line_end(code, hit)
+        if code[line_start:line_end].strip() == _FENCE:
+            return line_start
+        position = line_end + 1
+
 def parse_animation_code(code: str) -> List[AnimationFileInfo]:
     """
     Parse animation code text and extract file information.
 
+    The text is scanned once by offset: only header and fence lines are inspected,
+    and each file body is sliced out of the original text in one piece.
+
     Args:
         code: The raw animation code text containing file definitions
 
@@ -32,84 +97,251 @@ def parse_animation_code(code: str) -> List[AnimationFileInfo]:
     files: List[AnimationFileInfo] = []
     processed_paths: Set[str] = set()
 
-    lines = code.split("\n")
-    i = 0
-    while i < len(lines):
-        line = lines[i]
+    # Offsets are line starts; len(code) + 1 means past the last line
+    end_of_text = len(code) + 1
+    position = 0
+    while position < end_of_text:
         # Look for file path indicator
-        if line.strip().lower().startswith("file:"):
-            # Extract the file path
-            current_path = line.split(":", 1)[1].strip()
-            if current_path in processed_paths:
-                # Skip duplicates
-                i += 1
-                continue
+        header_start = _find_file_header(code, position)
+        if header_start == -1:
+            break
+        header_end = _line_end(code, header_start)
+        current_path = code[header_start:header_end].split(":", 1)[1].strip()
+        position = header_end + 1
+        if current_path in processed_paths:
+            # Skip duplicates
+            continue
 
-            # Expect next line to be the opening fence ```lang
-            i += 1
-            if i < len(lines) and lines[i].strip().startswith("```"):
-                # Enter fence mode
-                fence_lang = lines[i].strip()
-                current_content_lines: List[str] = []
-                i += 1
-                # Collect until closing fence ```
-                while i < len(lines) and lines[i].strip() != "```":
-                    current_content_lines.append(lines[i])
-                    i += 1
-                # Skip the closing fence line
-                i += 1
-                # Save the file info
-                files.append(AnimationFileInfo(
-                    path=current_path,
-                    content="\n".join(current_content_lines)
-                ))
+        # Expect next line to be the opening fence ```lang
+        if position < end_of_text:
+            fence_end = _line_end(code, position)
+            if code[position:fence_end].strip().startswith(_FENCE):
+                body_start = fence_end + 1
+                closing_start = _find_closing_fence(code, body_start) if body_start < end_of_text else -1
+                if closing_start == -1:
+                    # Unterminated fence: the file runs to the end of the text
+                    content = code[body_start:]
+                    position = end_of_text
+                else:
+                    content = code[body_start:closing_start - 1] if closing_start > body_start else ""
+                    position = _line_end(code, closing_start) + 1
+                files.append(AnimationFileInfo(path=current_path, content=content))
                 processed_paths.add(current_path)
                 continue
+
+        # No fence detected, fallback to old behavior: collect until next File:
+        if position >= end_of_text:
+            content = ""
+        else:
+            next_header = _find_file_header(code, position)
+            if next_header == -1:
+                content = code[position:]
+                position = end_of_text
             else:
-                # No fence detected, fallback to old behavior: collect until next File:
-                current_content_lines = []
-                while i < len(lines) and not lines[i].strip().lower().startswith("file:"):
-                    current_content_lines.append(lines[i])
-                    i += 1
-                files.append(AnimationFileInfo(
-                    path=current_path,
-                    content="\n".join(current_content_lines)
-                ))
-                processed_paths.add(current_path)
-                continue
-        i += 1
+                content = code[position:next_header - 1] if next_header > position else ""
+                position = next_header
+        files.append(AnimationFileInfo(path=current_path, content=content))
+        processed_paths.add(current_path)
 
     logger.info(f"Parsed {len(files)} files from animation code")
     return files
 
-def save_animation_files(base_dir: str, files: List[AnimationFileInfo]) -> List[str]:
+class StreamingAnimationParser:
+    """
+    Push-based version of parse_animation_code for streamed LLM responses.
+
+    Text is fed in arbitrary chunks and each AnimationFileInfo is returned as soon as
+    its closing fence has arrived. Feeding a whole text and calling close() produces
+    exactly the files parse_animation_code would.
+    """
+    _SEEK = "seek"                  # Looking for a File: header
+    _EXPECT_FENCE = "expect_fence"  # Saw a header, the next line decides fenced or not
+    _IN_FENCE = "in_fence"          # Collecting until the closing fence
+    _NO_FENCE = "no_fence"          # Fallback: collecting until the next File: header
+
+    def __init__(self):
+        self.files: List[AnimationFileInfo] = []
+        self._partial_line = ""
+        self._state = self._SEEK
+        self._path: Optional[str] = None
+        self._content_lines: List[str] = []
+        self._processed_paths: Set[str] = set()
+
+    def feed(self, text: str) -> List[AnimationFileInfo]:
+        """
+        Feed the next chunk of response text.
+
+        Args:
+            text: The next chunk, of any length
+
+        Returns:
+            List[AnimationFileInfo]: Files completed by this chunk
+        """
+        completed: List[AnimationFileInfo] = []
+        if "\n" not in text:
+            self._partial_line += text
+            return completed
+        lines = (self._partial_line + text).split("\n")
+        self._partial_line = lines.pop()
+        for line in lines:
+            self._process_line(line, completed)
+        return completed
+
+    def close(self) -> List[AnimationFileInfo]:
+        """
+        Signal the end of the response and flush the file still being collected.
+
+        Returns:
+            List[AnimationFileInfo]: Files completed by the end of the text
+        """
+        completed: List[AnimationFileInfo] = []
+        self._process_line(self._partial_line, completed)
+        self._partial_line = ""
+        if self._state != self._SEEK:
+            # Unterminated fences and fallback files run to the end of the text
+            self._finish_file(completed)
+        logger.info(f"Parsed {len(self.files)} files from streamed animation code")
+        return completed
+
+    def _finish_file(self, completed: List[AnimationFileInfo]) -> None:
+        file_info = AnimationFileInfo(path=self._path, content="\n".join(self._content_lines))
+        self.files.append(file_info)
+        completed.append(file_info)
+        self._processed_paths.add(self._path)
+        self._path = None
+        self._content_lines = []
+        self._state = self._SEEK
+
+    def _process_line(self, line: str, completed: List[AnimationFileInfo]) -> None:
+        if self._state == self._IN_FENCE:
+            if line.strip() == "```":
+                self._finish_file(completed)
+            else:
+                self._content_lines.append(line)
+            return
+
+        if self._state == self._EXPECT_FENCE:
+            if line.strip().startswith("```"):
+                self._state = self._IN_FENCE
+                return
+            # No fence detected, fall back to collecting until the next File: header
+            self._state = self._NO_FENCE
+
+        is_header = line.strip().lower().startswith("file:")
+        if self._state == self._NO_FENCE:
+            if not is_header:
+                self._content_lines.append(line)
+                return
+            self._finish_file(completed)
+
+        if is_header:
+            path = line.split(":", 1)[1].strip()
+            # Skip duplicates
+            if path not in self._processed_paths:
+                self._path = path
+                self._state = self._EXPECT_FENCE
+
+
+async def save_animation_stream(chunks: AsyncIterator[str], base_dir: str) -> Tuple[str, List[str], Optional[Dict[str, Any]]]:
+    """
+    Parse a streamed animation response and save its files.
+    Each file is saved as soon as it is complete, so the animation server can compile it
+    while later files are still generating. In the atomic commit mode it is staged and
+    swapped in with a single rename, so the server never sees it half-written; in the
+    in_place mode it is written directly. Unchanged files are not rewritten.
+
+    Args:
+        chunks: Async iterator of response text chunks
+        base_dir: Base directory where files should be saved
+
+    Returns:
+        Tuple[str, List[str], Optional[Dict[str, Any]]]: The full response text, the saved file
+        paths including unchanged ones, and the commit timings in the atomic mode
+    """
+    from linda_server.utils.animation_commit import StreamingCommit, get_commit_mode
+    from linda_server.utils.blocking_io import run_file_io
+
+    parser = StreamingAnimationParser()
+    parts: List[str] = []
+    saved_files: List[str] = []
+
+    if get_commit_mode() == "atomic":
+        commit = StreamingCommit(base_dir)
+        try:
+            async for text in chunks:
+                parts.append(text)
+                await commit.add(parser.feed(text))
+            await commit.add(parser.close())
+        except BaseException:
+            await asyncio.shield(commit.abort())
+            raise
+        result = await commit.commit()
+        commit_timings = None
+        if result is not None:
+            saved_files.extend(result.saved_files + result.unchanged_files)
+            commit_timings = result.timings()
+        logger.info(f"Successfully committed {len(saved_files)} streamed animation files")
+        return "".join(parts), saved_files, commit_timings
+
+    async def save(files: List[AnimationFileInfo]) -> None:
+        if not files:
+            return
+        unchanged: List[str] = []
+        written = await run_file_io("save", save_animation_files, base_dir, files, unchanged)
+        saved_files.extend(written + unchanged)
+
+    async for text in chunks:
+        parts.append(text)
+        await save(parser.feed(text))
+    await save(parser.close())
+
+    logger.info(f"Successfully saved {len(saved_files)} streamed animation files")
+    return "".join(parts), saved_files, None
+
+
+def save_animation_files(base_dir: str, files: List[AnimationFileInfo], unchanged_files: Optional[List[str]] = None) -> List[str]:
     """
     Save parsed animation files to the specified base directory.
+    Files whose content matches the workspace manifest are not rewritten.
 
     Args:
         base_dir: Base directory where files should be saved
         files: List of AnimationFileInfo objects to save
+        unchanged_files: If given, collects the paths that were skipped as unchanged
 
     Returns:
-        List[str]: List of successfully saved file paths
+        List[str]: List of file paths that were written
 
     Raises:
         IOError: If there's an error saving files
     """
-    from linda_server.utils.file_utils import save_file
+    from linda_server.utils.file_manifest import count_elision, get_file_manifest
+    from linda_server.utils.file_utils import is_system_file, save_file
 
     logger.info(f"Saving {len(files)} animation files to {base_dir}")
+    manifest = get_file_manifest(base_dir)
     saved_files: List[str] = []
+    unchanged: List[str] = []
 
     for file_info in files:
         file_path = os.path.join(base_dir, file_info.path)
+        # System files are left to save_file, which skips them
+        if not is_system_file(file_path) and manifest.is_unchanged(file_path, file_info.content):
+            unchanged.append(file_path)
+            continue
         try:
             success = save_file(file_path, file_info.content)
             if success:
                 saved_files.append(file_path)
+                manifest.record(file_path, file_info.content)
         except IOError as e:
             logger.error(f"Failed to save {file_path}: {str(e)}")
             # Continue with other files even if one fails
 
-    logger.info(f"Successfully saved {len(saved_files)} animation files")
+    if saved_files:
+        manifest.save()
+    count_elision(len(saved_files), len(unchanged))
+    if unchanged_files is not None:
+        unchanged_files.extend(unchanged)
+    logger.info(f"Successfully saved {len(saved_files)} animation files, {len(unchanged)} unchanged")
     return saved_files
@@ -0,0 +1,291 @@
+"""
+Utility module for a pool of pre-warmed animation preview servers.
+
+Cold-starting a Nuxt dev server takes seconds, which a new session used to wait for
+on its first preview. The pool keeps dev servers running ahead of demand, each on a
+port allocated by the OS and serving its own directory (a clone of the template)
+under ANIMATION_WORKSPACES_DIR:
+
+- A new session leases an idle server; its workspace becomes a link to the server's
+  directory, so generated files are hot-reloaded by a server that is already warm.
+- When the session's workspace is collected, the directory is reset to the template
+  and the server goes back to the pool, still running.
+- The pool tops itself up to ANIMATION_PREVIEW_POOL_MIN_IDLE idle servers whenever
+  one is leased (never beyond ANIMATION_PREVIEW_POOL_MAX_SIZE servers in total), and
+  stops surplus servers that stayed idle for ANIMATION_PREVIEW_POOL_IDLE_SECONDS.
+
+Sessions that find no idle server fall back to a dev server of their own.
+
+Settings:
+    ANIMATION_PREVIEW_POOL_MIN_IDLE: Warm servers kept idle (default 1)
+    ANIMATION_PREVIEW_POOL_MAX_SIZE: Pooled servers at most, idle plus leased; 0 disables the pool (default 4)
+    ANIMATION_PREVIEW_POOL_IDLE_SECONDS: Idle time before a surplus server is stopped (default 600)
+    ANIMATION_PREVIEW_POOL_INTERVAL_SECONDS: Time between pool checks (default 30)
+"""
+import asyncio
+import logging
+import os
+import shutil
+import threading
+import time
+import uuid
+from typing import Dict, List, Optional
+
+from linda_server.utils.animation_server_runner import AnimationServerSupervisor, allocate_port, start_animation_server
+from linda_server.utils.animation_workspaces import clone_template, reset_workspace
+from linda_server.utils.blocking_io import run_file_io
+from linda_server.utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+DEFAULT_POOL_MIN_IDLE = 1
+DEFAULT_POOL_MAX_SIZE = 4
+DEFAULT_POOL_IDLE_SECONDS = 600
+DEFAULT_POOL_INTERVAL_SECONDS = 30
+# Not a valid session id, so pooled directories are never listed as workspaces
+POOL_DIR_PREFIX = ".pool-"
+
+class PooledPreview:
+    """One warm dev server of the pool and the directory it serves."""
+
+    def __init__(self, directory: str, supervisor: AnimationServerSupervisor):
+        self.directory = directory
+        self.supervisor = supervisor
+        self.session_id: Optional[str] = None
+        self.idle_since = time.monotonic()
+        self.recycling = False
+
+    @property
+    def url(self) -> str:
+        return self.supervisor.url
+
+    @property
+    def idle(self) -> bool:
+        return self.session_id is None and not self.recycling and self.supervisor.running
+
+class PreviewPool:
+    """Keeps warm preview servers and leases them to sessions."""
+
+    def __init__(
+        self,
+        template_dir: str,
+        root_dir: str,
+        min_idle: Optional[int] = None,
+        max_size: Optional[int] = None,
+        idle_seconds: Optional[float] = None,
+    ):
+        self.template_dir = template_dir
+        self.root_dir = root_dir
+        self.max_size = max_size if max_size is not None else int(
+            os.getenv("ANIMATION_PREVIEW_POOL_MAX_SIZE", str(DEFAULT_POOL_MAX_SIZE))
+        )
+        self.min_idle = min(self.max_size, min_idle if min_idle is not None else int(
+            os.getenv("ANIMATION_PREVIEW_POOL_MIN_IDLE", str(DEFAULT_POOL_MIN_IDLE))
+        ))
+        self.idle_seconds = idle_seconds if idle_seconds is not None else float(
+            os.getenv("ANIMATION_PREVIEW_POOL_IDLE_SECONDS", str(DEFAULT_POOL_IDLE_SECONDS))
+        )
+        self._instances: List[PooledPreview] = []
+        self._leases: Dict[str, PooledPreview] = {}
+        # Leases are taken from the file I/O threads that resolve workspaces
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._scale_lock: Optional[asyncio.Lock] = None
+        self._closing = False
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Get the number of pooled servers, in total, idle and leased.
+        """
+        with self._lock:
+            return {
+                "size": len(self._instances),
+                "idle": sum(1 for instance in self._instances if instance.idle),
+                "leased": len(self._leases),
+            }
+
+    def lease(self, session_id: str) -> Optional[PooledPreview]:
+        """
+        Lease a warm server to a session. Thread-safe.
+
+        Args:
+            session_id: The session that needs a preview
+
+        Returns:
+            Optional[PooledPreview]: The session's server, or None if no server is idle
+        """
+        if self._loop is None:
+            return None
+        with self._lock:
+            instance = self._leases.get(session_id)
+            if instance is not None:
+                return instance
+            instance = next((instance for instance in self._instances if instance.idle), None)
+            if instance is not None:
+                instance.session_id = session_id
+                self._leases[session_id] = instance
+        metrics.inc("animation_preview_leases_total", labels={"result": "warm" if instance else "miss"})
+        if instance is not None:
+            logger.info(f"Leased preview server {instance.url} to session {session_id}")
+        else:
+            logger.info(f"No warm preview server idle for session {session_id}")
+        # Either way the pool is now short of idle servers
+        self._loop.call_soon_threadsafe(self._wake.set)
+        self._publish_gauges()
+        return instance
+
+    def get_lease(self, session_id: str) -> Optional[PooledPreview]:
+        """
+        Get the server leased to a session, if any.
+        """
+        with self._lock:
+            return self._leases.get(session_id)
+
+    async def release(self, session_id: str) -> None:
+        """
+        End a session's lease, reset the server's directory and return it to the pool.
+
+        Args:
+            session_id: The session whose workspace was removed
+        """
+        with self._lock:
+            instance = self._leases.pop(session_id, None)
+            if instance is None:
+                return
+            instance.recycling = True
+        try:
+            changed = await run_file_io("pool_recycle", reset_workspace, self.template_dir, instance.directory)
+        except Exception as e:
+            logger.error(f"Failed to reset pooled preview {instance.directory}: {str(e)}")
+            await self._discard(instance)
+            return
+        with self._lock:
+            instance.session_id = None
+            instance.recycling = False
+            instance.idle_since = time.monotonic()
+        if not instance.supervisor.running:
+            await self._discard(instance)
+            return
+        metrics.inc("animation_preview_recycled_total")
+        logger.info(f"Recycled preview server {instance.url} from session {session_id} ({changed} files reset)")
+        self._publish_gauges()
+
+    async def start(self) -> None:
+        """
+        Warm up the pool and keep it sized in the background until closed.
+        """
+        if not self.enabled:
+            logger.info("Animation preview pool disabled")
+            return
+        self._closing = False
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        self._scale_lock = asyncio.Lock()
+        self._task = asyncio.create_task(self._run())
+
+    async def scale(self, now: Optional[float] = None) -> None:
+        """
+        Start servers until enough are idle, then stop surplus servers that idled too long.
+
+        Args:
+            now: Current time from time.monotonic(), for tests
+        """
+        async with self._scale_lock:
+            while not self._closing:
+                with self._lock:
+                    idle = sum(1 for instance in self._instances if instance.idle)
+                    missing = min(self.min_idle - idle, self.max_size - len(self._instances))
+                if missing <= 0:
+                    break
+                started = await asyncio.gather(*(self._add() for _ in range(missing)))
+                if not all(started):
+                    # Try again on the next check instead of spinning on a broken template
+                    break
+
+            now = time.monotonic() if now is None else now
+            with self._lock:
+                idle_instances = sorted((i for i in self._instances if i.idle), key=lambda i: i.idle_since)
+                surplus = idle_instances[:max(0, len(idle_instances) - self.min_idle)]
+                expired = [i for i in surplus if now - i.idle_since > self.idle_seconds]
+            for instance in expired:
+                logger.info(f"Stopping idle preview server {instance.url}")
+                await self._discard(instance)
+        self._publish_gauges()
+
+    async def close(self) -> None:
+        """
+        Stop the pool's background task and every pooled server.
+
+        Directories still leased to a session are kept, since they hold its animation.
+        """
+        self._closing = True
+        self._loop = None
+        if self._task:
+            self._task.cancel()
+            # Let a server that is starting finish or stop before the pool is emptied
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        with self._lock:
+            instances = list(self._instances)
+        for instance in instances:
+            await self._discard(instance, keep_directory=instance.session_id is not None)
+
+    async def _run(self) -> None:
+        interval = float(os.getenv("ANIMATION_PREVIEW_POOL_INTERVAL_SECONDS", str(DEFAULT_POOL_INTERVAL_SECONDS)))
+        # Checked as well as cancellation, which wait_for can drop when the wake-up races it
+        while not self._closing:
+            self._wake.clear()
+            try:
+                await self.scale()
+            except Exception as e:
+                logger.error(f"Animation preview pool check failed: {str(e)}")
+            try:
+                await asyncio.wait_for(self._wake.wait(), interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _add(self) -> bool:
+        directory = os.path.join(self.root_dir, f"{POOL_DIR_PREFIX}{uuid.uuid4().hex[:12]}")
+        try:
+            await run_file_io("pool_clone", clone_template, self.template_dir, directory)
+        except Exception as e:
+            logger.error(f"Failed to create pooled preview directory: {str(e)}")
+            return False
+        supervisor = await start_animation_server(directory, allocate_port())
+        if supervisor is None:
+            metrics.inc("animation_preview_pool_start_failures_total")
+            await run_file_io("pool_clone", shutil.rmtree, directory, True)
+            return False
+        instance = PooledPreview(directory, supervisor)
+        with self._lock:
+            self._instances.append(instance)
+        if self._closing:
+            await self._discard(instance)
+            return False
+        metrics.inc("animation_preview_pool_started_total")
+        logger.info(f"Warmed preview server {supervisor.url} in {supervisor.startup_seconds:.1f}s")
+        return True
+
+    async def _discard(self, instance: PooledPreview, keep_directory: bool = False) -> None:
+        with self._lock:
+            if instance in self._instances:
+                self._instances.remove(instance)
+            if instance.session_id and self._leases.get(instance.session_id) is instance:
+                del self._leases[instance.session_id]
+        await instance.supervisor.stop()
+        if not keep_directory:
+            await run_file_io("pool_clone", shutil.rmtree, instance.directory, True)
+        self._publish_gauges()
+
+    def _publish_gauges(self) -> None:
+        stats = self.stats()
+        metrics.set_gauge("animation_preview_pool_size", stats["size"])
+        metrics.set_gauge("animation_preview_pool_idle", stats["idle"])
+        metrics.set_gauge("animation_preview_pool_leased", stats["leased"])
@@ -0,0 +1,280 @@
+"""
+Utility module for serving animation previews through the linda server.
+
+Preview dev servers only listen on 127.0.0.1 (see animation_server_runner), so a browser
+never talks to one directly. The API proxies PREVIEW_PATH_PREFIX/<port>/ to the dev
+server on that port, HTTP and the Vite HMR websocket alike, and only for a browser
+holding a preview cookie for the session that server is previewing.
+
+Previews load in an iframe, which cannot send the Authorization header, and access
+tokens must not travel in URLs. The web app therefore asks for a preview ticket over
+GraphQL and loads /animations/<session>?ticket=<ticket>. A ticket is random, expires
+after ANIMATION_PREVIEW_TICKET_SECONDS and can be redeemed once; redeeming it sets the
+preview cookie, which is another random value that only opens that session's preview,
+is scoped to its server's path and is never an access token. Both live in this
+process's memory, so the API must run as a single process for previews to work.
+
+Settings:
+    ANIMATION_PREVIEW_TICKET_SECONDS: Lifetime of a preview ticket (default 60)
+    ANIMATION_PREVIEW_COOKIE_SECONDS: Lifetime of a preview cookie (default 3600)
+"""
+import asyncio
+import logging
+import os
+import secrets
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+import websockets
+from fastapi import Request, WebSocket
+from fastapi.responses import Response, StreamingResponse
+from starlette.background import BackgroundTask
+from starlette.websockets import WebSocketDisconnect
+
+from linda_server.utils.animation_server_runner import DEV_SERVER_HOST, preview_base_path
+from linda_server.utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+PREVIEW_COOKIE = "linda_preview"
+DEFAULT_TICKET_SECONDS = 60
+DEFAULT_COOKIE_SECONDS = 3600
+
+# Hop-by-hop headers, plus the credentials meant for the linda server itself
+_REQUEST_HEADERS_DROPPED = {
+    "connection", "keep-alive", "proxy-authenticate", "proxy-authorization", "te", "trailer",
+    "transfer-encoding", "upgrade", "host", "cookie", "authorization",
+}
+_RESPONSE_HEADERS_DROPPED = {
+    "connection", "keep-alive", "proxy-authenticate", "proxy-authorization", "te", "trailer",
+    "transfer-encoding", "upgrade",
+}
+# Set by the websocket handshake itself, never forwarded
+_WEBSOCKET_HEADERS_DROPPED = _REQUEST_HEADERS_DROPPED | {
+    "sec-websocket-key", "sec-websocket-version", "sec-websocket-extensions", "sec-websocket-protocol",
+}
+
+@dataclass(frozen=True)
+class PreviewGrant:
+    """Access of one user to the preview of one session."""
+    session_id: str
+    user_id: str
+    expires_at: float
+
+class PreviewGrants:
+    """Single-use preview tickets and the preview cookies they are exchanged for."""
+
+    def __init__(self, ticket_seconds: Optional[float] = None, cookie_seconds: Optional[float] = None):
+        self.ticket_seconds = ticket_seconds if ticket_seconds is not None else float(
+            os.getenv("ANIMATION_PREVIEW_TICKET_SECONDS", str(DEFAULT_TICKET_SECONDS))
+        )
+        self.cookie_seconds = cookie_seconds if cookie_seconds is not None else float(
+            os.getenv("ANIMATION_PREVIEW_COOKIE_SECONDS", str(DEFAULT_COOKIE_SECONDS))
+        )
+        self._tickets: Dict[str, PreviewGrant] = {}
+        self._cookies: Dict[str, PreviewGrant] = {}
+        # Tickets are issued from resolver threads and redeemed on the event loop
+        self._lock = threading.Lock()
+
+    def issue_ticket(self, session_id: str, user_id: str) -> str:
+        """
+        Issue a ticket that opens a session's preview once.
+
+        Args:
+            session_id: The session to preview
+            user_id: The user the session belongs to
+
+        Returns:
+            str: The ticket, to be passed as the ticket query parameter of /animations/<session>
+        """
+        return self._issue(self._tickets, session_id, str(user_id), self.ticket_seconds)
+
+    def redeem_ticket(self, ticket: str) -> Optional[PreviewGrant]:
+        """
+        Redeem a ticket. A ticket is only accepted once, and only before it expires.
+
+        Returns:
+            Optional[PreviewGrant]: The grant the ticket was issued for, or None
+        """
+        with self._lock:
+            grant = self._tickets.pop(ticket, None)
+        if grant is None or grant.expires_at <= time.time():
+            metrics.inc("animation_preview_tickets_total", labels={"result": "rejected"})
+            return None
+        metrics.inc("animation_preview_tickets_total", labels={"result": "redeemed"})
+        return grant
+
+    def open_cookie(self, session_id: str, user_id: str) -> str:
+        """
+        Get a preview cookie value that opens a session's preview until it expires.
+        """
+        return self._issue(self._cookies, session_id, str(user_id), self.cookie_seconds)
+
+    def check_cookie(self, value: Optional[str]) -> Optional[PreviewGrant]:
+        """
+        Get the grant of a preview cookie, or None if it is unknown or expired.
+        """
+        if not value:
+            return None
+        with self._lock:
+            grant = self._cookies.get(value)
+            if grant is not None and grant.expires_at <= time.time():
+                del self._cookies[value]
+                grant = None
+        return grant
+
+    def _issue(self, grants: Dict[str, PreviewGrant], session_id: str, user_id: str, lifetime: float) -> str:
+        value = secrets.token_urlsafe(32)
+        now = time.time()
+        with self._lock:
+            # Forget expired entries as new ones come in, so neither map grows without bound
+            for key in [key for key, grant in grants.items() if grant.expires_at <= now]:
+                del grants[key]
+            grants[value] = PreviewGrant(session_id, user_id, now + lifetime)
+        return value
+
+_grants: Optional[PreviewGrants] = None
+
+def get_preview_grants() -> PreviewGrants:
+    """
+    Get the process-wide preview tickets and cookies.
+    """
+    global _grants
+    if _grants is None:
+        _grants = PreviewGrants()
+    return _grants
+
+_client: Optional[httpx.AsyncClient] = None
+
+def _get_client() -> httpx.AsyncClient:
+    global _client
+    if _client is None:
+        # Dev servers can take a while to compile a page on first request
+        _client = httpx.AsyncClient(timeout=httpx.Timeout(120.0, connect=5.0), follow_redirects=False)
+    return _client
+
+async def close_preview_proxy() -> None:
+    """
+    Close the proxy's connections to the dev servers.
+    """
+    global _client
+    if _client is not None:
+        client, _client = _client, None
+        await client.aclose()
+
+def _upstream_path(port: int, path: str, query: bytes) -> str:
+    # Dev servers serve under the same base path the proxy is mounted at
+    target = f"{preview_base_path(port)}{path}"
+    return f"{target}?{query.decode('latin-1')}" if query else target
+
+async def proxy_http(request: Request, port: int, path: str) -> Response:
+    """
+    Forward a request to the dev server on a port and stream its response back.
+
+    Args:
+        request: The browser's request
+        port: The dev server's port
+        path: The path below the server's base path
+
+    Returns:
+        Response: The dev server's response, or 502 if it cannot be reached
+    """
+    headers = [
+        (name, value) for name, value in request.headers.items()
+        if name.lower() not in _REQUEST_HEADERS_DROPPED
+    ]
+    origin = f"http://{DEV_SERVER_HOST}:{port}"
+    client = _get_client()
+    upstream_request = client.build_request(
+        request.method,
+        origin + _upstream_path(port, path, request.url.query.encode("latin-1")),
+        headers=headers,
+        content=request.stream(),
+    )
+    try:
+        upstream = await client.send(upstream_request, stream=True)
+    except httpx.HTTPError as e:
+        logger.warning(f"Preview server on port {port} did not answer: {str(e)}")
+        return Response("Animation preview server is not available", status_code=502)
+    response_headers: List[Tuple[str, str]] = []
+    for name, value in upstream.headers.multi_items():
+        if name.lower() in _RESPONSE_HEADERS_DROPPED:
+            continue
+        if name.lower() == "location" and value.startswith(origin):
+            # Keep redirects on the proxy
+            value = value[len(origin):]
+        response_headers.append((name, value))
+    response = StreamingResponse(
+        upstream.aiter_raw(),
+        status_code=upstream.status_code,
+        background=BackgroundTask(upstream.aclose),
+    )
+    # Replaces the defaults of StreamingResponse; repeated headers such as set-cookie are kept
+    response.raw_headers = [(name.lower().encode("latin-1"), value.encode("latin-1")) for name, value in response_headers]
+    return response
+
+async def proxy_websocket(websocket: WebSocket, port: int, path: str) -> None:
+    """
+    Relay a websocket, such as the Vite HMR connection, to the dev server on a port.
+
+    Args:
+        websocket: The browser's websocket, not yet accepted
+        port: The dev server's port
+        path: The path below the server's base path
+    """
+    url = f"ws://{DEV_SERVER_HOST}:{port}" + _upstream_path(port, path, websocket.scope.get("query_string", b""))
+    headers = [
+        (name, value) for name, value in websocket.headers.items()
+        if name.lower() not in _WEBSOCKET_HEADERS_DROPPED
+    ]
+    subprotocols = websocket.scope.get("subprotocols") or None
+    try:
+        upstream = await websockets.connect(url, subprotocols=subprotocols, additional_headers=headers, open_timeout=10)
+    except (OSError, asyncio.TimeoutError, websockets.InvalidHandshake) as e:
+        logger.warning(f"Preview server on port {port} refused its websocket: {str(e)}")
+        await websocket.close(code=1011)
+        return
+
+    async def to_upstream() -> None:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                return
+            if message.get("text") is not None:
+                await upstream.send(message["text"])
+            elif message.get("bytes") is not None:
+                await upstream.send(message["bytes"])
+
+    async def to_browser() -> None:
+        async for message in upstream:
+            if isinstance(message, str):
+                await websocket.send_text(message)
+            else:
+                await websocket.send_bytes(message)
+
+    await websocket.accept(subprotocol=upstream.subprotocol)
+    tasks = [asyncio.ensure_future(to_upstream()), asyncio.ensure_future(to_browser())]
+    try:
+        await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        # Shielded, so both connections are closed even when this handler is cancelled
+        await asyncio.shield(_close_relay(tasks, upstream, websocket))
+
+async def _close_relay(tasks: List["asyncio.Task[None]"], upstream, websocket: WebSocket) -> None:
+    for task in tasks:
+        task.cancel()
+    await asyncio.wait(tasks)
+    for task in tasks:
+        if not task.cancelled():
+            # The relay ends when either side closes; that is not an error
+            task.exception()
+    await upstream.close()
+    try:
+        await websocket.close()
+    except (RuntimeError, WebSocketDisconnect):
+        # Already closed by the browser
+        pass
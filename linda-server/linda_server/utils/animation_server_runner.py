@@ -1,68 +1,556 @@
 """
 Utility module for starting and managing the animation server.
+
+A freshly provisioned animation server needs a `yarn install` and a cold Vite
+dependency pre-bundle before it serves anything. Both are cached under
+ANIMATION_CACHE_DIR, keyed on the hash of yarn.lock:
+
+    dependencies/<lock hash>/node_modules   Installed once, symlinked into every server directory
+    build/<lock hash>/vite                  Vite cache of the first server, copied into new ones
+
+A startup that had to install dependencies or had no Vite cache is logged and
+measured as cold, one that reused both as warm.
+
+Dev servers only listen on 127.0.0.1. Browsers reach them through the linda server,
+which proxies PREVIEW_PATH_PREFIX/<port>/ to the server on that port, so each server is
+started with that path as its Nuxt base URL.
+
+Settings:
+    ANIMATION_SERVER_PORT: Port of the main animation server (default 4000)
+    ANIMATION_DEV_COMMAND: Dev server command, with {port} filled in
+        (default "yarn dev --host 127.0.0.1 --port {port}")
+    ANIMATION_SERVER_STARTUP_TIMEOUT_SECONDS: Time to wait for readiness (default 120)
+    ANIMATION_CACHE_DIR: Dependency and build caches (default .animation_cache next to the template)
+    ANIMATION_INSTALL_COMMAND: Dependency install command; empty disables installs
+        (default "yarn install --frozen-lockfile --non-interactive")
 """
 import asyncio
+import hashlib
 import logging
 import os
+import shutil
+import signal
+import socket
 import subprocess
 import sys
-from typing import Optional, Tuple
+import tempfile
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Deque, Dict, List, Optional
+
+from linda_server.utils.blocking_io import run_file_io
+from linda_server.utils.metrics import metrics
 
 # Configure logging
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 
-# Hardcoded animation server port
-ANIMATION_SERVER_PORT = 4000
+# Port of the main animation server; preview servers get ports from allocate_port
+ANIMATION_SERVER_PORT = int(os.getenv("ANIMATION_SERVER_PORT", "4000"))
+
+DEFAULT_DEV_COMMAND = "yarn dev --host 127.0.0.1 --port {port}"
+DEV_SERVER_HOST = "127.0.0.1"
+# Dev servers are served by the linda server under this prefix, see preview_base_path
+PREVIEW_PATH_PREFIX = "/animation-previews"
+DEFAULT_LOG_LINES = 500
+DEFAULT_STARTUP_TIMEOUT_SECONDS = 120
+READINESS_POLL_SECONDS = 0.25
+RESTART_BACKOFF_SECONDS = 1.0
+RESTART_BACKOFF_MAX_SECONDS = 60.0
+# A server that stayed up this long crashed for a new reason, so its backoff starts over
+STABLE_UPTIME_SECONDS = 60.0
+MAX_CONSECUTIVE_RESTARTS = 10
+STARTUP_BUCKETS = (0.5, 1, 2.5, 5, 10, 20, 30, 60, 120)
+DEFAULT_INSTALL_COMMAND = "yarn install --frozen-lockfile --non-interactive"
+# Read by nuxt.config.ts, so each server directory keeps its own Vite cache
+VITE_CACHE_ENV = "ANIMATION_VITE_CACHE_DIR"
+VITE_CACHE_SUBDIR = os.path.join(".cache", "vite")
+# Written by Vite once the dependency pre-bundle is complete
+VITE_CACHE_MARKER = os.path.join("deps", "_metadata.json")
+BUILD_CACHE_SAVE_ATTEMPTS = 60
+
+@dataclass
+class StartupCache:
+    """What a server start could reuse from the caches."""
+    lock_hash: Optional[str]
+    # "cached", "installed", "present" (own node_modules) or "none" (nothing to install)
+    dependencies: str
+    # "seeded", "present" or "empty"
+    build_cache: str
+    prepare_seconds: float
 
-async def start_animation_server() -> Optional[asyncio.subprocess.Process]:
+    @property
+    def warm(self) -> bool:
+        return self.dependencies != "installed" and self.build_cache != "empty"
+
+def get_cache_dir() -> str:
     """
-    Start the animation server as a subprocess.
-    
+    Get the directory holding the dependency and build caches.
+    """
+    cache_dir = os.getenv("ANIMATION_CACHE_DIR")
+    if cache_dir:
+        return os.path.abspath(cache_dir)
+    template_dir = os.getenv("ANIMATION_SERVER_PATH")
+    if template_dir:
+        return os.path.join(os.path.dirname(os.path.abspath(template_dir)), ".animation_cache")
+    return os.path.abspath(".animation_cache")
+
+def hash_lockfile(animation_server_dir: str) -> Optional[str]:
+    """
+    Hash a server directory's yarn.lock, the key of its caches.
+
     Returns:
-        Optional[asyncio.subprocess.Process]: The animation server process if successful, None otherwise
+        Optional[str]: Hex SHA-256 of yarn.lock, or None if there is none
     """
     try:
-        # Check for mandatory ANIMATION_SERVER_PATH environment variable
-        if "ANIMATION_SERVER_PATH" not in os.environ:
-            logger.error("ERROR: ANIMATION_SERVER_PATH environment variable is not set!")
-            logger.error("Animation server cannot be started.")
-            return None
-        
-        animation_server_dir = os.environ["ANIMATION_SERVER_PATH"]
-        
-        if not os.path.exists(animation_server_dir):
-            logger.error(f"ERROR: Animation server directory not found: {animation_server_dir}")
-            logger.error("Please check the ANIMATION_SERVER_PATH environment variable.")
-            return None
+        with open(os.path.join(animation_server_dir, "yarn.lock"), "rb") as f:
+            return hashlib.sha256(f.read()).hexdigest()
+    except FileNotFoundError:
+        return None
 
-        # Start the animation server process with explicit port 4000
-        logger.info(f"Starting animation server from {animation_server_dir} on port {ANIMATION_SERVER_PORT}")
-        process = await asyncio.create_subprocess_shell(
-            f"cd {animation_server_dir} && yarn dev --port {ANIMATION_SERVER_PORT}",
+def _copy_into_place(source: str, target: str) -> bool:
+    # Copied next to the target and renamed, so a cache is complete or absent
+    parent = os.path.dirname(target)
+    os.makedirs(parent, exist_ok=True)
+    staging = tempfile.mkdtemp(prefix=f".{os.path.basename(target)}-", dir=parent)
+    try:
+        shutil.copytree(source, staging, symlinks=True, dirs_exist_ok=True)
+        try:
+            os.rename(staging, target)
+        except OSError:
+            # Filled meanwhile by another server
+            if not os.path.isdir(target):
+                raise
+            return False
+        return True
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+
+def _seed_build_cache(animation_server_dir: str, lock_hash: Optional[str]) -> str:
+    local = os.path.join(animation_server_dir, VITE_CACHE_SUBDIR)
+    if os.path.isfile(os.path.join(local, VITE_CACHE_MARKER)):
+        return "present"
+    if lock_hash is None:
+        return "empty"
+    seed = os.path.join(get_cache_dir(), "build", lock_hash, "vite")
+    if not os.path.isfile(os.path.join(seed, VITE_CACHE_MARKER)):
+        return "empty"
+    shutil.rmtree(local, ignore_errors=True)
+    _copy_into_place(seed, local)
+    return "seeded"
+
+def persist_build_cache(animation_server_dir: str, lock_hash: Optional[str]) -> bool:
+    """
+    Save a server's completed Vite cache as the seed for new servers with the same yarn.lock.
+
+    Args:
+        animation_server_dir: The server directory
+        lock_hash: Hash of its yarn.lock
+
+    Returns:
+        bool: True if a new seed was saved
+    """
+    if lock_hash is None:
+        return False
+    seed = os.path.join(get_cache_dir(), "build", lock_hash, "vite")
+    local = os.path.join(animation_server_dir, VITE_CACHE_SUBDIR)
+    if os.path.isdir(seed) or not os.path.isfile(os.path.join(local, VITE_CACHE_MARKER)):
+        return False
+    saved = _copy_into_place(local, seed)
+    if saved:
+        logger.info(f"Saved Vite build cache for yarn.lock {lock_hash[:12]}")
+    return saved
+
+_install_locks: Dict[str, asyncio.Lock] = {}
+
+def _dependency_status(node_modules: str, cached: Optional[str]) -> Optional[str]:
+    if cached is None:
+        return "present" if os.path.isdir(node_modules) else "none"
+    if os.path.isdir(node_modules):
+        # Workspaces link the template's node_modules, which may itself link the cache
+        return "cached" if os.path.realpath(node_modules) == os.path.realpath(cached) else "present"
+    return None
+
+def _store_dependencies(node_modules: str, cached: str) -> None:
+    # Installed in place so postinstall hooks see the project, then moved into the cache;
+    # across filesystems the move is a full copy
+    os.makedirs(os.path.dirname(cached), exist_ok=True)
+    try:
+        shutil.move(node_modules, cached)
+    except OSError:
+        if not os.path.isdir(cached):
+            raise
+        shutil.rmtree(node_modules, ignore_errors=True)
+
+def _link_dependencies(cached: str, node_modules: str) -> None:
+    if os.path.lexists(node_modules):
+        os.unlink(node_modules)
+    os.symlink(cached, node_modules)
+
+def _unlink_stale(node_modules: str) -> None:
+    if os.path.islink(node_modules):
+        os.unlink(node_modules)
+
+async def _ensure_dependencies(animation_server_dir: str, lock_hash: Optional[str]) -> str:
+    node_modules = os.path.join(animation_server_dir, "node_modules")
+    cached = os.path.join(get_cache_dir(), "dependencies", lock_hash, "node_modules") if lock_hash else None
+    status = await run_file_io("server_cache", _dependency_status, node_modules, cached)
+    if status is not None:
+        return status
+
+    # One install per yarn.lock, however many servers start at once
+    async with _install_locks.setdefault(lock_hash, asyncio.Lock()):
+        status = "cached"
+        if not await run_file_io("server_cache", os.path.isdir, cached):
+            install_command = os.getenv("ANIMATION_INSTALL_COMMAND", DEFAULT_INSTALL_COMMAND)
+            if not install_command:
+                return "none"
+            await run_file_io("server_cache", _unlink_stale, node_modules)
+            await _install(animation_server_dir, install_command)
+            await run_file_io("server_cache", _store_dependencies, node_modules, cached)
+            status = "installed"
+        await run_file_io("server_cache", _link_dependencies, cached, node_modules)
+        return status
+
+async def _install(animation_server_dir: str, install_command: str) -> None:
+    logger.info(f"Installing animation server dependencies in {animation_server_dir}")
+    started = time.perf_counter()
+    process = await asyncio.create_subprocess_shell(
+        install_command,
+        cwd=animation_server_dir,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.STDOUT,
+        start_new_session=True,
+    )
+    try:
+        output, _ = await process.communicate()
+    except asyncio.CancelledError:
+        process.kill()
+        await process.wait()
+        raise
+    install_seconds = time.perf_counter() - started
+    if process.returncode != 0:
+        tail = output[-4000:].decode("utf-8", errors="replace")
+        raise RuntimeError(f"Dependency install exited with {process.returncode}: {tail}")
+    metrics.observe("animation_dependency_install_seconds", install_seconds, buckets=STARTUP_BUCKETS + (300, 600))
+    logger.info(f"Installed animation server dependencies in {install_seconds:.1f}s")
+
+async def prepare_startup_cache(animation_server_dir: str) -> StartupCache:
+    """
+    Link cached dependencies into a server directory and seed its Vite cache.
+
+    Dependencies are installed into the cache first if no directory with this yarn.lock
+    has installed them yet. A directory with its own node_modules is left alone.
+
+    Args:
+        animation_server_dir: The directory about to be served
+
+    Returns:
+        StartupCache: What could be reused
+    """
+    started = time.perf_counter()
+    lock_hash = await run_file_io("server_cache", hash_lockfile, animation_server_dir)
+    dependencies = await _ensure_dependencies(animation_server_dir, lock_hash)
+    build_cache = await run_file_io("server_cache", _seed_build_cache, animation_server_dir, lock_hash)
+    return StartupCache(lock_hash, dependencies, build_cache, time.perf_counter() - started)
+
+def preview_base_path(port: int) -> str:
+    """
+    Get the path a dev server is served under, both by itself and by the linda server's proxy.
+    """
+    return f"{PREVIEW_PATH_PREFIX}/{port}/"
+
+class AnimationServerSupervisor:
+    """
+    Runs one animation dev server and keeps it running.
+
+    Both output pipes are drained into a bounded ring buffer, so a chatty stderr can
+    never fill its pipe and stall Nuxt. start() only reports success once the server
+    answers HTTP on its port. If the process exits on its own it is restarted with
+    exponential backoff; the backoff resets once it has stayed up for a while.
+    """
+
+    def __init__(
+        self,
+        animation_server_dir: str,
+        port: int = ANIMATION_SERVER_PORT,
+        command: Optional[str] = None,
+        log_lines: int = DEFAULT_LOG_LINES,
+    ):
+        self.animation_server_dir = animation_server_dir
+        self.port = port
+        self.command = (command or os.getenv("ANIMATION_DEV_COMMAND", DEFAULT_DEV_COMMAND)).format(port=port)
+        self.logs: Deque[str] = deque(maxlen=log_lines)
+        self.process: Optional[asyncio.subprocess.Process] = None
+        self.restarts = 0
+        self.startup_seconds: Optional[float] = None
+        self.startup_cache: Optional[StartupCache] = None
+        self._stopping = False
+        self._monitor: Optional[asyncio.Task] = None
+        self._drains: List[asyncio.Task] = []
+        self._cache_saver: Optional[asyncio.Task] = None
+
+    @property
+    def base_path(self) -> str:
+        return preview_base_path(self.port)
+
+    @property
+    def url(self) -> str:
+        return f"http://{DEV_SERVER_HOST}:{self.port}{self.base_path}"
+
+    @property
+    def running(self) -> bool:
+        return self.process is not None and self.process.returncode is None
+
+    def recent_logs(self, lines: int = 20) -> List[str]:
+        """
+        Get the last lines the server wrote to stdout or stderr.
+        """
+        return list(self.logs)[-lines:]
+
+    async def start(self, timeout: Optional[float] = None) -> bool:
+        """
+        Start the server and wait until it answers on its port.
+
+        The server keeps being supervised even if it is not ready in time.
+
+        Args:
+            timeout: Seconds to wait for readiness, defaults to ANIMATION_SERVER_STARTUP_TIMEOUT_SECONDS
+
+        Returns:
+            bool: True once the server is ready, False if it did not become ready in time
+        """
+        self._stopping = False
+        ready = await self._launch(timeout)
+        self._monitor = asyncio.create_task(self._supervise())
+        return ready
+
+    async def stop(self, timeout: float = 10.0) -> None:
+        """
+        Stop the server and its whole process group, without restarting it.
+        """
+        self._stopping = True
+        if self._monitor:
+            self._monitor.cancel()
+            self._monitor = None
+        if self._cache_saver:
+            self._cache_saver.cancel()
+            self._cache_saver = None
+        if self.process:
+            await stop_animation_server(self.process, timeout)
+        for drain in self._drains:
+            drain.cancel()
+        self._drains = []
+        await self._save_build_cache()
+
+    async def _save_build_cache(self) -> bool:
+        if not self.startup_cache or self.startup_cache.build_cache != "empty":
+            return False
+        try:
+            return await run_file_io("server_cache", persist_build_cache, self.animation_server_dir, self.startup_cache.lock_hash)
+        except OSError as e:
+            logger.warning(f"Failed to save Vite build cache: {str(e)}")
+            return False
+
+    async def _save_build_cache_when_complete(self) -> None:
+        # Vite finishes pre-bundling a little after the first request; stop() tries once more
+        marker = os.path.join(self.animation_server_dir, VITE_CACHE_SUBDIR, VITE_CACHE_MARKER)
+        for _ in range(BUILD_CACHE_SAVE_ATTEMPTS):
+            if os.path.isfile(marker):
+                await self._save_build_cache()
+                return
+            await asyncio.sleep(READINESS_POLL_SECONDS * 4)
+
+    async def _launch(self, timeout: Optional[float]) -> bool:
+        timeout = timeout if timeout is not None else float(
+            os.getenv("ANIMATION_SERVER_STARTUP_TIMEOUT_SECONDS", str(DEFAULT_STARTUP_TIMEOUT_SECONDS))
+        )
+        started = time.perf_counter()
+        try:
+            self.startup_cache = await prepare_startup_cache(self.animation_server_dir)
+        except Exception as e:
+            # The server may still come up, just without the caches
+            logger.error(f"Failed to prepare animation server caches: {str(e)}")
+            self.startup_cache = None
+        logger.info(f"Starting animation server from {self.animation_server_dir} on port {self.port}")
+        env = dict(os.environ)
+        env[VITE_CACHE_ENV] = os.path.join(os.path.abspath(self.animation_server_dir), VITE_CACHE_SUBDIR)
+        env["NUXT_APP_BASE_URL"] = self.base_path
+        self.process = await asyncio.create_subprocess_shell(
+            self.command,
+            cwd=self.animation_server_dir,
+            env=env,
             stdout=asyncio.subprocess.PIPE,
             stderr=asyncio.subprocess.PIPE,
-            shell=True
+            # Own process group, so stop_animation_server also stops yarn and nuxt
+            start_new_session=True,
         )
+        self._drains = [
+            asyncio.create_task(self._drain(self.process.stdout, "stdout")),
+            asyncio.create_task(self._drain(self.process.stderr, "stderr")),
+        ]
+        if not await self._wait_until_ready(timeout):
+            logger.error(
+                f"Animation server on port {self.port} not ready after {timeout:.0f}s; "
+                f"last output: {' | '.join(self.recent_logs(5))}"
+            )
+            return False
+        self.startup_seconds = time.perf_counter() - started
+        cache = self.startup_cache
+        kind = "warm" if cache and cache.warm else "cold"
+        metrics.observe("animation_server_startup_seconds", self.startup_seconds, labels={"cache": kind}, buckets=STARTUP_BUCKETS)
+        details = f"dependencies {cache.dependencies}, build cache {cache.build_cache}" if cache else "caches unavailable"
+        logger.info(f"Animation server ready on port {self.port} after {self.startup_seconds:.1f}s ({kind} start: {details})")
+        if cache and cache.build_cache == "empty" and cache.lock_hash:
+            self._cache_saver = asyncio.create_task(self._save_build_cache_when_complete())
+        return True
+
+    async def _drain(self, stream: asyncio.StreamReader, name: str) -> None:
+        while True:
+            line = await stream.readline()
+            if not line:
+                return
+            line_text = line.decode("utf-8", errors="replace").rstrip()
+            self.logs.append(f"[{name}] {line_text}")
+            logger.debug(f"Animation server {name}: {line_text}")
+
+    async def _wait_until_ready(self, timeout: float) -> bool:
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline and self.running:
+            if await probe_http(self.port, path=self.base_path):
+                return True
+            await asyncio.sleep(READINESS_POLL_SECONDS)
+        return False
+
+    async def _supervise(self) -> None:
+        failures = 0
+        while not self._stopping:
+            up_since = time.monotonic()
+            returncode = await self.process.wait()
+            if self._stopping:
+                return
+            metrics.inc("animation_server_crashes_total")
+            if time.monotonic() - up_since >= STABLE_UPTIME_SECONDS:
+                failures = 0
+            failures += 1
+            if failures > MAX_CONSECUTIVE_RESTARTS:
+                logger.error(f"Animation server on port {self.port} keeps crashing; giving up after {failures - 1} restarts")
+                return
+            backoff = min(RESTART_BACKOFF_MAX_SECONDS, RESTART_BACKOFF_SECONDS * 2 ** (failures - 1))
+            logger.warning(
+                f"Animation server on port {self.port} exited with {returncode}; restarting in {backoff:.1f}s. "
+                f"Last output: {' | '.join(self.recent_logs(5))}"
+            )
+            await asyncio.sleep(backoff)
+            self.restarts += 1
+            metrics.inc("animation_server_restarts_total")
+            try:
+                await self._launch(None)
+            except OSError as e:
+                # Counted as another crash when the loop sees the old process has exited
+                logger.error(f"Failed to restart animation server on port {self.port}: {str(e)}")
+
+def allocate_port(host: str = DEV_SERVER_HOST) -> int:
+    """
+    Get a port that is currently free, as chosen by the operating system.
+    """
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind((host, 0))
+        return sock.getsockname()[1]
+
+async def probe_http(port: int, host: str = DEV_SERVER_HOST, timeout: float = 2.0, path: str = "/") -> bool:
+    """
+    Check whether an HTTP server on a port answers with a non-5xx status.
 
-        # Log the output in the background
-        async def log_output():
-            while True:
-                line = await process.stdout.readline()
-                if not line:
-                    break
-                line_text = line.decode('utf-8').strip()
-                logger.info(f"Animation server: {line_text}")
+    Args:
+        port: The port to probe
+        host: The host to probe
+        timeout: Seconds to wait for the status line
+        path: The path to request
+
+    Returns:
+        bool: True if the server is ready to serve pages
+    """
+    try:
+        reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout)
+    except (OSError, asyncio.TimeoutError):
+        return False
+    try:
+        writer.write(f"HEAD {path} HTTP/1.0\r\nHost: {host}:{port}\r\n\r\n".encode("ascii"))
+        await writer.drain()
+        status_line = await asyncio.wait_for(reader.readline(), timeout)
+        parts = status_line.split()
+        return len(parts) >= 2 and parts[0].startswith(b"HTTP/") and parts[1].isdigit() and int(parts[1]) < 500
+    except (OSError, asyncio.TimeoutError):
+        return False
+    finally:
+        writer.close()
+
+async def start_animation_server(
+    animation_server_dir: Optional[str] = None,
+    port: int = ANIMATION_SERVER_PORT,
+) -> Optional[AnimationServerSupervisor]:
+    """
+    Start the animation server under a supervisor.
+    
+    Args:
+        animation_server_dir: Directory to serve, defaults to ANIMATION_SERVER_PATH
+        port: Port for the dev server
         
-        # Start logging in the background - don't await to avoid blocking
-        asyncio.create_task(log_output())
+    Returns:
+        Optional[AnimationServerSupervisor]: The supervisor once the server is ready, None otherwise
+    """
+    try:
+        if animation_server_dir is None:
+            # Check for mandatory ANIMATION_SERVER_PATH environment variable
+            if "ANIMATION_SERVER_PATH" not in os.environ:
+                logger.error("ERROR: ANIMATION_SERVER_PATH environment variable is not set!")
+                logger.error("Animation server cannot be started.")
+                return None
+            
+            animation_server_dir = os.environ["ANIMATION_SERVER_PATH"]
         
-        logger.info(f"Animation server started on port {ANIMATION_SERVER_PORT}")
-        return process
+        if not os.path.exists(animation_server_dir):
+            logger.error(f"ERROR: Animation server directory not found: {animation_server_dir}")
+            logger.error("Please check the ANIMATION_SERVER_PATH environment variable.")
+            return None
+
+        supervisor = AnimationServerSupervisor(animation_server_dir, port)
+        try:
+            ready = await supervisor.start()
+        except asyncio.CancelledError:
+            # Don't leave a half-started server running
+            await supervisor.stop()
+            raise
+        if not ready:
+            await supervisor.stop()
+            return None
+        return supervisor
     except Exception as e:
         logger.error(f"Failed to start animation server: {str(e)}")
         return None
 
+async def stop_animation_server(process: asyncio.subprocess.Process, timeout: float = 10.0) -> None:
+    """
+    Stop an animation server process with its whole process group.
+    
+    Args:
+        process: The animation server process
+        timeout: Seconds to wait after SIGTERM before sending SIGKILL
+    """
+    if process.returncode is not None:
+        return
+    try:
+        os.killpg(process.pid, signal.SIGTERM)
+        try:
+            await asyncio.wait_for(process.wait(), timeout)
+        except asyncio.TimeoutError:
+            os.killpg(process.pid, signal.SIGKILL)
+            await process.wait()
+    except ProcessLookupError:
+        pass
+
 def start_animation_server_sync() -> Optional[subprocess.Popen]:
     """
     Start the animation server synchronously (for command-line usage).
@@ -89,8 +577,9 @@ def start_animation_server_sync() -> Optional[subprocess.Popen]:
         
         # Use shell=True because we have a compound command with cd
         process = subprocess.Popen(
-            f"cd {animation_server_dir} && yarn dev --port {ANIMATION_SERVER_PORT}",
+            f"cd {animation_server_dir} && yarn dev --host {DEV_SERVER_HOST} --port {ANIMATION_SERVER_PORT}",
             shell=True,
+            env=dict(os.environ, NUXT_APP_BASE_URL=preview_base_path(ANIMATION_SERVER_PORT)),
             stdout=subprocess.PIPE,
             stderr=subprocess.PIPE,
             text=True,
@@ -125,14 +614,28 @@ def start_animation_server_sync() -> Optional[subprocess.Popen]:
         logger.error(f"Failed to start animation server synchronously: {str(e)}")
         return None
 
-def get_animation_server_url() -> str:
+def get_animation_server_url(session_id: Optional[str] = None) -> str:
     """
     Get the URL of the animation server.
+
+    Args:
+        session_id: A session holding a lease on a pooled preview server, if any
     
     Returns:
-        str: The animation server URL
+        str: The leased preview server's URL, otherwise the main animation server URL.
+        These are the servers' own addresses on 127.0.0.1; browsers go through the linda server.
     """
-    return f"http://localhost:{ANIMATION_SERVER_PORT}"
+    if session_id:
+        # Imported here because the workspaces build on this module
+        from linda_server.utils.animation_workspaces import get_workspace_manager
+        try:
+            pool = get_workspace_manager().pool
+        except ValueError:
+            pool = None
+        instance = pool.get_lease(session_id) if pool else None
+        if instance is not None:
+            return instance.url
+    return f"http://{DEV_SERVER_HOST}:{ANIMATION_SERVER_PORT}{preview_base_path(ANIMATION_SERVER_PORT)}"
 
 # Allow this module to be run directly for testing
 if __name__ == "__main__":
@@ -0,0 +1,550 @@
+"""
+Utility module for per-session animation workspaces.
+
+Every AnimationDeveloperAgent run used to write into the one ANIMATION_SERVER_PATH,
+so concurrent users overwrote each other's components. In session mode each agent
+(keyed by its workflow id) gets its own workspace under ANIMATION_WORKSPACES_DIR,
+cloned from the ANIMATION_SERVER_PATH template:
+
+- Source files are hard-linked instead of copied. Generated files are always swapped
+  in with os.replace or written after unlinking, so the template is never modified.
+- node_modules is a symlink to the template's, so dependencies exist once.
+- Build output (.nuxt, .output) is per workspace and not cloned.
+
+Each workspace is previewed by its own supervised dev server on a free port. When the
+preview pool (see animation_preview_pool) has a warm server idle, a new session's
+workspace is a symlink to that server's directory, so its preview is ready at once;
+otherwise a dev server is started on first request. Dev servers are only reachable
+through the API's preview proxy (see animation_preview_proxy), which /animations/{session_id}
+redirects to for the user who claimed the session only; it never creates a workspace. Workspaces not used for ANIMATION_WORKSPACE_TTL_SECONDS
+are garbage collected, together with their preview server and owner record; pooled
+servers are reset and returned to the pool instead.
+
+Settings:
+    ANIMATION_WORKSPACE_MODE: session (default) or shared (write into ANIMATION_SERVER_PATH)
+    ANIMATION_WORKSPACES_DIR: Root of the workspaces (default: .animation_workspaces next to the template)
+    ANIMATION_WORKSPACE_TTL_SECONDS: Idle time before a workspace is collected (default 3600)
+    ANIMATION_WORKSPACE_GC_INTERVAL_SECONDS: Time between collections (default 300)
+"""
+import asyncio
+import filecmp
+import logging
+import os
+import re
+import shutil
+import tempfile
+import time
+from typing import TYPE_CHECKING, Dict, List, Optional
+
+from restack_ai.function import function_info
+
+from linda_server.utils.animation_server_runner import AnimationServerSupervisor, allocate_port, start_animation_server
+from linda_server.utils.metrics import metrics
+
+if TYPE_CHECKING:
+    from linda_server.utils.animation_preview_pool import PreviewPool
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+WORKSPACE_MODES = ("session", "shared")
+DEFAULT_WORKSPACE_TTL_SECONDS = 3600
+DEFAULT_GC_INTERVAL_SECONDS = 300
+
+# Never cloned: dependencies are linked, build output and bookkeeping are per workspace
+NOT_CLONED = {"node_modules", ".nuxt", ".output", "dist", ".git", ".cache", ".linda-manifest.json"}
+# Owner records of claimed sessions, one file per session named after it
+OWNERS_DIR = ".owners"
+_SESSION_ID = re.compile(r"^[A-Za-z0-9][A-Za-z0-9_.-]{0,127}$")
+
+def get_workspace_mode() -> str:
+    """
+    Get the configured workspace mode.
+
+    Returns:
+        str: "session" or "shared"
+    """
+    mode = os.getenv("ANIMATION_WORKSPACE_MODE", "session").lower()
+    if mode not in WORKSPACE_MODES:
+        raise ValueError(f"ANIMATION_WORKSPACE_MODE must be one of {WORKSPACE_MODES}, got {mode}")
+    return mode
+
+def current_session_id() -> Optional[str]:
+    """
+    Get the session (agent workflow id) of the current Restack function, if any.
+    """
+    try:
+        return function_info().workflow_id or None
+    except RuntimeError:
+        return None
+
+def clone_template(template_dir: str, workspace_dir: str) -> None:
+    """
+    Create a copy-on-write clone of the animation server template.
+
+    Files are hard-linked (copied when linking is not possible, e.g. across devices)
+    and node_modules is symlinked. The clone is built next to workspace_dir and renamed
+    into place, so a workspace is either complete or absent.
+
+    Args:
+        template_dir: The animation server template
+        workspace_dir: Path of the new workspace; must not exist
+    """
+    parent = os.path.dirname(workspace_dir)
+    os.makedirs(parent, exist_ok=True)
+    building = tempfile.mkdtemp(prefix=f".{os.path.basename(workspace_dir)}-", dir=parent)
+    try:
+        for root, dirs, files in os.walk(template_dir):
+            dirs[:] = [d for d in dirs if d not in NOT_CLONED]
+            relative = os.path.relpath(root, template_dir)
+            target_root = os.path.normpath(os.path.join(building, relative))
+            os.makedirs(target_root, exist_ok=True)
+            for name in files:
+                if name in NOT_CLONED:
+                    continue
+                source = os.path.join(root, name)
+                target = os.path.join(target_root, name)
+                try:
+                    os.link(source, target)
+                except OSError:
+                    shutil.copy2(source, target)
+        node_modules = os.path.join(template_dir, "node_modules")
+        if os.path.isdir(node_modules):
+            os.symlink(os.path.abspath(node_modules), os.path.join(building, "node_modules"))
+        os.rename(building, workspace_dir)
+    except BaseException:
+        shutil.rmtree(building, ignore_errors=True)
+        raise
+
+def reset_workspace(template_dir: str, workspace_dir: str) -> int:
+    """
+    Bring a workspace back to the template's content in place.
+
+    Files that differ from the template are re-linked, files the template does not have
+    are deleted. Dependencies and build output are left alone, so a dev server running
+    in the workspace keeps its caches.
+
+    Args:
+        template_dir: The animation server template
+        workspace_dir: The workspace to reset
+
+    Returns:
+        int: Number of files restored or deleted
+    """
+    changed = 0
+    expected = set()
+    for root, dirs, files in os.walk(template_dir):
+        dirs[:] = [d for d in dirs if d not in NOT_CLONED]
+        relative = os.path.relpath(root, template_dir)
+        target_root = os.path.normpath(os.path.join(workspace_dir, relative))
+        expected.add(target_root)
+        os.makedirs(target_root, exist_ok=True)
+        for name in files:
+            if name in NOT_CLONED:
+                continue
+            source = os.path.join(root, name)
+            target = os.path.join(target_root, name)
+            expected.add(target)
+            try:
+                if os.path.samefile(source, target) or filecmp.cmp(source, target, shallow=False):
+                    continue
+            except OSError:
+                pass
+            # Linked next to the target and renamed, so the dev server never sees it missing
+            temp_target = f"{target}.{os.getpid()}.tmp"
+            try:
+                os.link(source, temp_target)
+            except OSError:
+                shutil.copy2(source, temp_target)
+            os.replace(temp_target, target)
+            changed += 1
+
+    extra_dirs = []
+    for root, dirs, files in os.walk(workspace_dir):
+        dirs[:] = [d for d in dirs if d not in NOT_CLONED]
+        if os.path.normpath(root) not in expected:
+            extra_dirs.append(root)
+        for name in files:
+            path = os.path.normpath(os.path.join(root, name))
+            if name not in NOT_CLONED and path not in expected:
+                os.unlink(path)
+                changed += 1
+    for directory in reversed(extra_dirs):
+        shutil.rmtree(directory, ignore_errors=True)
+    try:
+        # The previous session's manifest describes files that are gone now
+        os.unlink(os.path.join(workspace_dir, ".linda-manifest.json"))
+    except FileNotFoundError:
+        pass
+    return changed
+
+class WorkspaceManager:
+    """Creates, previews and collects the per-session animation workspaces."""
+
+    def __init__(
+        self,
+        template_dir: str,
+        root_dir: Optional[str] = None,
+        ttl_seconds: Optional[float] = None,
+        pool: Optional["PreviewPool"] = None,
+    ):
+        self.template_dir = os.path.abspath(template_dir)
+        self.root_dir = os.path.abspath(root_dir or os.getenv(
+            "ANIMATION_WORKSPACES_DIR",
+            os.path.join(os.path.dirname(self.template_dir), ".animation_workspaces"),
+        ))
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else float(
+            os.getenv("ANIMATION_WORKSPACE_TTL_SECONDS", str(DEFAULT_WORKSPACE_TTL_SECONDS))
+        )
+        # Warm preview servers leased to new sessions, if configured
+        self.pool = pool
+        self._previews: Dict[str, AnimationServerSupervisor] = {}
+        self._preview_locks: Dict[str, asyncio.Lock] = {}
+
+    def workspace_path(self, session_id: str) -> str:
+        """
+        Get the directory of a session's workspace, without creating it.
+
+        Raises:
+            ValueError: If the session id cannot be used as a directory name
+        """
+        if not _SESSION_ID.match(session_id):
+            raise ValueError(f"Invalid animation session id: {session_id!r}")
+        return os.path.join(self.root_dir, session_id)
+
+    def get_workspace(self, session_id: str) -> str:
+        """
+        Get a session's workspace, cloning it from the template on first use.
+
+        If the preview pool has a warm server idle, it is leased to the session instead
+        and the workspace links to the server's directory.
+
+        Using a workspace marks it as recently used, which keeps it from being collected.
+
+        Args:
+            session_id: The session, normally the agent's workflow id
+
+        Returns:
+            str: The workspace directory
+        """
+        workspace_dir = self.workspace_path(session_id)
+        if not os.path.isdir(workspace_dir):
+            if os.path.islink(workspace_dir):
+                # Left behind by a pooled server that is gone
+                os.unlink(workspace_dir)
+            instance = self.pool.lease(session_id) if self.pool else None
+            if instance is not None:
+                os.makedirs(self.root_dir, exist_ok=True)
+                try:
+                    os.symlink(instance.directory, workspace_dir)
+                except FileExistsError:
+                    # Linked by another worker leasing for the same session
+                    pass
+                os.utime(workspace_dir)
+                return workspace_dir
+
+            started = time.perf_counter()
+            try:
+                clone_template(self.template_dir, workspace_dir)
+            except OSError:
+                # Another worker may have created it at the same time
+                if not os.path.isdir(workspace_dir):
+                    raise
+            else:
+                metrics.inc("animation_workspaces_created_total")
+                metrics.observe("animation_workspace_clone_seconds", time.perf_counter() - started)
+                logger.info(f"Created animation workspace {workspace_dir} in {(time.perf_counter() - started) * 1000:.1f}ms")
+        os.utime(workspace_dir)
+        return workspace_dir
+
+    def find_workspace(self, session_id: str) -> Optional[str]:
+        """
+        Get a session's workspace if it exists, marking it as recently used.
+
+        Args:
+            session_id: The session
+
+        Returns:
+            Optional[str]: The workspace directory, or None if the session has none
+        """
+        workspace_dir = self.workspace_path(session_id)
+        if not os.path.isdir(workspace_dir):
+            return None
+        os.utime(workspace_dir)
+        return workspace_dir
+
+    def _owner_path(self, session_id: str) -> str:
+        # Validates the session id as well
+        self.workspace_path(session_id)
+        return os.path.join(self.root_dir, OWNERS_DIR, session_id)
+
+    def claim_session(self, session_id: str, user_id: str) -> bool:
+        """
+        Record the user a session belongs to. The first claim wins.
+
+        Args:
+            session_id: The session, normally the agent's workflow id
+            user_id: The user claiming it
+
+        Returns:
+            bool: True if the session now belongs to the user, False if another user claimed it first
+        """
+        path = self._owner_path(session_id)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(prefix=f".{session_id}-", dir=os.path.dirname(path))
+        try:
+            with os.fdopen(fd, "w") as f:
+                f.write(str(user_id))
+            # Linking fails if the record exists, so a record is never half-written or replaced
+            os.link(temp_path, path)
+        except FileExistsError:
+            return self.session_owner(session_id) == str(user_id)
+        finally:
+            os.unlink(temp_path)
+        logger.info(f"Animation session {session_id} claimed by user {user_id}")
+        return True
+
+    def session_owner(self, session_id: str) -> Optional[str]:
+        """
+        Get the user a session was claimed by.
+
+        Returns:
+            Optional[str]: The user id, or None if the session has not been claimed
+
+        Raises:
+            ValueError: If the session id cannot be used as a directory name
+        """
+        try:
+            with open(self._owner_path(session_id)) as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def list_sessions(self) -> List[str]:
+        """
+        List the sessions that currently have a workspace.
+        """
+        if not os.path.isdir(self.root_dir):
+            return []
+        return sorted(
+            name for name in os.listdir(self.root_dir)
+            if _SESSION_ID.match(name) and os.path.isdir(os.path.join(self.root_dir, name))
+        )
+
+    async def get_preview_url(self, session_id: str, create: bool = True) -> Optional[str]:
+        """
+        Get the URL previewing a session's workspace, starting its dev server if needed.
+
+        Args:
+            session_id: The session to preview
+            create: Clone the workspace if the session has none yet
+
+        Returns:
+            Optional[str]: The dev server's own URL, or None if it did not come up
+
+        Raises:
+            FileNotFoundError: If create is False and the session has no workspace
+        """
+        preview = await self.get_preview_server(session_id, create)
+        return preview.url if preview is not None else None
+
+    async def get_preview_server(self, session_id: str, create: bool = True) -> Optional[AnimationServerSupervisor]:
+        """
+        Get the dev server previewing a session's workspace, starting it if needed.
+
+        Args:
+            session_id: The session to preview
+            create: Clone the workspace if the session has none yet
+
+        Returns:
+            Optional[AnimationServerSupervisor]: The dev server, or None if it did not come up
+
+        Raises:
+            FileNotFoundError: If create is False and the session has no workspace
+        """
+        if create:
+            workspace_dir = await asyncio.to_thread(self.get_workspace, session_id)
+        else:
+            workspace_dir = await asyncio.to_thread(self.find_workspace, session_id)
+            if workspace_dir is None:
+                raise FileNotFoundError(f"No animation workspace for session {session_id}")
+        instance = self.pool.get_lease(session_id) if self.pool else None
+        if instance is not None and instance.supervisor.running:
+            return instance.supervisor
+        lock = self._preview_locks.setdefault(session_id, asyncio.Lock())
+        async with lock:
+            preview = self._previews.get(session_id)
+            if preview and preview.running:
+                return preview
+
+            preview = await start_animation_server(workspace_dir, allocate_port())
+            if preview is None:
+                logger.error(f"Preview server for session {session_id} did not start")
+                return None
+            self._previews[session_id] = preview
+            metrics.set_gauge("animation_previews_running", len(self._previews))
+            return preview
+
+    def running_preview_port(self, session_id: str) -> Optional[int]:
+        """
+        Get the port of the dev server currently previewing a session, without starting one.
+
+        Returns:
+            Optional[int]: The port, or None if no dev server is running for the session
+        """
+        instance = self.pool.get_lease(session_id) if self.pool else None
+        if instance is not None and instance.supervisor.running:
+            return instance.supervisor.port
+        preview = self._previews.get(session_id)
+        if preview is not None and preview.running:
+            return preview.port
+        return None
+
+    async def remove(self, session_id: str) -> None:
+        """
+        Stop a session's preview server and delete its workspace.
+
+        A workspace leased from the preview pool is unlinked and its server recycled.
+        """
+        preview = self._previews.pop(session_id, None)
+        self._preview_locks.pop(session_id, None)
+        if preview:
+            await preview.stop()
+            metrics.set_gauge("animation_previews_running", len(self._previews))
+        workspace_dir = self.workspace_path(session_id)
+        if os.path.islink(workspace_dir):
+            pooled_dir = os.path.realpath(workspace_dir)
+            os.unlink(workspace_dir)
+            if self.pool and self.pool.get_lease(session_id):
+                await self.pool.release(session_id)
+            else:
+                # Leased before a restart, so no server is waiting to get it back
+                await asyncio.to_thread(shutil.rmtree, pooled_dir, True)
+        else:
+            # The workspace only holds links to the template, so removing it leaves the template alone
+            await asyncio.to_thread(shutil.rmtree, workspace_dir, True)
+        try:
+            await asyncio.to_thread(os.unlink, self._owner_path(session_id))
+        except FileNotFoundError:
+            pass
+
+    async def collect_garbage(self, now: Optional[float] = None) -> List[str]:
+        """
+        Remove workspaces that have not been used for longer than the TTL.
+
+        Args:
+            now: Current time as a Unix timestamp, for tests
+
+        Returns:
+            List[str]: The collected session ids
+        """
+        now = time.time() if now is None else now
+        collected: List[str] = []
+        for session_id in self.list_sessions():
+            try:
+                last_used = os.stat(self.workspace_path(session_id)).st_mtime
+            except OSError:
+                continue
+            if now - last_used > self.ttl_seconds:
+                await self.remove(session_id)
+                collected.append(session_id)
+        collected_owners = await asyncio.to_thread(self._collect_owner_records, now)
+        if collected_owners:
+            logger.info(f"Collected {collected_owners} owner records of sessions without a workspace")
+        if collected:
+            metrics.inc("animation_workspaces_collected_total", len(collected))
+            logger.info(f"Collected {len(collected)} stale animation workspaces")
+        metrics.set_gauge("animation_workspaces_active", len(self.list_sessions()))
+        return collected
+
+    def _collect_owner_records(self, now: float) -> int:
+        # Sessions claimed without ever saving an animation leave only their owner record
+        owners_dir = os.path.join(self.root_dir, OWNERS_DIR)
+        if not os.path.isdir(owners_dir):
+            return 0
+        collected = 0
+        for session_id in os.listdir(owners_dir):
+            path = os.path.join(owners_dir, session_id)
+            if os.path.isdir(os.path.join(self.root_dir, session_id)):
+                continue
+            try:
+                if now - os.stat(path).st_mtime > self.ttl_seconds:
+                    os.unlink(path)
+                    collected += 1
+            except OSError:
+                continue
+        return collected
+
+    async def run_garbage_collector(self, interval: Optional[float] = None) -> None:
+        """
+        Collect stale workspaces periodically until cancelled.
+
+        Args:
+            interval: Seconds between collections, defaults to ANIMATION_WORKSPACE_GC_INTERVAL_SECONDS
+        """
+        interval = interval or float(os.getenv("ANIMATION_WORKSPACE_GC_INTERVAL_SECONDS", str(DEFAULT_GC_INTERVAL_SECONDS)))
+        while True:
+            try:
+                await self.collect_garbage()
+            except Exception as e:
+                logger.error(f"Animation workspace garbage collection failed: {str(e)}")
+            await asyncio.sleep(interval)
+
+    async def close(self) -> None:
+        """
+        Stop every preview server, pooled ones included. Workspaces stay on disk until collected.
+        """
+        previews = list(self._previews.values())
+        self._previews.clear()
+        for preview in previews:
+            await preview.stop()
+        if self.pool:
+            await self.pool.close()
+
+_manager: Optional[WorkspaceManager] = None
+
+def get_workspace_manager() -> WorkspaceManager:
+    """
+    Get the shared workspace manager for ANIMATION_SERVER_PATH.
+
+    Raises:
+        ValueError: If ANIMATION_SERVER_PATH is not set
+    """
+    global _manager
+    template_dir = os.environ.get("ANIMATION_SERVER_PATH")
+    if not template_dir:
+        raise ValueError("ANIMATION_SERVER_PATH environment variable is not set!")
+    if _manager is None or _manager.template_dir != os.path.abspath(template_dir):
+        # Imported here because the pool builds its servers' directories with this module
+        from linda_server.utils.animation_preview_pool import PreviewPool
+        _manager = WorkspaceManager(template_dir)
+        _manager.pool = PreviewPool(_manager.template_dir, _manager.root_dir)
+    return _manager
+
+def resolve_animation_dir(session_id: Optional[str] = None) -> str:
+    """
+    Get the directory generated animation files should be written to.
+
+    In session mode this is the workspace of the given session, or of the agent that
+    scheduled the current function. Without a session (shared mode, or called outside
+    a Restack function) it is ANIMATION_SERVER_PATH itself.
+
+    Args:
+        session_id: The session, defaults to the current agent's workflow id
+
+    Returns:
+        str: The directory to write into
+
+    Raises:
+        ValueError: If ANIMATION_SERVER_PATH is not set
+        FileNotFoundError: If the ANIMATION_SERVER_PATH directory does not exist
+    """
+    template_dir = os.environ.get("ANIMATION_SERVER_PATH")
+    if not template_dir:
+        raise ValueError("ANIMATION_SERVER_PATH environment variable is not set!")
+    if not os.path.exists(template_dir):
+        raise FileNotFoundError(f"Animation server directory not found: {template_dir}")
+    session_id = session_id or current_session_id()
+    if get_workspace_mode() == "shared" or not session_id:
+        return template_dir
+    return get_workspace_manager().get_workspace(session_id)
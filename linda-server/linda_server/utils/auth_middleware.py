@@ -0,0 +1,57 @@
+"""
+Utility module for the ASGI middleware that authenticates requests.
+
+`@app.middleware("http")` runs through Starlette's BaseHTTPMiddleware, which adds a
+task and a memory stream to every request, buffers the response body and never sees
+websocket connections at all. This middleware is plain ASGI: it reads the bearer
+token from the connection's headers, verifies it with the cached token verifier and
+passes the scope on untouched otherwise, so streaming responses and the /graphql
+websocket upgrade go straight through.
+
+The user (or None) is stored as scope["user"] and in the connection state, so both
+`request.state.user` and `websocket.state.user` see it.
+"""
+import logging
+from typing import Any, Dict, Optional
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from linda_server.utils.auth_tokens import InvalidTokenError, TokenVerifier, get_token_verifier
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+class UserAuthMiddleware:
+    """Sets the authenticated user on HTTP and websocket scopes."""
+
+    def __init__(self, app: ASGIApp, verifier: Optional[TokenVerifier] = None):
+        self.app = app
+        self.verifier = verifier if verifier is not None else get_token_verifier()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] in ("http", "websocket"):
+            user = self.authenticate(scope)
+            scope["user"] = user
+            scope.setdefault("state", {})["user"] = user
+        await self.app(scope, receive, send)
+
+    def authenticate(self, scope: Scope) -> Optional[Dict[str, Any]]:
+        """
+        Get the user a connection's bearer token authenticates.
+
+        Args:
+            scope: The ASGI connection scope
+
+        Returns:
+            Optional[Dict[str, Any]]: The user, or None without a valid bearer token
+        """
+        for name, value in scope.get("headers", ()):
+            if name == b"authorization":
+                scheme, _, token = value.decode("latin-1").partition(" ")
+                if scheme.lower() != "bearer":
+                    return None
+                try:
+                    return self.verifier.verify(token)
+                except InvalidTokenError:
+                    return None
+        return None
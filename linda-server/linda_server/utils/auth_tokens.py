@@ -0,0 +1,180 @@
+"""
+Utility module for verifying JWT access tokens.
+
+Every authenticated request carries the same bearer token for a whole session, so
+verifying it from scratch each time (reading the settings from the environment and
+running jwt.decode) is wasted work. Settings are resolved once at startup, and
+verified tokens are kept in a bounded LRU cache keyed by the token's SHA-256 digest.
+An entry is only served until the token's own `exp`, so expiry behaves as before.
+Tokens without `exp` and tokens that fail verification are never cached.
+
+Refresh tokens are random strings rather than JWTs. The server only stores their
+HMAC-SHA256 under the signing key, so checking one is a single HMAC and an indexed
+lookup instead of a bcrypt password verification.
+
+Settings:
+    JWT_SECRET_KEY: Signing key (default "your_default_secret_key")
+    JWT_ALGORITHM: Signing algorithm (default HS256)
+    JWT_ACCESS_TOKEN_EXPIRE_MINUTES: Lifetime of access tokens (default 30)
+    JWT_CACHE_SIZE: Verified tokens kept in memory; 0 disables the cache (default 10000)
+    JWT_REFRESH_TOKEN_EXPIRE_DAYS: Lifetime of refresh tokens (default 14)
+"""
+import hashlib
+import hmac
+import logging
+import os
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
+
+import jwt  # PyJWT library
+
+from linda_server.utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+DEFAULT_TOKEN_CACHE_SIZE = 10000
+DEFAULT_REFRESH_TOKEN_EXPIRE_DAYS = 14
+
+class InvalidTokenError(Exception):
+    """The token is malformed, expired, badly signed or has no subject."""
+
+@dataclass(frozen=True)
+class AuthSettings:
+    """JWT settings, resolved once instead of on every request."""
+    secret_key: str
+    algorithm: str
+    access_token_expire_minutes: int
+    token_cache_size: int
+    refresh_token_expire_days: int = DEFAULT_REFRESH_TOKEN_EXPIRE_DAYS
+
+def load_auth_settings() -> AuthSettings:
+    """
+    Read the auth settings from the environment.
+    """
+    return AuthSettings(
+        secret_key=os.getenv("JWT_SECRET_KEY", "your_default_secret_key"),
+        algorithm=os.getenv("JWT_ALGORITHM", "HS256"),
+        access_token_expire_minutes=int(os.getenv("JWT_ACCESS_TOKEN_EXPIRE_MINUTES", "30")),
+        token_cache_size=int(os.getenv("JWT_CACHE_SIZE", str(DEFAULT_TOKEN_CACHE_SIZE))),
+        refresh_token_expire_days=int(
+            os.getenv("JWT_REFRESH_TOKEN_EXPIRE_DAYS", str(DEFAULT_REFRESH_TOKEN_EXPIRE_DAYS))
+        ),
+    )
+
+_settings: Optional[AuthSettings] = None
+
+def get_auth_settings() -> AuthSettings:
+    """
+    Get the process-wide auth settings, read from the environment on first use.
+    """
+    global _settings
+    if _settings is None:
+        _settings = load_auth_settings()
+    return _settings
+
+def hash_refresh_token(token: str, settings: Optional[AuthSettings] = None) -> str:
+    """
+    Get the digest a refresh token is stored and looked up by.
+
+    Args:
+        token: The refresh token as sent by the client
+        settings: Auth settings whose signing key is the HMAC key, defaults to the startup settings
+
+    Returns:
+        str: Hex HMAC-SHA256 of the token
+    """
+    secret_key = (settings or get_auth_settings()).secret_key
+    return hmac.new(secret_key.encode("utf-8"), token.encode("utf-8"), hashlib.sha256).hexdigest()
+
+def generate_refresh_token(settings: Optional[AuthSettings] = None) -> Tuple[str, str]:
+    """
+    Generate a new refresh token.
+
+    Returns:
+        Tuple[str, str]: The token for the client and its digest for the database
+    """
+    token = secrets.token_urlsafe(32)
+    return token, hash_refresh_token(token, settings)
+
+class TokenVerifier:
+    """Verifies access tokens, remembering verified ones until they expire."""
+
+    def __init__(self, settings: AuthSettings):
+        self.settings = settings
+        self._algorithms = [settings.algorithm]
+        self._cache: "OrderedDict[bytes, Tuple[Dict[str, Any], float]]" = OrderedDict()
+        # Verification runs on the event loop and in resolver threads
+        self._lock = threading.Lock()
+
+    def verify(self, token: str) -> Dict[str, Any]:
+        """
+        Verify an access token and get the user it authenticates.
+
+        Args:
+            token: The encoded JWT, without the "Bearer" prefix
+
+        Returns:
+            Dict[str, Any]: {"user_id": <sub claim>, "is_authenticated": True}
+
+        Raises:
+            InvalidTokenError: If the token does not verify or has no subject
+        """
+        key = hashlib.sha256(token.encode("utf-8")).digest()
+        now = time.time()
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is not None:
+                user, expires_at = entry
+                if now < expires_at:
+                    self._cache.move_to_end(key)
+                    metrics.inc("auth_token_cache_total", labels={"result": "hit"})
+                    return user
+                del self._cache[key]
+        metrics.inc("auth_token_cache_total", labels={"result": "miss" if entry is None else "expired"})
+
+        try:
+            payload = jwt.decode(token, self.settings.secret_key, algorithms=self._algorithms)
+        except jwt.PyJWTError as e:
+            raise InvalidTokenError(str(e)) from e
+        user_id = payload.get("sub")
+        if user_id is None:
+            raise InvalidTokenError("Token has no subject")
+        user = {"user_id": user_id, "is_authenticated": True}
+
+        expires_at = payload.get("exp")
+        if self.settings.token_cache_size > 0 and isinstance(expires_at, (int, float)):
+            with self._lock:
+                self._cache[key] = (user, float(expires_at))
+                self._cache.move_to_end(key)
+                while len(self._cache) > self.settings.token_cache_size:
+                    self._cache.popitem(last=False)
+                metrics.set_gauge("auth_token_cache_size", len(self._cache))
+        return user
+
+    def clear(self) -> None:
+        """
+        Forget every verified token.
+        """
+        with self._lock:
+            self._cache.clear()
+        metrics.set_gauge("auth_token_cache_size", 0)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._cache)
+
+_verifier: Optional[TokenVerifier] = None
+
+def get_token_verifier() -> TokenVerifier:
+    """
+    Get the process-wide token verifier for the startup auth settings.
+    """
+    global _verifier
+    if _verifier is None:
+        _verifier = TokenVerifier(get_auth_settings())
+    return _verifier
@@ -0,0 +1,94 @@
+"""
+Utility module for running blocking file I/O off the event loop.
+
+Restack functions are coroutines sharing one event loop per worker, so a makedirs,
+write or base64 decode done inline stalls every other function on that worker.
+run_file_io hands such work to a bounded thread pool shared by the process and
+counts the time it spent there, which is event-loop time that was not blocked.
+
+Settings:
+    FILE_IO_WORKERS: Size of the file I/O thread pool (default 8)
+"""
+import asyncio
+import contextvars
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Optional, TypeVar
+
+from linda_server.utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+T = TypeVar("T")
+
+DEFAULT_FILE_IO_WORKERS = 8
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+@dataclass
+class OffloadStats:
+    """File I/O calls and seconds kept off the event loop by one caller."""
+    calls: int = 0
+    seconds: float = 0.0
+
+def get_file_io_workers() -> int:
+    """
+    Get the configured size of the file I/O thread pool.
+    """
+    return max(1, int(os.getenv("FILE_IO_WORKERS", str(DEFAULT_FILE_IO_WORKERS))))
+
+def get_file_io_executor() -> ThreadPoolExecutor:
+    """
+    Get the shared file I/O thread pool, creating it on first use.
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=get_file_io_workers(), thread_name_prefix="file-io")
+        return _executor
+
+async def run_file_io(operation: str, func: Callable[..., T], *args: Any, stats: Optional[OffloadStats] = None) -> T:
+    """
+    Run a blocking file operation on the file I/O thread pool.
+
+    Args:
+        operation: Name used to label the metrics (e.g. "stage", "upload")
+        func: The blocking callable
+        *args: Positional arguments for func
+        stats: If given, accumulates the calls and seconds spent off the loop
+
+    Returns:
+        Whatever func returns; its exceptions propagate unchanged
+    """
+    submitted = time.perf_counter()
+    timing = {}
+    # Like asyncio.to_thread, run with the caller's context (e.g. the current function's info)
+    context = contextvars.copy_context()
+
+    def timed() -> T:
+        started = time.perf_counter()
+        timing["wait"] = started - submitted
+        try:
+            return context.run(func, *args)
+        finally:
+            timing["run"] = time.perf_counter() - started
+
+    try:
+        return await asyncio.get_running_loop().run_in_executor(get_file_io_executor(), timed)
+    finally:
+        # Missing if the caller was cancelled before the pool picked the work up
+        if "run" in timing:
+            labels = {"operation": operation}
+            metrics.inc("file_io_calls_total", labels=labels)
+            metrics.inc("file_io_offloaded_seconds_total", timing["run"])
+            metrics.observe("file_io_seconds", timing["run"], labels=labels)
+            metrics.observe("file_io_queue_wait_seconds", timing["wait"], labels=labels)
+            if stats is not None:
+                stats.calls += 1
+                stats.seconds += timing["run"]
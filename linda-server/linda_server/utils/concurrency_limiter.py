@@ -0,0 +1,172 @@
+"""
+Utility module for adaptive concurrency limiting.
+
+AdaptiveLimiter uses additive-increase/multiplicative-decrease (AIMD): the limit grows
+by roughly one slot per window of requests that respond within the latency target,
+and is cut back multiplicatively whenever a request fails with an overload error
+such as a 429 or a timeout. Current limit, in-flight count and queue depth are
+published as gauges.
+"""
+import asyncio
+import logging
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Callable, Dict, Optional, Tuple
+
+from linda_server.utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+DEFAULT_INITIAL_LIMIT = 8
+DEFAULT_MIN_LIMIT = 1
+DEFAULT_MAX_LIMIT = 64
+DEFAULT_LATENCY_TARGET_SECONDS = 60.0
+DEFAULT_BACKOFF_RATIO = 0.5
+
+
+class LimiterSlot:
+    """A held concurrency slot; call responded() when the first response byte arrives."""
+    def __init__(self):
+        self.started_at = time.monotonic()
+        self.latency: Optional[float] = None
+
+    def responded(self) -> None:
+        if self.latency is None:
+            self.latency = time.monotonic() - self.started_at
+
+
+class AdaptiveLimiter:
+    """AIMD concurrency limiter for calls to a rate-limited upstream."""
+    def __init__(
+        self,
+        name: str,
+        labels: Optional[Dict[str, str]] = None,
+        initial_limit: float = DEFAULT_INITIAL_LIMIT,
+        min_limit: float = DEFAULT_MIN_LIMIT,
+        max_limit: float = DEFAULT_MAX_LIMIT,
+        latency_target: float = DEFAULT_LATENCY_TARGET_SECONDS,
+        backoff_ratio: float = DEFAULT_BACKOFF_RATIO,
+        is_overload: Optional[Callable[[BaseException], bool]] = None,
+    ):
+        self.name = name
+        self.labels = labels or {}
+        self.limit = float(initial_limit)
+        self.min_limit = float(min_limit)
+        self.max_limit = float(max_limit)
+        self.latency_target = latency_target
+        self.backoff_ratio = backoff_ratio
+        self.is_overload = is_overload or (lambda e: isinstance(e, asyncio.TimeoutError))
+        self.in_flight = 0
+        self.queued = 0
+        self._condition: Optional[asyncio.Condition] = None
+        self._publish()
+
+    def _get_condition(self) -> asyncio.Condition:
+        # Created lazily so the limiter can be built outside a running event loop
+        if self._condition is None:
+            self._condition = asyncio.Condition()
+        return self._condition
+
+    def _publish(self) -> None:
+        metrics.set_gauge(f"{self.name}_concurrency_limit", self.limit, labels=self.labels)
+        metrics.set_gauge(f"{self.name}_in_flight", self.in_flight, labels=self.labels)
+        metrics.set_gauge(f"{self.name}_queue_depth", self.queued, labels=self.labels)
+
+    async def acquire(self) -> LimiterSlot:
+        """
+        Wait until a slot is available under the current limit.
+
+        Returns:
+            LimiterSlot: The held slot
+        """
+        condition = self._get_condition()
+        async with condition:
+            self.queued += 1
+            self._publish()
+            try:
+                await condition.wait_for(lambda: self.in_flight < int(self.limit))
+            finally:
+                self.queued -= 1
+            self.in_flight += 1
+            self._publish()
+        return LimiterSlot()
+
+    async def release(self, slot: LimiterSlot, error: Optional[BaseException] = None) -> None:
+        """
+        Release a slot and adapt the limit from its outcome.
+
+        Args:
+            slot: The slot returned by acquire
+            error: The exception the call failed with, if any
+        """
+        slot.responded()
+        condition = self._get_condition()
+        async with condition:
+            self.in_flight -= 1
+            if error is not None and self.is_overload(error):
+                self.limit = max(self.min_limit, self.limit * self.backoff_ratio)
+                metrics.inc(f"{self.name}_overload_total", labels=self.labels)
+                logger.warning(
+                    "%s overloaded (%s), limit reduced to %.1f", self.name, type(error).__name__, self.limit
+                )
+            elif error is None and slot.latency <= self.latency_target:
+                self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+            self._publish()
+            condition.notify_all()
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[LimiterSlot]:
+        """
+        Hold a slot for the duration of the block.
+
+        Yields:
+            LimiterSlot: The held slot
+        """
+        held = await self.acquire()
+        try:
+            yield held
+        except BaseException as e:
+            await asyncio.shield(self.release(held, e))
+            raise
+        else:
+            await self.release(held)
+
+    def stats(self) -> Dict[str, float]:
+        return {"limit": self.limit, "in_flight": self.in_flight, "queue_depth": self.queued}
+
+
+_limiters: Dict[Tuple[str, str], AdaptiveLimiter] = {}
+
+
+def get_adaptive_limiter(
+    function_name: str,
+    model: str,
+    is_overload: Optional[Callable[[BaseException], bool]] = None,
+) -> AdaptiveLimiter:
+    """
+    Get the process-wide limiter for a function and model, creating it from environment settings on first use.
+
+    Args:
+        function_name: Name of the limited function (e.g. "llm_chat")
+        model: Upstream model name
+        is_overload: Predicate telling which errors should shrink the limit
+
+    Returns:
+        AdaptiveLimiter: The shared limiter
+    """
+    key = (function_name, model)
+    limiter = _limiters.get(key)
+    if limiter is None:
+        limiter = AdaptiveLimiter(
+            name=function_name,
+            labels={"model": model},
+            initial_limit=float(os.getenv("LLM_CONCURRENCY_INITIAL", DEFAULT_INITIAL_LIMIT)),
+            min_limit=float(os.getenv("LLM_CONCURRENCY_MIN", DEFAULT_MIN_LIMIT)),
+            max_limit=float(os.getenv("LLM_CONCURRENCY_MAX", DEFAULT_MAX_LIMIT)),
+            latency_target=float(os.getenv("LLM_LATENCY_TARGET_SECONDS", DEFAULT_LATENCY_TARGET_SECONDS)),
+            is_overload=is_overload,
+        )
+        _limiters[key] = limiter
+    return limiter
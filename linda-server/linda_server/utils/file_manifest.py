@@ -0,0 +1,157 @@
+"""
+Utility module for skipping writes of generated files whose content has not changed.
+
+Regenerated animations often reproduce files byte for byte. Rewriting them still
+touches their mtime, which makes Vite recompile. Each animation workspace keeps a
+manifest of the content hash, size and mtime of every file written into it, so
+identical files can be left alone.
+
+The manifest is only trusted while a file's size and mtime are what was recorded.
+A file changed by anything else is compared against its current content instead.
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+from typing import Any, Dict
+
+from linda_server.utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+MANIFEST_FILENAME = ".linda-manifest.json"
+
+def content_hash(content: str) -> str:
+    """
+    Get the hash recorded for a file's content.
+
+    Args:
+        content: The file content
+
+    Returns:
+        str: Hex SHA-256 of the UTF-8 encoded content
+    """
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+class FileManifest:
+    """Content hashes of the files written into one animation workspace."""
+
+    def __init__(self, base_dir: str):
+        self.base_dir = os.path.abspath(base_dir)
+        self.path = os.path.join(self.base_dir, MANIFEST_FILENAME)
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Dict[str, Any]] = self._load()
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            with open(self.path) as f:
+                return json.load(f).get("files", {})
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError, AttributeError) as e:
+            logger.warning(f"Ignoring unreadable file manifest {self.path}: {str(e)}")
+            return {}
+
+    def _key(self, file_path: str) -> str:
+        return os.path.relpath(os.path.abspath(file_path), self.base_dir)
+
+    def is_unchanged(self, file_path: str, content: str) -> bool:
+        """
+        Check whether a file already holds exactly this content.
+
+        Args:
+            file_path: Path of the file inside the workspace
+            content: The content about to be written
+
+        Returns:
+            bool: True if writing the file can be skipped
+        """
+        digest = content_hash(content)
+        key = self._key(file_path)
+        with self._lock:
+            entry = self._entries.get(key)
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            return False
+        if entry and entry["sha256"] == digest and entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns:
+            return True
+
+        # Not written by us, or changed since: compare what is actually on disk
+        data = content.encode("utf-8")
+        if stat.st_size != len(data):
+            return False
+        try:
+            with open(file_path, "rb") as f:
+                if f.read() != data:
+                    return False
+        except OSError:
+            return False
+        self._set(key, digest, stat)
+        return True
+
+    def record(self, file_path: str, content: str) -> None:
+        """
+        Record the content just written to a file.
+
+        Args:
+            file_path: Path of the file inside the workspace
+            content: The content that was written
+        """
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            return
+        self._set(self._key(file_path), content_hash(content), stat)
+
+    def _set(self, key: str, digest: str, stat: os.stat_result) -> None:
+        with self._lock:
+            self._entries[key] = {"sha256": digest, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+    def save(self) -> None:
+        """
+        Persist the manifest next to the files it describes.
+        """
+        with self._lock:
+            data = json.dumps({"files": self._entries}, indent=2, sort_keys=True)
+        temp_path = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(temp_path, "w") as f:
+                f.write(data)
+            os.replace(temp_path, self.path)
+        except OSError as e:
+            # The manifest is only an optimisation, a missing one just means full writes
+            logger.warning(f"Failed to save file manifest {self.path}: {str(e)}")
+
+_manifests: Dict[str, FileManifest] = {}
+_manifests_lock = threading.Lock()
+
+def get_file_manifest(base_dir: str) -> FileManifest:
+    """
+    Get the shared manifest of an animation workspace.
+
+    Args:
+        base_dir: The workspace directory
+
+    Returns:
+        FileManifest: The workspace's manifest, loaded from disk on first use
+    """
+    key = os.path.abspath(base_dir)
+    with _manifests_lock:
+        manifest = _manifests.get(key)
+        if manifest is None:
+            manifest = _manifests[key] = FileManifest(key)
+        return manifest
+
+def count_elision(written: int, unchanged: int) -> None:
+    """
+    Count written and skipped animation files.
+
+    Args:
+        written: Number of files written
+        unchanged: Number of identical files that were not rewritten
+    """
+    metrics.inc("animation_files_written_total", written)
+    metrics.inc("animation_files_unchanged_total", unchanged)
@@ -7,6 +7,24 @@ import logging
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 
+# Files of the animation server that generated code must never overwrite
+SYSTEM_FILES = [
+    "nuxt.config", "app.vue", "package.json", "tailwind.config",
+    "postcss.config", "vite.config", "tsconfig.json", "main.ts"
+]
+
+def is_system_file(file_path: str) -> bool:
+    """
+    Check whether a path matches one of the protected system file patterns.
+
+    Args:
+        file_path: The path to check
+
+    Returns:
+        bool: True if the file must not be modified
+    """
+    return any(sys_file in file_path for sys_file in SYSTEM_FILES)
+
 def save_file(file_path: str, content: str, skip_system_files: bool = True) -> bool:
     """
     Save content to a file, creating directories as needed.
@@ -26,19 +44,17 @@ def save_file(file_path: str, content: str, skip_system_files: bool = True) -> b
     
     try:
         # Skip if the file path contains system files that should not be modified
-        if skip_system_files:
-            system_files = [
-                "nuxt.config", "app.vue", "package.json", "tailwind.config",
-                "postcss.config", "vite.config", "tsconfig.json", "main.ts"
-            ]
-            
-            if any(sys_file in file_path for sys_file in system_files):
-                logger.warning("Skipping system file: %s", file_path)
-                return False
+        if skip_system_files and is_system_file(file_path):
+            logger.warning("Skipping system file: %s", file_path)
+            return False
         
         # Create directories if they don't exist
         os.makedirs(os.path.dirname(file_path), exist_ok=True)
         
+        # A hard link shared with the workspace template must not be written through
+        if os.path.exists(file_path) and os.stat(file_path).st_nlink > 1:
+            os.unlink(file_path)
+        
         # Write the content to the file
         with open(file_path, "w") as f:
             f.write(content)
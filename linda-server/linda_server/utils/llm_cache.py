@@ -0,0 +1,227 @@
+"""
+Utility module for caching LLM chat responses.
+
+Responses are cached in two tiers: an in-memory LRU with TTL in front of a
+persistent SQLite store that survives restarts. Keys are a stable hash of the
+model, system content and normalized messages of a chat request.
+"""
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from linda_server.utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+DEFAULT_MAX_ENTRIES = 1000
+DEFAULT_TTL_SECONDS = 24 * 60 * 60
+DEFAULT_CACHE_PATH = os.path.join(".cache", "llm_responses.sqlite3")
+
+
+def _normalize_content(content: Optional[str]) -> Optional[str]:
+    if content is None:
+        return None
+    return content.replace("\r\n", "\n").strip()
+
+
+def make_cache_key(model: str, system_content: Optional[str], messages: List[Any]) -> str:
+    """
+    Build a stable cache key for a chat request.
+
+    Args:
+        model: The resolved model name
+        system_content: Optional system prompt
+        messages: Chat messages (objects with role and content attributes)
+
+    Returns:
+        str: Hex digest identifying the request
+    """
+    payload = {
+        "model": model,
+        "system_content": _normalize_content(system_content),
+        "messages": [
+            {"role": m.role, "content": _normalize_content(m.content)} for m in messages
+        ],
+    }
+    encoded = json.dumps(payload, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+class LlmResponseCache:
+    """Two-tier (memory LRU + SQLite) cache of LLM responses with TTL."""
+    def __init__(
+        self,
+        db_path: Optional[str] = DEFAULT_CACHE_PATH,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        ttl_seconds: float = DEFAULT_TTL_SECONDS,
+    ):
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._memory: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._conn: Optional[sqlite3.Connection] = None
+        if db_path:
+            self._open_db(db_path)
+
+    def _open_db(self, db_path: str) -> None:
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS llm_responses ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        Look up a cached response, checking memory first and then disk.
+
+        Args:
+            key: Cache key from make_cache_key
+
+        Returns:
+            Optional[str]: The cached response, or None on a miss
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at > now:
+                    self._memory.move_to_end(key)
+                    metrics.inc("llm_cache_hits_total", labels={"tier": "memory"})
+                    return value
+                del self._memory[key]
+                metrics.inc("llm_cache_expirations_total", labels={"tier": "memory"})
+
+            if self._conn is not None:
+                row = self._conn.execute(
+                    "SELECT value, expires_at FROM llm_responses WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    value, expires_at = row
+                    if expires_at > now:
+                        self._put_memory(key, value, expires_at)
+                        metrics.inc("llm_cache_hits_total", labels={"tier": "disk"})
+                        return value
+                    self._conn.execute("DELETE FROM llm_responses WHERE key = ?", (key,))
+                    self._conn.commit()
+                    metrics.inc("llm_cache_expirations_total", labels={"tier": "disk"})
+
+        metrics.inc("llm_cache_misses_total")
+        return None
+
+    def set(self, key: str, value: str) -> None:
+        """
+        Store a response in both tiers.
+
+        Args:
+            key: Cache key from make_cache_key
+            value: The response text
+        """
+        expires_at = time.time() + self.ttl_seconds
+        with self._lock:
+            self._put_memory(key, value, expires_at)
+            if self._conn is not None:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO llm_responses (key, value, expires_at) VALUES (?, ?, ?)",
+                    (key, value, expires_at),
+                )
+                self._conn.commit()
+        metrics.inc("llm_cache_writes_total")
+
+    def _put_memory(self, key: str, value: str, expires_at: float) -> None:
+        self._memory[key] = (value, expires_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            metrics.inc("llm_cache_evictions_total", labels={"tier": "memory"})
+
+    def purge_expired(self) -> int:
+        """
+        Remove expired entries from both tiers.
+
+        Returns:
+            int: Number of entries removed
+        """
+        now = time.time()
+        removed = 0
+        with self._lock:
+            for key in [k for k, (_, exp) in self._memory.items() if exp <= now]:
+                del self._memory[key]
+                removed += 1
+            if self._conn is not None:
+                cursor = self._conn.execute("DELETE FROM llm_responses WHERE expires_at <= ?", (now,))
+                self._conn.commit()
+                removed += cursor.rowcount
+        if removed:
+            metrics.inc("llm_cache_expirations_total", amount=removed, labels={"tier": "purge"})
+        return removed
+
+    def stats(self) -> Dict[str, float]:
+        """
+        Get cache counters and current size.
+
+        Returns:
+            Dict of hit/miss/eviction counters
+        """
+        with self._lock:
+            memory_entries = len(self._memory)
+        return {
+            "memory_entries": memory_entries,
+            "memory_hits": metrics.get("llm_cache_hits_total", labels={"tier": "memory"}),
+            "disk_hits": metrics.get("llm_cache_hits_total", labels={"tier": "disk"}),
+            "misses": metrics.get("llm_cache_misses_total"),
+            "evictions": metrics.get("llm_cache_evictions_total", labels={"tier": "memory"}),
+        }
+
+    def close(self) -> None:
+        """
+        Close the on-disk store.
+        """
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+_cache: Optional[LlmResponseCache] = None
+
+
+def llm_cache_enabled() -> bool:
+    """
+    Check whether requests with cache=True may be answered from the cache.
+
+    The cache is off unless LLM_CACHE_ENABLED is set, since a cached answer replaces a
+    fresh generation for identical prompts until its TTL expires.
+    """
+    return os.getenv("LLM_CACHE_ENABLED", "false").lower() in ("1", "true", "yes")
+
+
+def get_llm_cache() -> LlmResponseCache:
+    """
+    Get the process-wide LLM response cache, creating it from environment settings on first use.
+
+    Returns:
+        LlmResponseCache: The shared cache
+    """
+    global _cache
+    if _cache is None:
+        _cache = LlmResponseCache(
+            db_path=os.getenv("LLM_CACHE_PATH", DEFAULT_CACHE_PATH) or None,
+            max_entries=int(os.getenv("LLM_CACHE_MAX_ENTRIES", DEFAULT_MAX_ENTRIES)),
+            ttl_seconds=float(os.getenv("LLM_CACHE_TTL_SECONDS", DEFAULT_TTL_SECONDS)),
+        )
+        logger.info("LLM response cache initialized (path=%s)", _cache.db_path)
+    return _cache
@@ -0,0 +1,243 @@
+"""
+Utility module for recording and replaying LLM traffic.
+
+In record mode every upstream llm_chat response is appended to a gzip-compressed
+JSON-lines cassette, including the arrival time of each streamed chunk. In replay
+mode responses are served back from the cassette, deterministically and without the
+network, either with their original timing or scaled by LLM_CASSETTE_TIME_SCALE
+(0 replays as fast as possible).
+
+Reading and writing the cassette runs on the file I/O thread pool, so recording does
+not stall the event loop and distort the latencies it captures.
+
+Settings:
+    LLM_CASSETTE_MODE: off (default), record or replay
+    LLM_CASSETTE_PATH: cassette file (default .cache/llm_cassette.jsonl.gz)
+    LLM_CASSETTE_TIME_SCALE: multiplier applied to recorded delays (default 1.0)
+"""
+import asyncio
+import gzip
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from openai.types.chat import ChatCompletion
+
+from linda_server.utils.blocking_io import run_file_io
+from linda_server.utils.metrics import metrics
+from linda_server.utils.stream_relay import chunk_content, close_stream, make_chunk
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+DEFAULT_CASSETTE_PATH = os.path.join(".cache", "llm_cassette.jsonl.gz")
+CASSETTE_MODES = ("off", "record", "replay")
+
+
+class CassetteMissError(LookupError):
+    """Raised in replay mode when the cassette has no recording for a request."""
+
+
+class LlmCassette:
+    """A gzip JSON-lines store of recorded LLM responses."""
+    def __init__(self, path: str, mode: str, time_scale: float = 1.0):
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Unknown cassette mode: {mode}")
+        self.path = path
+        self.mode = mode
+        self.time_scale = time_scale
+        self._lock = threading.Lock()
+        self._recordings: Dict[Tuple[str, bool], List[Dict[str, Any]]] = {}
+        self._positions: Dict[Tuple[str, bool], int] = {}
+        # Replay recordings are read on first use, off the event loop
+        self._loaded = mode != "replay"
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode == "replay"
+
+    def _load(self) -> None:
+        with self._lock:
+            if self._loaded:
+                return
+            self._loaded = True
+            if not os.path.exists(self.path):
+                logger.warning("Cassette %s does not exist; every request will miss", self.path)
+                return
+            count = 0
+            with gzip.open(self.path, "rt", encoding="utf-8") as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    entry = json.loads(line)
+                    self._recordings.setdefault((entry["key"], entry["stream"]), []).append(entry)
+                    count += 1
+        logger.info("Loaded %d recordings from cassette %s", count, self.path)
+
+    async def _ensure_loaded(self) -> None:
+        if not self._loaded:
+            await run_file_io("llm_cassette", self._load)
+
+    def _write(self, line: str) -> None:
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._lock:
+            # Each append is its own gzip member, so the file stays readable if the process dies;
+            # concatenated members read back as one file
+            with gzip.open(self.path, "at", encoding="utf-8") as f:
+                f.write(line)
+
+    async def _append(self, entry: Dict[str, Any]) -> None:
+        line = json.dumps(entry, separators=(",", ":"), ensure_ascii=False) + "\n"
+        await run_file_io("llm_cassette", self._write, line)
+        metrics.inc("llm_cassette_recorded_total", labels={"stream": entry["stream"]})
+
+    def _next_recording(self, key: str, stream: bool) -> Dict[str, Any]:
+        recordings = self._recordings.get((key, stream))
+        if not recordings:
+            metrics.inc("llm_cassette_misses_total")
+            raise CassetteMissError(f"No cassette recording for request {key[:12]} (stream={stream})")
+        # Cycle through repeated recordings of the same request in recorded order
+        with self._lock:
+            position = self._positions.get((key, stream), 0)
+            self._positions[(key, stream)] = position + 1
+        metrics.inc("llm_cassette_replayed_total", labels={"stream": stream})
+        return recordings[position % len(recordings)]
+
+    async def record_completion(self, key: str, model: str, response: Any, started: float) -> Any:
+        """
+        Record a non-streaming response.
+
+        Args:
+            key: Canonical request key
+            model: Model name
+            response: The ChatCompletion returned upstream
+            started: time.monotonic() when the request was sent
+
+        Returns:
+            The response, unchanged
+        """
+        usage = response.usage
+        await self._append({
+            "key": key,
+            "model": model,
+            "stream": False,
+            "recorded_at": time.time(),
+            "latency": round(time.monotonic() - started, 4),
+            "content": response.choices[0].message.content,
+            "usage": [usage.prompt_tokens, usage.completion_tokens] if usage else None,
+        })
+        return response
+
+    async def record_stream(self, key: str, model: str, stream: Any, started: float) -> AsyncIterator[Any]:
+        """
+        Pass an upstream stream through while recording each chunk and its arrival time.
+
+        Args:
+            key: Canonical request key
+            model: Model name
+            stream: The upstream async stream
+            started: time.monotonic() when the request was sent
+
+        Yields:
+            The upstream chunks, unchanged
+        """
+        chunks: List[List[Any]] = []
+        completed = False
+        try:
+            async for chunk in stream:
+                chunks.append([round(time.monotonic() - started, 4), chunk_content(chunk) or ""])
+                yield chunk
+            completed = True
+        finally:
+            await close_stream(stream)
+            # Only complete streams are worth replaying
+            if completed:
+                await self._append({
+                    "key": key,
+                    "model": model,
+                    "stream": True,
+                    "recorded_at": time.time(),
+                    "chunks": chunks,
+                })
+
+    async def replay_completion(self, key: str, model: str) -> ChatCompletion:
+        """
+        Replay a recorded non-streaming response.
+
+        Raises:
+            CassetteMissError: If the request was never recorded
+        """
+        await self._ensure_loaded()
+        entry = self._next_recording(key, False)
+        await asyncio.sleep(entry["latency"] * self.time_scale)
+        usage = entry.get("usage")
+        return ChatCompletion(
+            id=f"chatcmpl-cassette-{uuid.uuid4().hex}",
+            object="chat.completion",
+            created=int(time.time()),
+            model=entry.get("model", model),
+            choices=[{
+                "index": 0,
+                "message": {"role": "assistant", "content": entry["content"]},
+                "finish_reason": "stop",
+            }],
+            usage={
+                "prompt_tokens": usage[0],
+                "completion_tokens": usage[1],
+                "total_tokens": usage[0] + usage[1],
+            } if usage else None,
+        )
+
+    async def replay_stream(self, key: str, model: str) -> AsyncIterator[Any]:
+        """
+        Replay a recorded stream, reproducing the recorded chunk timing.
+
+        Raises:
+            CassetteMissError: If the request was never recorded
+        """
+        await self._ensure_loaded()
+        entry = self._next_recording(key, True)
+        chunk_id = f"chatcmpl-cassette-{uuid.uuid4().hex}"
+        chunk_model = entry.get("model", model)
+        started = time.monotonic()
+        for offset, content in entry["chunks"]:
+            delay = offset * self.time_scale - (time.monotonic() - started)
+            if delay > 0:
+                await asyncio.sleep(delay)
+            yield make_chunk(chunk_id, chunk_model, content)
+        yield make_chunk(chunk_id, chunk_model, None, finish_reason="stop")
+
+
+_cassette: Optional[LlmCassette] = None
+_cassette_settings: Optional[Tuple[str, str, float]] = None
+
+
+def get_llm_cassette() -> Optional[LlmCassette]:
+    """
+    Get the cassette configured by the environment, or None when recording/replay is off.
+
+    Returns:
+        Optional[LlmCassette]: The shared cassette
+    """
+    global _cassette, _cassette_settings
+    mode = os.getenv("LLM_CASSETTE_MODE", "off").lower()
+    if mode not in CASSETTE_MODES:
+        raise ValueError(f"LLM_CASSETTE_MODE must be one of {CASSETTE_MODES}, got {mode}")
+    if mode == "off":
+        return None
+    settings = (
+        mode,
+        os.getenv("LLM_CASSETTE_PATH", DEFAULT_CASSETTE_PATH),
+        float(os.getenv("LLM_CASSETTE_TIME_SCALE", "1.0")),
+    )
+    if _cassette is None or _cassette_settings != settings:
+        _cassette = LlmCassette(path=settings[1], mode=settings[0], time_scale=settings[2])
+        _cassette_settings = settings
+        logger.info("LLM cassette in %s mode at %s", mode, settings[1])
+    return _cassette
@@ -0,0 +1,127 @@
+"""
+Utility module for creating and sharing the async LLM client.
+
+A single AsyncOpenAI client is created lazily per (base_url, api_key) pair and reused
+for the lifetime of the process, so every llm_chat invocation shares one bounded
+HTTP connection pool with keep-alive instead of paying a new TLS handshake per call.
+"""
+import asyncio
+import logging
+import os
+from typing import Dict, Optional, Tuple
+
+import httpx
+import openai
+from openai import AsyncOpenAI
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+RESTACK_LLM_BASE_URL = "https://ai.restack.io"
+OPENAI_BASE_URL = "https://api.openai.com/v1"
+
+# Connection pool settings, tunable through environment variables
+DEFAULT_MAX_CONNECTIONS = 100
+DEFAULT_MAX_KEEPALIVE_CONNECTIONS = 20
+DEFAULT_KEEPALIVE_EXPIRY = 30.0
+DEFAULT_CONNECT_TIMEOUT = 10.0
+
+_clients: Dict[Tuple[str, str], AsyncOpenAI] = {}
+
+
+def resolve_llm_endpoint() -> Tuple[str, str]:
+    """
+    Resolve the LLM base URL and API key from the environment.
+
+    Returns:
+        Tuple[str, str]: The (base_url, api_key) pair
+
+    Raises:
+        ValueError: If no API key is configured
+    """
+    api_key = os.environ.get("RESTACK_API_KEY") or os.environ.get("OPENAI_API_KEY")
+    if not api_key:
+        raise ValueError("LLM API key not found")
+    base_url = os.environ.get("LLM_BASE_URL")
+    if not base_url:
+        base_url = RESTACK_LLM_BASE_URL if os.environ.get("RESTACK_API_KEY") else OPENAI_BASE_URL
+    return base_url, api_key
+
+
+def is_llm_overload_error(error: BaseException) -> bool:
+    """
+    Tell whether an error means the LLM provider is overloaded (rate limited or timing out).
+
+    Args:
+        error: The exception raised by an LLM call
+
+    Returns:
+        bool: True for 429s and timeouts
+    """
+    return isinstance(error, (openai.RateLimitError, openai.APITimeoutError, asyncio.TimeoutError))
+
+
+def _build_http_client() -> httpx.AsyncClient:
+    """
+    Build the shared httpx client with bounded pool limits and keep-alive.
+
+    Returns:
+        httpx.AsyncClient: The configured HTTP client
+    """
+    limits = httpx.Limits(
+        max_connections=int(os.getenv("LLM_HTTP_MAX_CONNECTIONS", DEFAULT_MAX_CONNECTIONS)),
+        max_keepalive_connections=int(
+            os.getenv("LLM_HTTP_MAX_KEEPALIVE_CONNECTIONS", DEFAULT_MAX_KEEPALIVE_CONNECTIONS)
+        ),
+        keepalive_expiry=float(os.getenv("LLM_HTTP_KEEPALIVE_EXPIRY", DEFAULT_KEEPALIVE_EXPIRY)),
+    )
+    # Generations can take minutes, so only the connect phase gets a short timeout
+    timeout = httpx.Timeout(
+        None,
+        connect=float(os.getenv("LLM_HTTP_CONNECT_TIMEOUT", DEFAULT_CONNECT_TIMEOUT)),
+    )
+    return httpx.AsyncClient(limits=limits, timeout=timeout)
+
+
+def get_llm_client(base_url: Optional[str] = None, api_key: Optional[str] = None) -> AsyncOpenAI:
+    """
+    Get the process-wide AsyncOpenAI client for the given endpoint, creating it on first use.
+
+    Args:
+        base_url: The LLM API base URL (resolved from the environment if omitted)
+        api_key: The LLM API key (resolved from the environment if omitted)
+
+    Returns:
+        AsyncOpenAI: The shared client for this endpoint
+    """
+    if base_url is None or api_key is None:
+        resolved_base_url, resolved_api_key = resolve_llm_endpoint()
+        base_url = base_url or resolved_base_url
+        api_key = api_key or resolved_api_key
+
+    key = (base_url, api_key)
+    client = _clients.get(key)
+    if client is None:
+        logger.info("Creating pooled LLM client for %s", base_url)
+        # Retries are handled by llm_retry so they can respect the step deadline
+        client = AsyncOpenAI(
+            base_url=base_url,
+            api_key=api_key,
+            http_client=_build_http_client(),
+            max_retries=0,
+        )
+        _clients[key] = client
+    return client
+
+
+async def close_llm_clients() -> None:
+    """
+    Close all pooled LLM clients and release their connections.
+    """
+    clients = list(_clients.values())
+    _clients.clear()
+    for client in clients:
+        try:
+            await client.close()
+        except Exception as e:
+            logger.warning(f"Error closing LLM client: {str(e)}")
@@ -0,0 +1,256 @@
+"""
+Utility module for deadline-aware retries and request hedging of LLM calls.
+
+Each llm_chat invocation gets a deadline derived from the Restack step's timeouts.
+Transient failures are retried with full-jitter exponential backoff while time
+remains, and non-streaming calls can optionally be hedged: a second request is
+fired once the first has been outstanding longer than a recent latency percentile,
+and whichever finishes first wins.
+"""
+import asyncio
+import logging
+import math
+import os
+import random
+import time
+from collections import deque
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Deque, Dict, Optional, TypeVar
+
+import openai
+from restack_ai.function import function_info
+
+from linda_server.utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+T = TypeVar("T")
+
+DEFAULT_DEADLINE_SECONDS = 600.0
+DEFAULT_DEADLINE_MARGIN_SECONDS = 2.0
+DEFAULT_MAX_ATTEMPTS = 3
+DEFAULT_BASE_DELAY_SECONDS = 0.5
+DEFAULT_MAX_DELAY_SECONDS = 8.0
+DEFAULT_HEDGE_PERCENTILE = 95.0
+DEFAULT_HEDGE_MIN_SAMPLES = 20
+LATENCY_WINDOW_SIZE = 200
+
+TRANSIENT_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+
+
+class DeadlineExceeded(Exception):
+    """Raised when no time is left for another attempt."""
+
+
+def compute_deadline(default_seconds: Optional[float] = None) -> float:
+    """
+    Compute the monotonic deadline for the current function run.
+
+    The deadline is the earlier of the step's start_to_close and schedule_to_close
+    limits, minus a small margin so we fail cleanly before Restack times the step out.
+    Outside a function context the default is used.
+
+    Args:
+        default_seconds: Budget to use when no step timeouts are available
+
+    Returns:
+        float: Deadline on the time.monotonic() clock
+    """
+    if default_seconds is None:
+        default_seconds = float(os.getenv("LLM_DEFAULT_DEADLINE_SECONDS", DEFAULT_DEADLINE_SECONDS))
+    margin = float(os.getenv("LLM_DEADLINE_MARGIN_SECONDS", DEFAULT_DEADLINE_MARGIN_SECONDS))
+
+    budget = default_seconds
+    try:
+        info = function_info()
+        now = datetime.now(timezone.utc)
+        remaining = []
+        if info.start_to_close_timeout and info.started_time:
+            remaining.append((info.started_time + info.start_to_close_timeout - now).total_seconds())
+        if info.schedule_to_close_timeout and info.scheduled_time:
+            remaining.append((info.scheduled_time + info.schedule_to_close_timeout - now).total_seconds())
+        if remaining:
+            budget = min(remaining)
+    except RuntimeError:
+        # Not running inside a Restack function
+        pass
+
+    return time.monotonic() + max(0.0, budget - margin)
+
+
+def time_left(deadline: float) -> float:
+    return deadline - time.monotonic()
+
+
+def is_transient_llm_error(error: BaseException) -> bool:
+    """
+    Tell whether an LLM error is worth retrying.
+
+    Args:
+        error: The exception raised by an LLM call
+
+    Returns:
+        bool: True for connection errors, timeouts, 429s and 5xx responses
+    """
+    if isinstance(error, (openai.APIConnectionError, asyncio.TimeoutError)):
+        return True
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code in TRANSIENT_STATUS_CODES
+    return False
+
+
+def _retry_after_seconds(error: BaseException) -> Optional[float]:
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    value = response.headers.get("retry-after")
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+async def call_with_retries(
+    fn: Callable[[float], Awaitable[T]],
+    deadline: float,
+    max_attempts: Optional[int] = None,
+    base_delay: float = DEFAULT_BASE_DELAY_SECONDS,
+    max_delay: float = DEFAULT_MAX_DELAY_SECONDS,
+    is_transient: Callable[[BaseException], bool] = is_transient_llm_error,
+) -> T:
+    """
+    Call fn with bounded, jittered retries that never run past the deadline.
+
+    Args:
+        fn: Attempt to run; receives the seconds left before the deadline
+        deadline: Monotonic deadline from compute_deadline
+        max_attempts: Maximum number of attempts
+        base_delay: Initial backoff in seconds
+        max_delay: Cap on a single backoff
+        is_transient: Predicate telling which errors are retried
+
+    Returns:
+        The result of the first successful attempt
+
+    Raises:
+        DeadlineExceeded: If the deadline passes before an attempt can start
+    """
+    if max_attempts is None:
+        max_attempts = int(os.getenv("LLM_MAX_ATTEMPTS", DEFAULT_MAX_ATTEMPTS))
+
+    attempt = 0
+    while True:
+        attempt += 1
+        remaining = time_left(deadline)
+        if remaining <= 0:
+            raise DeadlineExceeded("LLM call deadline exceeded")
+        try:
+            return await asyncio.wait_for(fn(remaining), timeout=remaining)
+        except Exception as e:
+            if attempt >= max_attempts or not is_transient(e):
+                raise
+            # Full jitter, but respect the provider's Retry-After when it asks for longer
+            delay = random.uniform(0, min(max_delay, base_delay * (2 ** (attempt - 1))))
+            retry_after = _retry_after_seconds(e)
+            if retry_after is not None:
+                delay = max(delay, retry_after)
+            if delay >= time_left(deadline):
+                raise
+            metrics.inc("llm_retries_total", labels={"error": type(e).__name__})
+            logger.warning(
+                "LLM call attempt %d failed with %s, retrying in %.2fs", attempt, type(e).__name__, delay
+            )
+            await asyncio.sleep(delay)
+
+
+class LatencyTracker:
+    """Rolling window of recent call latencies."""
+    def __init__(self, window_size: int = LATENCY_WINDOW_SIZE):
+        self._samples: Deque[float] = deque(maxlen=window_size)
+
+    def record(self, latency: float) -> None:
+        self._samples.append(latency)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def percentile(self, percentile: float) -> Optional[float]:
+        """
+        Get the given percentile of the recorded latencies (nearest-rank).
+
+        Returns:
+            Optional[float]: The latency, or None if nothing was recorded
+        """
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        rank = max(1, math.ceil(percentile / 100.0 * len(ordered)))
+        return ordered[rank - 1]
+
+
+_latency_trackers: Dict[str, LatencyTracker] = {}
+
+
+def get_latency_tracker(model: str) -> LatencyTracker:
+    tracker = _latency_trackers.get(model)
+    if tracker is None:
+        tracker = LatencyTracker()
+        _latency_trackers[model] = tracker
+    return tracker
+
+
+def hedge_delay_for(model: str) -> Optional[float]:
+    """
+    Get how long to wait before hedging a call to the model, if hedging is enabled.
+
+    Returns:
+        Optional[float]: Delay in seconds, or None when hedging is disabled or there is too little data
+    """
+    if os.getenv("LLM_HEDGE_ENABLED", "false").lower() != "true":
+        return None
+    tracker = get_latency_tracker(model)
+    if len(tracker) < int(os.getenv("LLM_HEDGE_MIN_SAMPLES", DEFAULT_HEDGE_MIN_SAMPLES)):
+        return None
+    return tracker.percentile(float(os.getenv("LLM_HEDGE_PERCENTILE", DEFAULT_HEDGE_PERCENTILE)))
+
+
+async def hedged_call(fn: Callable[[], Awaitable[T]], hedge_delay: Optional[float]) -> T:
+    """
+    Run fn, firing a second identical call if the first is still running after hedge_delay.
+
+    Args:
+        fn: Factory for one attempt
+        hedge_delay: Seconds to wait before hedging, or None to never hedge
+
+    Returns:
+        The result of whichever call succeeds first
+    """
+    if hedge_delay is None:
+        return await fn()
+
+    primary = asyncio.ensure_future(fn())
+    hedge: Optional[asyncio.Future] = None
+    try:
+        done, _ = await asyncio.wait({primary}, timeout=hedge_delay)
+        if done:
+            return primary.result()
+
+        metrics.inc("llm_hedges_total")
+        hedge = asyncio.ensure_future(fn())
+        pending = {primary, hedge}
+        error: Optional[BaseException] = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    if task is hedge:
+                        metrics.inc("llm_hedges_won_total")
+                    return task.result()
+                error = task.exception()
+        raise error
+    finally:
+        # Cancel whichever request lost (or both if we were cancelled ourselves)
+        for task in (primary, hedge):
+            if task is not None and not task.done():
+                task.cancel()
@@ -0,0 +1,282 @@
+"""
+Local OpenAI-compatible stub server for load testing the agent pipeline.
+
+The stub answers POST /v1/chat/completions with canned geometry solutions or
+multi-file animation code, streaming them as server-sent events with a
+configurable time to first token, token rate and error rate. It also accepts
+Restack-style stream websockets at /stream/ws/agent and discards what it receives,
+so llm_chat's streaming relay can run without a Restack engine.
+
+Point llm_chat at it with LLM_BASE_URL=http://localhost:<port>/v1 and
+RESTACK_API_ADDRESS=localhost:<port>.
+"""
+import asyncio
+import json
+import logging
+import random
+import re
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Any, Dict, List
+
+from fastapi import FastAPI, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import JSONResponse, StreamingResponse
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+CANNED_GEOMETRY_SOLUTION = """**Step 1: Identify the given information**
+Triangle ABC is a right triangle with the right angle at C, AC = 3 and BC = 4.
+
+**Step 2: Apply the Pythagorean theorem**
+In a right triangle, the square of the hypotenuse equals the sum of the squares of the legs:
+AB² = AC² + BC² = 3² + 4² = 9 + 16 = 25
+
+**Step 3: Solve for the hypotenuse**
+AB = √25 = 5
+
+**Step 4: Find the area**
+The legs are perpendicular, so Area = ½ · AC · BC = ½ · 3 · 4 = 6
+
+**Final Answer:** AB = 5 and the area of triangle ABC is 6 square units.
+"""
+
+CANNED_ANIMATION_CODE = """Here is the animation for the problem.
+
+File: components/GeometryAnimation.vue
+```vue
+<template>
+  <div class="flex flex-col items-center gap-4 p-4">
+    <h2 class="text-xl font-semibold">{{ store.currentStepTitle }}</h2>
+    <div ref="canvasContainer" class="w-full h-96 rounded bg-gray-900"></div>
+    <div class="flex gap-2">
+      <button class="px-4 py-2 rounded bg-blue-600 text-white" @click="store.prevStep()">Previous</button>
+      <button class="px-4 py-2 rounded bg-blue-600 text-white" @click="store.nextStep()">Next</button>
+    </div>
+  </div>
+</template>
+
+<script setup lang="ts">
+import { onMounted, onBeforeUnmount, ref, watch } from 'vue';
+import * as THREE from 'three';
+import * as TWEEN from '@tweenjs/tween.js';
+import { useAnimationStore } from '~/stores/animationStore';
+import { createTriangle, createLabel } from '~/utils/geometry-helpers';
+
+const store = useAnimationStore();
+const canvasContainer = ref<HTMLDivElement | null>(null);
+let renderer: THREE.WebGLRenderer;
+let frameId = 0;
+
+onMounted(() => {
+  const scene = new THREE.Scene();
+  const camera = new THREE.PerspectiveCamera(50, 2, 0.1, 100);
+  camera.position.set(2, 2, 10);
+  renderer = new THREE.WebGLRenderer({ antialias: true });
+  canvasContainer.value?.appendChild(renderer.domElement);
+  scene.add(createTriangle([0, 0], [3, 0], [0, 4]));
+  scene.add(createLabel('A', [0, 4]));
+  const animate = (time: number) => {
+    frameId = requestAnimationFrame(animate);
+    TWEEN.update(time);
+    renderer.render(scene, camera);
+  };
+  frameId = requestAnimationFrame(animate);
+});
+
+watch(() => store.currentStep, (step) => {
+  new TWEEN.Tween({ t: 0 }).to({ t: 1 }, 600).start();
+});
+
+onBeforeUnmount(() => {
+  cancelAnimationFrame(frameId);
+  renderer?.dispose();
+});
+</script>
+```
+
+File: stores/animationStore.ts
+```ts
+import { defineStore } from 'pinia';
+
+const STEPS = [
+  'Identify the given information',
+  'Apply the Pythagorean theorem',
+  'Solve for the hypotenuse',
+  'Find the area',
+];
+
+export const useAnimationStore = defineStore('animation', {
+  state: () => ({
+    currentStep: 0,
+  }),
+  getters: {
+    currentStepTitle: (state) => STEPS[state.currentStep],
+  },
+  actions: {
+    nextStep() {
+      if (this.currentStep < STEPS.length - 1) this.currentStep++;
+    },
+    prevStep() {
+      if (this.currentStep > 0) this.currentStep--;
+    },
+  },
+});
+```
+
+File: utils/geometry-helpers.ts
+```ts
+import * as THREE from 'three';
+
+export function createTriangle(a: number[], b: number[], c: number[]): THREE.Line {
+  const points = [a, b, c, a].map(([x, y]) => new THREE.Vector3(x, y, 0));
+  const geometry = new THREE.BufferGeometry().setFromPoints(points);
+  return new THREE.Line(geometry, new THREE.LineBasicMaterial({ color: 0x60a5fa }));
+}
+
+export function createLabel(text: string, [x, y]: number[]): THREE.Sprite {
+  const canvas = document.createElement('canvas');
+  const context = canvas.getContext('2d')!;
+  context.font = '48px sans-serif';
+  context.fillStyle = '#ffffff';
+  context.fillText(text, 8, 48);
+  const sprite = new THREE.Sprite(new THREE.SpriteMaterial({ map: new THREE.CanvasTexture(canvas) }));
+  sprite.position.set(x, y, 0);
+  return sprite;
+}
+```
+"""
+
+_TOKEN_PATTERN = re.compile(r"\s*\S+|\s+")
+
+
+@dataclass
+class StubSettings:
+    """Behaviour of the stub server."""
+    ttft: float = 0.5
+    tokens_per_second: float = 50.0
+    error_rate: float = 0.0
+    rate_limit_share: float = 0.5
+
+
+def split_tokens(text: str) -> List[str]:
+    """
+    Split text into word-sized pseudo tokens that join back to the original text.
+    """
+    return _TOKEN_PATTERN.findall(text)
+
+
+def pick_response(messages: List[Dict[str, Any]]) -> str:
+    """
+    Pick the canned response for a request, based on what its prompt asks for.
+    """
+    prompt = "\n".join(str(m.get("content") or "") for m in messages).lower()
+    if "animation" in prompt and "file:" in prompt:
+        return CANNED_ANIMATION_CODE
+    return CANNED_GEOMETRY_SOLUTION
+
+
+def _completion_payload(completion_id: str, model: str, content: str, prompt_tokens: int, completion_tokens: int) -> Dict[str, Any]:
+    return {
+        "id": completion_id,
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": content},
+            "finish_reason": "stop",
+        }],
+        "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        },
+    }
+
+
+def _chunk_payload(completion_id: str, model: str, content: Any, finish_reason: Any = None) -> str:
+    delta = {"role": "assistant", "content": content} if content is not None else {}
+    return json.dumps({
+        "id": completion_id,
+        "object": "chat.completion.chunk",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+    })
+
+
+def create_stub_app(settings: StubSettings) -> FastAPI:
+    """
+    Create the stub FastAPI application.
+
+    Args:
+        settings: Latency, throughput and error behaviour
+
+    Returns:
+        FastAPI: The stub app
+    """
+    app = FastAPI()
+    app.state.settings = settings
+    app.state.stats = {"requests": 0, "errors": 0, "websocket_messages": 0}
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        stats = app.state.stats
+        stats["requests"] += 1
+        model = body.get("model", "stub")
+        messages = body.get("messages", [])
+
+        if random.random() < settings.error_rate:
+            stats["errors"] += 1
+            if random.random() < settings.rate_limit_share:
+                return JSONResponse(
+                    {"error": {"message": "Rate limit reached (stub)", "type": "rate_limit_error"}},
+                    status_code=429,
+                    headers={"retry-after": "0.1"},
+                )
+            return JSONResponse(
+                {"error": {"message": "Internal error (stub)", "type": "server_error"}},
+                status_code=500,
+            )
+
+        content = pick_response(messages)
+        tokens = split_tokens(content)
+        prompt_tokens = sum(len(split_tokens(str(m.get("content") or ""))) for m in messages)
+        completion_id = f"chatcmpl-stub-{uuid.uuid4().hex}"
+        token_delay = 1.0 / settings.tokens_per_second if settings.tokens_per_second > 0 else 0.0
+
+        if not body.get("stream"):
+            await asyncio.sleep(settings.ttft + token_delay * len(tokens))
+            return JSONResponse(_completion_payload(completion_id, model, content, prompt_tokens, len(tokens)))
+
+        async def events():
+            await asyncio.sleep(settings.ttft)
+            for token in tokens:
+                yield f"data: {_chunk_payload(completion_id, model, token)}\n\n"
+                if token_delay:
+                    await asyncio.sleep(token_delay)
+            yield f"data: {_chunk_payload(completion_id, model, None, 'stop')}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    @app.websocket("/stream/ws/agent")
+    async def stream_sink(websocket: WebSocket):
+        await websocket.accept()
+        try:
+            while True:
+                message = await websocket.receive_text()
+                app.state.stats["websocket_messages"] += 1
+                if message == "[DONE]":
+                    break
+        except WebSocketDisconnect:
+            pass
+
+    @app.get("/stats")
+    async def get_stats():
+        return app.state.stats
+
+    return app
@@ -0,0 +1,222 @@
+"""
+Load generator for the MathMaster -> AnimationDeveloper -> save_animation_code pipeline.
+
+Each solve runs the same function calls the agents make, in-process under a
+Temporal test activity context, and times every stage. Run it against the local
+LLM stub server (see llm_stub_server.py) to load-test without spending API quota.
+"""
+import asyncio
+import dataclasses
+import logging
+import math
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+from temporalio.testing import ActivityEnvironment
+
+from linda_server.agents.prompts.animation_developer_prompt import SYSTEM_PROMPT as ANIMATION_DEVELOPER_SYSTEM_PROMPT
+from linda_server.agents.prompts.math_master_prompt import SYSTEM_PROMPT as MATH_MASTER_SYSTEM_PROMPT
+from linda_server.functions.animation_services import save_animation_code
+from linda_server.functions.llm_chat import LlmChatInput, LlmChatOutput, Message, llm_chat
+from linda_server.utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+STAGES = ["math_master", "animation_developer", "save_animation_code"]
+# Streaming timings of the math_master stage, as seen upstream and at the websocket relay
+STREAM_TIMINGS = ["upstream_ttft", "relay_ttft", "relay_send", "tokens_per_second"]
+DEFAULT_PROBLEM = "In right triangle ABC, angle C is 90 degrees, AC = 3 and BC = 4. Find AB and the area of the triangle."
+
+# Step timeouts used by the agents for each stage
+STAGE_TIMEOUTS = {
+    "math_master": timedelta(seconds=36000),
+    "animation_developer": timedelta(seconds=240),
+    "save_animation_code": timedelta(seconds=60000),
+}
+
+
+def percentile(samples: List[float], pct: float) -> Optional[float]:
+    """
+    Nearest-rank percentile of a list of samples.
+    """
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    rank = max(1, math.ceil(pct / 100.0 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def _activity_environment(workflow_id: str, timeout: timedelta) -> ActivityEnvironment:
+    env = ActivityEnvironment()
+    now = datetime.now(timezone.utc)
+    env.info = dataclasses.replace(
+        env.info,
+        workflow_id=workflow_id,
+        workflow_run_id=f"{workflow_id}-run",
+        scheduled_time=now,
+        started_time=now,
+        current_attempt_scheduled_time=now,
+        start_to_close_timeout=timeout,
+        schedule_to_close_timeout=timeout,
+    )
+    return env
+
+
+async def _timed(stage: str, workflow_id: str, fn: Any, arg: Any, timings: Dict[str, float]) -> Any:
+    env = _activity_environment(workflow_id, STAGE_TIMEOUTS[stage])
+    started = time.perf_counter()
+    result = await env.run(fn, arg)
+    timings[stage] = time.perf_counter() - started
+    return result
+
+
+async def run_solve(problem_text: str) -> Dict[str, float]:
+    """
+    Run one solve through all pipeline stages.
+
+    Args:
+        problem_text: The geometry problem to solve
+
+    Returns:
+        Dict mapping stage name (and "total") to latency in seconds, plus the
+        math_master stream timings under STREAM_TIMINGS names
+    """
+    workflow_id = f"load-test-{uuid.uuid4().hex[:12]}"
+    timings: Dict[str, float] = {}
+    started = time.perf_counter()
+
+    solution = await _timed("math_master", workflow_id, llm_chat, LlmChatInput(
+        messages=[
+            Message(role="system", content=MATH_MASTER_SYSTEM_PROMPT),
+            Message(role="user", content=problem_text),
+        ],
+        stream=True,
+        cache=True,
+        include_stats=True,
+    ), timings)
+    if isinstance(solution, LlmChatOutput):
+        upstream = solution.stream_stats.get("upstream") or {}
+        relay = solution.stream_stats.get("relay") or {}
+        for name, value in (
+            ("upstream_ttft", upstream.get("ttft")),
+            ("relay_ttft", relay.get("ttft")),
+            ("relay_send", relay.get("send_seconds")),
+            ("tokens_per_second", upstream.get("tokens_per_second")),
+        ):
+            if value is not None:
+                timings[name] = value
+
+    animation = await _timed("animation_developer", workflow_id, llm_chat, LlmChatInput(
+        messages=[
+            Message(role="system", content=ANIMATION_DEVELOPER_SYSTEM_PROMPT),
+            Message(role="user", content=f"Create animation code for this geometry problem:\n\n{problem_text}"),
+        ],
+        cache=True,
+        stream=True,
+        stream_target="animation_server",
+    ), timings)
+
+    # Files are saved while the response streams; the save step only runs as a fallback
+    if not animation.saved_files:
+        save_result = await _timed("save_animation_code", workflow_id, save_animation_code, animation.content, timings)
+        if not save_result.get("success", False):
+            raise RuntimeError(save_result.get("message", "Unknown error saving animation code"))
+
+    timings["total"] = time.perf_counter() - started
+    return timings
+
+
+async def run_load_test(
+    solves: int,
+    concurrency: int,
+    same_problem: bool = False,
+    problem_text: str = DEFAULT_PROBLEM,
+    run_nonce: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Drive concurrent solves and summarize throughput and per-stage latency.
+
+    Args:
+        solves: Total number of solves to run
+        concurrency: Maximum number of solves in flight
+        same_problem: Send the identical problem every time (exercises caching/coalescing)
+        problem_text: The base problem text
+        run_nonce: Suffix that makes problems unique to this run; pass a fixed value so a
+            replayed cassette sees the same requests it recorded
+
+    Returns:
+        Dict report with throughput, failures and p50/p95/p99 per stage
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    run_nonce = run_nonce or uuid.uuid4().hex[:8]
+    results: List[Dict[str, float]] = []
+    failures: List[str] = []
+
+    async def one(index: int) -> None:
+        text = problem_text if same_problem else f"{problem_text} (load test {run_nonce}-{index})"
+        async with semaphore:
+            try:
+                results.append(await run_solve(text))
+            except Exception as e:
+                logger.warning(f"Solve {index} failed: {str(e)}")
+                failures.append(str(e))
+
+    offloaded_before = metrics.get("file_io_offloaded_seconds_total")
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(solves)))
+    elapsed = time.perf_counter() - started
+
+    report: Dict[str, Any] = {
+        "solves": solves,
+        "concurrency": concurrency,
+        "completed": len(results),
+        "failed": len(failures),
+        "elapsed_seconds": elapsed,
+        "throughput_per_second": len(results) / elapsed if elapsed > 0 else 0.0,
+        # File I/O that ran on the thread pool instead of blocking the event loop
+        "file_io_offloaded_seconds": metrics.get("file_io_offloaded_seconds_total") - offloaded_before,
+        "stages": {},
+    }
+    for stage in STAGES + ["total"]:
+        report["stages"][stage] = _percentiles([r[stage] for r in results if stage in r])
+    report["stream"] = {
+        name: _percentiles([r[name] for r in results if name in r]) for name in STREAM_TIMINGS
+    }
+    return report
+
+
+def _percentiles(samples: List[float]) -> Dict[str, Optional[float]]:
+    return {
+        "p50": percentile(samples, 50),
+        "p95": percentile(samples, 95),
+        "p99": percentile(samples, 99),
+    }
+
+
+def format_report(report: Dict[str, Any]) -> str:
+    """
+    Format a load test report as a human-readable table.
+    """
+    lines = [
+        f"Solves: {report['completed']}/{report['solves']} completed, {report['failed']} failed "
+        f"(concurrency {report['concurrency']})",
+        f"Elapsed: {report['elapsed_seconds']:.2f}s, throughput: {report['throughput_per_second']:.2f} solves/s",
+        f"File I/O kept off the event loop: {report.get('file_io_offloaded_seconds', 0.0) * 1000:.1f}ms",
+        f"{'stage':<22}{'p50':>10}{'p95':>10}{'p99':>10}",
+    ]
+    for stage, stats in report["stages"].items():
+        lines.append(f"{stage:<22}{_cells(stats, 's')}")
+    lines.append(f"{'math_master stream':<22}{'p50':>10}{'p95':>10}{'p99':>10}")
+    for name, stats in report.get("stream", {}).items():
+        lines.append(f"{name:<22}{_cells(stats, '' if name == 'tokens_per_second' else 's')}")
+    return "\n".join(lines)
+
+
+def _cells(stats: Dict[str, Optional[float]], unit: str) -> str:
+    width = 10 - len(unit)
+    return "".join(
+        f"{stats[p]:>{width}.3f}{unit}" if stats[p] is not None else f"{'-':>10}" for p in ("p50", "p95", "p99")
+    )
@@ -0,0 +1,287 @@
+"""
+Utility module for protecting login against floods of password guesses.
+
+Every login attempt that reaches bcrypt costs a few hundred milliseconds of CPU, so a
+credential-stuffing script can keep the password workers busy and starve real users.
+The guard turns attempts away before bcrypt runs:
+
+- A short-lived negative cache remembers (username, password) pairs that just failed,
+  keyed by an HMAC digest under a per-process random key, so replaying the same guess
+  is answered as invalid straight away.
+- Token buckets per client IP, and per username from each client IP, bound how fast
+  guesses are checked; attempts beyond them are rejected until a token refills. A
+  successful login gives its username token back, so only failed attempts use up a
+  username's bucket, and a stranger guessing a password from elsewhere cannot lock
+  its owner out.
+
+The per-IP limit is charged for every attempt, since each one runs bcrypt. Its defaults
+leave room for a classroom of a few dozen users signing in at once behind one NAT
+address; raise them for larger sites behind one address, or set LOGIN_IP_PER_MINUTE=0
+when a proxy in front of the API already limits clients.
+
+A rejected attempt costs a digest and a dictionary lookup. Each one is counted with the
+bcrypt time it saved, estimated from the mean time of the verifications that ran.
+
+Settings:
+    LOGIN_USERNAME_BURST: Failed attempts per username and client IP allowed at once (default 5)
+    LOGIN_USERNAME_PER_MINUTE: Failed attempts per username and client IP refilled per minute; 0 disables the limit (default 5)
+    LOGIN_IP_BURST: Attempts per client IP allowed at once (default 100)
+    LOGIN_IP_PER_MINUTE: Attempts per client IP refilled per minute; 0 disables the limit (default 100)
+    LOGIN_FAILURE_CACHE_SECONDS: How long a failed pair is answered from memory; 0 disables (default 60)
+    LOGIN_FAILURE_CACHE_SIZE: Failed pairs kept at most (default 10000)
+    LOGIN_GUARD_MAX_KEYS: Usernames and IPs tracked at most by each limiter (default 100000)
+"""
+import hashlib
+import hmac
+import logging
+import math
+import os
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from typing import Hashable, Optional, Tuple
+
+from linda_server.utils.metrics import metrics
+from linda_server.utils.password import DEFAULT_BCRYPT_ROUNDS, get_bcrypt_rounds
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+DEFAULT_USERNAME_BURST = 5
+DEFAULT_USERNAME_PER_MINUTE = 5
+# Sized for a classroom signing in behind one NAT address
+DEFAULT_IP_BURST = 100
+DEFAULT_IP_PER_MINUTE = 100
+DEFAULT_FAILURE_CACHE_SECONDS = 60
+DEFAULT_FAILURE_CACHE_SIZE = 10000
+DEFAULT_MAX_KEYS = 100000
+# bcrypt verification time at the default cost before any has been measured
+DEFAULT_VERIFY_SECONDS = 0.25
+
+class LoginThrottledError(Exception):
+    """Too many login attempts for a username or client IP."""
+
+    def __init__(self, reason: str, retry_after: float):
+        super().__init__(f"Too many login attempts, try again in {math.ceil(retry_after)} seconds")
+        self.reason = reason
+        self.retry_after = retry_after
+
+class TokenBuckets:
+    """Token buckets keyed by name, refilled continuously and bounded in number."""
+
+    def __init__(self, capacity: float, per_second: float, max_keys: int = DEFAULT_MAX_KEYS):
+        self.capacity = float(capacity)
+        self.per_second = float(per_second)
+        self.max_keys = max_keys
+        # key -> (tokens, monotonic time they were counted)
+        self._buckets: "OrderedDict[Hashable, Tuple[float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key: Hashable, now: Optional[float] = None) -> float:
+        """
+        Take a token from a key's bucket.
+
+        Args:
+            key: Client IP, or username and client IP
+            now: Current time from time.monotonic(), for tests
+
+        Returns:
+            float: 0 if a token was taken (or the limit is disabled), otherwise seconds until one refills
+        """
+        if self.per_second <= 0:
+            return 0.0
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            tokens, counted_at = self._buckets.get(key, (self.capacity, now))
+            tokens = min(self.capacity, tokens + (now - counted_at) * self.per_second)
+            if tokens >= 1:
+                self._buckets[key] = (tokens - 1, now)
+                self._buckets.move_to_end(key)
+                # A bucket evicted here is simply full again when its key comes back
+                while len(self._buckets) > self.max_keys:
+                    self._buckets.popitem(last=False)
+                return 0.0
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+        return (1 - tokens) / self.per_second
+
+    def give_back(self, key: Hashable) -> None:
+        """
+        Return a token taken from a key's bucket, up to its capacity.
+
+        Args:
+            key: The key the token was taken for
+        """
+        if self.per_second <= 0:
+            return
+        with self._lock:
+            entry = self._buckets.get(key)
+            if entry is not None:
+                self._buckets[key] = (min(self.capacity, entry[0] + 1), entry[1])
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._buckets)
+
+def estimated_verify_seconds() -> float:
+    """
+    Get the mean bcrypt time of the password verifications that ran, excluding queueing.
+    """
+    total = metrics.get_histogram("password_hash_seconds", {"operation": "verify"})
+    waited = metrics.get_histogram("password_hash_queue_wait_seconds", {"operation": "verify"})
+    if total and total["count"]:
+        return max(0.0, total["sum"] - (waited["sum"] if waited else 0.0)) / total["count"]
+    # Each extra round doubles the work
+    return DEFAULT_VERIFY_SECONDS * 2 ** (get_bcrypt_rounds() - DEFAULT_BCRYPT_ROUNDS)
+
+class LoginGuard:
+    """Rejects login attempts before bcrypt when they are repeated or too frequent."""
+
+    def __init__(
+        self,
+        username_buckets: Optional[TokenBuckets] = None,
+        ip_buckets: Optional[TokenBuckets] = None,
+        failure_ttl: Optional[float] = None,
+        failure_cache_size: Optional[int] = None,
+    ):
+        max_keys = int(os.getenv("LOGIN_GUARD_MAX_KEYS", str(DEFAULT_MAX_KEYS)))
+        self.username_buckets = username_buckets if username_buckets is not None else TokenBuckets(
+            float(os.getenv("LOGIN_USERNAME_BURST", str(DEFAULT_USERNAME_BURST))),
+            float(os.getenv("LOGIN_USERNAME_PER_MINUTE", str(DEFAULT_USERNAME_PER_MINUTE))) / 60,
+            max_keys,
+        )
+        self.ip_buckets = ip_buckets if ip_buckets is not None else TokenBuckets(
+            float(os.getenv("LOGIN_IP_BURST", str(DEFAULT_IP_BURST))),
+            float(os.getenv("LOGIN_IP_PER_MINUTE", str(DEFAULT_IP_PER_MINUTE))) / 60,
+            max_keys,
+        )
+        self.failure_ttl = failure_ttl if failure_ttl is not None else float(
+            os.getenv("LOGIN_FAILURE_CACHE_SECONDS", str(DEFAULT_FAILURE_CACHE_SECONDS))
+        )
+        self.failure_cache_size = failure_cache_size if failure_cache_size is not None else int(
+            os.getenv("LOGIN_FAILURE_CACHE_SIZE", str(DEFAULT_FAILURE_CACHE_SIZE))
+        )
+        # Digests are only comparable within this process, never to a password hash
+        self._digest_key = secrets.token_bytes(32)
+        # digest -> (username, expiry, whether the failure ran bcrypt)
+        self._failures: "OrderedDict[bytes, Tuple[str, float, bool]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _digest(self, username: str, password: str) -> bytes:
+        message = username.encode("utf-8") + b"\0" + password.encode("utf-8")
+        return hmac.new(self._digest_key, message, hashlib.sha256).digest()
+
+    def recently_failed(self, username: str, password: str, now: Optional[float] = None) -> bool:
+        """
+        Check whether a username and password failed to log in moments ago.
+
+        Args:
+            username: Username of the attempt
+            password: Plain text password of the attempt
+            now: Current time from time.monotonic(), for tests
+
+        Returns:
+            bool: True if the attempt can be rejected as invalid without checking it
+        """
+        if self.failure_ttl <= 0:
+            return False
+        now = time.monotonic() if now is None else now
+        key = self._digest(username, password)
+        with self._lock:
+            entry = self._failures.get(key)
+            if entry is None:
+                return False
+            if now >= entry[1]:
+                del self._failures[key]
+                return False
+            verified = entry[2]
+        self._rejected("failed_recently", verified)
+        return True
+
+    def admit(self, username: str, client_ip: Optional[str] = None, now: Optional[float] = None) -> None:
+        """
+        Take a token from the client IP's bucket and from the bucket of the username at
+        that IP for an attempt.
+
+        Args:
+            username: Username of the attempt
+            client_ip: Address the attempt came from, if known
+            now: Current time from time.monotonic(), for tests
+
+        Raises:
+            LoginThrottledError: If either bucket is empty
+        """
+        for reason, buckets, key in (("ip_rate", self.ip_buckets, client_ip), ("username_rate", self.username_buckets, (username, client_ip))):
+            if key is None:
+                continue
+            retry_after = buckets.take(key, now)
+            if retry_after:
+                self._rejected(reason, True)
+                logger.warning(f"Login throttled ({reason}) for user {username} from {client_ip}")
+                raise LoginThrottledError(reason, retry_after)
+
+    def record_success(self, username: str, client_ip: Optional[str] = None) -> None:
+        """
+        Give back the username token of an attempt that logged in, so that only failed
+        attempts count against a username.
+
+        Args:
+            username: Username of the attempt
+            client_ip: Address the attempt came from, if known
+        """
+        self.username_buckets.give_back((username, client_ip))
+
+    def record_failure(self, username: str, password: str, verified: bool = True, now: Optional[float] = None) -> None:
+        """
+        Remember a failed attempt so that repeating it is rejected without checking it.
+
+        Args:
+            username: Username of the attempt
+            password: Plain text password of the attempt
+            verified: Whether checking the attempt ran bcrypt (False for unknown users)
+            now: Current time from time.monotonic(), for tests
+        """
+        if self.failure_ttl <= 0 or self.failure_cache_size <= 0:
+            return
+        now = time.monotonic() if now is None else now
+        key = self._digest(username, password)
+        with self._lock:
+            self._failures[key] = (username, now + self.failure_ttl, verified)
+            self._failures.move_to_end(key)
+            while len(self._failures) > self.failure_cache_size:
+                self._failures.popitem(last=False)
+            size = len(self._failures)
+        metrics.set_gauge("login_failure_cache_size", size)
+
+    def forget(self, username: str) -> None:
+        """
+        Forget a user's failed attempts, e.g. when the user is created or sets a new password.
+
+        Args:
+            username: The user's username
+        """
+        with self._lock:
+            for key in [key for key, entry in self._failures.items() if entry[0] == username]:
+                del self._failures[key]
+            size = len(self._failures)
+        metrics.set_gauge("login_failure_cache_size", size)
+
+    def _rejected(self, reason: str, saved_bcrypt: bool) -> None:
+        metrics.inc("login_attempts_rejected_total", labels={"reason": reason})
+        if saved_bcrypt:
+            metrics.inc("login_bcrypt_verifications_saved_total")
+            metrics.inc("login_bcrypt_seconds_saved_total", estimated_verify_seconds())
+
+_guard: Optional[LoginGuard] = None
+_guard_lock = threading.Lock()
+
+def get_login_guard() -> LoginGuard:
+    """
+    Get the process-wide login guard.
+    """
+    global _guard
+    with _guard_lock:
+        if _guard is None:
+            _guard = LoginGuard()
+        return _guard
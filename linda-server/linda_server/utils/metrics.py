@@ -0,0 +1,131 @@
+"""
+Utility module for lightweight in-process metrics.
+
+Counters, gauges and histograms are kept in a single process-wide registry and
+exposed as a JSON snapshot through the /metrics endpoint of the FastAPI app.
+"""
+import bisect
+import threading
+from typing import Any, Dict, Optional, Sequence
+
+Labels = Optional[Dict[str, Any]]
+
+# Upper bounds (seconds) suitable for latencies from milliseconds to minutes
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+
+def _metric_key(name: str, labels: Labels) -> str:
+    if not labels:
+        return name
+    label_text = ",".join(f"{k}={labels[k]}" for k in sorted(labels))
+    return f"{name}{{{label_text}}}"
+
+
+def _export_histogram(histogram: Dict[str, Any]) -> Dict[str, Any]:
+    buckets: Dict[str, int] = {}
+    cumulative = 0
+    for bound, count in zip(list(histogram["bounds"]) + ["+Inf"], histogram["counts"]):
+        cumulative += count
+        buckets[str(bound)] = cumulative
+    return {"buckets": buckets, "sum": histogram["sum"], "count": histogram["count"]}
+
+
+class MetricsRegistry:
+    """Thread-safe registry of named counters, gauges and histograms."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, float] = {}
+        self._gauges: Dict[str, float] = {}
+        self._histograms: Dict[str, Dict[str, Any]] = {}
+
+    def inc(self, name: str, amount: float = 1, labels: Labels = None) -> None:
+        """
+        Increment a counter.
+
+        Args:
+            name: Counter name
+            amount: Amount to add
+            labels: Optional labels distinguishing series of the same counter
+        """
+        key = _metric_key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def set_gauge(self, name: str, value: float, labels: Labels = None) -> None:
+        """
+        Set a gauge to the given value.
+
+        Args:
+            name: Gauge name
+            value: Current value
+            labels: Optional labels distinguishing series of the same gauge
+        """
+        key = _metric_key(name, labels)
+        with self._lock:
+            self._gauges[key] = value
+
+    def observe(self, name: str, value: float, labels: Labels = None, buckets: Optional[Sequence[float]] = None) -> None:
+        """
+        Record an observation in a histogram.
+
+        Args:
+            name: Histogram name
+            value: Observed value
+            labels: Optional labels distinguishing series of the same histogram
+            buckets: Bucket upper bounds, fixed by the first observation (defaults to DEFAULT_BUCKETS)
+        """
+        key = _metric_key(name, labels)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                bounds = tuple(sorted(buckets or DEFAULT_BUCKETS))
+                histogram = {"bounds": bounds, "counts": [0] * (len(bounds) + 1), "sum": 0.0, "count": 0}
+                self._histograms[key] = histogram
+            histogram["counts"][bisect.bisect_left(histogram["bounds"], value)] += 1
+            histogram["sum"] += value
+            histogram["count"] += 1
+
+    def get_histogram(self, name: str, labels: Labels = None) -> Optional[Dict[str, Any]]:
+        """
+        Get a histogram as {"buckets": {upper_bound: cumulative_count}, "sum", "count"}, or None.
+        """
+        key = _metric_key(name, labels)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            return _export_histogram(histogram) if histogram else None
+
+    def get(self, name: str, labels: Labels = None) -> float:
+        """
+        Get the current value of a counter or gauge (0 if it was never recorded).
+        """
+        key = _metric_key(name, labels)
+        with self._lock:
+            if key in self._counters:
+                return self._counters[key]
+            return self._gauges.get(key, 0)
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        """
+        Get a copy of all recorded metrics.
+
+        Returns:
+            Dict with "counters", "gauges" and "histograms" mappings
+        """
+        with self._lock:
+            return {
+                "counters": dict(self._counters),
+                "gauges": dict(self._gauges),
+                "histograms": {key: _export_histogram(h) for key, h in self._histograms.items()},
+            }
+
+    def reset(self) -> None:
+        """
+        Clear all recorded metrics.
+        """
+        with self._lock:
+            self._counters.clear()
+            self._gauges.clear()
+            self._histograms.clear()
+
+
+metrics = MetricsRegistry()
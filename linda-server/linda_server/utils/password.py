@@ -1,19 +1,54 @@
+"""
+Utility module for hashing and verifying passwords with bcrypt.
+
+bcrypt is deliberately CPU-bound, so hashing on the event loop stalls every other
+request, and a burst of logins pins the server. The async functions run bcrypt on a
+bounded process pool instead, where it also escapes the GIL. Requests beyond the
+pool's size wait their turn; the waiting ones are exported as a queue depth.
+
+Settings:
+    BCRYPT_ROUNDS: Cost factor of new hashes (default 12); existing hashes keep their own
+    PASSWORD_HASH_WORKERS: Worker processes (default: CPU count, at most 4)
+    PASSWORD_HASH_START_METHOD: multiprocessing start method of the workers (default spawn)
+"""
+import asyncio
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Tuple
 import bcrypt
-from typing import Tuple
 import logging
 
+from linda_server.utils.metrics import metrics
+
 logger = logging.getLogger(__name__)
 
-def hash_password(password: str) -> str:
+DEFAULT_BCRYPT_ROUNDS = 12
+MAX_DEFAULT_HASH_WORKERS = 4
+HASH_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+def get_bcrypt_rounds() -> int:
+    """
+    Get the configured bcrypt cost factor for new hashes.
+    """
+    rounds = int(os.getenv("BCRYPT_ROUNDS", str(DEFAULT_BCRYPT_ROUNDS)))
+    if not 4 <= rounds <= 31:
+        raise ValueError(f"BCRYPT_ROUNDS must be between 4 and 31, got {rounds}")
+    return rounds
+
+def hash_password(password: str, rounds: Optional[int] = None) -> str:
     """
     Hash a password using bcrypt.
     Args:
         password: Plain text password
+        rounds: Cost factor, defaults to BCRYPT_ROUNDS
     Returns:
         Hashed password string
     """
     try:
-        salt = bcrypt.gensalt()
+        salt = bcrypt.gensalt(rounds or get_bcrypt_rounds())
         hashed = bcrypt.hashpw(password.encode('utf-8'), salt)
         return hashed.decode('utf-8')
     except Exception as e:
@@ -37,3 +72,118 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     except Exception as e:
         logger.error(f"Error verifying password: {str(e)}")
         return False
+
+def _timed_hash(password: str, rounds: int) -> Tuple[str, float]:
+    # Runs in a worker process; returns how long bcrypt itself took
+    started = time.perf_counter()
+    return hash_password(password, rounds), time.perf_counter() - started
+
+def _timed_verify(plain_password: str, hashed_password: str) -> Tuple[bool, float]:
+    started = time.perf_counter()
+    return verify_password(plain_password, hashed_password), time.perf_counter() - started
+
+def get_password_hash_workers() -> int:
+    """
+    Get the configured number of password hashing processes.
+    """
+    default = min(MAX_DEFAULT_HASH_WORKERS, os.cpu_count() or 1)
+    return max(1, int(os.getenv("PASSWORD_HASH_WORKERS", str(default))))
+
+class PasswordHasher:
+    """Runs bcrypt on a bounded process pool and tracks its queue."""
+
+    def __init__(self, workers: Optional[int] = None):
+        self.workers = workers or get_password_hash_workers()
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._in_flight = 0
+
+    @property
+    def queue_depth(self) -> int:
+        """Requests waiting for a free worker."""
+        return max(0, self._in_flight - self.workers)
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # spawn by default: forking the threaded server process is not safe
+                context = multiprocessing.get_context(os.getenv("PASSWORD_HASH_START_METHOD", "spawn"))
+                self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=context)
+            return self._executor
+
+    async def _run(self, operation: str, func, *args):
+        executor = self._get_executor()
+        submitted = time.perf_counter()
+        self._track(1)
+        try:
+            result, run_seconds = await asyncio.get_running_loop().run_in_executor(executor, func, *args)
+        finally:
+            self._track(-1)
+        total = time.perf_counter() - submitted
+        labels = {"operation": operation}
+        metrics.inc("password_hash_total", labels=labels)
+        metrics.observe("password_hash_seconds", total, labels=labels, buckets=HASH_BUCKETS)
+        metrics.observe("password_hash_queue_wait_seconds", max(0.0, total - run_seconds), labels=labels, buckets=HASH_BUCKETS)
+        return result
+
+    def _track(self, delta: int) -> None:
+        with self._lock:
+            self._in_flight += delta
+            in_flight = self._in_flight
+        metrics.set_gauge("password_hash_in_flight", in_flight)
+        metrics.set_gauge("password_hash_queue_depth", max(0, in_flight - self.workers))
+
+    async def hash(self, password: str) -> str:
+        """
+        Hash a password on the worker pool with the configured cost factor.
+        """
+        return await self._run("hash", _timed_hash, password, get_bcrypt_rounds())
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        """
+        Verify a password against its hash on the worker pool.
+        """
+        return await self._run("verify", _timed_verify, plain_password, hashed_password)
+
+    def close(self) -> None:
+        """
+        Shut the worker processes down.
+        """
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+_hasher: Optional[PasswordHasher] = None
+_hasher_lock = threading.Lock()
+
+def get_password_hasher() -> PasswordHasher:
+    """
+    Get the process-wide password hasher.
+    """
+    global _hasher
+    with _hasher_lock:
+        if _hasher is None:
+            _hasher = PasswordHasher()
+        return _hasher
+
+async def hash_password_async(password: str) -> str:
+    """
+    Hash a password without blocking the event loop.
+    Args:
+        password: Plain text password
+    Returns:
+        Hashed password string
+    """
+    return await get_password_hasher().hash(password)
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """
+    Verify a password against its hash without blocking the event loop.
+    Args:
+        plain_password: Plain text password to verify
+        hashed_password: Hashed password to check against
+    Returns:
+        Boolean indicating if password matches
+    """
+    return await get_password_hasher().verify(plain_password, hashed_password)
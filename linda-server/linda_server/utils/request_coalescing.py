@@ -0,0 +1,185 @@
+"""
+Utility module for coalescing identical in-flight requests.
+
+SingleFlight lets concurrent callers with the same key share one awaited result.
+SharedStreamGroup does the same for streams: one producer reads the upstream
+stream and every subscriber receives all of its chunks, including the ones that
+were produced before it joined.
+
+A call or stream is cancelled once its last caller goes away, and it is forgotten in
+the same step, so a request arriving afterwards starts a new one instead of joining
+one that is being torn down.
+
+Followers share the leader's call, and with it the leader's deadline: a follower
+whose step has a longer timeout than the leader's can still time out when the
+leader's deadline runs out.
+"""
+import asyncio
+import logging
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, TypeVar
+
+from linda_server.utils.metrics import metrics
+from linda_server.utils.stream_relay import close_stream
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+T = TypeVar("T")
+
+
+class _Flight:
+    """A single shared call and the number of callers waiting on it."""
+    def __init__(self, task: "asyncio.Task[Any]"):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Share one in-flight call between concurrent callers with the same key."""
+    def __init__(self, name: str):
+        self.name = name
+        self._flights: Dict[str, _Flight] = {}
+
+    def in_flight(self) -> int:
+        return len(self._flights)
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[T]]) -> T:
+        """
+        Run fn once for all concurrent callers using the same key.
+
+        Args:
+            key: Canonical request key
+            fn: Factory for the awaitable to run if no call is in flight
+
+        Returns:
+            The result of the shared call
+        """
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = _Flight(asyncio.ensure_future(fn()))
+            self._flights[key] = flight
+            flight.task.add_done_callback(lambda _: self._forget(key, flight))
+            metrics.inc("coalesced_calls_total", labels={"group": self.name, "role": "leader"})
+        else:
+            metrics.inc("coalesced_calls_total", labels={"group": self.name, "role": "follower"})
+
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)
+        except asyncio.CancelledError:
+            # Cancel the shared call only when nobody else is waiting for it
+            if flight.waiters == 1 and not flight.task.done():
+                self._forget(key, flight)
+                flight.task.cancel()
+            raise
+        finally:
+            flight.waiters -= 1
+
+    def _forget(self, key: str, flight: _Flight) -> None:
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+
+
+class _SharedStream:
+    """One upstream stream broadcast to any number of subscribers."""
+    def __init__(self, factory: Callable[[], Awaitable[AsyncIterator[Any]]]):
+        self._factory = factory
+        self._condition = asyncio.Condition()
+        self._producer: Optional["asyncio.Task[None]"] = None
+        self.chunks: List[Any] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.subscribers = 0
+        self.cancelled = False
+        self.on_finished: Optional[Callable[[], None]] = None
+
+    def _ensure_started(self) -> None:
+        if self._producer is None:
+            self._producer = asyncio.ensure_future(self._produce())
+
+    async def _produce(self) -> None:
+        stream = None
+        try:
+            stream = await self._factory()
+            async for chunk in stream:
+                async with self._condition:
+                    self.chunks.append(chunk)
+                    self._condition.notify_all()
+        except BaseException as e:
+            self.error = e
+            if isinstance(e, asyncio.CancelledError):
+                raise
+        finally:
+            async with self._condition:
+                self.done = True
+                self._condition.notify_all()
+            if self.on_finished:
+                self.on_finished()
+            await close_stream(stream)
+
+    async def subscribe(self) -> AsyncIterator[Any]:
+        self.subscribers += 1
+        self._ensure_started()
+        index = 0
+        try:
+            while True:
+                async with self._condition:
+                    while index >= len(self.chunks) and not self.done:
+                        await self._condition.wait()
+                    batch = self.chunks[index:]
+                    index = len(self.chunks)
+                    finished = self.done
+                for chunk in batch:
+                    yield chunk
+                if finished:
+                    if self.error is not None:
+                        raise self.error
+                    return
+        finally:
+            self.subscribers -= 1
+            # Stop generating once the last subscriber has gone away
+            if self.subscribers == 0 and not self.done and self._producer is not None:
+                # Forget the stream before cancelling it, so nobody joins it while it is torn down
+                self.cancelled = True
+                if self.on_finished:
+                    self.on_finished()
+                self._producer.cancel()
+
+
+class SharedStreamGroup:
+    """Share one upstream stream between concurrent subscribers with the same key."""
+    def __init__(self, name: str):
+        self.name = name
+        self._streams: Dict[str, _SharedStream] = {}
+
+    def in_flight(self) -> int:
+        return len(self._streams)
+
+    def subscribe(
+        self,
+        key: str,
+        factory: Callable[[], Awaitable[AsyncIterator[Any]]],
+    ) -> AsyncIterator[Any]:
+        """
+        Subscribe to the stream for a key, starting a new producer if none is running.
+
+        Args:
+            key: Canonical request key
+            factory: Coroutine factory that opens the upstream stream
+
+        Returns:
+            AsyncIterator: Every chunk of the shared stream, from the beginning
+        """
+        shared = self._streams.get(key)
+        if shared is None or shared.done or shared.cancelled:
+            shared = _SharedStream(factory)
+            shared.on_finished = lambda: self._forget(key, shared)
+            self._streams[key] = shared
+            metrics.inc("coalesced_streams_total", labels={"group": self.name, "role": "leader"})
+        else:
+            metrics.inc("coalesced_streams_total", labels={"group": self.name, "role": "follower"})
+        return shared.subscribe()
+
+    def _forget(self, key: str, shared: _SharedStream) -> None:
+        if self._streams.get(key) is shared:
+            del self._streams[key]
@@ -0,0 +1,233 @@
+"""
+Utility module for relaying streamed LLM chunks to the Restack websocket.
+
+This mirrors restack_ai's stream_to_websocket, but consumes async iterators so the
+upstream stream is read without blocking the worker's event loop. The relay also
+watches its consumer: if the websocket is closed from the other side or the step is
+cancelled, it stops reading and closes the upstream stream so generation stops.
+"""
+import asyncio
+import logging
+import os
+import time
+import uuid
+from typing import Any, AsyncIterator, List, Optional
+
+import websockets
+from websockets.exceptions import ConnectionClosed
+from openai.types.chat import ChatCompletionChunk
+from restack_ai.function import function_info, heartbeat
+from temporalio.exceptions import ApplicationError
+
+from linda_server.utils.metrics import metrics
+from linda_server.utils.stream_stats import StreamTimer
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+DEFAULT_API_ADDRESS = "localhost:9233"
+DEFAULT_REPLAY_CHUNK_SIZE = 16
+DEFAULT_HEARTBEAT_INTERVAL_SECONDS = 5.0
+
+# ApplicationError type raised by llm_chat when its stream's consumer went away
+STREAM_ABANDONED_ERROR_TYPE = "StreamAbandoned"
+
+
+class StreamAbandonedError(Exception):
+    """Raised when the consumer of a relayed stream goes away before the stream ends."""
+
+
+def get_stream_api_address() -> Optional[str]:
+    """
+    Get the Restack API address used for streaming.
+
+    Returns:
+        Optional[str]: The configured API address, if any
+    """
+    return os.environ.get("RESTACK_API_ADDRESS") or os.environ.get("API_ADDRESS")
+
+
+def get_heartbeat_interval() -> float:
+    """
+    Seconds between heartbeats while a relayed stream is idle (e.g. waiting for the first token).
+    """
+    return float(os.getenv("LLM_STREAM_HEARTBEAT_SECONDS", str(DEFAULT_HEARTBEAT_INTERVAL_SECONDS)))
+
+
+def chunk_content(chunk: Any) -> Optional[str]:
+    """
+    Extract the delta text from an OpenAI-compatible chat completion chunk.
+
+    Args:
+        chunk: A chat completion chunk
+
+    Returns:
+        Optional[str]: The delta content, or None if the chunk carries no text
+    """
+    if not chunk.choices:
+        return None
+    delta = chunk.choices[0].delta
+    return delta.content if delta else None
+
+
+async def close_stream(stream: Any) -> None:
+    """
+    Close an upstream stream or async generator, releasing its connection.
+
+    Args:
+        stream: An OpenAI AsyncStream, async generator or None
+    """
+    close = getattr(stream, "aclose", None) or getattr(stream, "close", None)
+    if close is None:
+        return
+    try:
+        result = close()
+        if hasattr(result, "__await__"):
+            await result
+    except Exception as e:
+        logger.warning(f"Error closing upstream stream: {str(e)}")
+
+
+def make_chunk(chunk_id: str, model: str, content: Optional[str], finish_reason: Optional[str] = None) -> ChatCompletionChunk:
+    """
+    Build an OpenAI-compatible chat completion chunk carrying the given text.
+
+    Args:
+        chunk_id: Completion id shared by all chunks of one response
+        model: Model name reported in the chunk
+        content: Delta text, or None for the final chunk
+        finish_reason: Finish reason for the final chunk
+
+    Returns:
+        ChatCompletionChunk: The constructed chunk
+    """
+    return ChatCompletionChunk(
+        id=chunk_id,
+        object="chat.completion.chunk",
+        created=int(time.time()),
+        model=model,
+        choices=[{
+            "index": 0,
+            "delta": {"role": "assistant", "content": content} if content is not None else {},
+            "finish_reason": finish_reason,
+        }],
+    )
+
+
+async def iter_text_chunks(
+    text: str,
+    model: str,
+    chunk_size: int = DEFAULT_REPLAY_CHUNK_SIZE,
+) -> AsyncIterator[ChatCompletionChunk]:
+    """
+    Replay a complete response as a stream of chat completion chunks.
+
+    Args:
+        text: The full response text
+        model: Model name reported in the chunks
+        chunk_size: Number of characters per chunk
+
+    Yields:
+        ChatCompletionChunk: Chunks in the same shape as an upstream stream
+    """
+    chunk_id = f"chatcmpl-replay-{uuid.uuid4().hex}"
+    for start in range(0, len(text), chunk_size):
+        yield make_chunk(chunk_id, model, text[start:start + chunk_size])
+    yield make_chunk(chunk_id, model, None, finish_reason="stop")
+
+
+async def relay_stream_to_websocket(
+    stream: AsyncIterator[Any],
+    api_address: Optional[str] = None,
+    timer: Optional[StreamTimer] = None,
+) -> str:
+    """
+    Relay an async stream of chat completion chunks to the agent's websocket.
+
+    Args:
+        stream: Async iterator of OpenAI-compatible chat completion chunks
+        api_address: The address of the Restack Engine API
+        timer: Optional timer recording chunk arrival and websocket send times
+
+    Returns:
+        str: The combined text of all streamed chunks
+
+    Raises:
+        StreamAbandonedError: If the websocket was closed by the consumer first
+        ApplicationError: If relaying the stream fails
+    """
+    if api_address is None:
+        api_address = DEFAULT_API_ADDRESS
+
+    info = function_info()
+    protocol = "ws" if api_address.startswith("localhost") else "wss"
+    websocket_url = (
+        f"{protocol}://{api_address}/stream/ws/agent"
+        f"?agentId={info.workflow_id}&runId={info.workflow_run_id}"
+    )
+
+    collected_messages: List[str] = []
+
+    async def pump(websocket: Any) -> None:
+        async for chunk in stream:
+            content = chunk_content(chunk)
+            if timer:
+                timer.chunk(content)
+            raw_chunk_json = chunk.model_dump_json()
+            heartbeat(raw_chunk_json)
+            send_started = time.monotonic()
+            await websocket.send(raw_chunk_json)
+            if timer:
+                timer.sent(time.monotonic() - send_started)
+            if content:
+                collected_messages.append(content)
+
+    async def keep_alive() -> None:
+        # Heartbeats are how a cancelled step learns about its cancellation
+        interval = get_heartbeat_interval()
+        while True:
+            await asyncio.sleep(interval)
+            heartbeat()
+
+    try:
+        async with websockets.connect(websocket_url) as websocket:
+            pump_task = asyncio.ensure_future(pump(websocket))
+            closed_task = asyncio.ensure_future(websocket.wait_closed())
+            keep_alive_task = asyncio.ensure_future(keep_alive())
+            reason = None
+            try:
+                await asyncio.wait({pump_task, closed_task}, return_when=asyncio.FIRST_COMPLETED)
+                if not pump_task.done():
+                    reason = "disconnected"
+                    raise StreamAbandonedError("Stream consumer disconnected")
+                pump_task.result()
+            except ConnectionClosed as e:
+                reason = "disconnected"
+                raise StreamAbandonedError(f"Stream consumer disconnected: {e}") from e
+            except asyncio.CancelledError:
+                reason = "cancelled"
+                raise
+            finally:
+                for task in (pump_task, closed_task, keep_alive_task):
+                    task.cancel()
+                await asyncio.gather(pump_task, closed_task, keep_alive_task, return_exceptions=True)
+                if reason:
+                    # Stop reading so the upstream generation is closed and its slot released
+                    await close_stream(stream)
+                    metrics.inc("llm_stream_abandoned_total", labels={"reason": reason})
+                    logger.info(f"Relayed stream abandoned ({reason}) after {len(collected_messages)} chunks")
+                try:
+                    # Always tell the frontend the stream is over
+                    await websocket.send("[DONE]")
+                    await websocket.close()
+                except ConnectionClosed:
+                    pass
+                if timer:
+                    await timer.finish()
+            return "".join(collected_messages)
+    except StreamAbandonedError:
+        raise
+    except Exception as e:
+        error_message = f"Error relaying stream to websocket: {e}"
+        logger.exception(error_message)
+        raise ApplicationError(error_message) from e
@@ -0,0 +1,153 @@
+"""
+Utility module for timing streamed LLM responses.
+
+A StreamTimer follows one stream and exports time to first token, inter-chunk gaps,
+total tokens and throughput as histograms labelled by model, agent and stage. The
+"upstream" stage is measured where llm_chat reads the provider's stream. The "relay"
+stage is measured where the chunks are forwarded to the Restack websocket and also
+records the time spent in websocket sends. Comparing the two tells provider
+latency apart from time lost in the worker's event loop or the websocket relay.
+"""
+import asyncio
+import logging
+import time
+from typing import Any, Dict, List, Optional
+
+from pydantic import BaseModel
+from restack_ai.function import function_info
+
+from linda_server.utils.metrics import metrics
+from linda_server.utils.token_budget import count_tokens
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+TOKEN_BUCKETS = (16, 64, 256, 1024, 2048, 4096, 8192, 16384, 32768)
+THROUGHPUT_BUCKETS = (1, 5, 10, 20, 40, 80, 160, 320, 640)
+
+
+class StreamStats(BaseModel):
+    """Timing summary of one streamed response."""
+    stage: str
+    model: str
+    agent: str
+    ttft: Optional[float] = None
+    duration: float = 0.0
+    chunks: int = 0
+    tokens: int = 0
+    tokens_per_second: Optional[float] = None
+    mean_gap: Optional[float] = None
+    max_gap: Optional[float] = None
+    send_seconds: float = 0.0
+
+
+def current_agent_name() -> str:
+    """
+    Get the agent (workflow type) that scheduled the current function, if known.
+
+    Returns:
+        str: The agent name, or "unknown" outside a Restack function
+    """
+    try:
+        return function_info().workflow_type or "unknown"
+    except RuntimeError:
+        return "unknown"
+
+
+class StreamTimer:
+    """Collects chunk arrival times for one stream and exports them on finish."""
+    def __init__(self, stage: str, model: str, agent: Optional[str] = None, started: Optional[float] = None):
+        self.stage = stage
+        self.model = model
+        self.agent = agent or current_agent_name()
+        self.started = started if started is not None else time.monotonic()
+        self.first_chunk_at: Optional[float] = None
+        self.last_chunk_at: Optional[float] = None
+        self.chunks = 0
+        self.send_seconds = 0.0
+        self._gaps: List[float] = []
+        self._parts: List[str] = []
+        self._stats: Optional[StreamStats] = None
+
+    def chunk(self, content: Optional[str]) -> None:
+        """
+        Record the arrival of a chunk.
+
+        Args:
+            content: The chunk's delta text; chunks without text are not timed
+        """
+        if not content:
+            return
+        now = time.monotonic()
+        if self.first_chunk_at is None:
+            self.first_chunk_at = now
+        else:
+            self._gaps.append(now - self.last_chunk_at)
+        self.last_chunk_at = now
+        self.chunks += 1
+        self._parts.append(content)
+
+    def sent(self, seconds: float) -> None:
+        """
+        Record time spent forwarding a chunk downstream.
+        """
+        self.send_seconds += seconds
+
+    async def finish(self) -> StreamStats:
+        """
+        Summarize the stream and export its histograms. Safe to call more than once.
+
+        The completion is tokenized in a worker thread, so the event loop keeps serving
+        other streams while a long response is counted.
+
+        Returns:
+            StreamStats: The timing summary
+        """
+        if self._stats is not None:
+            return self._stats
+        labels = {"model": self.model, "agent": self.agent, "stage": self.stage}
+        stats = StreamStats(
+            stage=self.stage,
+            model=self.model,
+            agent=self.agent,
+            duration=time.monotonic() - self.started,
+            chunks=self.chunks,
+            send_seconds=self.send_seconds,
+        )
+        if self.first_chunk_at is not None:
+            stats.ttft = self.first_chunk_at - self.started
+            # Shielded so a cancellation arriving during cleanup still exports the stats
+            stats.tokens = await asyncio.shield(asyncio.to_thread(count_tokens, "".join(self._parts), self.model))
+            generating = self.last_chunk_at - self.first_chunk_at
+            if generating > 0:
+                stats.tokens_per_second = stats.tokens / generating
+            if self._gaps:
+                stats.mean_gap = sum(self._gaps) / len(self._gaps)
+                stats.max_gap = max(self._gaps)
+
+            metrics.observe("llm_stream_ttft_seconds", stats.ttft, labels=labels)
+            for gap in self._gaps:
+                metrics.observe("llm_stream_inter_token_gap_seconds", gap, labels=labels)
+            metrics.observe("llm_stream_tokens", stats.tokens, labels=labels, buckets=TOKEN_BUCKETS)
+            if stats.tokens_per_second is not None:
+                metrics.observe("llm_stream_tokens_per_second", stats.tokens_per_second, labels=labels, buckets=THROUGHPUT_BUCKETS)
+        metrics.observe("llm_stream_duration_seconds", stats.duration, labels=labels)
+        if self.stage == "relay":
+            metrics.observe("llm_stream_send_seconds", stats.send_seconds, labels=labels)
+
+        logger.info(
+            "Stream %s stats model=%s agent=%s ttft=%s tokens=%d tokens/s=%s duration=%.3fs",
+            self.stage, self.model, self.agent,
+            f"{stats.ttft:.3f}s" if stats.ttft is not None else "-",
+            stats.tokens,
+            f"{stats.tokens_per_second:.1f}" if stats.tokens_per_second is not None else "-",
+            stats.duration,
+        )
+        self._stats = stats
+        return stats
+
+    def summary(self) -> Optional[Dict[str, Any]]:
+        """
+        Get the finished summary as a dict, or None if the stream never finished here.
+        """
+        return self._stats.model_dump() if self._stats is not None else None
@@ -0,0 +1,223 @@
+"""
+Utility module for counting and budgeting prompt tokens.
+
+Tokens are counted locally with tiktoken when its encodings are available, and
+with a conservative characters-per-token estimate otherwise. Oversized prompts
+are fitted into the model's context budget by truncating the middle of the
+longest user messages, so we never send a request the API would reject.
+
+Loading an encoding can download its BPE file, and encoding a large prompt takes a
+while, so callers on the event loop preload the encodings at startup with
+preload_encodings and run fit_messages_to_budget in a thread.
+"""
+import logging
+import math
+import os
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+from linda_server.utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# Context windows (prompt + completion) of the models we use
+MODEL_CONTEXT_WINDOWS: Dict[str, int] = {
+    "gpt-4.1": 1047576,
+    "gpt-4.1-mini": 1047576,
+    "gpt-4.1-nano": 1047576,
+    "gpt-4o": 128000,
+    "gpt-4o-mini": 128000,
+    "gpt-4-turbo": 128000,
+    "gpt-3.5-turbo": 16385,
+}
+DEFAULT_CONTEXT_WINDOW = 128000
+DEFAULT_COMPLETION_RESERVE_TOKENS = 16384
+
+# Per-message framing overhead of the chat format
+TOKENS_PER_MESSAGE = 3
+TOKENS_PER_REPLY = 3
+CHARS_PER_TOKEN_ESTIMATE = 3.5
+
+TRUNCATION_MARKER = "\n\n[... {count} tokens truncated ...]\n\n"
+
+
+class PromptTooLargeError(ValueError):
+    """Raised when a prompt cannot be fitted into the model's context budget."""
+
+
+@lru_cache(maxsize=None)
+def _get_encoding(model: str) -> Optional[Any]:
+    try:
+        import tiktoken
+    except ImportError:
+        logger.info("tiktoken not installed, using estimated token counts")
+        return None
+    try:
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            return tiktoken.get_encoding("o200k_base")
+    except Exception as e:
+        logger.warning(f"Could not load tokenizer for {model}, using estimated token counts: {str(e)}")
+        return None
+
+
+def preload_encodings(models: Optional[List[str]] = None) -> int:
+    """
+    Load the tokenizers of the given models (default: every known model) ahead of use.
+
+    Args:
+        models: Model names to load tokenizers for
+
+    Returns:
+        int: Number of models with a tokenizer available
+    """
+    loaded = sum(1 for model in (models or MODEL_CONTEXT_WINDOWS) if _get_encoding(model) is not None)
+    logger.info(f"Preloaded tokenizers for {loaded} models")
+    return loaded
+
+
+def count_tokens(text: str, model: str) -> int:
+    """
+    Count the tokens in a piece of text.
+
+    Args:
+        text: The text to count
+        model: Model whose tokenizer should be used
+
+    Returns:
+        int: Number of tokens
+    """
+    if not text:
+        return 0
+    encoding = _get_encoding(model)
+    if encoding is None:
+        return math.ceil(len(text) / CHARS_PER_TOKEN_ESTIMATE)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def count_message_tokens(messages: List[Dict[str, str]], model: str) -> int:
+    """
+    Count the prompt tokens of a chat messages payload.
+
+    Args:
+        messages: List of {"role", "content"} dicts
+        model: Model whose tokenizer should be used
+
+    Returns:
+        int: Number of prompt tokens
+    """
+    total = TOKENS_PER_REPLY
+    for message in messages:
+        total += TOKENS_PER_MESSAGE
+        total += count_tokens(message.get("role", ""), model)
+        total += count_tokens(message.get("content") or "", model)
+    return total
+
+
+def get_prompt_budget(model: str) -> int:
+    """
+    Get the number of prompt tokens allowed for a model.
+
+    The budget is the model's context window (optionally capped by LLM_CONTEXT_BUDGET_TOKENS)
+    minus the tokens reserved for the completion.
+
+    Args:
+        model: Model name
+
+    Returns:
+        int: Maximum prompt tokens
+    """
+    window = MODEL_CONTEXT_WINDOWS.get(model, DEFAULT_CONTEXT_WINDOW)
+    cap = os.getenv("LLM_CONTEXT_BUDGET_TOKENS")
+    if cap:
+        window = min(window, int(cap))
+    reserve = int(os.getenv("LLM_COMPLETION_RESERVE_TOKENS", DEFAULT_COMPLETION_RESERVE_TOKENS))
+    return max(0, window - reserve)
+
+
+def _truncate_middle(text: str, keep_tokens: int, model: str) -> str:
+    """Keep the head and tail of text within roughly keep_tokens tokens."""
+    total = count_tokens(text, model)
+    if total <= keep_tokens:
+        return text
+    removed = total - keep_tokens
+    # Work in characters proportionally; the result is re-counted by the caller
+    keep_chars = max(0, int(len(text) * keep_tokens / total))
+    head = keep_chars * 2 // 3
+    tail = keep_chars - head
+    return text[:head] + TRUNCATION_MARKER.format(count=removed) + (text[len(text) - tail:] if tail else "")
+
+
+def fit_messages_to_budget(
+    messages: List[Dict[str, str]],
+    model: str,
+    budget: Optional[int] = None,
+) -> Tuple[List[Dict[str, str]], int]:
+    """
+    Fit a messages payload into the prompt budget, truncating user content if needed.
+
+    System messages are never truncated; the longest user message is shortened first.
+
+    Args:
+        messages: List of {"role", "content"} dicts
+        model: Model name
+        budget: Maximum prompt tokens (defaults to get_prompt_budget(model))
+
+    Returns:
+        Tuple of (messages that fit, prompt token count)
+
+    Raises:
+        PromptTooLargeError: If the prompt cannot fit even after truncating user content
+    """
+    if budget is None:
+        budget = get_prompt_budget(model)
+
+    prompt_tokens = count_message_tokens(messages, model)
+    if prompt_tokens <= budget:
+        return messages, prompt_tokens
+
+    logger.warning("Prompt for %s has %d tokens, over budget of %d; truncating", model, prompt_tokens, budget)
+    fitted = [dict(m) for m in messages]
+    user_indexes = sorted(
+        (i for i, m in enumerate(fitted) if m.get("role") == "user"),
+        key=lambda i: len(fitted[i].get("content") or ""),
+        reverse=True,
+    )
+    for index in user_indexes:
+        # Token counts of truncated text are approximate, so allow a couple of passes
+        for _ in range(3):
+            overflow = prompt_tokens - budget
+            if overflow <= 0:
+                break
+            content = fitted[index].get("content") or ""
+            content_tokens = count_tokens(content, model)
+            keep = max(0, content_tokens - overflow - count_tokens(TRUNCATION_MARKER, model) - 8)
+            fitted[index]["content"] = _truncate_middle(content, keep, model)
+            prompt_tokens = count_message_tokens(fitted, model)
+            if keep == 0:
+                break
+
+    if prompt_tokens > budget:
+        raise PromptTooLargeError(
+            f"Prompt needs {prompt_tokens} tokens but {model} allows {budget}"
+        )
+    metrics.inc("llm_prompt_truncations_total", labels={"model": model})
+    return fitted, prompt_tokens
+
+
+def record_usage(model: str, prompt_tokens: int, completion_tokens: int) -> None:
+    """
+    Record the token usage of one LLM call.
+
+    Args:
+        model: Model name
+        prompt_tokens: Tokens sent in the prompt
+        completion_tokens: Tokens generated in the completion
+    """
+    metrics.inc("llm_prompt_tokens_total", amount=prompt_tokens, labels={"model": model})
+    metrics.inc("llm_completion_tokens_total", amount=completion_tokens, labels={"model": model})
+    logger.info(
+        "LLM usage model=%s prompt_tokens=%d completion_tokens=%d", model, prompt_tokens, completion_tokens
+    )
@@ -0,0 +1,45 @@
+#!/usr/bin/env python
+"""
+Convenience script to start just the local OpenAI-compatible LLM stub server.
+Useful for load testing the running services without spending API quota:
+
+    python run_llm_stub_server.py --port 8765 --ttft 0.5 --tokens-per-second 80
+    export LLM_BASE_URL=http://localhost:8765/v1
+"""
+import argparse
+import logging
+import sys
+
+import uvicorn
+
+from linda_server.utils.llm_stub_server import StubSettings, create_stub_app
+
+# Set up logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+def main():
+    """Run the LLM stub server"""
+    parser = argparse.ArgumentParser(description="Local OpenAI-compatible stub server")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--ttft", type=float, default=0.5, help="Time to first token in seconds")
+    parser.add_argument("--tokens-per-second", type=float, default=50.0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests failing with 429/500")
+    args = parser.parse_args()
+
+    settings = StubSettings(
+        ttft=args.ttft,
+        tokens_per_second=args.tokens_per_second,
+        error_rate=args.error_rate,
+    )
+    logger.info(f"LLM stub server listening on http://localhost:{args.port}/v1")
+    uvicorn.run(create_stub_app(settings), host="0.0.0.0", port=args.port, log_level="info")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,119 @@
+#!/usr/bin/env python
+"""
+Load test the agent pipeline against a local OpenAI-compatible stub server.
+
+Starts the stub in-process (unless --no-stub is given), points llm_chat and the
+stream relay at it, drives N concurrent solves and prints throughput and
+p50/p95/p99 latency per stage.
+
+Example:
+    python run_load_test.py --solves 100 --concurrency 30 --ttft 0.5 --tokens-per-second 80
+
+Record real traffic once, then benchmark offline against the recording:
+    python run_load_test.py --no-stub --record .cache/bench.jsonl.gz
+    python run_load_test.py --replay .cache/bench.jsonl.gz --time-scale 0
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import shutil
+import sys
+import tempfile
+
+import uvicorn
+
+from linda_server.utils.llm_stub_server import StubSettings, create_stub_app
+
+# Set up logging
+logging.basicConfig(
+    level=logging.WARNING,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Load test the agent pipeline")
+    parser.add_argument("--solves", type=int, default=20, help="Total number of solves")
+    parser.add_argument("--concurrency", type=int, default=10, help="Solves in flight at once")
+    parser.add_argument("--same-problem", action="store_true", help="Send the identical problem every time")
+    parser.add_argument("--no-stub", action="store_true", help="Use the already configured LLM_BASE_URL instead of a stub")
+    parser.add_argument("--stub-port", type=int, default=8765, help="Port for the in-process stub server")
+    parser.add_argument("--ttft", type=float, default=0.5, help="Stub time to first token in seconds")
+    parser.add_argument("--tokens-per-second", type=float, default=50.0, help="Stub token rate")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of stub requests that fail with 429/500")
+    parser.add_argument("--record", metavar="CASSETTE", help="Record every LLM response to this cassette")
+    parser.add_argument("--replay", metavar="CASSETTE", help="Serve LLM responses from this cassette")
+    parser.add_argument("--time-scale", type=float, default=1.0,
+                        help="Scale recorded delays on replay (1 = original timing, 0 = no delays)")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    return parser.parse_args()
+
+
+async def run(args) -> int:
+    stub_server = None
+    stub_task = None
+    if not args.no_stub:
+        settings = StubSettings(
+            ttft=args.ttft,
+            tokens_per_second=args.tokens_per_second,
+            error_rate=args.error_rate,
+        )
+        config = uvicorn.Config(create_stub_app(settings), host="127.0.0.1", port=args.stub_port, log_level="warning")
+        stub_server = uvicorn.Server(config)
+        stub_task = asyncio.create_task(stub_server.serve())
+        while not stub_server.started:
+            await asyncio.sleep(0.05)
+        os.environ["LLM_BASE_URL"] = f"http://127.0.0.1:{args.stub_port}/v1"
+        os.environ["RESTACK_API_ADDRESS"] = f"localhost:{args.stub_port}"
+        os.environ.setdefault("OPENAI_API_KEY", "stub-key")
+
+    # Import after the environment is configured
+    from linda_server.utils.load_generator import format_report, run_load_test
+
+    try:
+        report = await run_load_test(
+            args.solves,
+            args.concurrency,
+            same_problem=args.same_problem,
+            # Recorded runs need the same problem texts on replay
+            run_nonce="cassette" if args.record or args.replay else None,
+        )
+    finally:
+        if stub_server:
+            stub_server.should_exit = True
+            await stub_task
+
+    print(json.dumps(report, indent=2) if args.json else format_report(report))
+    return 0 if report["failed"] == 0 else 1
+
+
+def main():
+    args = parse_args()
+    if args.record and args.replay:
+        print("--record and --replay are mutually exclusive", file=sys.stderr)
+        return 2
+    if args.record or args.replay:
+        os.environ["LLM_CASSETTE_MODE"] = "record" if args.record else "replay"
+        os.environ["LLM_CASSETTE_PATH"] = args.record or args.replay
+        os.environ["LLM_CASSETTE_TIME_SCALE"] = str(args.time_scale)
+    # Generated animation files go to a scratch copy, never the real animation server
+    scratch_dir = tempfile.mkdtemp(prefix="linda-load-test-")
+    os.environ["ANIMATION_SERVER_PATH"] = os.path.join(scratch_dir, "animation_server")
+    os.makedirs(os.environ["ANIMATION_SERVER_PATH"])
+    # Each solve gets its own workspace, like each agent session does
+    os.environ["ANIMATION_WORKSPACES_DIR"] = os.path.join(scratch_dir, "workspaces")
+    # Production builds need the animation server's node toolchain
+    os.environ["ANIMATION_BUILDS_ENABLED"] = "false"
+    # Keep the response cache in memory so repeated runs don't replay earlier results
+    os.environ["LLM_CACHE_PATH"] = ""
+    try:
+        return asyncio.run(run(args))
+    finally:
+        shutil.rmtree(scratch_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
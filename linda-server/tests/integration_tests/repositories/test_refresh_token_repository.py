@@ -0,0 +1,46 @@
+import pytest
+from datetime import datetime, timedelta
+from repository_sqlalchemy.transaction_management import transaction
+from linda_server.db.repositories.refresh_token_repository import RefreshTokenRepository
+
+
+@pytest.fixture
+def refresh_token_repository(tables):
+    return RefreshTokenRepository()
+
+
+def create_token(refresh_token_repository, user_id, token_hash, family_id="family"):
+    now = datetime.utcnow()
+    return refresh_token_repository.create_refresh_token(user_id, token_hash, family_id, now, now + timedelta(days=14))
+
+
+def test_find_token_by_hash(user_repository, refresh_token_repository):
+    with transaction() as session:
+        user = user_repository.create_user("testuser", "test@example.com", "Test User", "hashed")
+        token = create_token(refresh_token_repository, user.id, "a" * 64)
+        found = refresh_token_repository.find_token_by_hash("a" * 64)
+        assert found is not None
+        assert found.id == token.id
+        assert found.revoked_at is None
+        assert refresh_token_repository.find_token_by_hash("b" * 64) is None
+        session.rollback()
+
+
+def test_revoke_token_only_once(user_repository, refresh_token_repository):
+    with transaction() as session:
+        user = user_repository.create_user("testuser", "test@example.com", "Test User", "hashed")
+        token = create_token(refresh_token_repository, user.id, "a" * 64)
+        assert refresh_token_repository.update_revoke_token(token.id, datetime.utcnow())
+        assert not refresh_token_repository.update_revoke_token(token.id, datetime.utcnow())
+        session.rollback()
+
+
+def test_revoke_family(user_repository, refresh_token_repository):
+    with transaction() as session:
+        user = user_repository.create_user("testuser", "test@example.com", "Test User", "hashed")
+        create_token(refresh_token_repository, user.id, "a" * 64)
+        create_token(refresh_token_repository, user.id, "b" * 64)
+        create_token(refresh_token_repository, user.id, "c" * 64, family_id="other")
+        assert refresh_token_repository.update_revoke_family("family", datetime.utcnow()) == 2
+        assert refresh_token_repository.find_token_by_hash("c" * 64).revoked_at is None
+        session.rollback()
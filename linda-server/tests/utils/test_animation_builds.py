@@ -0,0 +1,140 @@
+import asyncio
+import os
+import pytest
+import shutil
+import sys
+import tempfile
+from linda_server.utils.animation_builds import AnimationBuildQueue, get_session_build, hash_build_inputs
+from linda_server.utils.metrics import metrics
+
+# Stands in for `yarn generate`: writes a bundle and counts how often it ran
+FAKE_BUILD = (
+    "import os, sys; "
+    "os.makedirs('.nuxt', exist_ok=True); "
+    "open('.nuxt/build.txt', 'w').write('built'); "
+    "os.makedirs('.output/public/_nuxt', exist_ok=True); "
+    "open('.output/public/index.html', 'w').write(os.environ['NUXT_APP_BASE_URL'] + open('app.vue').read()); "
+    "open('.output/public/_nuxt/entry.js', 'w').write('x' * 1000); "
+    "open(os.environ['BUILD_COUNT_FILE'], 'a').write('.'); "
+    "sys.exit(1 if 'broken' in open('app.vue').read() else 0)"
+)
+
+def build_once(session_id, workspace):
+    async def run():
+        return await AnimationBuildQueue().submit(session_id, workspace)
+    return asyncio.run(run())
+
+class TestAnimationBuilds:
+    @pytest.fixture
+    def root(self, monkeypatch):
+        root = tempfile.mkdtemp()
+        monkeypatch.setenv("ANIMATION_PUBLISH_DIR", os.path.join(root, "publish"))
+        monkeypatch.setenv("ANIMATION_BUILD_COMMAND", f'"{sys.executable}" -c "{FAKE_BUILD}"')
+        monkeypatch.setenv("BUILD_COUNT_FILE", os.path.join(root, "builds.count"))
+        metrics.reset()
+        yield root
+        shutil.rmtree(root)
+
+    def workspace(self, root, name, app="<template>a</template>"):
+        path = os.path.join(root, name)
+        os.makedirs(os.path.join(path, "node_modules", "dep"), exist_ok=True)
+        with open(os.path.join(path, "app.vue"), "w") as f:
+            f.write(app)
+        return path
+
+    def build_count(self, root):
+        path = os.path.join(root, "builds.count")
+        return len(open(path).read()) if os.path.exists(path) else 0
+
+    def test_build_publishes_bundle(self, root):
+        workspace = self.workspace(root, "alice")
+
+        build = build_once("alice", workspace)
+
+        assert not build.cached
+        assert build.url == f"/static-animations/{build.input_hash}/"
+        assert build.bundle_files == 2
+        assert build.bundle_bytes > 1000
+        index = os.path.join(root, "publish", "builds", build.input_hash, "index.html")
+        assert open(index).read().startswith(build.url)
+        assert get_session_build("alice") == build
+        assert metrics.get("animation_builds_total", labels={"result": "built"}) == 1
+        assert metrics.get_histogram("animation_build_seconds")["count"] == 1
+
+    def test_build_leaves_the_dev_server_directory_untouched(self, root):
+        workspace = self.workspace(root, "alice")
+        os.makedirs(os.path.join(workspace, ".nuxt"))
+        with open(os.path.join(workspace, ".nuxt", "dev.txt"), "w") as f:
+            f.write("dev server state")
+
+        build = build_once("alice", workspace)
+
+        assert build is not None and not build.cached
+        assert os.listdir(os.path.join(workspace, ".nuxt")) == ["dev.txt"]
+        assert not os.path.exists(os.path.join(workspace, ".output"))
+        assert os.listdir(os.path.join(root, "publish", ".building")) == []
+
+    def test_identical_inputs_reuse_the_bundle(self, root):
+        alice = self.workspace(root, "alice")
+        bob = self.workspace(root, "bob")
+        with open(os.path.join(bob, "node_modules", "dep", "ignored.js"), "w") as f:
+            f.write("dependencies are not build inputs")
+
+        async def run():
+            queue = AnimationBuildQueue()
+            first = await queue.submit("alice", alice)
+            second = await queue.submit("bob", bob)
+            return first, second
+
+        first, second = asyncio.run(run())
+
+        assert self.build_count(root) == 1
+        assert second.cached
+        assert second.input_hash == first.input_hash
+        assert get_session_build("bob").url == first.url
+
+    def test_concurrent_identical_builds_run_once(self, root):
+        alice = self.workspace(root, "alice")
+        bob = self.workspace(root, "bob")
+
+        async def run():
+            queue = AnimationBuildQueue()
+            return await asyncio.gather(queue.submit("alice", alice), queue.submit("bob", bob))
+
+        first, second = asyncio.run(run())
+
+        assert self.build_count(root) == 1
+        assert first.input_hash == second.input_hash
+
+    def test_newer_save_supersedes_queued_build(self, root):
+        workspace = self.workspace(root, "alice")
+
+        async def run():
+            queue = AnimationBuildQueue()
+            first = queue.submit("alice", workspace)
+            second = queue.submit("alice", workspace)
+            return await first, await second
+
+        first, second = asyncio.run(run())
+
+        assert first is None
+        assert second is not None
+        assert self.build_count(root) == 1
+
+    def test_failed_build_is_not_published(self, root):
+        workspace = self.workspace(root, "alice", app="broken")
+
+        assert build_once("alice", workspace) is None
+        assert get_session_build("alice") is None
+        assert metrics.get("animation_builds_total", labels={"result": "failed"}) == 1
+
+    def test_input_hash_tracks_sources_only(self, root):
+        workspace = self.workspace(root, "alice")
+        before = hash_build_inputs(workspace)
+        os.makedirs(os.path.join(workspace, ".nuxt"))
+        with open(os.path.join(workspace, ".nuxt", "cache.json"), "w") as f:
+            f.write("{}")
+        assert hash_build_inputs(workspace) == before
+        with open(os.path.join(workspace, "app.vue"), "a") as f:
+            f.write("changed")
+        assert hash_build_inputs(workspace) != before
@@ -0,0 +1,73 @@
+import asyncio
+import os
+import pytest
+import tempfile
+import shutil
+from linda_server.functions.animation_services import save_animation_code
+from linda_server.utils.animation_commit import commit_animation_files
+from linda_server.utils.animation_parser import AnimationFileInfo
+
+class TestAnimationCommit:
+    @pytest.fixture
+    def base_dir(self):
+        parent = tempfile.mkdtemp()
+        base_dir = os.path.join(parent, "animation_server")
+        os.makedirs(base_dir)
+        yield base_dir
+        shutil.rmtree(parent)
+
+    def test_commit_swaps_all_files_in(self, base_dir):
+        with open(os.path.join(base_dir, "old.ts"), "w") as f:
+            f.write("old")
+        files = [
+            AnimationFileInfo("components/Scene.vue", "<template />"),
+            AnimationFileInfo("old.ts", "new"),
+            AnimationFileInfo("nuxt.config.ts", "export default {}"),
+        ]
+
+        result = commit_animation_files(base_dir, files)
+
+        assert result.saved_files == [os.path.join(base_dir, "components/Scene.vue"), os.path.join(base_dir, "old.ts")]
+        assert result.skipped_files == [os.path.join(base_dir, "nuxt.config.ts")]
+        assert not os.path.exists(os.path.join(base_dir, "nuxt.config.ts"))
+        with open(os.path.join(base_dir, "old.ts")) as f:
+            assert f.read() == "new"
+        # The scratch directory next to the target is cleaned up
+        assert os.listdir(os.path.dirname(base_dir)) == ["animation_server"]
+        timings = result.timings()
+        assert timings["files"] == 2
+        assert timings["total_seconds"] >= timings["swap_seconds"]
+
+    def test_failed_staging_leaves_target_untouched(self, base_dir):
+        files = [
+            AnimationFileInfo("a.ts", "fine"),
+            AnimationFileInfo("b.ts", "unencodable \ud800"),
+        ]
+
+        with pytest.raises(IOError):
+            commit_animation_files(base_dir, files)
+
+        assert os.listdir(base_dir) == []
+        assert os.listdir(os.path.dirname(base_dir)) == ["animation_server"]
+
+    def test_save_animation_code_reports_commit_timings(self, base_dir, monkeypatch):
+        monkeypatch.setenv("ANIMATION_SERVER_PATH", base_dir)
+        monkeypatch.setenv("ANIMATION_BUILDS_ENABLED", "false")
+        code = "File: a.ts\n```ts\nconst a = 1;\n```\nFile: b.ts\n```ts\nconst b = 2;\n```\n"
+
+        result = asyncio.run(save_animation_code(code))
+
+        assert result["success"]
+        assert len(result["saved_files"]) == 2
+        assert result["commit"]["files"] == 2
+
+    def test_in_place_mode(self, base_dir, monkeypatch):
+        monkeypatch.setenv("ANIMATION_SERVER_PATH", base_dir)
+        monkeypatch.setenv("ANIMATION_BUILDS_ENABLED", "false")
+        monkeypatch.setenv("ANIMATION_COMMIT_MODE", "in_place")
+
+        result = asyncio.run(save_animation_code("File: a.ts\n```ts\nx\n```\n"))
+
+        assert result["success"]
+        assert result["commit"] is None
+        assert os.path.exists(os.path.join(base_dir, "a.ts"))
@@ -1,8 +1,15 @@
+import asyncio
 import os
 import pytest
 import tempfile
 import shutil
-from linda_server.utils.animation_parser import parse_animation_code, save_animation_files, AnimationFileInfo
+from linda_server.utils.animation_parser import (
+    parse_animation_code,
+    save_animation_files,
+    save_animation_stream,
+    StreamingAnimationParser,
+)
+from linda_server.utils.metrics import metrics
 
 class TestAnimationParser:
     @pytest.fixture
@@ -79,6 +86,20 @@ export const calculateDistance = (x1: number, y1: number, x2: number, y2: number
         files = parse_animation_code(code)
         assert len(files) == 0
     
+    @pytest.mark.parametrize("code, expected", [
+        # Duplicate paths are skipped; the first definition wins
+        ("File: a.ts\n```ts\none\n```\nFile: a.ts\n```ts\ntwo\n```\n", [("a.ts", "one")]),
+        # Without a fence, content runs until the next File: header
+        ("File: a.ts\nconst a = 1;\n\nfile: b.ts\n```\nb\n```", [("a.ts", "const a = 1;\n"), ("b.ts", "b")]),
+        # An unterminated fence runs to the end of the text
+        ("File: a.ts\n```ts\nconst a = 1;\n", [("a.ts", "const a = 1;\n")]),
+        # Closing fences may be indented; headers are case-insensitive
+        ("  FILE:  a.ts \n```ts\nx\n  ```  \ntrailing", [("a.ts", "x")]),
+        ("File: a.ts", [("a.ts", "")]),
+    ])
+    def test_parse_animation_code_edge_cases(self, code, expected):
+        assert [(f.path, f.content) for f in parse_animation_code(code)] == expected
+
     def test_save_animation_files(self, test_animation_code, temp_dir, monkeypatch):
         # Mock dependency to avoid actual file system operations in save_file
         save_file_calls = []
@@ -104,3 +125,85 @@ export const calculateDistance = (x1: number, y1: number, x2: number, y2: number
         expected_path = os.path.join(temp_dir, "pages/geometry-animation.vue")
         assert first_path == expected_path
         assert "<template>" in first_content
+
+class TestStreamingAnimationParser:
+    @pytest.fixture
+    def temp_dir(self):
+        temp_dir = tempfile.mkdtemp()
+        yield temp_dir
+        shutil.rmtree(temp_dir)
+
+    @pytest.mark.parametrize("code", [
+        "",
+        "File: a.ts",
+        "File: a.ts\n```ts\nunterminated\n",
+        "File: a\nplain\nFile: b\n```\nx\n```\nFile: a\n```\nduplicate\n```\n",
+        "file: A\nFile: B\n```js\n1\n  ```  \nrest\n",
+    ])
+    def test_matches_parse_animation_code(self, code):
+        expected = [(f.path, f.content) for f in parse_animation_code(code)]
+        for chunk_size in (1, 3, 64):
+            parser = StreamingAnimationParser()
+            for start in range(0, len(code), chunk_size):
+                parser.feed(code[start:start + chunk_size])
+            parser.close()
+            assert [(f.path, f.content) for f in parser.files] == expected
+
+    def test_emits_file_when_its_fence_closes(self):
+        parser = StreamingAnimationParser()
+        assert parser.feed("File: a.ts\n```ts\nconst a = 1;\n") == []
+        assert parser.feed("``") == []
+        completed = parser.feed("`\nFile: b.ts\n```ts\n")
+        assert [(f.path, f.content) for f in completed] == [("a.ts", "const a = 1;")]
+        assert [f.path for f in parser.close()] == ["b.ts"]
+
+    def test_save_animation_stream_commits_each_file_before_the_stream_ends(self, temp_dir):
+        metrics.reset()
+        written_during_stream = []
+
+        async def chunks():
+            yield "File: a.ts\n```ts\nconst a = 1;\n```\n"
+            written_during_stream.append(os.path.exists(os.path.join(temp_dir, "a.ts")))
+            yield "File: b.ts\n```ts\nconst b = 2;\n```\n"
+
+        text, saved, commit = asyncio.run(save_animation_stream(chunks(), temp_dir))
+
+        # The dev server can compile a.ts while b.ts is still generating
+        assert written_during_stream == [True]
+        assert saved == [os.path.join(temp_dir, "a.ts"), os.path.join(temp_dir, "b.ts")]
+        assert text.startswith("File: a.ts")
+        with open(os.path.join(temp_dir, "b.ts")) as f:
+            assert f.read() == "const b = 2;"
+        assert commit["files"] == 2
+        assert commit["total_seconds"] >= commit["swap_seconds"]
+        assert metrics.get("animation_commits_total") == 1
+
+    def test_failed_save_animation_stream_keeps_completed_files(self, temp_dir):
+        async def chunks():
+            yield "File: a.ts\n```ts\nconst a = 1;\n```\n"
+            yield "File: b.ts\n```ts\nconst b"
+            raise RuntimeError("stream dropped")
+
+        with pytest.raises(RuntimeError):
+            asyncio.run(save_animation_stream(chunks(), temp_dir))
+
+        with open(os.path.join(temp_dir, "a.ts")) as f:
+            assert f.read() == "const a = 1;"
+        assert not os.path.exists(os.path.join(temp_dir, "b.ts"))
+        staging_prefix = f".{os.path.basename(temp_dir)}-staging-"
+        assert not [name for name in os.listdir(os.path.dirname(temp_dir)) if name.startswith(staging_prefix)]
+
+    def test_save_animation_stream_in_place_writes_files_incrementally(self, temp_dir, monkeypatch):
+        monkeypatch.setenv("ANIMATION_COMMIT_MODE", "in_place")
+        written_during_stream = []
+
+        async def chunks():
+            yield "File: a.ts\n```ts\nconst a = 1;\n```\n"
+            written_during_stream.append(os.path.exists(os.path.join(temp_dir, "a.ts")))
+            yield "File: b.ts\n```ts\nconst b = 2;\n```\n"
+
+        text, saved, commit = asyncio.run(save_animation_stream(chunks(), temp_dir))
+
+        assert written_during_stream == [True]
+        assert saved == [os.path.join(temp_dir, "a.ts"), os.path.join(temp_dir, "b.ts")]
+        assert commit is None
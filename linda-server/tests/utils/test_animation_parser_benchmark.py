@@ -0,0 +1,113 @@
+"""
+Benchmarks for the animation parser on large synthetic multi-file responses.
+
+Requires pytest-benchmark. Run with:
+    pytest tests/utils/test_animation_parser_benchmark.py --benchmark-only
+"""
+import logging
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+from typing import List, Set
+from linda_server.utils.animation_parser import parse_animation_code, AnimationFileInfo, StreamingAnimationParser
+
+def reference_parse_animation_code(code: str) -> List[AnimationFileInfo]:
+    """The original line-based parser, kept as the behavioural reference and baseline."""
+    files: List[AnimationFileInfo] = []
+    processed_paths: Set[str] = set()
+    lines = code.split("\n")
+    i = 0
+    while i < len(lines):
+        line = lines[i]
+        if line.strip().lower().startswith("file:"):
+            current_path = line.split(":", 1)[1].strip()
+            if current_path in processed_paths:
+                i += 1
+                continue
+            i += 1
+            if i < len(lines) and lines[i].strip().startswith("```"):
+                current_content_lines: List[str] = []
+                i += 1
+                while i < len(lines) and lines[i].strip() != "```":
+                    current_content_lines.append(lines[i])
+                    i += 1
+                i += 1
+                files.append(AnimationFileInfo(path=current_path, content="\n".join(current_content_lines)))
+                processed_paths.add(current_path)
+                continue
+            else:
+                current_content_lines = []
+                while i < len(lines) and not lines[i].strip().lower().startswith("file:"):
+                    current_content_lines.append(lines[i])
+                    i += 1
+                files.append(AnimationFileInfo(path=current_path, content="\n".join(current_content_lines)))
+                processed_paths.add(current_path)
+                continue
+        i += 1
+    return files
+
+def make_response(target_bytes: int, fenced: bool = True, duplicate_every: int = 0) -> str:
+    """Build a synthetic multi-file LLM response of roughly target_bytes."""
+    body = "\n".join(
+        f"  const value{n} = computeStep({n}, `template ${{{n}}}`); // step {n}" for n in range(40)
+    )
+    parts = ["Here is the animation code for the problem.\n"]
+    size = 0
+    index = 0
+    while size < target_bytes:
+        path = "components/File0.vue" if duplicate_every and index % duplicate_every == 0 else f"components/File{index}.vue"
+        block = f"File: {path}\n```vue\n{body}\n```\n\n" if fenced else f"File: {path}\n{body}\n\n"
+        parts.append(block)
+        size += len(block)
+        index += 1
+    return "".join(parts)
+
+INPUTS = {
+    "fenced_100kb": make_response(100_000),
+    "fenced_300kb": make_response(300_000),
+    "unfenced_300kb": make_response(300_000, fenced=False),
+    "duplicates_300kb": make_response(300_000, duplicate_every=3),
+}
+
+def as_tuples(files: List[AnimationFileInfo]):
+    return [(f.path, f.content) for f in files]
+
+@pytest.fixture(autouse=True)
+def quiet_parser_logs():
+    logger = logging.getLogger("linda_server.utils.animation_parser")
+    previous = logger.level
+    logger.setLevel(logging.WARNING)
+    yield
+    logger.setLevel(previous)
+
+@pytest.mark.parametrize("name", list(INPUTS))
+def test_parse_matches_reference(name):
+    code = INPUTS[name]
+    assert as_tuples(parse_animation_code(code)) == as_tuples(reference_parse_animation_code(code))
+
+@pytest.mark.parametrize("name", list(INPUTS))
+def test_benchmark_parse_animation_code(benchmark, name):
+    benchmark.group = f"parse-{name}"
+    files = benchmark(parse_animation_code, INPUTS[name])
+    assert files
+
+@pytest.mark.parametrize("name", list(INPUTS))
+def test_benchmark_reference_parser(benchmark, name):
+    benchmark.group = f"parse-{name}"
+    files = benchmark(reference_parse_animation_code, INPUTS[name])
+    assert files
+
+def test_benchmark_streaming_parser(benchmark):
+    code = INPUTS["fenced_300kb"]
+    benchmark.group = "parse-fenced_300kb"
+
+    def parse_in_chunks():
+        parser = StreamingAnimationParser()
+        for start in range(0, len(code), 64):
+            parser.feed(code[start:start + 64])
+        parser.close()
+        return parser.files
+
+    files = benchmark(parse_in_chunks)
+    assert as_tuples(files) == as_tuples(parse_animation_code(code))
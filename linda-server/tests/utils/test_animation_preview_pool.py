@@ -0,0 +1,178 @@
+import asyncio
+import os
+import pytest
+import shutil
+import sys
+import tempfile
+import time
+from linda_server.utils import animation_workspaces
+from linda_server.utils.animation_preview_pool import PreviewPool
+from linda_server.utils.animation_server_runner import get_animation_server_url, probe_http
+from linda_server.utils.animation_workspaces import WorkspaceManager, clone_template, reset_workspace
+from linda_server.utils.file_utils import save_file
+from linda_server.utils.metrics import metrics
+
+class TestPreviewPool:
+    @pytest.fixture
+    def template_dir(self, monkeypatch):
+        parent = tempfile.mkdtemp()
+        template_dir = os.path.join(parent, "animation_server")
+        for path, content in {
+            "components/GeometryAnimation.vue": "<template>template</template>",
+            "stores/animationStore.ts": "export const store = {};",
+            "node_modules/three/index.js": "module.exports = {};",
+        }.items():
+            os.makedirs(os.path.dirname(os.path.join(template_dir, path)), exist_ok=True)
+            with open(os.path.join(template_dir, path), "w") as f:
+                f.write(content)
+        monkeypatch.setenv("ANIMATION_SERVER_PATH", template_dir)
+        monkeypatch.setenv("ANIMATION_WORKSPACES_DIR", os.path.join(parent, "workspaces"))
+        # A plain HTTP server stands in for `yarn dev`
+        monkeypatch.setenv("ANIMATION_DEV_COMMAND", f'"{sys.executable}" -m http.server {{port}} --bind 127.0.0.1')
+        metrics.reset()
+        yield template_dir
+        shutil.rmtree(parent)
+
+    def manager(self, template_dir, monkeypatch, min_idle=1, max_size=3, idle_seconds=600):
+        manager = WorkspaceManager(template_dir)
+        manager.pool = PreviewPool(manager.template_dir, manager.root_dir, min_idle, max_size, idle_seconds)
+        monkeypatch.setattr(animation_workspaces, "_manager", manager)
+        return manager
+
+    def read(self, *parts):
+        with open(os.path.join(*parts)) as f:
+            return f.read()
+
+    def test_pool_warms_up_servers_on_their_own_ports(self, template_dir, monkeypatch):
+        manager = self.manager(template_dir, monkeypatch, min_idle=2)
+
+        async def run():
+            try:
+                await manager.pool.start()
+                await manager.pool.scale()
+                urls = [instance.url for instance in manager.pool._instances]
+                answering = [await probe_http(instance.supervisor.port) for instance in manager.pool._instances]
+                return urls, answering, manager.pool.stats()
+            finally:
+                await manager.close()
+
+        urls, answering, stats = asyncio.run(run())
+
+        assert len(set(urls)) == 2 and all(answering)
+        assert stats == {"size": 2, "idle": 2, "leased": 0}
+        assert manager.list_sessions() == []
+        assert manager.pool.stats()["size"] == 0
+
+    def test_new_session_leases_a_warm_server(self, template_dir, monkeypatch):
+        manager = self.manager(template_dir, monkeypatch)
+
+        async def run():
+            try:
+                await manager.pool.start()
+                await manager.pool.scale()
+                workspace_dir = await asyncio.to_thread(manager.get_workspace, "alice")
+                preview_url = await manager.get_preview_url("alice")
+                # The lease is topped up with another idle server
+                await manager.pool.scale()
+                server_urls = get_animation_server_url("alice"), get_animation_server_url("bob")
+                return workspace_dir, preview_url, server_urls, manager.pool.get_lease("alice"), manager.pool.stats()
+            finally:
+                await manager.close()
+
+        workspace_dir, preview_url, server_urls, instance, stats = asyncio.run(run())
+
+        assert os.path.islink(workspace_dir)
+        assert os.path.realpath(workspace_dir) == instance.directory
+        assert preview_url == instance.url
+        assert server_urls == (instance.url, "http://127.0.0.1:4000/animation-previews/4000/")
+        assert manager._previews == {}
+        assert stats == {"size": 2, "idle": 1, "leased": 1}
+        assert metrics.get("animation_preview_leases_total", {"result": "warm"}) == 1
+
+    def test_removed_session_returns_its_server_reset(self, template_dir, monkeypatch):
+        manager = self.manager(template_dir, monkeypatch, max_size=1)
+
+        async def run():
+            try:
+                await manager.pool.start()
+                await manager.pool.scale()
+                workspace_dir = await asyncio.to_thread(manager.get_workspace, "alice")
+                instance = manager.pool.get_lease("alice")
+                save_file(os.path.join(workspace_dir, "components/GeometryAnimation.vue"), "<template>alice</template>")
+                save_file(os.path.join(workspace_dir, "components/Extra.vue"), "<template>extra</template>")
+                await manager.remove("alice")
+                reused = await asyncio.to_thread(manager.get_workspace, "bob")
+                return workspace_dir, instance, reused, manager.pool.get_lease("bob")
+            finally:
+                await manager.close()
+
+        workspace_dir, instance, reused, bob_instance = asyncio.run(run())
+
+        assert not os.path.lexists(workspace_dir)
+        assert bob_instance is instance
+        assert self.read(reused, "components/GeometryAnimation.vue") == "<template>template</template>"
+        assert not os.path.exists(os.path.join(reused, "components/Extra.vue"))
+        assert metrics.get("animation_preview_recycled_total") == 1
+        # The template was never written through the links
+        assert self.read(template_dir, "components/GeometryAnimation.vue") == "<template>template</template>"
+
+    def test_session_falls_back_to_a_clone_when_pool_is_exhausted(self, template_dir, monkeypatch):
+        manager = self.manager(template_dir, monkeypatch, max_size=1)
+
+        async def run():
+            try:
+                await manager.pool.start()
+                await manager.pool.scale()
+                leased = await asyncio.to_thread(manager.get_workspace, "alice")
+                cloned = await asyncio.to_thread(manager.get_workspace, "bob")
+                return leased, cloned
+            finally:
+                await manager.close()
+
+        leased, cloned = asyncio.run(run())
+
+        assert os.path.islink(leased)
+        assert os.path.isdir(cloned) and not os.path.islink(cloned)
+        assert metrics.get("animation_preview_leases_total", {"result": "miss"}) == 1
+
+    def test_pool_shrinks_back_after_idling(self, template_dir, monkeypatch):
+        manager = self.manager(template_dir, monkeypatch, min_idle=1, max_size=3, idle_seconds=60)
+
+        async def run():
+            try:
+                await manager.pool.start()
+                await manager.pool.scale()
+                for session_id in ("alice", "bob"):
+                    await asyncio.to_thread(manager.get_workspace, session_id)
+                    await manager.pool.scale()
+                grown = manager.pool.stats()
+                for session_id in ("alice", "bob"):
+                    await manager.remove(session_id)
+                await manager.pool.scale()
+                released = manager.pool.stats()
+                await manager.pool.scale(now=time.monotonic() + 61)
+                return grown, released, manager.pool.stats()
+            finally:
+                await manager.close()
+
+        grown, released, shrunk = asyncio.run(run())
+
+        assert grown == {"size": 3, "idle": 1, "leased": 2}
+        assert released == {"size": 3, "idle": 3, "leased": 0}
+        assert shrunk == {"size": 1, "idle": 1, "leased": 0}
+        assert [name for name in os.listdir(manager.root_dir) if not name.startswith(".pool-")] == []
+
+    def test_reset_workspace_restores_template(self, template_dir):
+        workspace_dir = os.path.join(os.path.dirname(template_dir), "workspace")
+        clone_template(template_dir, workspace_dir)
+        save_file(os.path.join(workspace_dir, "stores/animationStore.ts"), "changed")
+        save_file(os.path.join(workspace_dir, "generated/deep/File.vue"), "new")
+        os.remove(os.path.join(workspace_dir, "components/GeometryAnimation.vue"))
+
+        assert reset_workspace(template_dir, workspace_dir) == 3
+
+        assert self.read(workspace_dir, "stores/animationStore.ts") == "export const store = {};"
+        assert os.path.exists(os.path.join(workspace_dir, "components/GeometryAnimation.vue"))
+        assert not os.path.exists(os.path.join(workspace_dir, "generated"))
+        assert os.path.islink(os.path.join(workspace_dir, "node_modules"))
+        assert reset_workspace(template_dir, workspace_dir) == 0
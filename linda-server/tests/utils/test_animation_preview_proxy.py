@@ -0,0 +1,59 @@
+import threading
+from fastapi import FastAPI, WebSocket
+from fastapi.testclient import TestClient
+from websockets.sync.server import serve
+from linda_server.utils.animation_preview_proxy import PreviewGrants, close_preview_proxy, proxy_websocket
+
+class TestPreviewGrants:
+    def test_tickets_are_single_use(self):
+        grants = PreviewGrants(ticket_seconds=60, cookie_seconds=60)
+        ticket = grants.issue_ticket("alice-session", 1)
+
+        grant = grants.redeem_ticket(ticket)
+        assert (grant.session_id, grant.user_id) == ("alice-session", "1")
+        assert grants.redeem_ticket(ticket) is None
+        assert grants.redeem_ticket("made-up") is None
+
+    def test_expired_tickets_and_cookies_are_rejected(self):
+        grants = PreviewGrants(ticket_seconds=0, cookie_seconds=0)
+
+        assert grants.redeem_ticket(grants.issue_ticket("alice-session", "1")) is None
+        assert grants.check_cookie(grants.open_cookie("alice-session", "1")) is None
+
+    def test_cookie_opens_its_session(self):
+        grants = PreviewGrants(ticket_seconds=60, cookie_seconds=60)
+        cookie = grants.open_cookie("alice-session", "1")
+
+        assert grants.check_cookie(cookie).session_id == "alice-session"
+        assert grants.check_cookie(None) is None
+
+class TestProxyWebsocket:
+    def test_messages_are_relayed_both_ways(self):
+        paths = []
+
+        def echo(connection):
+            paths.append(connection.request.path)
+            for message in connection:
+                connection.send(f"hmr:{message}")
+
+        with serve(echo, "127.0.0.1", 0, subprotocols=["vite-hmr"]) as server:
+            port = server.socket.getsockname()[1]
+            thread = threading.Thread(target=server.serve_forever, daemon=True)
+            thread.start()
+
+            app = FastAPI()
+
+            @app.websocket("/preview/{path:path}")
+            async def relay(websocket: WebSocket, path: str):
+                await proxy_websocket(websocket, port, path)
+
+            with TestClient(app) as client:
+                with client.websocket_connect("/preview/_nuxt/?token=1", subprotocols=["vite-hmr"]) as websocket:
+                    assert websocket.accepted_subprotocol == "vite-hmr"
+                    websocket.send_text("update")
+                    assert websocket.receive_text() == "hmr:update"
+                client.portal.call(close_preview_proxy)
+            server.shutdown()
+            thread.join(timeout=5)
+
+        assert paths == [f"/animation-previews/{port}/_nuxt/?token=1"]
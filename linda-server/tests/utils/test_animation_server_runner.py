@@ -0,0 +1,248 @@
+import asyncio
+import os
+import pytest
+import shutil
+import socket
+import sys
+import tempfile
+import threading
+from linda_server.utils import animation_server_runner
+from linda_server.utils.animation_server_runner import (
+    AnimationServerSupervisor,
+    persist_build_cache,
+    prepare_startup_cache,
+    probe_http,
+    start_animation_server,
+)
+from linda_server.utils.metrics import metrics
+
+# Stands in for `yarn dev`: optional startup delay and stderr noise, then an HTTP server
+# that exits after `lifetime` seconds on its first launch only
+FAKE_DEV_SERVER = """
+import http.server, os, sys, threading, time
+port, delay, noise, lifetime = int(sys.argv[1]), float(sys.argv[2]), int(sys.argv[3]), float(sys.argv[4])
+time.sleep(delay)
+sys.stderr.write("warning: something chatty\\n" * noise)
+sys.stderr.flush()
+open("base_url", "w").write(os.environ.get("NUXT_APP_BASE_URL", ""))
+first_launch = not os.path.exists("launched")
+open("launched", "a").write(".")
+if lifetime and first_launch:
+    threading.Timer(lifetime, lambda: os._exit(3)).start()
+http.server.ThreadingHTTPServer(("127.0.0.1", port), http.server.SimpleHTTPRequestHandler).serve_forever()
+"""
+
+class TestAnimationServerSupervisor:
+    @pytest.fixture
+    def server_dir(self, monkeypatch):
+        server_dir = tempfile.mkdtemp()
+        with open(os.path.join(server_dir, "fake_dev_server.py"), "w") as f:
+            f.write(FAKE_DEV_SERVER)
+        monkeypatch.setattr(animation_server_runner, "RESTART_BACKOFF_SECONDS", 0.05)
+        metrics.reset()
+        yield server_dir
+        shutil.rmtree(server_dir)
+
+    def supervisor(self, server_dir, delay=0.0, noise=0, lifetime=0.0, log_lines=500):
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            port = sock.getsockname()[1]
+        command = f'"{sys.executable}" fake_dev_server.py {{port}} {delay} {noise} {lifetime}'
+        return AnimationServerSupervisor(server_dir, port, command=command, log_lines=log_lines)
+
+    def test_start_waits_for_readiness(self, server_dir):
+        supervisor = self.supervisor(server_dir, delay=0.5)
+
+        async def run():
+            try:
+                ready = await supervisor.start(timeout=10)
+                return ready, await probe_http(supervisor.port)
+            finally:
+                await supervisor.stop()
+
+        ready, answering = asyncio.run(run())
+
+        assert ready and answering
+        # Served under the path the linda server proxies, on the loopback interface only
+        assert open(os.path.join(server_dir, "base_url")).read() == f"/animation-previews/{supervisor.port}/"
+        assert supervisor.url == f"http://127.0.0.1:{supervisor.port}/animation-previews/{supervisor.port}/"
+        assert supervisor.startup_seconds >= 0.5
+        assert metrics.get_histogram("animation_server_startup_seconds", {"cache": "cold"})["count"] == 1
+        assert not supervisor.running
+
+    def test_chatty_stderr_is_drained_into_bounded_buffer(self, server_dir):
+        # Far more than a pipe buffer holds; an undrained stderr would block the server
+        supervisor = self.supervisor(server_dir, noise=20000, log_lines=100)
+
+        async def run():
+            try:
+                return await supervisor.start(timeout=10)
+            finally:
+                await supervisor.stop()
+
+        assert asyncio.run(run())
+        assert len(supervisor.logs) == 100
+        assert "[stderr] warning: something chatty" in supervisor.recent_logs(5)
+
+    def test_not_ready_in_time(self, server_dir):
+        supervisor = self.supervisor(server_dir, delay=30)
+
+        async def run():
+            try:
+                return await supervisor.start(timeout=0.5)
+            finally:
+                await supervisor.stop()
+
+        assert not asyncio.run(run())
+        assert supervisor.startup_seconds is None
+
+    def test_crash_is_restarted(self, server_dir):
+        supervisor = self.supervisor(server_dir, lifetime=0.5)
+
+        async def run():
+            try:
+                assert await supervisor.start(timeout=10)
+                for _ in range(100):
+                    if supervisor.restarts and await probe_http(supervisor.port):
+                        return True
+                    await asyncio.sleep(0.1)
+                return False
+            finally:
+                await supervisor.stop()
+
+        assert asyncio.run(run())
+        assert supervisor.restarts == 1
+        assert metrics.get("animation_server_restarts_total") == 1
+        assert metrics.get("animation_server_crashes_total") == 1
+
+    def test_missing_directory(self, server_dir):
+        assert asyncio.run(start_animation_server(os.path.join(server_dir, "missing"), 4999)) is None
+
+# Stands in for `yarn install`: counts its runs and creates node_modules
+FAKE_INSTALL = """
+import os, sys
+open(os.path.join(sys.argv[1], "installs"), "a").write(".")
+os.makedirs("node_modules/three", exist_ok=True)
+open("node_modules/three/index.js", "w").write("module.exports = {};")
+"""
+
+# Stands in for `yarn dev`: pre-bundles into the Vite cache it is given, then serves
+FAKE_VITE_SERVER = """
+import http.server, os, sys
+deps = os.path.join(os.environ["ANIMATION_VITE_CACHE_DIR"], "deps")
+os.makedirs(deps, exist_ok=True)
+open(os.path.join(deps, "_metadata.json"), "w").write("{}")
+http.server.ThreadingHTTPServer(("127.0.0.1", int(sys.argv[1])), http.server.SimpleHTTPRequestHandler).serve_forever()
+"""
+
+class TestStartupCache:
+    @pytest.fixture
+    def root(self, monkeypatch):
+        root = tempfile.mkdtemp()
+        for name, content in {"fake_install.py": FAKE_INSTALL, "fake_vite_server.py": FAKE_VITE_SERVER}.items():
+            with open(os.path.join(root, name), "w") as f:
+                f.write(content)
+        monkeypatch.setenv("ANIMATION_CACHE_DIR", os.path.join(root, "cache"))
+        monkeypatch.setenv("ANIMATION_INSTALL_COMMAND", f'"{sys.executable}" "{os.path.join(root, "fake_install.py")}" "{root}"')
+        metrics.reset()
+        yield root
+        shutil.rmtree(root)
+
+    def server_dir(self, root, name, lock="three@0.175.0"):
+        server_dir = os.path.join(root, name)
+        os.makedirs(server_dir)
+        with open(os.path.join(server_dir, "yarn.lock"), "w") as f:
+            f.write(lock)
+        return server_dir
+
+    def installs(self, root):
+        with open(os.path.join(root, "installs")) as f:
+            return len(f.read())
+
+    def test_dependencies_are_installed_once_per_lockfile(self, root):
+        first, second, other = (self.server_dir(root, "first"), self.server_dir(root, "second"),
+                                self.server_dir(root, "other", lock="three@0.176.0"))
+
+        async def run():
+            return [await prepare_startup_cache(server_dir) for server_dir in (first, second, other)]
+
+        caches = asyncio.run(run())
+
+        assert [cache.dependencies for cache in caches] == ["installed", "cached", "installed"]
+        assert self.installs(root) == 2
+        assert os.path.islink(os.path.join(first, "node_modules"))
+        assert os.path.realpath(os.path.join(first, "node_modules")) == os.path.realpath(os.path.join(second, "node_modules"))
+        assert os.path.realpath(os.path.join(first, "node_modules")) != os.path.realpath(os.path.join(other, "node_modules"))
+        assert os.path.exists(os.path.join(second, "node_modules", "three", "index.js"))
+
+    def test_moving_dependencies_into_the_cache_stays_off_the_event_loop(self, root, monkeypatch):
+        server_dir = self.server_dir(root, "first")
+        move = shutil.move
+        moved_on = []
+
+        def recording_move(source, target):
+            moved_on.append(threading.current_thread() is threading.main_thread())
+            return move(source, target)
+
+        monkeypatch.setattr(animation_server_runner.shutil, "move", recording_move)
+
+        cache = asyncio.run(prepare_startup_cache(server_dir))
+
+        assert cache.dependencies == "installed"
+        assert moved_on == [False]
+        assert os.path.islink(os.path.join(server_dir, "node_modules"))
+
+    def test_own_node_modules_are_left_alone(self, root):
+        server_dir = self.server_dir(root, "template")
+        os.makedirs(os.path.join(server_dir, "node_modules"))
+
+        cache = asyncio.run(prepare_startup_cache(server_dir))
+
+        assert cache.dependencies == "present"
+        assert not os.path.islink(os.path.join(server_dir, "node_modules"))
+        assert not os.path.exists(os.path.join(root, "installs"))
+
+    def test_build_cache_seeds_new_directories(self, root):
+        first, second = self.server_dir(root, "first"), self.server_dir(root, "second")
+        deps = os.path.join(first, ".cache", "vite", "deps")
+        os.makedirs(deps)
+        with open(os.path.join(deps, "_metadata.json"), "w") as f:
+            f.write("{}")
+
+        first_cache = asyncio.run(prepare_startup_cache(first))
+        assert persist_build_cache(first, first_cache.lock_hash)
+        assert not persist_build_cache(first, first_cache.lock_hash)
+        second_cache = asyncio.run(prepare_startup_cache(second))
+
+        assert first_cache.build_cache == "present"
+        assert second_cache.build_cache == "seeded" and second_cache.warm
+        assert os.path.exists(os.path.join(second, ".cache", "vite", "deps", "_metadata.json"))
+
+    def test_second_server_starts_warm(self, root):
+        command = f'"{sys.executable}" "{os.path.join(root, "fake_vite_server.py")}" {{port}}'
+        supervisors = [
+            AnimationServerSupervisor(self.server_dir(root, name), port, command=command)
+            for name, port in (("first", self.free_port()), ("second", self.free_port()))
+        ]
+
+        async def run():
+            for supervisor in supervisors:
+                try:
+                    assert await supervisor.start(timeout=10)
+                finally:
+                    await supervisor.stop()
+
+        asyncio.run(run())
+
+        assert not supervisors[0].startup_cache.warm
+        assert supervisors[1].startup_cache.warm
+        assert supervisors[1].startup_cache.dependencies == "cached"
+        assert supervisors[1].startup_cache.build_cache == "seeded"
+        assert self.installs(root) == 1
+        assert metrics.get_histogram("animation_server_startup_seconds", {"cache": "cold"})["count"] == 1
+        assert metrics.get_histogram("animation_server_startup_seconds", {"cache": "warm"})["count"] == 1
+
+    def free_port(self):
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            return sock.getsockname()[1]
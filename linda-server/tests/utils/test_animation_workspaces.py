@@ -0,0 +1,198 @@
+import asyncio
+import dataclasses
+import jwt
+import os
+import pytest
+import shutil
+import sys
+import tempfile
+import time
+from fastapi.testclient import TestClient
+from temporalio.testing import ActivityEnvironment
+from linda_server.functions.animation_services import save_animation_code
+from linda_server.utils.animation_preview_proxy import get_preview_grants
+from linda_server.utils.animation_workspaces import WorkspaceManager, clone_template, get_workspace_manager, resolve_animation_dir
+from linda_server.utils.auth_tokens import get_auth_settings
+from linda_server.utils.file_utils import save_file
+
+class TestAnimationWorkspaces:
+    @pytest.fixture
+    def template_dir(self, monkeypatch):
+        parent = tempfile.mkdtemp()
+        template_dir = os.path.join(parent, "animation_server")
+        for path, content in {
+            "components/GeometryAnimation.vue": "<template>template</template>",
+            "stores/animationStore.ts": "export const store = {};",
+            "node_modules/three/index.js": "module.exports = {};",
+            ".nuxt/build.js": "",
+        }.items():
+            os.makedirs(os.path.dirname(os.path.join(template_dir, path)), exist_ok=True)
+            with open(os.path.join(template_dir, path), "w") as f:
+                f.write(content)
+        monkeypatch.setenv("ANIMATION_SERVER_PATH", template_dir)
+        monkeypatch.setenv("ANIMATION_BUILDS_ENABLED", "false")
+        monkeypatch.setenv("ANIMATION_WORKSPACES_DIR", os.path.join(parent, "workspaces"))
+        yield template_dir
+        shutil.rmtree(parent)
+
+    def read(self, *parts):
+        with open(os.path.join(*parts)) as f:
+            return f.read()
+
+    def test_clone_links_template_files(self, template_dir):
+        workspace = os.path.join(os.path.dirname(template_dir), "clone")
+        clone_template(template_dir, workspace)
+
+        component = os.path.join(workspace, "components/GeometryAnimation.vue")
+        assert os.stat(component).st_ino == os.stat(os.path.join(template_dir, "components/GeometryAnimation.vue")).st_ino
+        assert os.path.islink(os.path.join(workspace, "node_modules"))
+        assert not os.path.exists(os.path.join(workspace, ".nuxt"))
+
+        # Writing a linked file replaces it in the workspace only
+        save_file(component, "<template>mine</template>")
+        assert self.read(component) == "<template>mine</template>"
+        assert self.read(template_dir, "components/GeometryAnimation.vue") == "<template>template</template>"
+
+    def test_sessions_do_not_overwrite_each_other(self, template_dir):
+        code = "File: components/GeometryAnimation.vue\n```vue\n<template>{}</template>\n```\n"
+
+        def as_session(session_id):
+            # Each environment runs as a different agent
+            env = ActivityEnvironment()
+            env.info = dataclasses.replace(env.info, workflow_id=session_id)
+            return env
+
+        async def run():
+            return await asyncio.gather(
+                as_session("session-alice").run(save_animation_code, code.format("alice")),
+                as_session("session-bob").run(save_animation_code, code.format("bob")),
+            )
+
+        alice, bob = asyncio.run(run())
+
+        assert alice["success"] and bob["success"]
+        workspaces = os.environ["ANIMATION_WORKSPACES_DIR"]
+        assert self.read(workspaces, "session-alice/components/GeometryAnimation.vue") == "<template>alice</template>"
+        assert self.read(workspaces, "session-bob/components/GeometryAnimation.vue") == "<template>bob</template>"
+        assert self.read(template_dir, "components/GeometryAnimation.vue") == "<template>template</template>"
+
+    def test_shared_mode_and_no_session_use_template(self, template_dir, monkeypatch):
+        assert resolve_animation_dir() == template_dir
+        assert resolve_animation_dir("abc").endswith(os.path.join("workspaces", "abc"))
+        monkeypatch.setenv("ANIMATION_WORKSPACE_MODE", "shared")
+        assert resolve_animation_dir("abc") == template_dir
+
+    def test_invalid_session_id(self, template_dir):
+        with pytest.raises(ValueError):
+            WorkspaceManager(template_dir).get_workspace("../escape")
+
+    def test_garbage_collection_removes_stale_workspaces(self, template_dir):
+        manager = WorkspaceManager(template_dir, ttl_seconds=60)
+        stale = manager.get_workspace("stale")
+        manager.get_workspace("fresh")
+        os.utime(stale, (time.time() - 120, time.time() - 120))
+
+        collected = asyncio.run(manager.collect_garbage())
+
+        assert collected == ["stale"]
+        assert manager.list_sessions() == ["fresh"]
+        # The template is untouched by removing links to it
+        assert self.read(template_dir, "stores/animationStore.ts") == "export const store = {};"
+        assert os.path.exists(os.path.join(template_dir, "node_modules/three/index.js"))
+
+    def test_each_session_gets_its_own_preview(self, template_dir, monkeypatch):
+        # A plain HTTP server stands in for `yarn dev`
+        monkeypatch.setenv("ANIMATION_DEV_COMMAND", f'"{sys.executable}" -m http.server {{port}} --bind 127.0.0.1')
+        manager = WorkspaceManager(template_dir)
+
+        async def run():
+            try:
+                first = await manager.get_preview_url("alice")
+                again = await manager.get_preview_url("alice")
+                other = await manager.get_preview_url("bob")
+                return first, again, other
+            finally:
+                await manager.remove("alice")
+                await manager.close()
+
+        first, again, other = asyncio.run(run())
+
+        assert first == again
+        assert first != other
+        assert manager.list_sessions() == ["bob"]
+
+    def test_first_claim_owns_the_session(self, template_dir):
+        manager = WorkspaceManager(template_dir)
+
+        assert manager.session_owner("alice-session") is None
+        assert manager.claim_session("alice-session", "1")
+        assert manager.claim_session("alice-session", "1")
+        assert not manager.claim_session("alice-session", "2")
+        assert manager.session_owner("alice-session") == "1"
+        # Owner records are never listed as sessions
+        manager.get_workspace("alice-session")
+        assert manager.list_sessions() == ["alice-session"]
+
+        asyncio.run(manager.remove("alice-session"))
+
+        assert manager.session_owner("alice-session") is None
+
+    def test_preview_never_creates_a_workspace(self, template_dir):
+        manager = WorkspaceManager(template_dir)
+
+        with pytest.raises(FileNotFoundError):
+            asyncio.run(manager.get_preview_url("alice", create=False))
+
+        assert manager.list_sessions() == []
+
+    def test_preview_endpoint_requires_the_session_owner(self, template_dir, monkeypatch):
+        from linda_server.app import app
+
+        monkeypatch.setenv("ANIMATION_DEV_COMMAND", f'"{sys.executable}" -m http.server {{port}} --bind 127.0.0.1')
+        settings = get_auth_settings()
+        grants = get_preview_grants()
+
+        def token(user_id):
+            return jwt.encode({"sub": user_id, "exp": int(time.time()) + 600}, settings.secret_key, algorithm=settings.algorithm)
+
+        manager = get_workspace_manager()
+        manager.claim_session("alice-session", "1")
+        url = "/animations/alice-session"
+
+        with TestClient(app) as client:
+            assert client.get(url, follow_redirects=False).status_code == 401
+            assert client.get(url, params={"ticket": "made-up"}, follow_redirects=False).status_code == 401
+            # A ticket only opens the session it was issued for
+            bob_ticket = grants.issue_ticket("bob-session", "1")
+            assert client.get(url, params={"ticket": bob_ticket}, follow_redirects=False).status_code == 401
+            assert client.get(url, params={"ticket": grants.issue_ticket("alice-session", "2")}, follow_redirects=False).status_code == 404
+            # The owner's GET does not clone a workspace for a session that has none
+            assert client.get(url, headers={"Authorization": f"Bearer {token('1')}"}, follow_redirects=False).status_code == 404
+            assert manager.list_sessions() == []
+
+            workspace_dir = manager.get_workspace("alice-session")
+            try:
+                ticket = grants.issue_ticket("alice-session", "1")
+                response = client.get(url, params={"ticket": ticket}, follow_redirects=False)
+                location = response.headers["location"]
+                # The dev server serves under the base path the proxy forwards
+                os.makedirs(os.path.join(workspace_dir, location.strip("/")))
+                with open(os.path.join(workspace_dir, location.strip("/"), "index.html"), "w") as f:
+                    f.write("alice's animation")
+
+                proxied = client.get(location)
+                stranger = TestClient(app).get(location)
+                reused = client.get(url, params={"ticket": ticket}, follow_redirects=False)
+            finally:
+                # Preview servers belong to the app's event loop
+                client.portal.call(manager.close)
+
+        assert response.status_code == 307
+        assert location.startswith("/animation-previews/")
+        assert "HttpOnly" in response.headers["set-cookie"]
+        assert f"Path={location}" in response.headers["set-cookie"]
+        assert proxied.status_code == 200
+        assert proxied.text == "alice's animation"
+        # Without the preview cookie the dev server is out of reach, and tickets are single-use
+        assert stranger.status_code == 404
+        assert reused.status_code == 401
@@ -0,0 +1,60 @@
+import jwt
+import pytest
+import time
+from fastapi import FastAPI, Request, WebSocket
+from fastapi.testclient import TestClient
+from linda_server.utils.auth_middleware import UserAuthMiddleware
+from linda_server.utils.auth_tokens import AuthSettings, TokenVerifier
+
+SETTINGS = AuthSettings(secret_key="test-secret-key-of-at-least-32-bytes", algorithm="HS256", access_token_expire_minutes=30, token_cache_size=100)
+
+def make_token(sub="42"):
+    return jwt.encode({"sub": sub, "exp": int(time.time()) + 600}, SETTINGS.secret_key, algorithm="HS256")
+
+class TestUserAuthMiddleware:
+    @pytest.fixture
+    def client(self):
+        app = FastAPI()
+        app.add_middleware(UserAuthMiddleware, verifier=TokenVerifier(SETTINGS))
+
+        @app.get("/whoami")
+        async def whoami(request: Request):
+            return {"state": request.state.user, "scope": request.scope["user"]}
+
+        @app.websocket("/ws")
+        async def websocket_whoami(websocket: WebSocket):
+            await websocket.accept()
+            await websocket.send_json({"user": websocket.state.user})
+            await websocket.close()
+
+        return TestClient(app)
+
+    def test_bearer_token_sets_user(self, client):
+        response = client.get("/whoami", headers={"Authorization": f"Bearer {make_token()}"})
+
+        user = {"user_id": "42", "is_authenticated": True}
+        assert response.json() == {"state": user, "scope": user}
+
+    @pytest.mark.parametrize("headers", [
+        {},
+        {"Authorization": "Bearer not-a-jwt"},
+        {"Authorization": f"Basic {make_token()}"},
+    ])
+    def test_missing_or_invalid_token_sets_no_user(self, client, headers):
+        assert client.get("/whoami", headers=headers).json() == {"state": None, "scope": None}
+
+    def test_websocket_gets_user(self, client):
+        with client.websocket_connect("/ws", headers={"Authorization": f"Bearer {make_token('7')}"}) as websocket:
+            assert websocket.receive_json() == {"user": {"user_id": "7", "is_authenticated": True}}
+
+    def test_graphql_endpoint_still_answers(self):
+        from linda_server.app import app
+
+        response = TestClient(app).post(
+            "/graphql",
+            json={"query": "{ __typename }"},
+            headers={"Authorization": f"Bearer {make_token()}"},
+        )
+
+        assert response.status_code == 200
+        assert response.json() == {"data": {"__typename": "Query"}}
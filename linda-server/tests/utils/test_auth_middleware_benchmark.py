@@ -0,0 +1,79 @@
+"""
+Throughput of a trivial GraphQL query behind the old BaseHTTPMiddleware auth hook
+and behind the ASGI auth middleware.
+
+Requires pytest-benchmark. Run with:
+    pytest tests/utils/test_auth_middleware_benchmark.py --benchmark-only
+"""
+import asyncio
+import time
+import httpx
+import jwt
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+from fastapi import FastAPI, Request
+from strawberry.fastapi import GraphQLRouter
+from linda_server.graphql.schema import schema
+from linda_server.utils.auth_middleware import UserAuthMiddleware
+from linda_server.utils.auth_tokens import AuthSettings, InvalidTokenError, TokenVerifier
+
+SETTINGS = AuthSettings(secret_key="benchmark-secret-key-of-at-least-32-bytes", algorithm="HS256", access_token_expire_minutes=30, token_cache_size=100)
+TOKEN = jwt.encode({"sub": "42", "exp": int(time.time()) + 3600}, SETTINGS.secret_key, algorithm="HS256")
+REQUESTS_PER_ROUND = 200
+
+def graphql_app() -> FastAPI:
+    app = FastAPI()
+    app.include_router(GraphQLRouter(schema), prefix="/graphql")
+    return app
+
+def base_http_middleware_app() -> FastAPI:
+    """The original @app.middleware("http") hook, with the same cached verifier."""
+    app = graphql_app()
+    verifier = TokenVerifier(SETTINGS)
+
+    @app.middleware("http")
+    async def add_user_to_request(request: Request, call_next):
+        token = request.headers.get("Authorization")
+        request.state.user = None
+        if token:
+            scheme, _, param = token.partition(" ")
+            if scheme.lower() == "bearer":
+                try:
+                    request.state.user = verifier.verify(param)
+                except InvalidTokenError:
+                    pass
+        return await call_next(request)
+
+    return app
+
+def asgi_middleware_app() -> FastAPI:
+    app = graphql_app()
+    app.add_middleware(UserAuthMiddleware, verifier=TokenVerifier(SETTINGS))
+    return app
+
+def run_queries(app: FastAPI) -> int:
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            ok = 0
+            for _ in range(REQUESTS_PER_ROUND):
+                response = await client.post(
+                    "/graphql",
+                    json={"query": "{ __typename }"},
+                    headers={"Authorization": f"Bearer {TOKEN}"},
+                )
+                ok += response.status_code == 200
+            return ok
+
+    return asyncio.run(run())
+
+@pytest.mark.parametrize("name, make_app", [
+    ("base_http_middleware", base_http_middleware_app),
+    ("asgi_middleware", asgi_middleware_app),
+])
+def test_benchmark_graphql_typename(benchmark, name, make_app):
+    benchmark.group = f"graphql-typename-x{REQUESTS_PER_ROUND}"
+    app = make_app()
+    assert benchmark.pedantic(run_queries, args=(app,), rounds=5, warmup_rounds=1) == REQUESTS_PER_ROUND
@@ -0,0 +1,83 @@
+import jwt
+import pytest
+import time
+from linda_server.utils import auth_tokens
+from linda_server.utils.auth_tokens import AuthSettings, InvalidTokenError, TokenVerifier
+from linda_server.utils.metrics import metrics
+
+SETTINGS = AuthSettings(secret_key="test-secret-key-of-at-least-32-bytes", algorithm="HS256", access_token_expire_minutes=30, token_cache_size=2)
+
+def make_token(sub="42", expires_in=1800, key="test-secret-key-of-at-least-32-bytes", **claims):
+    if expires_in is not None:
+        claims["exp"] = int(time.time()) + expires_in
+    if sub is not None:
+        claims["sub"] = sub
+    return jwt.encode(claims, key, algorithm="HS256")
+
+class TestTokenVerifier:
+    @pytest.fixture(autouse=True)
+    def reset_metrics(self):
+        metrics.reset()
+
+    def test_repeated_token_is_served_from_cache(self, monkeypatch):
+        verifier = TokenVerifier(SETTINGS)
+        token = make_token()
+        decodes = []
+        decode = jwt.decode
+        monkeypatch.setattr(auth_tokens.jwt, "decode", lambda *args, **kwargs: decodes.append(1) or decode(*args, **kwargs))
+
+        users = [verifier.verify(token) for _ in range(5)]
+
+        assert users == [{"user_id": "42", "is_authenticated": True}] * 5
+        assert len(decodes) == 1
+        assert metrics.get("auth_token_cache_total", {"result": "hit"}) == 4
+
+    def test_cached_token_expires_at_its_exp(self, monkeypatch):
+        verifier = TokenVerifier(SETTINGS)
+        token = make_token(expires_in=60)
+        verifier.verify(token)
+        now = time.time()
+        monkeypatch.setattr(auth_tokens.time, "time", lambda: now + 120)
+        monkeypatch.setattr(auth_tokens.jwt, "decode", lambda *args, **kwargs: (_ for _ in ()).throw(jwt.ExpiredSignatureError("expired")))
+
+        with pytest.raises(InvalidTokenError):
+            verifier.verify(token)
+        assert len(verifier) == 0
+        assert metrics.get("auth_token_cache_total", {"result": "expired"}) == 1
+
+    def test_invalid_tokens_are_rejected_and_not_cached(self):
+        verifier = TokenVerifier(SETTINGS)
+        for token in (make_token(key="other-secret-key-of-at-least-32-bytes"), make_token(sub=None), make_token(expires_in=-10), "not-a-jwt"):
+            with pytest.raises(InvalidTokenError):
+                verifier.verify(token)
+        assert len(verifier) == 0
+
+    def test_tokens_without_exp_are_not_cached(self):
+        verifier = TokenVerifier(SETTINGS)
+
+        assert verifier.verify(make_token(expires_in=None))["user_id"] == "42"
+        assert len(verifier) == 0
+
+    def test_cache_evicts_least_recently_used(self):
+        verifier = TokenVerifier(SETTINGS)
+        first, second, third = make_token("1"), make_token("2"), make_token("3")
+        verifier.verify(first)
+        verifier.verify(second)
+        verifier.verify(first)
+        verifier.verify(third)
+
+        assert len(verifier) == 2
+        metrics.reset()
+        verifier.verify(first)
+        verifier.verify(second)
+        assert metrics.get("auth_token_cache_total", {"result": "hit"}) == 1
+        assert metrics.get("auth_token_cache_total", {"result": "miss"}) == 1
+
+    def test_settings_are_read_once(self, monkeypatch):
+        monkeypatch.setattr(auth_tokens, "_settings", None)
+        monkeypatch.setenv("JWT_SECRET_KEY", "first")
+        settings = auth_tokens.get_auth_settings()
+        monkeypatch.setenv("JWT_SECRET_KEY", "second")
+
+        assert auth_tokens.get_auth_settings() is settings
+        assert settings.secret_key == "first"
@@ -0,0 +1,46 @@
+"""
+Benchmarks for the per-request cost of authenticating a bearer token.
+
+Requires pytest-benchmark. Run with:
+    pytest tests/utils/test_auth_tokens_benchmark.py --benchmark-only
+"""
+import os
+import time
+import jwt
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+from linda_server.utils.auth_tokens import AuthSettings, TokenVerifier
+
+SETTINGS = AuthSettings(secret_key="benchmark-secret-key-of-at-least-32-bytes", algorithm="HS256", access_token_expire_minutes=30, token_cache_size=10000)
+TOKEN = jwt.encode({"sub": "42", "exp": int(time.time()) + 3600}, SETTINGS.secret_key, algorithm="HS256")
+
+def reference_verify_token(token: str):
+    """The original app.verify_token: settings from the environment and a full decode per request."""
+    secret_key = os.getenv("JWT_SECRET_KEY", "benchmark-secret-key-of-at-least-32-bytes")
+    algorithm = os.getenv("JWT_ALGORITHM", "HS256")
+    payload = jwt.decode(token, secret_key, algorithms=[algorithm])
+    return {"user_id": payload.get("sub"), "is_authenticated": True}
+
+@pytest.fixture(autouse=True)
+def unset_jwt_env(monkeypatch):
+    monkeypatch.delenv("JWT_SECRET_KEY", raising=False)
+    monkeypatch.delenv("JWT_ALGORITHM", raising=False)
+
+def test_cached_verifier_matches_reference():
+    assert TokenVerifier(SETTINGS).verify(TOKEN) == reference_verify_token(TOKEN)
+
+def test_benchmark_reference_verify_token(benchmark):
+    benchmark.group = "verify-same-token"
+    assert benchmark(reference_verify_token, TOKEN)["user_id"] == "42"
+
+def test_benchmark_cached_verify_token(benchmark):
+    benchmark.group = "verify-same-token"
+    verifier = TokenVerifier(SETTINGS)
+    assert benchmark(verifier.verify, TOKEN)["user_id"] == "42"
+
+def test_benchmark_uncached_verify_token(benchmark):
+    benchmark.group = "verify-same-token"
+    verifier = TokenVerifier(AuthSettings(SETTINGS.secret_key, SETTINGS.algorithm, 30, token_cache_size=0))
+    assert benchmark(verifier.verify, TOKEN)["user_id"] == "42"
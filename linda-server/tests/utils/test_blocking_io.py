@@ -0,0 +1,94 @@
+import asyncio
+import base64
+import os
+import pytest
+import shutil
+import tempfile
+import threading
+import time
+from temporalio.testing import ActivityEnvironment
+from linda_server.functions.file_storage import SaveFileInput, save_file
+from linda_server.utils.animation_commit import commit_animation_files_async
+from linda_server.utils.animation_parser import AnimationFileInfo
+from linda_server.utils.blocking_io import OffloadStats, run_file_io
+from linda_server.utils.metrics import metrics
+
+class TestBlockingIo:
+    @pytest.fixture(autouse=True)
+    def reset_metrics(self):
+        metrics.reset()
+
+    @pytest.fixture
+    def base_dir(self):
+        parent = tempfile.mkdtemp()
+        base_dir = os.path.join(parent, "animation_server")
+        os.makedirs(base_dir)
+        yield base_dir
+        shutil.rmtree(parent)
+
+    def test_blocking_work_does_not_stall_the_loop(self):
+        stats = OffloadStats()
+        ticks = []
+
+        async def ticker():
+            while True:
+                ticks.append(time.perf_counter())
+                await asyncio.sleep(0.01)
+
+        async def run():
+            task = asyncio.create_task(ticker())
+            thread = await run_file_io("test", lambda: (time.sleep(0.2), threading.current_thread().name)[1], stats=stats)
+            task.cancel()
+            return thread
+
+        assert asyncio.run(run()).startswith("file-io")
+        # The loop kept ticking while the work slept in the pool
+        assert len(ticks) >= 10
+        assert stats.calls == 1
+        assert stats.seconds >= 0.2
+        assert metrics.get("file_io_offloaded_seconds_total") >= 0.2
+        assert metrics.get("file_io_calls_total", labels={"operation": "test"}) == 1
+
+    def test_exceptions_propagate(self):
+        def fail():
+            raise OSError("disk full")
+
+        with pytest.raises(OSError, match="disk full"):
+            asyncio.run(run_file_io("test", fail))
+
+    def test_async_commit_matches_sync_commit(self, base_dir):
+        files = [AnimationFileInfo(f"components/File{n}.vue", f"<template>{n}</template>") for n in range(20)]
+        files.append(AnimationFileInfo("nuxt.config.ts", "export default {}"))
+        stats = OffloadStats()
+
+        result = asyncio.run(commit_animation_files_async(base_dir, files, stats=stats))
+
+        assert result.saved_files == [os.path.join(base_dir, f.path) for f in files[:20]]
+        assert result.skipped_files == [os.path.join(base_dir, "nuxt.config.ts")]
+        with open(os.path.join(base_dir, "components/File7.vue")) as f:
+            assert f.read() == "<template>7</template>"
+        # Begin, one stage per file, swap and cleanup
+        assert stats.calls == 24
+        assert os.listdir(os.path.dirname(base_dir)) == ["animation_server"]
+
+    def test_async_commit_staging_failure_leaves_target_untouched(self, base_dir):
+        files = [AnimationFileInfo("a.ts", "fine"), AnimationFileInfo("b.ts", "unencodable \ud800")]
+
+        with pytest.raises(IOError):
+            asyncio.run(commit_animation_files_async(base_dir, files))
+
+        assert os.listdir(base_dir) == []
+        assert os.listdir(os.path.dirname(base_dir)) == ["animation_server"]
+
+    def test_save_file_writes_upload(self, base_dir, monkeypatch):
+        monkeypatch.chdir(base_dir)
+
+        result = asyncio.run(ActivityEnvironment().run(save_file, SaveFileInput(
+            file_content=base64.b64encode(b"png bytes").decode(),
+            file_name="image.png",
+            file_type="image/png",
+        )))
+
+        with open(os.path.join(base_dir, result.file_path), "rb") as f:
+            assert f.read() == b"png bytes"
+        assert metrics.get("file_io_calls_total", labels={"operation": "upload"}) == 1
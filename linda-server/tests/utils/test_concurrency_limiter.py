@@ -0,0 +1,58 @@
+import asyncio
+import pytest
+from linda_server.utils.concurrency_limiter import AdaptiveLimiter
+from linda_server.utils.metrics import metrics
+
+class TestAdaptiveLimiter:
+    def test_limit_grows_on_healthy_latency(self):
+        async def run():
+            limiter = AdaptiveLimiter("test", initial_limit=2, max_limit=4, latency_target=10)
+            for _ in range(10):
+                async with limiter.slot():
+                    pass
+            return limiter.limit
+
+        limit = asyncio.run(run())
+        assert 2 < limit <= 4
+
+    def test_limit_shrinks_on_overload(self):
+        async def run():
+            limiter = AdaptiveLimiter("test", initial_limit=8, min_limit=1)
+            with pytest.raises(asyncio.TimeoutError):
+                async with limiter.slot():
+                    raise asyncio.TimeoutError()
+            return limiter.limit
+
+        assert asyncio.run(run()) == 4
+
+    def test_other_errors_keep_limit(self):
+        async def run():
+            limiter = AdaptiveLimiter("test", initial_limit=8)
+            with pytest.raises(ValueError):
+                async with limiter.slot():
+                    raise ValueError("bad request")
+            return limiter.limit
+
+        assert asyncio.run(run()) == 8
+
+    def test_concurrency_is_bounded_and_queue_observable(self):
+        async def run():
+            limiter = AdaptiveLimiter("bounded", initial_limit=2, max_limit=2)
+            peak = 0
+            depths = []
+
+            async def call():
+                nonlocal peak
+                async with limiter.slot():
+                    peak = max(peak, limiter.in_flight)
+                    depths.append(metrics.get("bounded_queue_depth"))
+                    await asyncio.sleep(0.01)
+
+            await asyncio.gather(*(call() for _ in range(6)))
+            return peak, max(depths), limiter.stats()
+
+        peak, max_depth, stats = asyncio.run(run())
+        assert peak == 2
+        assert max_depth > 0
+        assert stats["in_flight"] == 0
+        assert stats["queue_depth"] == 0
@@ -0,0 +1,77 @@
+import asyncio
+import os
+import pytest
+import tempfile
+import shutil
+from linda_server.functions.animation_services import save_animation_code
+from linda_server.utils.animation_parser import AnimationFileInfo, save_animation_files
+from linda_server.utils.file_manifest import MANIFEST_FILENAME, FileManifest, get_file_manifest
+from linda_server.utils.metrics import metrics
+
+CODE = "File: stores/animationStore.ts\n```ts\nexport const a = 1;\n```\nFile: components/Scene.vue\n```vue\n<template />\n```\n"
+
+class TestFileManifest:
+    @pytest.fixture
+    def base_dir(self):
+        parent = tempfile.mkdtemp()
+        base_dir = os.path.join(parent, "animation_server")
+        os.makedirs(base_dir)
+        metrics.reset()
+        yield base_dir
+        shutil.rmtree(parent)
+
+    def test_identical_files_are_not_rewritten(self, base_dir, monkeypatch):
+        monkeypatch.setenv("ANIMATION_SERVER_PATH", base_dir)
+        monkeypatch.setenv("ANIMATION_BUILDS_ENABLED", "false")
+        first = asyncio.run(save_animation_code(CODE))
+        store = os.path.join(base_dir, "stores/animationStore.ts")
+        mtime = os.stat(store).st_mtime_ns
+
+        changed = CODE.replace("<template />", "<template><div /></template>")
+        second = asyncio.run(save_animation_code(changed))
+
+        assert len(first["written_files"]) == 2
+        assert second["unchanged_files"] == [store]
+        assert second["written_files"] == [os.path.join(base_dir, "components/Scene.vue")]
+        assert len(second["saved_files"]) == 2
+        assert second["commit"]["unchanged"] == 1
+        assert os.stat(store).st_mtime_ns == mtime
+        assert metrics.get("animation_files_unchanged_total") == 1
+
+    def test_externally_modified_file_is_rewritten(self, base_dir):
+        files = [AnimationFileInfo("a.ts", "const a = 1;")]
+        save_animation_files(base_dir, files)
+        with open(os.path.join(base_dir, "a.ts"), "w") as f:
+            f.write("edited by hand")
+
+        unchanged = []
+        written = save_animation_files(base_dir, files, unchanged)
+
+        assert written == [os.path.join(base_dir, "a.ts")]
+        assert unchanged == []
+        with open(os.path.join(base_dir, "a.ts")) as f:
+            assert f.read() == "const a = 1;"
+
+    def test_matching_file_without_entry_is_adopted(self, base_dir):
+        with open(os.path.join(base_dir, "a.ts"), "w") as f:
+            f.write("const a = 1;")
+
+        manifest = FileManifest(base_dir)
+
+        assert manifest.is_unchanged(os.path.join(base_dir, "a.ts"), "const a = 1;")
+        assert not manifest.is_unchanged(os.path.join(base_dir, "a.ts"), "const a = 2;")
+        assert not manifest.is_unchanged(os.path.join(base_dir, "missing.ts"), "")
+
+    def test_manifest_persists(self, base_dir):
+        save_animation_files(base_dir, [AnimationFileInfo("a.ts", "x")])
+
+        assert os.path.exists(os.path.join(base_dir, MANIFEST_FILENAME))
+        reloaded = FileManifest(base_dir)
+        assert reloaded is not get_file_manifest(base_dir)
+        assert reloaded.is_unchanged(os.path.join(base_dir, "a.ts"), "x")
+
+    def test_unreadable_manifest_is_ignored(self, base_dir):
+        with open(os.path.join(base_dir, MANIFEST_FILENAME), "w") as f:
+            f.write("not json")
+
+        assert save_animation_files(base_dir, [AnimationFileInfo("a.ts", "x")]) == [os.path.join(base_dir, "a.ts")]
@@ -0,0 +1,72 @@
+import os
+import pytest
+import tempfile
+import shutil
+from linda_server.functions.llm_chat import Message
+from linda_server.utils.llm_cache import LlmResponseCache, llm_cache_enabled, make_cache_key
+from linda_server.utils.metrics import metrics
+
+class TestLlmCache:
+    @pytest.fixture
+    def temp_dir(self):
+        temp_dir = tempfile.mkdtemp()
+        yield temp_dir
+        shutil.rmtree(temp_dir)
+
+    @pytest.fixture(autouse=True)
+    def reset_metrics(self):
+        metrics.reset()
+
+    def test_make_cache_key_normalizes_messages(self):
+        key = make_cache_key("gpt-4.1", None, [Message(role="user", content="Find the area\r\n")])
+        same = make_cache_key("gpt-4.1", None, [Message(role="user", content="  Find the area")])
+        other_model = make_cache_key("gpt-4o", None, [Message(role="user", content="Find the area")])
+
+        assert key == same
+        assert key != other_model
+
+    def test_memory_hit_and_miss(self):
+        cache = LlmResponseCache(db_path=None)
+        assert cache.get("k") is None
+        cache.set("k", "answer")
+        assert cache.get("k") == "answer"
+
+        stats = cache.stats()
+        assert stats["memory_hits"] == 1
+        assert stats["misses"] == 1
+
+    def test_lru_eviction(self):
+        cache = LlmResponseCache(db_path=None, max_entries=2)
+        cache.set("a", "1")
+        cache.set("b", "2")
+        cache.get("a")
+        cache.set("c", "3")
+
+        assert cache.get("b") is None
+        assert cache.get("a") == "1"
+        assert cache.stats()["evictions"] == 1
+
+    def test_ttl_expiry(self):
+        cache = LlmResponseCache(db_path=None, ttl_seconds=-1)
+        cache.set("k", "answer")
+        assert cache.get("k") is None
+
+    def test_disk_tier_survives_restart(self, temp_dir):
+        db_path = os.path.join(temp_dir, "cache.sqlite3")
+        cache = LlmResponseCache(db_path=db_path)
+        cache.set("k", "answer")
+        cache.close()
+
+        reopened = LlmResponseCache(db_path=db_path)
+        assert reopened.get("k") == "answer"
+        assert reopened.stats()["disk_hits"] == 1
+        # The disk hit is promoted into memory
+        assert reopened.get("k") == "answer"
+        assert reopened.stats()["memory_hits"] == 1
+        reopened.close()
+
+    def test_cache_is_off_unless_enabled(self, monkeypatch):
+        monkeypatch.delenv("LLM_CACHE_ENABLED", raising=False)
+        assert not llm_cache_enabled()
+        monkeypatch.setenv("LLM_CACHE_ENABLED", "true")
+        assert llm_cache_enabled()
@@ -0,0 +1,118 @@
+import asyncio
+import os
+import pytest
+import tempfile
+import threading
+import shutil
+import time
+from openai.types.chat import ChatCompletion
+from linda_server.utils.llm_cassette import CassetteMissError, LlmCassette
+from linda_server.utils.metrics import metrics
+from linda_server.utils.stream_relay import chunk_content, iter_text_chunks
+
+class TestLlmCassette:
+    @pytest.fixture
+    def cassette_path(self):
+        temp_dir = tempfile.mkdtemp()
+        yield os.path.join(temp_dir, "nested", "cassette.jsonl.gz")
+        shutil.rmtree(temp_dir)
+
+    @pytest.fixture(autouse=True)
+    def reset_metrics(self):
+        metrics.reset()
+
+    def _completion(self, content):
+        return ChatCompletion(
+            id="chatcmpl-test",
+            object="chat.completion",
+            created=0,
+            model="gpt-4.1",
+            choices=[{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            usage={"prompt_tokens": 10, "completion_tokens": 3, "total_tokens": 13},
+        )
+
+    def test_record_and_replay_completion(self, cassette_path):
+        recorder = LlmCassette(cassette_path, "record")
+        asyncio.run(recorder.record_completion("k", "gpt-4.1", self._completion("first"), time.monotonic()))
+        asyncio.run(recorder.record_completion("k", "gpt-4.1", self._completion("second"), time.monotonic()))
+
+        player = LlmCassette(cassette_path, "replay", time_scale=0)
+        replayed = [asyncio.run(player.replay_completion("k", "gpt-4.1")) for _ in range(3)]
+
+        # Repeated recordings of one request replay in order, then cycle
+        assert [r.choices[0].message.content for r in replayed] == ["first", "second", "first"]
+        assert replayed[0].usage.prompt_tokens == 10
+        assert metrics.get("llm_cassette_replayed_total", labels={"stream": False}) == 3
+
+    def test_record_and_replay_stream_with_timing(self, cassette_path):
+        recorder = LlmCassette(cassette_path, "record")
+
+        async def upstream():
+            async for chunk in iter_text_chunks("a" * 40, "gpt-4.1", chunk_size=10):
+                await asyncio.sleep(0.05)
+                yield chunk
+
+        async def record():
+            return [c async for c in recorder.record_stream("k", "gpt-4.1", upstream(), time.monotonic())]
+
+        recorded = asyncio.run(record())
+
+        async def replay(scale):
+            player = LlmCassette(cassette_path, "replay", time_scale=scale)
+            started = time.monotonic()
+            chunks = [c async for c in player.replay_stream("k", "gpt-4.1")]
+            return chunks, time.monotonic() - started
+
+        original, original_elapsed = asyncio.run(replay(1.0))
+        compressed, compressed_elapsed = asyncio.run(replay(0))
+
+        text = "".join(chunk_content(c) or "" for c in recorded)
+        assert "".join(chunk_content(c) or "" for c in original) == text
+        assert "".join(chunk_content(c) or "" for c in compressed) == text
+        assert original[-1].choices[0].finish_reason == "stop"
+        assert original_elapsed >= 0.15
+        assert compressed_elapsed < 0.1
+
+    def test_abandoned_stream_is_not_recorded(self, cassette_path):
+        recorder = LlmCassette(cassette_path, "record")
+
+        async def record_first_chunk():
+            stream = recorder.record_stream("k", "gpt-4.1", iter_text_chunks("abcdef", "gpt-4.1", 2), time.monotonic())
+            async for _ in stream:
+                break
+            await stream.aclose()
+
+        asyncio.run(record_first_chunk())
+
+        player = LlmCassette(cassette_path, "replay", time_scale=0)
+        with pytest.raises(CassetteMissError):
+            asyncio.run(player.replay_completion("k", "gpt-4.1"))
+
+    def test_replay_miss(self, cassette_path):
+        player = LlmCassette(cassette_path, "replay")
+
+        async def consume():
+            return [c async for c in player.replay_stream("missing", "gpt-4.1")]
+
+        with pytest.raises(CassetteMissError):
+            asyncio.run(consume())
+        assert metrics.get("llm_cassette_misses_total") == 1
+
+    def test_cassette_file_is_read_and_written_off_the_event_loop(self, cassette_path, monkeypatch):
+        on_main_thread = []
+        for name in ("_write", "_load"):
+            original = getattr(LlmCassette, name)
+
+            def recording(self, *args, original=original):
+                on_main_thread.append(threading.current_thread() is threading.main_thread())
+                return original(self, *args)
+
+            monkeypatch.setattr(LlmCassette, name, recording)
+
+        recorder = LlmCassette(cassette_path, "record")
+        asyncio.run(recorder.record_completion("k", "gpt-4.1", self._completion("first"), time.monotonic()))
+        player = LlmCassette(cassette_path, "replay", time_scale=0)
+        replayed = asyncio.run(player.replay_completion("k", "gpt-4.1"))
+
+        assert replayed.choices[0].message.content == "first"
+        assert on_main_thread == [False, False]
@@ -0,0 +1,48 @@
+import asyncio
+import pytest
+from linda_server.utils import llm_client
+from linda_server.utils.llm_client import get_llm_client, resolve_llm_endpoint, close_llm_clients
+
+class TestLlmClient:
+    @pytest.fixture(autouse=True)
+    def clean_env(self, monkeypatch):
+        for name in ("RESTACK_API_KEY", "OPENAI_API_KEY", "LLM_BASE_URL"):
+            monkeypatch.delenv(name, raising=False)
+        llm_client._clients.clear()
+        yield
+        llm_client._clients.clear()
+
+    def test_resolve_llm_endpoint_openai(self, monkeypatch):
+        monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+        assert resolve_llm_endpoint() == (llm_client.OPENAI_BASE_URL, "sk-test")
+
+    def test_resolve_llm_endpoint_override(self, monkeypatch):
+        monkeypatch.setenv("RESTACK_API_KEY", "rk-test")
+        monkeypatch.setenv("LLM_BASE_URL", "http://localhost:8001/v1")
+        assert resolve_llm_endpoint() == ("http://localhost:8001/v1", "rk-test")
+
+    def test_resolve_llm_endpoint_missing_key(self):
+        with pytest.raises(ValueError):
+            resolve_llm_endpoint()
+
+    def test_client_is_shared_per_endpoint(self):
+        first = get_llm_client("http://a.example/v1", "key")
+        second = get_llm_client("http://a.example/v1", "key")
+        other = get_llm_client("http://b.example/v1", "key")
+
+        assert first is second
+        assert first is not other
+
+    def test_pool_limits_from_env(self, monkeypatch):
+        monkeypatch.setenv("LLM_HTTP_MAX_CONNECTIONS", "7")
+        monkeypatch.setenv("LLM_HTTP_MAX_KEEPALIVE_CONNECTIONS", "3")
+        client = get_llm_client("http://a.example/v1", "key")
+
+        pool = client._client._transport._pool
+        assert pool._max_connections == 7
+        assert pool._max_keepalive_connections == 3
+
+    def test_close_llm_clients(self):
+        get_llm_client("http://a.example/v1", "key")
+        asyncio.run(close_llm_clients())
+        assert llm_client._clients == {}
@@ -0,0 +1,81 @@
+import asyncio
+import time
+import pytest
+from linda_server.utils.llm_retry import (
+    DeadlineExceeded,
+    LatencyTracker,
+    call_with_retries,
+    compute_deadline,
+    hedged_call,
+)
+
+class TestLlmRetry:
+    def test_compute_deadline_outside_function_uses_default(self):
+        deadline = compute_deadline(default_seconds=30)
+        assert 20 < deadline - time.monotonic() <= 30
+
+    def test_transient_errors_are_retried(self):
+        attempts = []
+
+        async def flaky(timeout):
+            attempts.append(timeout)
+            if len(attempts) < 3:
+                raise asyncio.TimeoutError()
+            return "ok"
+
+        result = asyncio.run(call_with_retries(flaky, time.monotonic() + 10, max_attempts=3, base_delay=0.001))
+        assert result == "ok"
+        assert len(attempts) == 3
+
+    def test_non_transient_errors_are_not_retried(self):
+        attempts = []
+
+        async def broken(timeout):
+            attempts.append(timeout)
+            raise ValueError("bad request")
+
+        with pytest.raises(ValueError):
+            asyncio.run(call_with_retries(broken, time.monotonic() + 10, max_attempts=3, base_delay=0.001))
+        assert len(attempts) == 1
+
+    def test_expired_deadline(self):
+        async def never_called(timeout):
+            raise AssertionError("should not run")
+
+        with pytest.raises(DeadlineExceeded):
+            asyncio.run(call_with_retries(never_called, time.monotonic() - 1))
+
+    def test_latency_percentile(self):
+        tracker = LatencyTracker()
+        for latency in range(1, 101):
+            tracker.record(float(latency))
+        assert tracker.percentile(95) == 95.0
+        assert tracker.percentile(50) == 50.0
+
+    def test_hedge_wins_when_primary_is_slow(self):
+        calls = []
+
+        async def call():
+            calls.append(1)
+            # The first call stalls, the hedge answers quickly
+            await asyncio.sleep(1 if len(calls) == 1 else 0.01)
+            return len(calls)
+
+        async def run():
+            started = time.monotonic()
+            result = await hedged_call(call, hedge_delay=0.02)
+            return result, time.monotonic() - started
+
+        result, elapsed = asyncio.run(run())
+        assert len(calls) == 2
+        assert elapsed < 0.5
+
+    def test_no_hedge_without_delay(self):
+        calls = []
+
+        async def call():
+            calls.append(1)
+            return "ok"
+
+        assert asyncio.run(hedged_call(call, hedge_delay=None)) == "ok"
+        assert len(calls) == 1
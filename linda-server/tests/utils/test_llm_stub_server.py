@@ -0,0 +1,55 @@
+import json
+import pytest
+from fastapi.testclient import TestClient
+from linda_server.utils.animation_parser import parse_animation_code
+from linda_server.utils.llm_stub_server import (
+    CANNED_ANIMATION_CODE,
+    CANNED_GEOMETRY_SOLUTION,
+    StubSettings,
+    create_stub_app,
+    split_tokens,
+)
+
+class TestLlmStubServer:
+    @pytest.fixture
+    def client(self):
+        return TestClient(create_stub_app(StubSettings(ttft=0, tokens_per_second=0)))
+
+    def test_split_tokens_round_trips(self):
+        assert "".join(split_tokens(CANNED_GEOMETRY_SOLUTION)) == CANNED_GEOMETRY_SOLUTION
+
+    def test_canned_animation_code_parses(self):
+        files = parse_animation_code(CANNED_ANIMATION_CODE)
+        assert [f.path for f in files] == [
+            "components/GeometryAnimation.vue",
+            "stores/animationStore.ts",
+            "utils/geometry-helpers.ts",
+        ]
+
+    def test_non_streaming_completion(self, client):
+        response = client.post("/v1/chat/completions", json={
+            "model": "gpt-4.1",
+            "messages": [{"role": "user", "content": "Find AB"}],
+        })
+        body = response.json()
+        assert response.status_code == 200
+        assert body["choices"][0]["message"]["content"] == CANNED_GEOMETRY_SOLUTION
+        assert body["usage"]["completion_tokens"] > 0
+
+    def test_streaming_completion(self, client):
+        with client.stream("POST", "/v1/chat/completions", json={
+            "model": "gpt-4.1",
+            "messages": [{"role": "system", "content": "Write animation code. File: x.vue"}],
+            "stream": True,
+        }) as response:
+            events = [line[len("data: "):] for line in response.iter_lines() if line.startswith("data: ")]
+
+        assert events[-1] == "[DONE]"
+        chunks = [json.loads(e) for e in events[:-1]]
+        text = "".join(c["choices"][0]["delta"].get("content") or "" for c in chunks)
+        assert text == CANNED_ANIMATION_CODE
+
+    def test_error_rate(self):
+        client = TestClient(create_stub_app(StubSettings(ttft=0, error_rate=1.0)))
+        response = client.post("/v1/chat/completions", json={"messages": []})
+        assert response.status_code in (429, 500)
@@ -0,0 +1,195 @@
+import asyncio
+import pytest
+import threading
+from types import SimpleNamespace
+from linda_server.services import user_service as user_service_module
+from linda_server.services.user_service import UserService
+from linda_server.utils import login_guard
+from linda_server.utils.login_guard import LoginGuard, LoginThrottledError, TokenBuckets
+from linda_server.utils.metrics import metrics
+
+class FakeUserRepository:
+    def __init__(self):
+        self.users = {"alice": SimpleNamespace(id=1, username="alice", hashed_password="hashed:right")}
+        self.threads = []
+
+    def find_user_by_username(self, username):
+        self.threads.append(threading.get_ident())
+        return self.users.get(username)
+
+    def update_user(self, user_id, **data):
+        self.threads.append(threading.get_ident())
+        user = next(user for user in self.users.values() if user.id == user_id)
+        if "hashed_password" in data:
+            user.hashed_password = data["hashed_password"]
+        return user
+
+class TestTokenBuckets:
+    def test_burst_then_refill(self):
+        buckets = TokenBuckets(capacity=2, per_second=0.5)
+
+        assert buckets.take("alice", now=0) == 0
+        assert buckets.take("alice", now=0) == 0
+        assert buckets.take("alice", now=0) == pytest.approx(2)
+        assert buckets.take("bob", now=0) == 0
+        assert buckets.take("alice", now=2) == 0
+        assert buckets.take("alice", now=2) == pytest.approx(2)
+
+    def test_keys_are_bounded(self):
+        buckets = TokenBuckets(capacity=1, per_second=1, max_keys=2)
+        for key in ("a", "b", "c"):
+            buckets.take(key, now=0)
+
+        assert len(buckets) == 2
+        # The evicted key starts over with a full bucket
+        assert buckets.take("a", now=0) == 0
+
+    def test_zero_rate_disables_the_limit(self):
+        buckets = TokenBuckets(capacity=0, per_second=0)
+
+        assert all(buckets.take("alice") == 0 for _ in range(10))
+
+class TestLoginGuard:
+    @pytest.fixture
+    def guard(self, monkeypatch):
+        metrics.reset()
+        guard = LoginGuard(TokenBuckets(3, 1 / 60), TokenBuckets(5, 1 / 60), failure_ttl=60, failure_cache_size=100)
+        monkeypatch.setattr(login_guard, "_guard", guard)
+        return guard
+
+    @pytest.fixture
+    def service(self, monkeypatch):
+        verifications = []
+
+        async def fake_verify(plain_password, hashed_password):
+            verifications.append(plain_password)
+            return hashed_password == f"hashed:{plain_password}"
+
+        async def fake_hash(password):
+            return f"hashed:{password}"
+
+        monkeypatch.setattr(user_service_module, "verify_password_async", fake_verify)
+        monkeypatch.setattr(user_service_module, "hash_password_async", fake_hash)
+        service = UserService(FakeUserRepository())
+        service.verifications = verifications
+        return service
+
+    def test_repeated_failure_is_answered_from_memory(self, guard, service):
+        async def run():
+            return [await service.authenticate_user_async("alice", "wrong", "10.0.0.1") for _ in range(3)]
+
+        assert asyncio.run(run()) == [None, None, None]
+
+        assert service.verifications == ["wrong"]
+        assert metrics.get("login_attempts_rejected_total", {"reason": "failed_recently"}) == 2
+        assert metrics.get("login_bcrypt_verifications_saved_total") == 2
+        assert metrics.get("login_bcrypt_seconds_saved_total") > 0
+        assert metrics.get("login_failure_cache_size") == 1
+
+    def test_cached_failure_expires(self, guard):
+        guard.record_failure("alice", "wrong", now=0)
+
+        assert guard.recently_failed("alice", "wrong", now=59)
+        assert not guard.recently_failed("alice", "wrong", now=61)
+        assert not guard.recently_failed("alice", "other", now=0)
+
+    def test_unknown_user_failure_saves_no_bcrypt(self, guard, service):
+        async def run():
+            for _ in range(2):
+                await service.authenticate_user_async("mallory", "guess")
+
+        asyncio.run(run())
+
+        assert metrics.get("login_attempts_rejected_total", {"reason": "failed_recently"}) == 1
+        assert metrics.get("login_bcrypt_verifications_saved_total") == 0
+
+    def test_username_flood_is_throttled_before_bcrypt(self, guard, service):
+        async def run():
+            results = []
+            for i in range(5):
+                try:
+                    results.append(await service.authenticate_user_async("alice", f"guess-{i}", "10.0.0.9"))
+                except LoginThrottledError as e:
+                    results.append(e.reason)
+            return results
+
+        assert asyncio.run(run()) == [None, None, None, "username_rate", "username_rate"]
+
+        assert len(service.verifications) == 3
+        assert metrics.get("login_attempts_rejected_total", {"reason": "username_rate"}) == 2
+        assert metrics.get("login_bcrypt_verifications_saved_total") == 2
+
+    def test_guessing_from_elsewhere_does_not_lock_the_owner_out(self, guard, service):
+        async def run():
+            for i in range(5):
+                try:
+                    await service.authenticate_user_async("alice", f"guess-{i}", "10.0.0.9")
+                except LoginThrottledError:
+                    pass
+            return await service.authenticate_user_async("alice", "right", "10.0.0.1")
+
+        user = asyncio.run(run())
+
+        assert user is not None and user.username == "alice"
+
+    def test_successful_logins_do_not_use_up_the_username_limit(self, guard, service):
+        async def run():
+            return [await service.authenticate_user_async("alice", "right", "10.0.0.1") for _ in range(5)]
+
+        assert all(user is not None for user in asyncio.run(run()))
+        assert metrics.get("login_attempts_rejected_total", {"reason": "username_rate"}) == 0
+
+    def test_classroom_behind_one_address_can_sign_in(self, monkeypatch, service):
+        for name in ("LOGIN_IP_BURST", "LOGIN_IP_PER_MINUTE", "LOGIN_USERNAME_BURST", "LOGIN_USERNAME_PER_MINUTE"):
+            monkeypatch.delenv(name, raising=False)
+        monkeypatch.setattr(login_guard, "_guard", LoginGuard())
+        for i in range(40):
+            service.user_repository.users[f"student-{i}"] = SimpleNamespace(
+                id=100 + i, username=f"student-{i}", hashed_password=f"hashed:pass-{i}"
+            )
+
+        async def run():
+            users = []
+            for i in range(40):
+                # Everyone mistypes once before getting in
+                await service.authenticate_user_async(f"student-{i}", "typo", "203.0.113.7")
+                users.append(await service.authenticate_user_async(f"student-{i}", f"pass-{i}", "203.0.113.7"))
+            return users
+
+        assert all(user is not None for user in asyncio.run(run()))
+
+    def test_ip_flood_is_throttled_across_usernames(self, guard, service):
+        async def run():
+            for i in range(5):
+                await service.authenticate_user_async(f"user-{i}", "guess", "10.0.0.1")
+            with pytest.raises(LoginThrottledError) as raised:
+                await service.authenticate_user_async("alice", "right", "10.0.0.1")
+            return raised.value
+
+        error = asyncio.run(run())
+
+        assert error.reason == "ip_rate"
+        assert error.retry_after == pytest.approx(60, abs=1)
+        assert str(error) == "Too many login attempts, try again in 60 seconds"
+
+    def test_repository_runs_off_the_event_loop(self, guard, service):
+        async def run():
+            await service.authenticate_user_async("alice", "right")
+            await service.update_user_async(1, full_name="Alice")
+            return threading.get_ident()
+
+        loop_thread = asyncio.run(run())
+
+        assert len(service.user_repository.threads) == 2
+        assert loop_thread not in service.user_repository.threads
+
+    def test_new_password_is_not_rejected_from_memory(self, guard, service):
+        async def run():
+            failed = await service.authenticate_user_async("alice", "new")
+            await service.update_user_async(1, password="new")
+            return failed, await service.authenticate_user_async("alice", "new")
+
+        failed, user = asyncio.run(run())
+
+        assert failed is None
+        assert user is not None and user.username == "alice"
@@ -0,0 +1,26 @@
+import pytest
+from fastapi.testclient import TestClient
+from linda_server.utils.metrics import metrics
+
+class TestMetricsEndpoint:
+    @pytest.fixture
+    def client(self):
+        from linda_server.app import app
+        return TestClient(app)
+
+    def test_disabled_without_token(self, client, monkeypatch):
+        from linda_server import app as app_module
+        monkeypatch.setattr(app_module, "metrics_token", "")
+
+        assert client.get("/metrics", headers={"Authorization": "Bearer anything"}).status_code == 404
+
+    def test_requires_the_metrics_token(self, client, monkeypatch):
+        from linda_server import app as app_module
+        monkeypatch.setattr(app_module, "metrics_token", "scrape-secret")
+        metrics.inc("test_requests_total")
+
+        assert client.get("/metrics").status_code == 401
+        assert client.get("/metrics", headers={"Authorization": "Bearer wrong"}).status_code == 401
+        response = client.get("/metrics", headers={"Authorization": "Bearer scrape-secret"})
+        assert response.status_code == 200
+        assert "test_requests_total" in response.json()["counters"]
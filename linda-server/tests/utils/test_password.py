@@ -0,0 +1,67 @@
+import asyncio
+import bcrypt
+import pytest
+from linda_server.utils.metrics import metrics
+from linda_server.utils.password import PasswordHasher, get_bcrypt_rounds, hash_password, verify_password
+
+class TestPasswordHasher:
+    @pytest.fixture
+    def hasher(self, monkeypatch):
+        # Low cost keeps the test fast; fork avoids re-importing the test runner in every worker
+        monkeypatch.setenv("BCRYPT_ROUNDS", "4")
+        monkeypatch.setenv("PASSWORD_HASH_START_METHOD", "fork")
+        metrics.reset()
+        hasher = PasswordHasher(workers=2)
+        yield hasher
+        hasher.close()
+
+    def test_hash_and_verify_on_worker_pool(self, hasher):
+        async def run():
+            hashed = await hasher.hash("correct horse")
+            return hashed, await hasher.verify("correct horse", hashed), await hasher.verify("wrong", hashed)
+
+        hashed, correct, wrong = asyncio.run(run())
+
+        assert correct and not wrong
+        assert hashed.startswith("$2b$04$")
+        assert verify_password("correct horse", hashed)
+        assert metrics.get("password_hash_total", {"operation": "hash"}) == 1
+        assert metrics.get("password_hash_total", {"operation": "verify"}) == 2
+        assert metrics.get_histogram("password_hash_seconds", {"operation": "verify"})["count"] == 2
+
+    def test_burst_queues_beyond_pool_size(self, hasher):
+        hashed = hash_password("secret", rounds=8)
+        depths = []
+
+        async def run():
+            tasks = [asyncio.create_task(hasher.verify("secret", hashed)) for _ in range(6)]
+            await asyncio.sleep(0)
+            depths.append(hasher.queue_depth)
+            return await asyncio.gather(*tasks)
+
+        assert asyncio.run(run()) == [True] * 6
+        assert depths == [4]
+        assert hasher.queue_depth == 0
+        assert metrics.get("password_hash_queue_depth") == 0
+
+    def test_event_loop_stays_responsive(self, hasher):
+        hashed = hash_password("secret", rounds=10)
+
+        async def run():
+            ticks = 0
+            verification = asyncio.create_task(hasher.verify("secret", hashed))
+            while not verification.done():
+                ticks += 1
+                await asyncio.sleep(0.001)
+            return ticks, verification.result()
+
+        ticks, verified = asyncio.run(run())
+
+        assert verified and ticks > 5
+
+    def test_cost_factor_is_configurable(self, monkeypatch):
+        monkeypatch.setenv("BCRYPT_ROUNDS", "5")
+        assert bcrypt.checkpw(b"pw", hash_password("pw").encode()) and hash_password("pw").startswith("$2b$05$")
+        monkeypatch.setenv("BCRYPT_ROUNDS", "3")
+        with pytest.raises(ValueError):
+            get_bcrypt_rounds()
@@ -0,0 +1,101 @@
+import asyncio
+import pytest
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from linda_server.services.user_service import UserService
+from linda_server.utils.auth_tokens import AuthSettings, TokenVerifier, generate_refresh_token, hash_refresh_token
+from linda_server.utils.metrics import metrics
+
+SETTINGS = AuthSettings(secret_key="test-secret-key-of-at-least-32-bytes", algorithm="HS256", access_token_expire_minutes=30, token_cache_size=100)
+
+class FakeUserRepository:
+    def find_user_by_id(self, user_id):
+        return SimpleNamespace(id=user_id, username="alice") if user_id == 1 else None
+
+class FakeRefreshTokenRepository:
+    def __init__(self):
+        self.tokens = []
+
+    def create_refresh_token(self, user_id, token_hash, family_id, created_at, expires_at):
+        token = SimpleNamespace(id=len(self.tokens) + 1, user_id=user_id, token_hash=token_hash, family_id=family_id,
+                                created_at=created_at, expires_at=expires_at, revoked_at=None)
+        self.tokens.append(token)
+        return token
+
+    def find_token_by_hash(self, token_hash):
+        # Copied, like a row loaded in its own transaction
+        return next((SimpleNamespace(**vars(t)) for t in self.tokens if t.token_hash == token_hash), None)
+
+    def update_revoke_token(self, token_id, revoked_at):
+        token = self.tokens[token_id - 1]
+        if token.revoked_at is not None:
+            return False
+        token.revoked_at = revoked_at
+        return True
+
+    def update_revoke_family(self, family_id, revoked_at):
+        live = [t for t in self.tokens if t.family_id == family_id and t.revoked_at is None]
+        for token in live:
+            token.revoked_at = revoked_at
+        return len(live)
+
+class TestRefreshTokens:
+    @pytest.fixture
+    def service(self):
+        metrics.reset()
+        service = UserService(FakeUserRepository(), FakeRefreshTokenRepository())
+        service.settings = SETTINGS
+        service.secret_key = SETTINGS.secret_key
+        return service
+
+    def test_only_the_digest_is_stored(self, service):
+        token = service.create_refresh_token(1)
+
+        stored = service.refresh_token_repository.tokens[0]
+        assert token not in vars(stored).values()
+        assert stored.token_hash == hash_refresh_token(token, SETTINGS)
+        assert stored.expires_at - stored.created_at == timedelta(days=14)
+
+    def test_refresh_rotates_the_token(self, service):
+        first = service.create_refresh_token(1)
+
+        access_token, second, user = service.refresh_access_token(first)
+
+        assert TokenVerifier(SETTINGS).verify(access_token)["user_id"] == "1"
+        assert user.id == 1 and second != first
+        old, new = service.refresh_token_repository.tokens
+        assert old.revoked_at is not None and new.revoked_at is None
+        assert new.family_id == old.family_id
+        assert service.refresh_access_token(second)[2].id == 1
+        assert metrics.get("auth_refresh_total", {"result": "rotated"}) == 2
+
+    def test_async_variants_rotate_the_token(self, service):
+        async def run():
+            first = await service.create_refresh_token_async(1)
+            return first, await service.refresh_access_token_async(first)
+
+        first, (access_token, second, user) = asyncio.run(run())
+
+        assert access_token is not None and user.id == 1 and second != first
+        assert [t.revoked_at is not None for t in service.refresh_token_repository.tokens] == [True, False]
+
+    def test_reused_token_revokes_its_family(self, service):
+        first = service.create_refresh_token(1)
+        other_login = service.create_refresh_token(1)
+        _, second, _ = service.refresh_access_token(first)
+
+        assert service.refresh_access_token(first) == (None, None, None)
+        # The token rotated from the leaked one is dead too, other logins are not
+        assert service.refresh_access_token(second) == (None, None, None)
+        assert service.refresh_access_token(other_login)[0] is not None
+        assert metrics.get("auth_refresh_total", {"result": "reused"}) == 2
+
+    def test_unknown_and_expired_tokens_are_rejected(self, service):
+        token = service.create_refresh_token(1)
+        service.refresh_token_repository.tokens[0].expires_at = datetime.utcnow() - timedelta(seconds=1)
+        unknown, _ = generate_refresh_token(SETTINGS)
+
+        assert service.refresh_access_token(token) == (None, None, None)
+        assert service.refresh_access_token(unknown) == (None, None, None)
+        assert metrics.get("auth_refresh_total", {"result": "expired"}) == 1
+        assert metrics.get("auth_refresh_total", {"result": "invalid"}) == 1
@@ -0,0 +1,114 @@
+import asyncio
+from linda_server.utils.request_coalescing import SingleFlight, SharedStreamGroup
+
+class TestSingleFlight:
+    def test_concurrent_calls_share_one_result(self):
+        calls = []
+
+        async def fetch():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return "answer"
+
+        async def run():
+            flights = SingleFlight("test")
+            results = await asyncio.gather(*(flights.do("k", fetch) for _ in range(5)))
+            return results, flights.in_flight()
+
+        results, in_flight = asyncio.run(run())
+        assert results == ["answer"] * 5
+        assert len(calls) == 1
+        assert in_flight == 0
+
+    def test_errors_are_shared(self):
+        async def fail():
+            await asyncio.sleep(0.01)
+            raise RuntimeError("upstream failed")
+
+        async def run():
+            flights = SingleFlight("test")
+            return await asyncio.gather(*(flights.do("k", fail) for _ in range(3)), return_exceptions=True)
+
+        results = asyncio.run(run())
+        assert all(isinstance(r, RuntimeError) for r in results)
+
+    def test_call_after_cancel_starts_a_new_flight(self):
+        calls = []
+
+        async def fetch():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return "answer"
+
+        async def run():
+            flights = SingleFlight("test")
+            first = asyncio.ensure_future(flights.do("k", fetch))
+            await asyncio.sleep(0)
+            first.cancel()
+            # Let the caller cancel the shared call, then join before it has finished
+            await asyncio.sleep(0)
+            return await flights.do("k", fetch)
+
+        assert asyncio.run(run()) == "answer"
+        assert len(calls) == 2
+
+
+class TestSharedStreamGroup:
+    @staticmethod
+    def make_factory(chunks, opened):
+        async def factory():
+            opened.append(1)
+
+            async def stream():
+                for chunk in chunks:
+                    await asyncio.sleep(0.005)
+                    yield chunk
+            return stream()
+        return factory
+
+    def test_subscribers_share_one_producer(self):
+        opened = []
+        factory = self.make_factory(["a", "b", "c"], opened)
+
+        async def consume(group, delay):
+            await asyncio.sleep(delay)
+            return [chunk async for chunk in group.subscribe("k", factory)]
+
+        async def run():
+            group = SharedStreamGroup("test")
+            # Late joiners still receive the chunks produced before they subscribed
+            results = await asyncio.gather(consume(group, 0), consume(group, 0.008), consume(group, 0))
+            return results, group.in_flight()
+
+        results, in_flight = asyncio.run(run())
+        assert results == [["a", "b", "c"]] * 3
+        assert len(opened) == 1
+        assert in_flight == 0
+
+    def test_producer_cancelled_when_last_subscriber_leaves(self):
+        opened = []
+        factory = self.make_factory(["a"] * 100, opened)
+
+        async def run():
+            group = SharedStreamGroup("test")
+            async for _ in group.subscribe("k", factory):
+                break
+            await asyncio.sleep(0.01)
+            return group.in_flight()
+
+        assert asyncio.run(run()) == 0
+
+    def test_join_after_cancel_starts_a_new_stream(self):
+        opened = []
+        factory = self.make_factory(["a", "b"], opened)
+
+        async def run():
+            group = SharedStreamGroup("test")
+            first = group.subscribe("k", factory)
+            await first.__anext__()
+            # The last subscriber leaves; the producer is still being torn down
+            await first.aclose()
+            return [chunk async for chunk in group.subscribe("k", factory)]
+
+        assert asyncio.run(run()) == ["a", "b"]
+        assert len(opened) == 2
@@ -0,0 +1,133 @@
+import asyncio
+import pytest
+import websockets
+from temporalio.testing import ActivityEnvironment
+from linda_server.functions.llm_chat import _limited_stream
+from linda_server.utils.concurrency_limiter import AdaptiveLimiter
+from linda_server.utils.llm_retry import compute_deadline
+from linda_server.utils.metrics import metrics
+from linda_server.utils.stream_relay import StreamAbandonedError, make_chunk, relay_stream_to_websocket
+from linda_server.utils.stream_stats import StreamTimer
+from linda_server.utils import token_budget
+
+class FakeUpstream:
+    """An endless upstream stream that records whether it was closed."""
+    def __init__(self, delay=0.01):
+        self.delay = delay
+        self.sent = 0
+        self.closed = False
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        await asyncio.sleep(self.delay)
+        self.sent += 1
+        return make_chunk("chatcmpl-test", "gpt-4.1", "token ")
+
+    async def close(self):
+        self.closed = True
+
+class TestStreamCancellation:
+    @pytest.fixture(autouse=True)
+    def reset_metrics(self, monkeypatch):
+        metrics.reset()
+        monkeypatch.setattr(token_budget, "_get_encoding", lambda model: None)
+
+    def _limited(self, limiter, upstream):
+        async def open_upstream(timeout):
+            return upstream
+        return _limited_stream(limiter, open_upstream, compute_deadline(), "gpt-4.1", 10, StreamTimer("upstream", "gpt-4.1", agent="test"))
+
+    def test_consumer_disconnect_closes_upstream_and_frees_slot(self):
+        limiter = AdaptiveLimiter("test_llm", initial_limit=1)
+        upstream = FakeUpstream()
+
+        async def close_after_three(websocket):
+            for _ in range(3):
+                await websocket.recv()
+            await websocket.close()
+
+        async def run():
+            async with websockets.serve(close_after_three, "localhost", 0) as server:
+                port = server.sockets[0].getsockname()[1]
+                return await ActivityEnvironment().run(
+                    relay_stream_to_websocket, self._limited(limiter, upstream), f"localhost:{port}"
+                )
+
+        with pytest.raises(StreamAbandonedError):
+            asyncio.run(run())
+
+        assert upstream.closed
+        assert upstream.sent < 20
+        assert limiter.stats()["in_flight"] == 0
+        assert metrics.get("llm_stream_abandoned_total", labels={"reason": "disconnected"}) == 1
+        assert metrics.get("llm_stream_slots_reclaimed_total", labels={"model": "gpt-4.1"}) == 1
+        assert metrics.get("llm_stream_cancelled_tokens_total", labels={"model": "gpt-4.1"}) > 0
+
+    def test_step_cancellation_closes_upstream(self):
+        limiter = AdaptiveLimiter("test_llm", initial_limit=1)
+        upstream = FakeUpstream()
+
+        async def sink(websocket):
+            async for _ in websocket:
+                pass
+
+        async def run():
+            async with websockets.serve(sink, "localhost", 0) as server:
+                port = server.sockets[0].getsockname()[1]
+                env = ActivityEnvironment()
+                task = asyncio.ensure_future(env.run(
+                    relay_stream_to_websocket, self._limited(limiter, upstream), f"localhost:{port}"
+                ))
+                await asyncio.sleep(0.1)
+                task.cancel()
+                with pytest.raises(asyncio.CancelledError):
+                    await task
+
+        asyncio.run(run())
+
+        assert upstream.closed
+        assert limiter.stats()["in_flight"] == 0
+        assert metrics.get("llm_stream_abandoned_total", labels={"reason": "cancelled"}) == 1
+        assert metrics.get("llm_stream_slots_reclaimed_total", labels={"model": "gpt-4.1"}) == 1
+
+    def test_completed_stream_is_not_counted_as_cancelled(self):
+        limiter = AdaptiveLimiter("test_llm", initial_limit=1)
+
+        async def finite():
+            for _ in range(3):
+                yield make_chunk("chatcmpl-test", "gpt-4.1", "token ")
+
+        async def consume():
+            async def open_upstream(timeout):
+                return finite()
+            stream = _limited_stream(limiter, open_upstream, compute_deadline(), "gpt-4.1", 10, StreamTimer("upstream", "gpt-4.1", agent="test"))
+            return [chunk async for chunk in stream]
+
+        assert len(asyncio.run(consume())) == 3
+        assert metrics.get("llm_stream_slots_reclaimed_total", labels={"model": "gpt-4.1"}) == 0
+
+    def test_each_open_attempt_takes_its_own_slot(self, monkeypatch):
+        monkeypatch.setenv("LLM_MAX_ATTEMPTS", "3")
+        limiter = AdaptiveLimiter("test_llm", initial_limit=4)
+        in_flight_at_open = []
+
+        async def finite():
+            yield make_chunk("chatcmpl-test", "gpt-4.1", "token ")
+
+        async def open_upstream(timeout):
+            in_flight_at_open.append(limiter.in_flight)
+            if len(in_flight_at_open) == 1:
+                raise asyncio.TimeoutError()
+            return finite()
+
+        async def consume():
+            stream = _limited_stream(limiter, open_upstream, compute_deadline(), "gpt-4.1", 10, StreamTimer("upstream", "gpt-4.1", agent="test"))
+            return [chunk async for chunk in stream]
+
+        assert len(asyncio.run(consume())) == 1
+        # The timed-out attempt released its slot, and shrank the limit, before the retry
+        assert in_flight_at_open == [1, 1]
+        assert metrics.get("test_llm_overload_total", labels={}) == 1
+        assert limiter.stats()["in_flight"] == 0
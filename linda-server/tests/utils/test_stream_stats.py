@@ -0,0 +1,72 @@
+import asyncio
+import pytest
+import time
+from linda_server.functions.llm_chat import LlmChatInput, LlmChatOutput, _chat_result
+from linda_server.utils.metrics import metrics
+from linda_server.utils.stream_stats import StreamTimer
+from linda_server.utils import token_budget
+
+class TestStreamStats:
+    @pytest.fixture(autouse=True)
+    def reset_metrics(self, monkeypatch):
+        metrics.reset()
+        monkeypatch.setattr(token_budget, "_get_encoding", lambda model: None)
+
+    def test_histogram_buckets_are_cumulative(self):
+        for value in (0.004, 0.3, 0.3, 500):
+            metrics.observe("latency_seconds", value, labels={"model": "m"})
+
+        histogram = metrics.get_histogram("latency_seconds", labels={"model": "m"})
+        assert histogram["count"] == 4
+        assert histogram["buckets"]["0.005"] == 1
+        assert histogram["buckets"]["0.5"] == 3
+        assert histogram["buckets"]["300"] == 3
+        assert histogram["buckets"]["+Inf"] == 4
+        assert "latency_seconds{model=m}" in metrics.snapshot()["histograms"]
+
+    def test_timer_records_ttft_gaps_and_throughput(self):
+        timer = StreamTimer("upstream", "gpt-4.1", agent="MathMasterAgent")
+
+        async def stream():
+            await asyncio.sleep(0.05)
+            for _ in range(5):
+                timer.chunk("word " * 4)
+                await asyncio.sleep(0.01)
+            timer.chunk(None)
+
+        asyncio.run(stream())
+        stats = asyncio.run(timer.finish())
+
+        assert stats.ttft >= 0.05
+        assert stats.chunks == 5
+        assert stats.tokens > 0
+        assert stats.tokens_per_second > 0
+        assert stats.max_gap >= 0.01
+        labels = {"model": "gpt-4.1", "agent": "MathMasterAgent", "stage": "upstream"}
+        assert metrics.get_histogram("llm_stream_ttft_seconds", labels=labels)["count"] == 1
+        assert metrics.get_histogram("llm_stream_inter_token_gap_seconds", labels=labels)["count"] == 4
+        # A second finish returns the same summary without re-exporting
+        assert asyncio.run(timer.finish()) is stats
+        assert metrics.get_histogram("llm_stream_ttft_seconds", labels=labels)["count"] == 1
+
+    def test_timer_without_chunks(self):
+        timer = StreamTimer("relay", "gpt-4.1", agent="unknown", started=time.monotonic())
+        timer.sent(0.2)
+        stats = asyncio.run(timer.finish())
+
+        assert stats.ttft is None
+        assert stats.tokens == 0
+        assert stats.send_seconds == 0.2
+
+    def test_chat_result_attaches_finished_timers(self):
+        upstream = StreamTimer("upstream", "gpt-4.1", agent="a")
+        relay = StreamTimer("relay", "gpt-4.1", agent="a")
+        relay.chunk("hello")
+        asyncio.run(relay.finish())
+
+        assert _chat_result(LlmChatInput(), "text", upstream, relay) == "text"
+        result = _chat_result(LlmChatInput(include_stats=True), "text", upstream, relay)
+        assert isinstance(result, LlmChatOutput)
+        assert result.content == "text"
+        # The upstream timer never finished here (e.g. a coalesced follower)
+        assert list(result.stream_stats) == ["relay"]
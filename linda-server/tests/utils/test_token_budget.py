@@ -0,0 +1,83 @@
+import pytest
+import sys
+import types
+from linda_server.utils import token_budget
+from linda_server.utils.token_budget import (
+    PromptTooLargeError,
+    count_message_tokens,
+    count_tokens,
+    fit_messages_to_budget,
+    get_prompt_budget,
+    preload_encodings,
+)
+
+# The cached loader, before the autouse fixture swaps it for the estimate
+_cached_get_encoding = token_budget._get_encoding
+
+class TestTokenBudget:
+    @pytest.fixture(autouse=True)
+    def estimated_tokenizer(self, monkeypatch):
+        # Use the character estimate so counts don't depend on tiktoken being available
+        monkeypatch.setattr(token_budget, "_get_encoding", lambda model: None)
+
+    def test_count_tokens(self):
+        assert count_tokens("", "gpt-4.1") == 0
+        assert count_tokens("a" * 35, "gpt-4.1") == 10
+
+    def test_count_message_tokens_includes_framing(self):
+        messages = [{"role": "user", "content": "a" * 35}]
+        assert count_message_tokens(messages, "gpt-4.1") > count_tokens("a" * 35, "gpt-4.1")
+
+    def test_prompt_budget_cap(self, monkeypatch):
+        monkeypatch.setenv("LLM_CONTEXT_BUDGET_TOKENS", "1000")
+        monkeypatch.setenv("LLM_COMPLETION_RESERVE_TOKENS", "200")
+        assert get_prompt_budget("gpt-4.1") == 800
+
+    def test_messages_within_budget_are_unchanged(self):
+        messages = [{"role": "system", "content": "Solve it"}, {"role": "user", "content": "Triangle ABC"}]
+        fitted, tokens = fit_messages_to_budget(messages, "gpt-4.1", budget=1000)
+        assert fitted is messages
+        assert tokens == count_message_tokens(messages, "gpt-4.1")
+
+    def test_oversized_user_content_is_truncated(self):
+        system = {"role": "system", "content": "You are a geometry master."}
+        user = {"role": "user", "content": "HEAD " + "x" * 5000 + " TAIL"}
+        fitted, tokens = fit_messages_to_budget([system, user], "gpt-4.1", budget=300)
+
+        assert tokens <= 300
+        assert fitted[0] == system
+        assert fitted[1]["content"].startswith("HEAD")
+        assert fitted[1]["content"].endswith("TAIL")
+        assert "tokens truncated" in fitted[1]["content"]
+        # The caller's messages are not modified
+        assert len(user["content"]) == 5010
+
+    def test_oversized_system_prompt_raises(self):
+        messages = [{"role": "system", "content": "x" * 5000}, {"role": "user", "content": "hi"}]
+        with pytest.raises(PromptTooLargeError):
+            fit_messages_to_budget(messages, "gpt-4.1", budget=100)
+
+    def test_preload_encodings_loads_each_model_once(self, monkeypatch):
+        loaded = []
+
+        class Encoding:
+            def encode(self, text, disallowed_special=()):
+                return text.split()
+
+        def encoding_for_model(model):
+            loaded.append(model)
+            return Encoding()
+
+        monkeypatch.setitem(sys.modules, "tiktoken", types.SimpleNamespace(encoding_for_model=encoding_for_model))
+        monkeypatch.setattr(token_budget, "_get_encoding", _cached_get_encoding)
+        _cached_get_encoding.cache_clear()
+        try:
+            assert preload_encodings(["gpt-4.1", "gpt-4o"]) == 2
+            assert preload_encodings(["gpt-4.1", "gpt-4o"]) == 2
+            assert count_tokens("three short words", "gpt-4.1") == 3
+            assert loaded == ["gpt-4.1", "gpt-4o"]
+            assert preload_encodings() == len(token_budget.MODEL_CONTEXT_WINDOWS)
+            assert sorted(loaded) == sorted(token_budget.MODEL_CONTEXT_WINDOWS)
+        finally:
+            # Don't leak the fake encodings into other tests
+            _cached_get_encoding.cache_clear()
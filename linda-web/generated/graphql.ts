@@ -39,6 +39,7 @@ export type LoginInput = {
 
 export type LoginPayload = {
   __typename?: 'LoginPayload';
+  refreshToken: Scalars['String']['output'];
   token: Scalars['String']['output'];
   user: User;
 };
@@ -47,10 +48,13 @@ export type Mutation = {
   __typename?: 'Mutation';
   buySubscription: Scalars['Boolean']['output'];
   cancelSubscription: Scalars['Boolean']['output'];
+  claimAnimationSession: Scalars['Boolean']['output'];
+  createAnimationPreviewTicket: Scalars['String']['output'];
   createUser: User;
   deleteUser: Scalars['Boolean']['output'];
   generateApiKey: ApiKey;
   login: LoginPayload;
+  refreshToken: LoginPayload;
   updateUser: User;
 };
 
@@ -67,6 +71,16 @@ export type MutationCancelSubscriptionArgs = {
 };
 
 
+export type MutationClaimAnimationSessionArgs = {
+  agentId: Scalars['String']['input'];
+};
+
+
+export type MutationCreateAnimationPreviewTicketArgs = {
+  agentId: Scalars['String']['input'];
+};
+
+
 export type MutationCreateUserArgs = {
   input: CreateUserInput;
 };
@@ -87,6 +101,11 @@ export type MutationLoginArgs = {
 };
 
 
+export type MutationRefreshTokenArgs = {
+  input: RefreshTokenInput;
+};
+
+
 export type MutationUpdateUserArgs = {
   input: UpdateUserInput;
 };
@@ -103,6 +122,10 @@ export type QueryUserArgs = {
   userId: Scalars['Int']['input'];
 };
 
+export type RefreshTokenInput = {
+  refreshToken: Scalars['String']['input'];
+};
+
 export type UpdateUserInput = {
   email?: InputMaybe<Scalars['String']['input']>;
   fullName?: InputMaybe<Scalars['String']['input']>;
@@ -142,6 +165,20 @@ export type CancelSubscriptionMutationVariables = Exact<{
 
 export type CancelSubscriptionMutation = { __typename?: 'Mutation', cancelSubscription: boolean };
 
+export type ClaimAnimationSessionMutationVariables = Exact<{
+  agentId: Scalars['String']['input'];
+}>;
+
+
+export type ClaimAnimationSessionMutation = { __typename?: 'Mutation', claimAnimationSession: boolean };
+
+export type CreateAnimationPreviewTicketMutationVariables = Exact<{
+  agentId: Scalars['String']['input'];
+}>;
+
+
+export type CreateAnimationPreviewTicketMutation = { __typename?: 'Mutation', createAnimationPreviewTicket: string };
+
 export type CreateUserMutationVariables = Exact<{
   input: CreateUserInput;
 }>;
@@ -168,7 +205,14 @@ export type LoginMutationVariables = Exact<{
 }>;
 
 
-export type LoginMutation = { __typename?: 'Mutation', login: { __typename?: 'LoginPayload', token: string, user: { __typename?: 'User', id: number, username: string, email: string, fullName: string } } };
+export type LoginMutation = { __typename?: 'Mutation', login: { __typename?: 'LoginPayload', token: string, refreshToken: string, user: { __typename?: 'User', id: number, username: string, email: string, fullName: string } } };
+
+export type RefreshTokenMutationVariables = Exact<{
+  input: RefreshTokenInput;
+}>;
+
+
+export type RefreshTokenMutation = { __typename?: 'Mutation', refreshToken: { __typename?: 'LoginPayload', token: string, refreshToken: string, user: { __typename?: 'User', id: number, username: string, email: string, fullName: string } } };
 
 export type GetUserQueryVariables = Exact<{
   userId: Scalars['Int']['input'];
@@ -274,6 +318,60 @@ export function useCancelSubscriptionMutation(options: VueApolloComposable.UseMu
   return VueApolloComposable.useMutation<CancelSubscriptionMutation, CancelSubscriptionMutationVariables>(CancelSubscriptionDocument, options);
 }
 export type CancelSubscriptionMutationCompositionFunctionResult = VueApolloComposable.UseMutationReturn<CancelSubscriptionMutation, CancelSubscriptionMutationVariables>;
+export const ClaimAnimationSessionDocument = gql`
+    mutation ClaimAnimationSession($agentId: String!) {
+  claimAnimationSession(agentId: $agentId)
+}
+    `;
+
+/**
+ * __useClaimAnimationSessionMutation__
+ *
+ * To run a mutation, you first call `useClaimAnimationSessionMutation` within a Vue component and pass it any options that fit your needs.
+ * When your component renders, `useClaimAnimationSessionMutation` returns an object that includes:
+ * - A mutate function that you can call at any time to execute the mutation
+ * - Several other properties: https://v4.apollo.vuejs.org/api/use-mutation.html#return
+ *
+ * @param options that will be passed into the mutation, supported options are listed on: https://v4.apollo.vuejs.org/guide-composable/mutation.html#options;
+ *
+ * @example
+ * const { mutate, loading, error, onDone } = useClaimAnimationSessionMutation({
+ *   variables: {
+ *     agentId: // value for 'agentId'
+ *   },
+ * });
+ */
+export function useClaimAnimationSessionMutation(options: VueApolloComposable.UseMutationOptions<ClaimAnimationSessionMutation, ClaimAnimationSessionMutationVariables> | ReactiveFunction<VueApolloComposable.UseMutationOptions<ClaimAnimationSessionMutation, ClaimAnimationSessionMutationVariables>> = {}) {
+  return VueApolloComposable.useMutation<ClaimAnimationSessionMutation, ClaimAnimationSessionMutationVariables>(ClaimAnimationSessionDocument, options);
+}
+export type ClaimAnimationSessionMutationCompositionFunctionResult = VueApolloComposable.UseMutationReturn<ClaimAnimationSessionMutation, ClaimAnimationSessionMutationVariables>;
+export const CreateAnimationPreviewTicketDocument = gql`
+    mutation CreateAnimationPreviewTicket($agentId: String!) {
+  createAnimationPreviewTicket(agentId: $agentId)
+}
+    `;
+
+/**
+ * __useCreateAnimationPreviewTicketMutation__
+ *
+ * To run a mutation, you first call `useCreateAnimationPreviewTicketMutation` within a Vue component and pass it any options that fit your needs.
+ * When your component renders, `useCreateAnimationPreviewTicketMutation` returns an object that includes:
+ * - A mutate function that you can call at any time to execute the mutation
+ * - Several other properties: https://v4.apollo.vuejs.org/api/use-mutation.html#return
+ *
+ * @param options that will be passed into the mutation, supported options are listed on: https://v4.apollo.vuejs.org/guide-composable/mutation.html#options;
+ *
+ * @example
+ * const { mutate, loading, error, onDone } = useCreateAnimationPreviewTicketMutation({
+ *   variables: {
+ *     agentId: // value for 'agentId'
+ *   },
+ * });
+ */
+export function useCreateAnimationPreviewTicketMutation(options: VueApolloComposable.UseMutationOptions<CreateAnimationPreviewTicketMutation, CreateAnimationPreviewTicketMutationVariables> | ReactiveFunction<VueApolloComposable.UseMutationOptions<CreateAnimationPreviewTicketMutation, CreateAnimationPreviewTicketMutationVariables>> = {}) {
+  return VueApolloComposable.useMutation<CreateAnimationPreviewTicketMutation, CreateAnimationPreviewTicketMutationVariables>(CreateAnimationPreviewTicketDocument, options);
+}
+export type CreateAnimationPreviewTicketMutationCompositionFunctionResult = VueApolloComposable.UseMutationReturn<CreateAnimationPreviewTicketMutation, CreateAnimationPreviewTicketMutationVariables>;
 export const CreateUserDocument = gql`
     mutation CreateUser($input: CreateUserInput!) {
   createUser(input: $input) {
@@ -369,6 +467,7 @@ export const LoginDocument = gql`
     mutation Login($input: LoginInput!) {
   login(input: $input) {
     token
+    refreshToken
     user {
       id
       username
@@ -400,6 +499,42 @@ export function useLoginMutation(options: VueApolloComposable.UseMutationOptions
   return VueApolloComposable.useMutation<LoginMutation, LoginMutationVariables>(LoginDocument, options);
 }
 export type LoginMutationCompositionFunctionResult = VueApolloComposable.UseMutationReturn<LoginMutation, LoginMutationVariables>;
+export const RefreshTokenDocument = gql`
+    mutation RefreshToken($input: RefreshTokenInput!) {
+  refreshToken(input: $input) {
+    token
+    refreshToken
+    user {
+      id
+      username
+      email
+      fullName
+    }
+  }
+}
+    `;
+
+/**
+ * __useRefreshTokenMutation__
+ *
+ * To run a mutation, you first call `useRefreshTokenMutation` within a Vue component and pass it any options that fit your needs.
+ * When your component renders, `useRefreshTokenMutation` returns an object that includes:
+ * - A mutate function that you can call at any time to execute the mutation
+ * - Several other properties: https://v4.apollo.vuejs.org/api/use-mutation.html#return
+ *
+ * @param options that will be passed into the mutation, supported options are listed on: https://v4.apollo.vuejs.org/guide-composable/mutation.html#options;
+ *
+ * @example
+ * const { mutate, loading, error, onDone } = useRefreshTokenMutation({
+ *   variables: {
+ *     input: // value for 'input'
+ *   },
+ * });
+ */
+export function useRefreshTokenMutation(options: VueApolloComposable.UseMutationOptions<RefreshTokenMutation, RefreshTokenMutationVariables> | ReactiveFunction<VueApolloComposable.UseMutationOptions<RefreshTokenMutation, RefreshTokenMutationVariables>> = {}) {
+  return VueApolloComposable.useMutation<RefreshTokenMutation, RefreshTokenMutationVariables>(RefreshTokenDocument, options);
+}
+export type RefreshTokenMutationCompositionFunctionResult = VueApolloComposable.UseMutationReturn<RefreshTokenMutation, RefreshTokenMutationVariables>;
 export const GetUserDocument = gql`
     query GetUser($userId: Int!) {
   user(userId: $userId) {
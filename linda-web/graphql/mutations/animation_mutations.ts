@@ -0,0 +1,13 @@
+import gql from 'graphql-tag';
+
+export const ClaimAnimationSession = gql`
+  mutation ClaimAnimationSession($agentId: String!) {
+    claimAnimationSession(agentId: $agentId)
+  }
+`;
+
+export const CreateAnimationPreviewTicket = gql`
+  mutation CreateAnimationPreviewTicket($agentId: String!) {
+    createAnimationPreviewTicket(agentId: $agentId)
+  }
+`;
@@ -32,6 +32,22 @@ export const Login = gql`
   mutation Login($input: LoginInput!) {
     login(input: $input) {
       token
+      refreshToken
+      user {
+        id
+        username
+        email
+        fullName
+      }
+    }
+  }
+`;
+
+export const RefreshToken = gql`
+  mutation RefreshToken($input: RefreshTokenInput!) {
+    refreshToken(input: $input) {
+      token
+      refreshToken
       user {
         id
         username
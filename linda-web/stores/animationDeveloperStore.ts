@@ -1,9 +1,18 @@
 import { defineStore } from 'pinia'
+import { useMutation } from '@vue/apollo-composable'
+import { ClaimAnimationSession, CreateAnimationPreviewTicket } from '~/graphql/mutations/animation_mutations'
+import type {
+  ClaimAnimationSessionMutation,
+  ClaimAnimationSessionMutationVariables,
+  CreateAnimationPreviewTicketMutation,
+  CreateAnimationPreviewTicketMutationVariables
+} from '~/generated/graphql'
 
 // Hardcoded URLs
 const API_BASE_URL = 'http://localhost:6233'
 const STREAM_BASE_URL = 'http://localhost:9233' // This URL should be used for the completion API
-const ANIMATION_SERVER_URL = 'http://localhost:4000'
+// Each agent session previews its own animation workspace through the linda server
+const ANIMATION_PREVIEW_BASE_URL = 'http://localhost:8000/animations'
 
 export const useAnimationDeveloperStore = defineStore('animationDeveloper', {
   state: () => ({
@@ -11,7 +20,8 @@ export const useAnimationDeveloperStore = defineStore('animationDeveloper', {
     runId: null as string | null,
     isLoading: false as boolean,
     error: null as string | null,
-    animationReady: false as boolean
+    animationReady: false as boolean,
+    animationUrl: '' as string
   }),
 
   actions: {
@@ -92,6 +102,10 @@ export const useAnimationDeveloperStore = defineStore('animationDeveloper', {
         const data = await resp.json()
         this.agentId = data.agentId
         this.runId = data.runId
+
+        // Only the user who claimed the session can preview its animation
+        const { mutate: claimSession } = useMutation<ClaimAnimationSessionMutation, ClaimAnimationSessionMutationVariables>(ClaimAnimationSession)
+        await claimSession({ agentId: data.agentId })
         
         console.log('Animation developer agent started successfully:', this.agentId, this.runId)
         return true
@@ -166,17 +180,11 @@ ${finalAnswer ? `Final Answer: ${finalAnswer}` : ""}
         const result = await response.json()
         console.log('Animation generation result:', result)
         
-        // Check if animation server is accessible
+        // Tickets are single-use, so the iframe gets one of its own
         try {
-          const serverCheck = await fetch(ANIMATION_SERVER_URL, { 
-            method: 'HEAD',
-            mode: 'no-cors'  // This allows us to check if server is up without CORS issues
-          })
-          // If we get here, the server is responding
-          console.log('Animation server is accessible')
+          this.animationUrl = await this.createPreviewUrl()
         } catch (e) {
-          console.warn('Animation server might not be running:', e)
-          this.error = `Animation server not accessible. Please check if it's running on ${ANIMATION_SERVER_URL}`
+          console.warn('Could not open the animation preview:', e)
           throw new Error('Animation server not accessible')
         }
         
@@ -193,8 +201,16 @@ ${finalAnswer ? `Final Answer: ${finalAnswer}` : ""}
       }
     },
 
-    getAnimationUrl() {
-      return ANIMATION_SERVER_URL
+    async createPreviewUrl() {
+      // The preview loads in an iframe, which cannot send the Authorization header,
+      // so it is opened with a short-lived, single-use ticket instead
+      const { mutate: createTicket } = useMutation<CreateAnimationPreviewTicketMutation, CreateAnimationPreviewTicketMutationVariables>(CreateAnimationPreviewTicket)
+      const result = await createTicket({ agentId: this.agentId! })
+      const ticket = result?.data?.createAnimationPreviewTicket
+      if (!ticket) {
+        throw new Error('No preview ticket returned')
+      }
+      return `${ANIMATION_PREVIEW_BASE_URL}/${this.agentId}?ticket=${encodeURIComponent(ticket)}`
     },
 
     reset() {
@@ -202,6 +218,7 @@ ${finalAnswer ? `Final Answer: ${finalAnswer}` : ""}
       this.isLoading = false
       this.error = null
       this.animationReady = false
+      this.animationUrl = ''
     },
     
     async fullReset() {
@@ -1,6 +1,6 @@
 import { defineStore } from 'pinia'
 import { useMutation, useQuery } from '@vue/apollo-composable'
-import { CreateUser, UpdateUser, DeleteUser, Login } from '~/graphql/mutations/user_mutations'
+import { CreateUser, UpdateUser, DeleteUser, Login, RefreshToken } from '~/graphql/mutations/user_mutations'
 import { GetUser, GetAllUsers } from '~/graphql/queries/user_queries'
 import type { 
   User,
@@ -12,6 +12,8 @@ import type {
   DeleteUserMutationVariables,
   LoginMutation,
   LoginMutationVariables,
+  RefreshTokenMutation,
+  RefreshTokenMutationVariables,
   GetUserQuery,
   GetUserQueryVariables,
   GetAllUsersQuery,
@@ -24,6 +26,21 @@ interface UserState {
   loading: boolean;
   error: string | null;
   authToken: string | null;
+  refreshToken: string | null;
+}
+
+// Refresh this long before the access token expires
+const REFRESH_MARGIN_MS = 60 * 1000
+
+let refreshTimer: ReturnType<typeof setTimeout> | null = null
+
+function tokenExpiresAt(token: string): number | null {
+  try {
+    const payload = JSON.parse(atob(token.split('.')[1].replace(/-/g, '+').replace(/_/g, '/')))
+    return typeof payload.exp === 'number' ? payload.exp * 1000 : null
+  } catch {
+    return null
+  }
 }
 
 export const useUserStore = defineStore('user', {
@@ -33,17 +50,64 @@ export const useUserStore = defineStore('user', {
     loading: false,
     error: null,
     authToken: null,
+    refreshToken: null,
   }),
 
   actions: {
-    setAuthToken(token: string) {
+    setAuthToken(token: string, refreshToken?: string) {
       this.authToken = token
       localStorage.setItem('authToken', token)
+      if (refreshToken) {
+        this.refreshToken = refreshToken
+        localStorage.setItem('refreshToken', refreshToken)
+      }
+      this.scheduleRefresh(token)
     },
 
     clearAuthToken() {
       this.authToken = null
+      this.refreshToken = null
       localStorage.removeItem('authToken')
+      localStorage.removeItem('refreshToken')
+      if (refreshTimer) {
+        clearTimeout(refreshTimer)
+        refreshTimer = null
+      }
+    },
+
+    scheduleRefresh(token: string) {
+      if (refreshTimer) {
+        clearTimeout(refreshTimer)
+      }
+      const expiresAt = tokenExpiresAt(token)
+      if (expiresAt === null) {
+        return
+      }
+      refreshTimer = setTimeout(() => this.refreshSession(), Math.max(0, expiresAt - Date.now() - REFRESH_MARGIN_MS))
+    },
+
+    // Trades the refresh token for new tokens instead of asking for the password again
+    async refreshSession(): Promise<boolean> {
+      const refreshToken = this.refreshToken ?? localStorage.getItem('refreshToken')
+      if (!refreshToken) {
+        return false
+      }
+      const { mutate: refreshTokenMutation } = useMutation<RefreshTokenMutation, RefreshTokenMutationVariables>(RefreshToken)
+
+      try {
+        const result = await refreshTokenMutation({ input: { refreshToken } })
+        if (result.data?.refreshToken) {
+          const { token, refreshToken: nextRefreshToken, user } = result.data.refreshToken
+          this.setAuthToken(token, nextRefreshToken)
+          this.currentUser = user
+          return true
+        }
+      } catch (error) {
+        console.error('Error refreshing session:', error)
+      }
+      // The refresh token expired or was revoked, so a real login is needed
+      this.logout()
+      return false
     },
 
     logout() {
@@ -65,8 +129,8 @@ export const useUserStore = defineStore('user', {
         })
         
         if (result.data?.login) {
-          const { token, user } = result.data.login
-          this.setAuthToken(token)
+          const { token, refreshToken, user } = result.data.login
+          this.setAuthToken(token, refreshToken)
           this.currentUser = user
           return true
         }